@@ -13,7 +13,6 @@ Script for adjacency list computation.
 
 from arcpy import AddField_management
 from arcpy import AddLocations_na
-from arcpy import AddMessage
 from arcpy import Append_management
 from arcpy import CalculateField_management
 from arcpy import Describe
@@ -30,7 +29,10 @@ from arcpy import SelectLayerByLocation_management
 from arcpy import Solve_na
 from arcpy import TableToTable_conversion
 from arcpy import UpdateCursor
+from src.Common.Utils.Messages import add_message
 from src.Common.Utils.Progress_Bar import Progress_Bar
+from src.Common.Utils.Tracing import PARTITION
+from src.Common.Utils.Tracing import span
 from src.Centrality.Constants import ADDING_DESTINATIONS_STARTED
 from src.Centrality.Constants import ADDING_DESTINATIONS_FINISHED
 from src.Centrality.Constants import ADDING_BARRIERS_STARTED
@@ -107,7 +109,7 @@ def compute_adjacency_list(input_points, input_network, id_attribute,
     barrier_costs_calculated = row_has_field(test_input_point,
                                              trim(BARRIER_COST_FIELD))
     if not barrier_costs_calculated:
-        AddMessage(BARRIER_COST_COMPUTATION_STARTED)
+        add_message(BARRIER_COST_COMPUTATION_STARTED)
         # Add |BARRIER_COST_FIELD| column in |input_points|
         AddField_management(in_table=input_points,
                             field_name=trim(BARRIER_COST_FIELD), field_type="DOUBLE",
@@ -139,7 +141,7 @@ def compute_adjacency_list(input_points, input_network, id_attribute,
             row.setValue(trim(BARRIER_COST_FIELD), barrier_cost)
             rows.updateRow(row)
             barrier_progress.step()
-        AddMessage(BARRIER_COST_COMPUTATION_FINISHED)
+        add_message(BARRIER_COST_COMPUTATION_FINISHED)
 
     # Necessary files
     od_cost_matrix_layer = join(auxiliary_dir, OD_COST_MATRIX_LAYER_NAME)
@@ -216,22 +218,23 @@ def compute_adjacency_list(input_points, input_network, id_attribute,
                         snap_offset=SNAP_OFFSET)
 
     # OD cost matrix destinations
-    AddMessage(ADDING_DESTINATIONS_STARTED)
+    add_message(ADDING_DESTINATIONS_STARTED)
     SelectLayerByLocation_management(in_layer=input_points_layer)
     add_locations("Destinations")
-    AddMessage(ADDING_DESTINATIONS_FINISHED)
+    add_message(ADDING_DESTINATIONS_FINISHED)
 
     # OD cost matrix point barriers
-    AddMessage(ADDING_BARRIERS_STARTED)
+    add_message(ADDING_BARRIERS_STARTED)
     add_locations("Point Barriers",
                   ("FullEdge # 0; BarrierType # 2;"
                    f"Attr_{impedance_attribute} {trim(BARRIER_COST_FIELD)} #;"))
-    AddMessage(ADDING_BARRIERS_FINISHED)
+    add_message(ADDING_BARRIERS_FINISHED)
 
     # Compute adjacency list, one raster cell at a time
     progress = Progress_Bar(raster_cell_count, 1, STEP_1)
     rows = UpdateCursor(polygons)
     for row in rows:
+        cell_span = span("Adjacency list cell", PARTITION, cell=row.FID)
         # Select the current polygon
         SelectLayerByAttribute_management(in_layer_or_view=polygons_layer,
                                           selection_type="NEW_SELECTION",
@@ -269,6 +272,7 @@ def compute_adjacency_list(input_points, input_network, id_attribute,
                           target=temp_adj_dbf,
                           schema_type="TEST")
 
+        cell_span.end()
         progress.step()
 
     # Copy data from |temp_adj_dbf| to |adj_dbf|
@@ -0,0 +1,267 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for running a parameter study: many centrality computations on the same
+    networks, with different origins, weights and measures.
+A batch spec (JSON) is a list of jobs, each a dictionary with:
+    "adjacency_list": the adjacency list computed by the tool (Step 1)
+    "points": the input points, with their network locations
+    "id_field": the id field of the points
+    "impedance": the impedance attribute of the adjacency list
+    "output": the CSV file for the results of the job
+and optionally "accumulate", "weight_field", "origins" (a list of point ids,
+    all points by default), "measures", "normalize", "radius",
+    "network_radius" and "beta".
+Jobs are grouped by the graph they run on, given by their |GRAPH_FIELDS|. Each
+    graph is built once, with the locations of its nodes and all the weight
+    fields its jobs use, and its jobs are then run back to back, or in
+    parallel.
+Usage:
+    python -m src.Centrality.Batch <batch spec> [processes]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from csv import writer
+from json import dumps
+from json import load
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Computation_Utils import Invalid_Parameters_Exception
+from src.Centrality.Computation_Utils import trim
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import CLOSENESS
+from src.Centrality.Constants import DESTINATION_ID_FIELD_NAME
+from src.Centrality.Constants import GRAVITY
+from src.Centrality.Constants import INFINITE_RADIUS
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import METRICS
+from src.Centrality.Constants import ORIGIN_ID_FIELD_NAME
+from src.Centrality.Constants import REACH
+from src.Centrality.Constants import STRAIGHTNESS
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Node import Node
+from src.Centrality.Partitioned_Computation import result_attributes
+from src.Common.Geodata.Backend import default_backend
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Progress_Bar import Progress_Bar
+from src.Common.Utils.Streaming import Background_Writer
+from src.Common.Utils.Streaming import prefetch_rows
+from sys import argv
+from time import perf_counter
+
+# Fields every job must have
+REQUIRED_FIELDS = ("adjacency_list", "points", "id_field", "impedance",
+                   "output")
+# Optional fields of a job, with their default values
+DEFAULT_JOB_FIELDS = {"accumulate": [], "weight_field": None, "origins": None,
+                      "measures": list(METRICS), "normalize": [],
+                      "radius": INFINITE_RADIUS, "network_radius": True,
+                      "beta": 1.0}
+# Fields of a job that determine the graph it runs on
+GRAPH_FIELDS = ("adjacency_list", "points", "id_field", "impedance",
+                "accumulate")
+
+# Graph and weights of the group of jobs run by a worker process
+_worker_group = []
+
+
+def read_batch_spec(spec_path):
+    """
+    Returns the jobs of the batch spec at |spec_path|, with the defaults of
+        their optional fields filled in
+    """
+    with open(spec_path) as spec_file:
+        jobs = load(spec_file)
+    return [complete_job(job) for job in jobs]
+
+
+def complete_job(job):
+    """
+    Returns a copy of |job| with the defaults of its optional fields filled in
+    """
+    missing = [field for field in REQUIRED_FIELDS if field not in job]
+    unknown = set(job) - set(REQUIRED_FIELDS) - set(DEFAULT_JOB_FIELDS)
+    if missing or unknown:
+        raise Invalid_Parameters_Exception(
+            f"Invalid job {job}: missing {missing}, unknown {sorted(unknown)}")
+    if not set(job.get("measures", [])) <= set(METRICS):
+        raise Invalid_Parameters_Exception(
+            f"Unknown measures: {job['measures']}")
+    completed = dict(DEFAULT_JOB_FIELDS)
+    completed.update(job)
+    return completed
+
+
+def group_jobs(jobs):
+    """
+    Returns the lists of the indices of the jobs that run on the same graph, in
+        the order the graphs first appear in |jobs|
+    """
+    groups = {}
+    for index, job in enumerate(jobs):
+        graph_key = dumps([job[field] for field in GRAPH_FIELDS],
+                          sort_keys=True)
+        groups.setdefault(graph_key, []).append(index)
+    return list(groups.values())
+
+
+def _needs_locations(job):
+    return STRAIGHTNESS in job["measures"] or not job["network_radius"]
+
+
+def load_group_graph(jobs, backend):
+    """
+    Builds the graph shared by |jobs|, all having the same |GRAPH_FIELDS|.
+        Returns the graph, a dictionary mapping node id's to |Node| objects
+        with their locations if a job needs them, and a dictionary mapping each
+        weight field of the jobs to a dictionary mapping node id's to weights.
+    """
+    graph_job = jobs[0]
+    distance_field = trim(f"Total_{graph_job['impedance']}")
+    accumulator_fields = [trim(f"Total_{attribute}") for attribute in
+                          graph_job["accumulate"]]
+    nodes = {}
+    rows = prefetch_rows(backend, graph_job["adjacency_list"], [
+        trim(ORIGIN_ID_FIELD_NAME), trim(DESTINATION_ID_FIELD_NAME),
+        distance_field] + accumulator_fields)
+    for origin_id, destination_id, distance, *values in rows:
+        distance = float(distance)
+        for row_id in [origin_id, destination_id]:
+            if not row_id in nodes:
+                nodes[row_id] = Node()
+        if origin_id != destination_id and distance >= 0:
+            accumulations = dict(zip(accumulator_fields, map(float, values)))
+            nodes[origin_id].add_neighbor(destination_id, distance,
+                                          accumulations)
+            nodes[destination_id].add_neighbor(origin_id, distance,
+                                               accumulations)
+
+    # Read the locations and every weight field in one pass over the points
+    get_locations = any(_needs_locations(job) for job in jobs)
+    weight_fields = sorted(set(trim(job["weight_field"]) for job in jobs if
+                               job["weight_field"] is not None))
+    point_columns = [graph_job["id_field"]] + weight_fields
+    if get_locations:
+        point_columns += [trim("SnapX"), trim("SnapY")]
+    weights = dict((field, {}) for field in weight_fields)
+    for row in prefetch_rows(backend, graph_job["points"], point_columns):
+        row = dict(zip(point_columns, row))
+        row_id = row[graph_job["id_field"]]
+        if not row_id in nodes:
+            continue
+        for field in weight_fields:
+            weights[field][row_id] = row[field]
+        if get_locations:
+            setattr(nodes[row_id], LOCATION, (row[trim("SnapX")],
+                                              row[trim("SnapY")]))
+    return nodes, weights
+
+
+def run_job(nodes, weights, job):
+    """
+    Runs |job| on the graph |nodes| and returns a dictionary mapping node id's
+        to their measures. The measures of previous jobs are removed first.
+    |weights|: as returned by |load_group_graph|
+    """
+    job_weights = (weights[trim(job["weight_field"])] if job["weight_field"]
+                   is not None else {})
+    for node_id, node in nodes.items():
+        for attribute in result_attributes(node):
+            delattr(node, attribute)
+        setattr(node, WEIGHT, job_weights.get(node_id, 1.0))
+    origins = (nodes if job["origins"] is None else
+               [s for s in job["origins"] if s in nodes])
+    measures = job["measures"]
+    compute_centrality(nodes, origins, REACH in measures, GRAVITY in measures,
+                       BETWEENNESS in measures, CLOSENESS in measures,
+                       STRAIGHTNESS in measures, job["radius"],
+                       job["network_radius"], job["beta"],
+                       list(job["normalize"]),
+                       [trim(f"Total_{attribute}") for attribute in
+                        job["accumulate"]], len(nodes))
+    return dict((node_id, result_attributes(node)) for node_id, node in
+                nodes.items())
+
+
+def write_job_results(job, results):
+    """
+    Writes the |results| of |job| to its output CSV file, one row per node.
+        Measures that were not computed for a node are 0, as in the tool.
+    """
+    attributes = sorted(set(attribute for node_results in results.values() for
+                            attribute in node_results))
+    with open(job["output"], "w", newline="") as output_file:
+        output = writer(output_file)
+        output.writerow([job["id_field"]] + attributes)
+        for node_id, node_results in results.items():
+            output.writerow([node_id] + [node_results.get(attribute, 0) for
+                                         attribute in attributes])
+
+
+def _init_worker(nodes, weights):
+    _worker_group[:] = [nodes, weights]
+
+
+def _run_worker_job(job):
+    nodes, weights = _worker_group
+    return run_job(nodes, weights, job)
+
+
+def run_batch(jobs, processes=1, backend=None):
+    """
+    Runs |jobs| (completed by |complete_job|) and writes their results.
+        Returns the number of seconds each job took, with the time taken to
+        build the graph of a group of jobs spread over its jobs.
+    |processes|: the number of processes running the jobs of a group, jobs are
+        run in this process if it is 1
+    |backend|: the |Geodata_Backend| reading the inputs, |default_backend| by
+        default
+    """
+    if backend is None:
+        backend = default_backend()
+    seconds = [0.0] * len(jobs)
+    groups = group_jobs(jobs)
+    progress = Progress_Bar(len(jobs), 1, "Running jobs ...")
+    for group_number, group in enumerate(groups):
+        add_message(f"Job group {group_number + 1} of {len(groups)}: "
+                    f"{len(group)} jobs")
+        start = perf_counter()
+        group_job_list = [jobs[index] for index in group]
+        nodes, weights = load_group_graph(group_job_list, backend)
+        load_seconds = (perf_counter() - start) / len(group)
+        if processes <= 1:
+            # Results of a job are written while the next job runs
+            with Background_Writer() as results_writer:
+                for index in group:
+                    start = perf_counter()
+                    results_writer.submit(write_job_results, jobs[index],
+                                          run_job(nodes, weights, jobs[index]))
+                    seconds[index] = load_seconds + perf_counter() - start
+                    progress.step()
+            continue
+        start = perf_counter()
+        with ProcessPoolExecutor(max_workers=processes,
+                                 initializer=_init_worker,
+                                 initargs=(nodes, weights)) as executor:
+            for index, results in zip(group, executor.map(_run_worker_job,
+                                                          group_job_list)):
+                write_job_results(jobs[index], results)
+                progress.step()
+        # Jobs of a group run in parallel share its running time
+        run_seconds = (perf_counter() - start) / len(group)
+        for index in group:
+            seconds[index] = load_seconds + run_seconds
+    return seconds
+
+
+if __name__ == "__main__":
+    batch_jobs = read_batch_spec(argv[1])
+    job_seconds = run_batch(batch_jobs, int(argv[2]) if len(argv) > 2 else 1)
+    for batch_job, job_time in zip(batch_jobs, job_seconds):
+        add_message(f"{batch_job['output']}: {job_time:.2f} s")
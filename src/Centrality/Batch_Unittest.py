@@ -0,0 +1,144 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Unittest for the batch runner.
+"""
+
+from src.Common.Geodata.Backend import Geodata_Backend
+from src.Centrality.Batch import complete_job
+from src.Centrality.Batch import group_jobs
+from src.Centrality.Batch import run_batch
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Computation_Utils import eq_tol
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import CLOSENESS
+from src.Centrality.Constants import GRAVITY
+from src.Centrality.Constants import INFINITE_RADIUS
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import METRICS
+from src.Centrality.Constants import REACH
+from src.Centrality.Constants import STRAIGHTNESS
+from src.Centrality.Constants import WEIGHT
+from csv import DictReader
+from src.Centrality.Node import Node
+from os.path import join
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class Table_Backend(Geodata_Backend):
+    """
+    Backend reading tables held in memory, as dictionaries mapping names to
+        lists of rows, each a dictionary mapping fields to values
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.reads = []
+
+    def count(self, dataset):
+        return len(self.tables[dataset])
+
+    def iter_rows(self, dataset, columns):
+        self.reads.append(dataset)
+        for row in self.tables[dataset]:
+            yield tuple(row[column] for column in columns)
+
+
+class TestBatch(unittest.TestCase):
+    """
+    Test class for the batch runner
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = list(range(8))
+        self.edges = [(i, i + 1, 1 + i % 3) for i in range(7)] + [(0, 4, 2)]
+        self.backend = Table_Backend({
+            "Adjacency": [{"OriginID": u, "Destinatio": v, "Total_Leng": d,
+                           "Total_Time": 2 * d} for u, v, d in self.edges],
+            "Points": [{"Id": i, "Pop": i + 1, "Jobs": 10 - i, "SnapX": i,
+                        "SnapY": i % 2} for i in self.nodes]})
+
+    def _job(self, output, **fields):
+        """
+        Returns a completed job writing to |output|, with the given |fields|
+        """
+        job = {"adjacency_list": "Adjacency", "points": "Points",
+               "id_field": "Id", "impedance": "Length", "output": output}
+        job.update(fields)
+        return complete_job(job)
+
+    def _expected(self, weight_field, origins, measures, accumulator_fields):
+        """
+        Returns the graph with the measures computed separately for a job
+        """
+        graph = dict((node_id, Node()) for node_id in self.nodes)
+        for u, v, d in self.edges:
+            accumulations = dict((field, 2 * d) for field in
+                                 accumulator_fields)
+            graph[u].add_neighbor(v, d, accumulations)
+            graph[v].add_neighbor(u, d, accumulations)
+        for point in self.backend.tables["Points"]:
+            if weight_field is not None:
+                setattr(graph[point["Id"]], WEIGHT, point[weight_field])
+            setattr(graph[point["Id"]], LOCATION, (point["SnapX"],
+                                                   point["SnapY"]))
+        compute_centrality(graph, origins, REACH in measures,
+                           GRAVITY in measures, BETWEENNESS in measures,
+                           CLOSENESS in measures, STRAIGHTNESS in measures,
+                           INFINITE_RADIUS, True, 1.0, [REACH],
+                           accumulator_fields, len(self.nodes))
+        return graph
+
+    def test_Same_Results(self):
+        """
+        Test that jobs sharing a graph load it once, and give the results of
+            separate computations
+        """
+        with TemporaryDirectory() as directory:
+            jobs = [self._job(join(directory, "Pop.csv"), weight_field="Pop",
+                              normalize=[REACH]),
+                    self._job(join(directory, "Jobs.csv"),
+                              weight_field="Jobs", origins=[0, 2, 5],
+                              measures=[REACH, BETWEENNESS],
+                              normalize=[REACH]),
+                    self._job(join(directory, "Time.csv"),
+                              accumulate=["Time"], normalize=[REACH])]
+            assert group_jobs(jobs) == [[0, 1], [2]]
+            for processes in [1, 2]:
+                self.backend.reads = []
+                run_batch(jobs, processes, self.backend)
+                assert sorted(self.backend.reads) == [
+                    "Adjacency", "Adjacency", "Points", "Points"]
+                for job, weight_field, origins, measures, accumulated in [
+                        (jobs[0], "Pop", self.nodes, METRICS, []),
+                        (jobs[1], "Jobs", [0, 2, 5], [REACH, BETWEENNESS],
+                         []),
+                        (jobs[2], None, self.nodes, METRICS,
+                         ["Total_Time"])]:
+                    expected = self._expected(weight_field, origins,
+                                              measures, accumulated)
+                    with open(job["output"]) as output_file:
+                        rows = list(DictReader(output_file))
+                    assert len(rows) == len(self.nodes)
+                    for row in rows:
+                        node = expected[int(row["Id"])]
+                        for attribute in set(row) - {"Id"}:
+                            assert eq_tol(float(row[attribute]),
+                                          getattr(node, attribute, 0))
+                        assert (BETWEENNESS in row) == (
+                            BETWEENNESS in measures)
+
+
+if __name__ == "__main__":
+    unittest.main()
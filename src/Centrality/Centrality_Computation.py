@@ -11,18 +11,22 @@
 Script for the computation of the five centrality metrics.
 """
 
-from arcpy import AddWarning
+from src.Common.Utils.Messages import add_warning
 from src.Common.Utils.Progress_Bar import Progress_Bar
+from src.Common.Utils.Tracing import PHASE
+from src.Common.Utils.Tracing import span
 from src.Centrality.Constants import BETWEENNESS
 from src.Centrality.Constants import CLOSENESS
 from src.Centrality.Constants import GRAVITY
 from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import MEMBER_COUNT
 from src.Centrality.Constants import NEIGHBORS
 from src.Centrality.Constants import NORM_BETWEENNESS
 from src.Centrality.Constants import NORM_CLOSENESS
 from src.Centrality.Constants import NORM_GRAVITY
 from src.Centrality.Constants import NORM_REACH
 from src.Centrality.Constants import NORM_STRAIGHTNESS
+from src.Centrality.Constants import ORIGIN_MEMBER_COUNT
 from src.Centrality.Constants import PROGRESS_NORMALIZATION
 from src.Centrality.Constants import REACH
 from src.Centrality.Constants import STEP_4
@@ -34,16 +38,17 @@ from heapq import heappop
 from heapq import heappush
 from math import exp
 from operator import add
-from src.Centrality.Utils import dist
-from src.Centrality.Utils import eq_tol
-from src.Centrality.Utils import Invalid_Parameters_Exception
-from src.Centrality.Utils import lt_tol
-from src.Centrality.Utils import merge_maps
+from src.Centrality.Computation_Utils import dist
+from src.Centrality.Computation_Utils import eq_tol
+from src.Centrality.Computation_Utils import Invalid_Parameters_Exception
+from src.Centrality.Computation_Utils import lt_tol
+from src.Centrality.Computation_Utils import merge_maps
+from time import perf_counter
 
 
 def compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
                        compute_c, compute_s, radius, network_radius, beta, measures_to_normalize,
-                       accumulator_fields):
+                       accumulator_fields, node_count=None, counters=None):
     """
     Computes reach, gravity, betweenness, closeness, and straightness on a graph.
     |nodes|: graph representation; dictionary mapping node id's to |Node| objects
@@ -59,6 +64,13 @@ def compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
     |beta|: parameter for gravity type index
     |measures_to_normalize|: a list of measures to normalize
     |accumulator_fields|: a list of cost attributes to accumulate
+    |node_count|: number of nodes in the full graph, if |nodes| holds only the
+        part of it that can be reached from |origins|
+    |counters|: |Search_Counters| recording the work of the search from each
+        origin, None to skip counting
+    Nodes may carry |MEMBER_COUNT| and |ORIGIN_MEMBER_COUNT| attributes (see
+        Co_Location.py); a node then stands for that many co-located buildings
+        in reach counts and betweenness contributions.
     """
 
     # Number of nodes in the graph
@@ -75,7 +87,10 @@ def compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
     if have_accumulations:
         def empty_accumulations(): return dict((field, 0.0) for field in
                                                accumulator_fields)
-    have_locations = hasattr(list(nodes.values())[0], LOCATION)
+    have_locations = hasattr(next(iter(nodes.values())), LOCATION)
+    # Look up member counts in the search only on graphs that carry them
+    have_member_counts = any(hasattr(node, MEMBER_COUNT) for node in
+                             nodes.values())
     if compute_s and not have_locations:
         # We cannot compute straightness without node locations
         compute_s = False
@@ -87,17 +102,25 @@ def compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
     # Initialize the sum of all node weights (normalization)
     sum_weights = 0.0
 
+    counting = counters is not None
+
     # Computation
     progress = Progress_Bar(O, 1, STEP_4)
     for s in origins:
         if s not in nodes:
             continue
         weight_s = getattr(nodes[s], WEIGHT)
+        origin_count_s = (getattr(nodes[s], ORIGIN_MEMBER_COUNT, 1) if
+                          have_member_counts else 1)
         if have_locations:
             location_s = getattr(nodes[s], LOCATION)
 
         sum_weights += weight_s
 
+        if counting:
+            search_start = perf_counter()
+            pops = decrease_keys = relaxed = settled = max_queue = 0
+
         # Initialize reach (weighted and unweighted) computation for |s|
         #     (normalization)
         reach_s = -1
@@ -145,8 +168,15 @@ def compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
                 location_v = getattr(nodes[v], LOCATION)
 
             compute = network_radius or dist_sv <= radius
+            if counting:
+                # The queue is largest right before a pop
+                max_queue = max(max_queue, len(Q) + 1)
+                pops += 1
+                settled += compute
+                relaxed += len(getattr(nodes[v], NEIGHBORS))
             if compute:
-                reach_s += 1
+                reach_s += (getattr(nodes[v], MEMBER_COUNT, 1) if
+                            have_member_counts else 1)
                 weighted_reach_s += weight_v
                 if d_sv > 0:
                     if compute_g:
@@ -186,6 +216,8 @@ def compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
                                                                                  dist_sw)
                             Q.remove(longer_path_node)
                             heapify(Q)
+                            if counting:
+                                decrease_keys += 1
                         add_w_to_Q = True
                     d[w] = d_sw
                     if compute_b:
@@ -223,7 +255,8 @@ def compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
                     delta[v] += sigma[v] / sigma[w] * (weight_w + delta_w)
                 if w != s:
                     between_w = getattr(nodes[w], BETWEENNESS)
-                    setattr(nodes[w], BETWEENNESS, between_w + delta_w)
+                    setattr(nodes[w], BETWEENNESS,
+                            between_w + origin_count_s * delta_w)
         if compute_c:
             setattr(nodes[s], CLOSENESS, (1.0 / d_sum_s if d_sum_s > 0
                                           else 0.0))
@@ -241,12 +274,46 @@ def compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
             for field in accumulator_fields:
                 setattr(nodes[s], field, total_accumulations_s[field])
 
+        if counting:
+            # Every entry of the queue but the first was pushed, and has left
+            #     through a pop or a decrease-key unless it is still there
+            counters.record(s, perf_counter() - search_start,
+                            pops + decrease_keys + len(Q) - 1, pops,
+                            decrease_keys, relaxed, settled,
+                            max(max_queue, len(Q)))
+
         progress.step()
 
     # Normalization
+    with span(PROGRESS_NORMALIZATION, PHASE):
+        normalize_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                             compute_c, compute_s, beta, measures_to_normalize,
+                             sum_weights, node_count)
+
+
+def normalize_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                         compute_c, compute_s, beta, measures_to_normalize,
+                         sum_weights, node_count=None,
+                         component_sum_weights=None):
+    """
+    Normalizes the measures computed by |compute_centrality| for each origin.
+    |nodes|: graph representation; dictionary mapping node id's to |Node| objects
+    |origins|: subset of nodes that were used as sources of shortest path trees
+    |compute_r|, |compute_g|, |compute_b|, |compute_c|, |compute_s|: which
+        measures were computed
+    |beta|: parameter for gravity type index
+    |measures_to_normalize|: a list of measures to normalize
+    |sum_weights|: the sum of the weights of all the origins
+    |node_count|: number of nodes in the full graph, defaults to len(|nodes|)
+    |component_sum_weights|: optional dictionary mapping each origin to the sum
+        of the origin weights in its connected component, used in place of
+        |sum_weights| to normalize reach
+    """
+    N = len(nodes) if node_count is None else node_count
+    O = len(origins)
     if BETWEENNESS in measures_to_normalize and O < N:
         measures_to_normalize.remove(BETWEENNESS)
-        AddWarning(WARNING_NO_BETWEENNESS_NORMALIZATION)
+        add_warning(WARNING_NO_BETWEENNESS_NORMALIZATION)
     if measures_to_normalize:
         norm_progress = Progress_Bar(O, 1, PROGRESS_NORMALIZATION)
         for s in origins:
@@ -258,9 +325,11 @@ def compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
             # Normalize reach
             if compute_r and REACH in measures_to_normalize:
                 weight_s = getattr(nodes[s], WEIGHT)
+                sum_weights_s = (sum_weights if component_sum_weights is None
+                                 else component_sum_weights[s])
                 try:
                     setattr(nodes[s], NORM_REACH, reach_s /
-                            (sum_weights - weight_s))
+                            (sum_weights_s - weight_s))
                 except:
                     setattr(nodes[s], NORM_REACH, 0.0)
 
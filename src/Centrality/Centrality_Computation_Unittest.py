@@ -8,24 +8,75 @@
 # ------------------------------------------------------------------------------
 
 """
-Unittest for the centrality metric computation.
+Unittest for the centrality metric computation, and for the ways of running it
+  on parts of the graph, on several machines, from arrays and as a service.
 These are very basic sanity checks, they do not fully test the centrality
   computation algorithm.
 """
 # TODO(mikemeko): add more tests
 
 from src.Centrality.Centrality_Computation import compute_centrality
-from src.Centrality.Constants import INFINITE_RADIUS
+from http.client import HTTPConnection
+from src.Centrality.Co_Location import collapse_co_located_nodes
+from src.Centrality.Co_Location import expand_co_located_results
+from src.Centrality.Components import compute_centrality_by_component
+from src.Centrality.Components import connected_components
+from src.Centrality.Computation_Utils import Invalid_Parameters_Exception
 from src.Centrality.Constants import BETWEENNESS
 from src.Centrality.Constants import CLOSENESS
 from src.Centrality.Constants import GRAVITY
+from src.Centrality.Constants import HILBERT_CURVE
+from src.Centrality.Constants import impedance_measure
+from src.Centrality.Constants import INFINITE_RADIUS
 from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import MORTON_CURVE
+from src.Centrality.Constants import NEIGHBORS
+from src.Centrality.Constants import NORM_BETWEENNESS
+from src.Centrality.Constants import NORM_GRAVITY
+from src.Centrality.Constants import NORM_REACH
 from src.Centrality.Constants import REACH
 from src.Centrality.Constants import STRAIGHTNESS
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Cost_Estimate import estimate_cost
+from concurrent.futures import ProcessPoolExecutor
+from src.Centrality.Graph_Artifacts import save_graph
+from src.Centrality.Graph_Pruning import load_neighbors
+from src.Centrality.Graph_Pruning import nodes_near_origins
+from src.Centrality.Graph_Pruning import nodes_within_radius
+from src.Centrality.Graph_Store import build_graph_store
+from src.Centrality.Incremental_Centrality import apply_edits
+from src.Centrality.Incremental_Centrality import update_centrality
+from json import dumps
+from json import loads
+from src.Centrality.Library import compute_centrality_arrays
+from src.Centrality.Map_Reduce import reduce_results
+from src.Centrality.Map_Reduce import run_worker
+from src.Centrality.Map_Reduce import write_job_spec
 from math import log
 from math import sqrt
+from src.Common.Utils.Messages import message_log
+from src.Common.Utils.Messages import set_headless
+from src.Centrality.Multi_Impedance import compute_multi_impedance_centrality
+from src.Redundancy.Network import csNetwork
+from src.Redundancy.Network import csPoint
 from src.Centrality.Node import Node
+from os import stat
+from src.Centrality.Partitioned_Computation import subgraph
+from os.path import join
+from src.Centrality.Query_Service import Centrality_Service
+from src.Centrality.Query_Service import make_server
+from src.Centrality.Rerooted_Computation import compute_centrality_rerooted
+from src.Centrality.Space_Filling_Curve import curve_order
+from src.Centrality.Street_Graph import compute_street_graph_centrality
+from subprocess import run
+from sys import executable
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import perf_counter
+from src.Centrality.Tiling import compute_centrality_by_tile
+from src.Centrality.Tiling import Tile_Rows
 import unittest
+from src.Centrality.Utils import check_step_4_options
 from src.Centrality.Utils import eq_tol
 
 
@@ -219,5 +270,897 @@ class TestStraightness(unittest.TestCase):
                       1 + 2 * sqrt(5) / (1 + sqrt(2)))
 
 
+class TestCoLocation(unittest.TestCase):
+    """
+    Co-located nodes
+       A1
+      /||\
+    E--A2-C--D
+          |
+          B
+    A1 and A2 share a location and are connected with a zero-length edge
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = ["A1", "A2", "B", "C", "D", "E"]
+        self.edges = [("A1", "C", 1), ("A2", "C", 1), ("B", "C", 1),
+                      ("C", "D", 1), ("A1", "E", 1), ("A2", "E", 1)]
+        self.locations = {"A1": (0, 1), "A2": (0, 1), "B": (1, 0),
+                          "C": (1, 1), "D": (2, 1), "E": (-1, 1)}
+
+    def _graph(self, member_distance=0):
+        """
+        Returns the graph, with A1 and A2 joined by an edge of length
+            |member_distance|
+        """
+        graph = construct_graph(self.nodes, self.edges +
+                                [("A1", "A2", member_distance)])
+        for node_id, location in self.locations.items():
+            setattr(graph[node_id], LOCATION, location)
+        return graph
+
+    def test_Collapse(self):
+        """
+        Test that co-located nodes are merged into one super-node
+        """
+        super_nodes, super_origins = collapse_co_located_nodes(self._graph(),
+                                                               self.nodes)
+        assert len(super_nodes) == 5
+        assert len(super_origins) == 5
+
+    def test_Expanded_Results(self):
+        """
+        Test that collapsed results match results on the original graph
+        """
+        expected = self._graph()
+        compute_centrality(expected, self.nodes, True, True, True, True, False,
+                           INFINITE_RADIUS, True, 1, [REACH], [])
+        graph = self._graph()
+        super_nodes, super_origins = collapse_co_located_nodes(graph,
+                                                               self.nodes)
+        compute_centrality(super_nodes, super_origins, True, True, True, True,
+                           False, INFINITE_RADIUS, True, 1, [], [])
+        expand_co_located_results(super_nodes, graph, self.nodes, True, True,
+                                  True, True, False, 1, [REACH], [])
+        for node_id in self.nodes:
+            for measure in [REACH, GRAVITY, CLOSENESS, NORM_REACH]:
+                assert eq_tol(getattr(graph[node_id], measure),
+                              getattr(expected[node_id], measure))
+        # On the original graph, the betweenness across the zero-length edge
+        #     depends on the order of the search, so compare with A1 and A2
+        #     joined by an edge shorter than the others but above the tolerance
+        expected = self._graph(0.001)
+        compute_centrality(expected, self.nodes, False, False, True, False,
+                           False, INFINITE_RADIUS, True, 1, [], [])
+        for node_id in self.nodes:
+            assert eq_tol(getattr(graph[node_id], BETWEENNESS),
+                          getattr(expected[node_id], BETWEENNESS))
+        # The paths from E to B, C and D go through A1 or A2
+        assert eq_tol(getattr(graph["A1"], BETWEENNESS), 3)
+        assert eq_tol(getattr(graph["A2"], BETWEENNESS), 3)
+
+    def test_Exact_Measures(self):
+        """
+        Test that reach and gravity match the uncollapsed computation exactly,
+            with distinct weights, a radius, and some members not origins
+        """
+        weights = {"A1": 2, "A2": 3, "B": 1, "C": 4, "D": 5}
+        origins = ["A1", "B", "C", "D"]
+        for radius in [INFINITE_RADIUS, 1.5]:
+            expected = self._graph()
+            graph = self._graph()
+            for node_id, weight in weights.items():
+                setattr(expected[node_id], WEIGHT, weight)
+                setattr(graph[node_id], WEIGHT, weight)
+            compute_centrality(expected, origins, True, True, False, False,
+                               False, radius, True, 0.5,
+                               [REACH, GRAVITY], [])
+            super_nodes, super_origins = collapse_co_located_nodes(graph,
+                                                                   origins)
+            compute_centrality(super_nodes, super_origins, True, True, False,
+                               False, False, radius, True, 0.5, [], [])
+            expand_co_located_results(super_nodes, graph, origins, True, True,
+                                      False, False, False, 0.5,
+                                      [REACH, GRAVITY], [])
+            for node_id in origins:
+                for measure in [REACH, GRAVITY, NORM_REACH, NORM_GRAVITY]:
+                    assert eq_tol(getattr(graph[node_id], measure),
+                                  getattr(expected[node_id], measure))
+            assert not hasattr(graph["A2"], REACH)
+
+
+class TestStreetGraph(unittest.TestCase):
+    """
+    Street graph
+    J1--a--b--J2--c--J3
+               |
+               d
+               |
+               J4
+    Buildings a, b, c, d are attached to the street edges
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.network = csNetwork()
+        for name, start, end in [(0, (0, 0, 0), (4, 0, 0)),
+                                 (1, (4, 0, 0), (8, 0, 0)),
+                                 (2, (4, 0, 0), (4, -4, 0))]:
+            self.network.addConnections(start, end, [start, end],
+                                        4.0, str(name))
+        self.network.remap()
+        self.points = {}
+        for point_id, t, edge_id in [("a", 0.25, 0), ("b", 0.5, 0),
+                                     ("c", 0.5, 1), ("d", 0.75, 2)]:
+            point = csPoint(t, edge_id)
+            point.Point = (0, 0, 0)
+            self.points[point_id] = point
+
+    def _building_graph(self):
+        """
+        Returns the building-to-building graph that the OD cost matrices would
+            produce: buildings are neighbors if a shortest path between them
+            does not go past another building
+        """
+        building_graph = construct_graph(list(self.points), [])
+        for u, v, distance in [("a", "b", 1), ("b", "c", 4), ("b", "d", 5),
+                               ("c", "d", 5)]:
+            building_graph[u].add_neighbor(v, distance)
+            building_graph[v].add_neighbor(u, distance)
+        return building_graph
+
+    def test_Street_Graph_Matches_Building_Graph(self):
+        """
+        Test that the street graph model reproduces the building graph results
+        """
+        expected = self._building_graph()
+        compute_centrality(expected, list(self.points), True, True, True, True,
+                           False, INFINITE_RADIUS, True, 1, [REACH], [])
+        nodes, unplaced_count = compute_street_graph_centrality(
+            self.network, self.points, list(self.points), True, True, True,
+            True, False, INFINITE_RADIUS, True, 1, [REACH])
+        assert unplaced_count == 0
+        for node_id in self.points:
+            for measure in [REACH, GRAVITY, BETWEENNESS, CLOSENESS,
+                            NORM_REACH]:
+                assert eq_tol(getattr(nodes[node_id], measure),
+                              getattr(expected[node_id], measure))
+        assert eq_tol(getattr(nodes["b"], BETWEENNESS), 4)
+
+    def test_Length_Scale(self):
+        """
+        Test that the street lengths are converted to the impedance units
+        """
+        # A radius of 3 units of the impedance is 6 units of length
+        nodes, _ = compute_street_graph_centrality(
+            self.network, self.points, list(self.points), True, False, False,
+            False, False, 3, True, 1, [], 0.5)
+        assert eq_tol(getattr(nodes["a"], REACH), 3)
+        assert eq_tol(getattr(nodes["b"], REACH), 3)
+        nodes, _ = compute_street_graph_centrality(
+            self.network, self.points, list(self.points), True, False, False,
+            False, False, 3, True, 1, [])
+        assert eq_tol(getattr(nodes["a"], REACH), 1)
+        assert eq_tol(getattr(nodes["b"], REACH), 1)
+
+
+class TestGraphPruning(unittest.TestCase):
+    """
+    Graph pruning
+    F
+    |
+    A--B--C--D--E
+    F is next to A, but only reached from E, by an edge of length 1
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = ["A", "B", "C", "D", "E"]
+        self.edges = [("A", "B", 1), ("B", "C", 1), ("C", "D", 1),
+                      ("D", "E", 1)]
+        self.locations = dict((node_id, (float(x), 0.0)) for x, node_id in
+                              enumerate(self.nodes))
+        self.locations["F"] = (0.0, 1.0)
+
+    def test_Nodes_Within_Radius(self):
+        """
+        Test that only nodes within the radius of an origin are kept
+        """
+        neighbors = dict((node_id, []) for node_id in self.nodes)
+        for (u, v, weight) in self.edges:
+            neighbors[u].append((v, weight))
+            neighbors[v].append((u, weight))
+        assert nodes_within_radius(neighbors, ["A"], 2) == {"A", "B", "C"}
+        assert nodes_within_radius(neighbors, ["A", "E"], 1) == {"A", "B", "D",
+                                                                 "E"}
+
+    def test_Nodes_Near_Origins(self):
+        """
+        Test the nodes within straight-line distance of an origin
+        """
+        assert nodes_near_origins(self.locations, ["A"], 2) == {"A", "B", "C",
+                                                                "F"}
+        assert nodes_near_origins(self.locations, ["A", "E"], 0.5) == {"A",
+                                                                       "E"}
+        assert nodes_near_origins(self.locations, ["G"], 2) == set()
+
+    def test_Load_Neighbors(self):
+        """
+        Test that only the rows between candidates are loaded
+        """
+        rows = [(u, v, str(distance)) for u, v, distance in self.edges +
+                [("E", "F", 1), ("A", "A", 0)]]
+        neighbors = load_neighbors(rows, {"A", "B", "C", "F"})
+        assert neighbors == {"A": [("B", 1.0)], "B": [("A", 1.0), ("C", 1.0)],
+                             "C": [("B", 1.0)]}
+
+    def test_Pruned_Results(self):
+        """
+        Test that the graph loaded from the rows near the origins gives the
+            same results for the origins
+        """
+        edges = self.edges + [("E", "F", 1)]
+        graph = construct_graph(self.nodes + ["F"], edges)
+        compute_centrality(graph, ["A"], True, False, True, True, False, 2, True,
+                           1, [], [])
+        neighbors = load_neighbors(edges, nodes_near_origins(self.locations,
+                                                             ["A"], 2))
+        kept_ids = nodes_within_radius(neighbors, ["A"], 2)
+        assert kept_ids == {"A", "B", "C"}
+        pruned_graph = construct_graph(list(kept_ids), [
+            (u, v, distance) for u, v, distance in edges if u in kept_ids and
+            v in kept_ids])
+        compute_centrality(pruned_graph, ["A"], True, False, True, True, False,
+                           2, True, 1, [], [])
+        for node_id in ["A", "B", "C"]:
+            assert eq_tol(getattr(graph[node_id], BETWEENNESS),
+                          getattr(pruned_graph[node_id], BETWEENNESS))
+        assert eq_tol(getattr(graph["A"], REACH),
+                      getattr(pruned_graph["A"], REACH))
+        assert eq_tol(getattr(graph["A"], CLOSENESS),
+                      getattr(pruned_graph["A"], CLOSENESS))
+
+
+class TestComponents(unittest.TestCase):
+    """
+    Test class for computation by connected component
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = ["A", "B", "C", "D", "E", "F"]
+        self.edges = [("A", "B", 1), ("B", "C", 1), ("D", "E", 1)]
+
+    def test_Connected_Components(self):
+        """
+        Test the component labels
+        """
+        component = connected_components(construct_graph(self.nodes,
+                                                          self.edges))
+        assert component["A"] == component["B"] == component["C"]
+        assert component["D"] == component["E"]
+        assert len(set(component.values())) == 3
+
+    def test_Same_Results(self):
+        """
+        Test that the results match the computation on the whole graph
+        """
+        graph = construct_graph(self.nodes, self.edges)
+        compute_centrality(graph, ["A", "B", "D"], True, False, True, True,
+                           False, INFINITE_RADIUS, True, 1, [REACH], [])
+        component_graph = construct_graph(self.nodes, self.edges)
+        counts = compute_centrality_by_component(
+            component_graph, ["A", "B", "D"], True, False, True, True, False,
+            INFINITE_RADIUS, True, 1, [REACH], [])
+        assert counts == (3, 2)
+        for node_id in self.nodes:
+            assert eq_tol(getattr(graph[node_id], BETWEENNESS),
+                          getattr(component_graph[node_id], BETWEENNESS))
+        for node_id in ["A", "B", "D"]:
+            for measure in [REACH, NORM_REACH, CLOSENESS]:
+                assert eq_tol(getattr(graph[node_id], measure),
+                              getattr(component_graph[node_id], measure))
+
+
+class TestSpaceFillingCurve(unittest.TestCase):
+    """
+    Test class for node ordering along space filling curves
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.locations = {"A": (0, 0), "B": (10, 0), "C": (0, 10),
+                          "D": (10, 10)}
+
+    def test_Hilbert_Order(self):
+        """
+        Test that the Hilbert curve visits neighboring cells consecutively
+        """
+        assert curve_order(self.locations, HILBERT_CURVE, 1) == ["A", "C", "D",
+                                                                 "B"]
+
+    def test_Morton_Order(self):
+        """
+        Test that the Morton curve visits the cells in Z order
+        """
+        assert curve_order(self.locations, MORTON_CURVE, 1) == ["A", "B", "C",
+                                                                "D"]
+
+
+class TestIncrementalCentrality(unittest.TestCase):
+    """
+    Test class for incremental updates after graph edits
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = ["A", "B", "C", "D", "E", "F", "G", "H"]
+        self.edges = [("A", "B", 1), ("B", "C", 1), ("C", "D", 1),
+                      ("D", "E", 1), ("E", "F", 1), ("F", "G", 1),
+                      ("G", "H", 1), ("B", "D", 3)]
+        self.edge_edits = [("B", "D", None, None), ("A", "C", 1.5, None),
+                           ("A", "I", 1, None)]
+        self.weight_edits = {"B": 2.0}
+
+    def test_Same_Results(self):
+        """
+        Test that the updated results match a full recomputation
+        """
+        arguments = (True, True, True, True, False, 2.5, True, 1, [REACH], [])
+        graph = construct_graph(self.nodes, self.edges)
+        compute_centrality(graph, self.nodes, *arguments)
+        recomputed_count = update_centrality(graph, self.nodes,
+                                             self.edge_edits,
+                                             self.weight_edits, *arguments)
+        assert recomputed_count < len(self.nodes)
+        edited_graph = construct_graph(self.nodes, self.edges)
+        apply_edits(edited_graph, self.edge_edits, self.weight_edits)
+        compute_centrality(edited_graph, self.nodes, *arguments)
+        for node_id in edited_graph:
+            assert eq_tol(getattr(graph[node_id], BETWEENNESS),
+                          getattr(edited_graph[node_id], BETWEENNESS))
+        for node_id in self.nodes:
+            for measure in [REACH, NORM_REACH, GRAVITY, CLOSENESS]:
+                assert eq_tol(getattr(graph[node_id], measure),
+                              getattr(edited_graph[node_id], measure))
+
+
+class TestRerootedComputation(unittest.TestCase):
+    """
+    Test class for computation with re-rooted shortest path trees
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = [(i, j) for i in range(5) for j in range(5)]
+        self.edges = ([((i, j), (i + 1, j), 1 + (i + j) % 2) for (i, j) in
+                       self.nodes if i < 4] +
+                      [((i, j), (i, j + 1), 1) for (i, j) in self.nodes if
+                       j < 4])
+
+    def test_Same_Results(self):
+        """
+        Test that the results match |compute_centrality|, whether trees are
+            re-rooted, searched from scratch, or handed to
+            |compute_centrality| after a pilot
+        """
+        for radius in [2, 3.5, INFINITE_RADIUS]:
+            graph = construct_graph(self.nodes, self.edges)
+            compute_centrality(graph, self.nodes, True, True, True, True,
+                               False, radius, True, 0.5, [REACH], [])
+            for max_update_fraction, pilot_origins in [(1.0, 0), (0.0, 0),
+                                                       (0.5, 2), (0.5, 20)]:
+                rerooted_graph = construct_graph(self.nodes, self.edges)
+                compute_centrality_rerooted(
+                    rerooted_graph, self.nodes, True, True, True, True, False,
+                    radius, True, 0.5, [REACH], [], None, max_update_fraction,
+                    pilot_origins)
+                for node_id in self.nodes:
+                    for measure in [REACH, NORM_REACH, GRAVITY, BETWEENNESS,
+                                    CLOSENESS]:
+                        assert eq_tol(getattr(graph[node_id], measure),
+                                      getattr(rerooted_graph[node_id],
+                                              measure))
+
+
+class TestMultiImpedance(unittest.TestCase):
+    """
+    Test class for computation with several impedances
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = ["A", "B", "C", "D"]
+        # (u, v, length, time)
+        self.edges = [("A", "B", 1, 4), ("B", "C", 1, 1), ("A", "D", 2, 1),
+                      ("D", "C", 2, 1)]
+
+    def test_Same_Results(self):
+        """
+        Test that each impedance gives the results of a separate computation
+        """
+        graph = {}
+        for node_id in self.nodes:
+            graph[node_id] = Node()
+        for (u, v, length, time) in self.edges:
+            graph[u].add_neighbor(v, length, {"Total_Time": time})
+            graph[v].add_neighbor(u, length, {"Total_Time": time})
+        compute_multi_impedance_centrality(
+            graph, self.nodes, [("Total_Time", 2.5)], True, True, True, True,
+            False, 3, True, 1, [REACH], [])
+        for index, edges, radius in [
+                (None, [(u, v, length) for u, v, length, _ in self.edges], 3),
+                (1, [(u, v, time) for u, v, _, time in self.edges], 2.5)]:
+            expected = construct_graph(self.nodes, edges)
+            compute_centrality(expected, self.nodes, True, True, True, True,
+                               False, radius, True, 1, [REACH], [])
+            for node_id in self.nodes:
+                for measure in [REACH, NORM_REACH, GRAVITY, BETWEENNESS,
+                                CLOSENESS]:
+                    name = (measure if index is None else
+                            impedance_measure(index, measure))
+                    assert eq_tol(getattr(graph[node_id], name),
+                                  getattr(expected[node_id], measure))
+
+
+class TestStep4Options(unittest.TestCase):
+    """
+    Test class for the check of the options of Step 4
+    """
+
+    def _warnings(self, *options):
+        """
+        Returns the warnings sent by |check_step_4_options| for |options|
+        """
+        set_headless(True)
+        try:
+            check_step_4_options(*options)
+            return [message for _, message_type, message in message_log() if
+                    message_type == "warning"]
+        finally:
+            set_headless(False)
+
+    def test_Conflicts(self):
+        """
+        Test that options computing the measures in different ways are rejected
+        """
+        impedances = {"Minutes": 10}
+        for options in [(impedances, True, False), (impedances, False, True),
+                        ({}, True, True)]:
+            with self.assertRaises(Invalid_Parameters_Exception):
+                check_step_4_options(*options, False, False, False)
+        assert self._warnings(impedances, False, False, False, False,
+                              False) == []
+        assert self._warnings({}, True, False, False, False, False) == []
+
+    def test_Ignored_Options(self):
+        """
+        Test that options left out by the graph model are reported
+        """
+        impedances = {"Minutes": 10}
+        assert len(self._warnings({}, True, False, True, False, False)) == 1
+        assert len(self._warnings({}, False, True, False, True, False)) == 1
+        assert len(self._warnings(impedances, False, False, False, False,
+                                  True)) == 1
+        # Components and merged nodes work on the graph store
+        assert self._warnings({}, True, False, False, False, True) == []
+        assert self._warnings({}, False, False, True, True, True) == []
+
+
+class TestGraphStore(unittest.TestCase):
+    """
+    Test class for computation on a graph stored in arrays
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = ["A", "B", "C", "D", "E"]
+        self.edges = [("A", "B", 1), ("B", "C", 1), ("C", "D", 2),
+                      ("B", "D", 2), ("D", "E", 1)]
+        # Adjacency list rows, with each edge in both directions
+        self.rows = ([(u, v, weight, {"Total_Time": 2 * weight}) for
+                      (u, v, weight) in self.edges] +
+                     [(v, u, weight, {"Total_Time": 2 * weight}) for
+                      (u, v, weight) in self.edges])
+
+    def test_Same_Results(self):
+        """
+        Test that the results match those computed with |Node| objects, with
+            arrays in memory and in files
+        """
+        graph = construct_graph(self.nodes, self.edges)
+        compute_centrality(graph, self.nodes, True, True, True, True, False,
+                           INFINITE_RADIUS, True, 1, [REACH], [])
+        for memory_budget in [None, 0]:
+            with TemporaryDirectory() as directory:
+                store = build_graph_store(directory, lambda: self.rows,
+                                          ["Total_Time"], memory_budget)
+                stored_graph = store.nodes()
+                compute_centrality(stored_graph, self.nodes, True, True, True,
+                                   True, False, INFINITE_RADIUS, True, 1,
+                                   [REACH], ["Total_Time"])
+                for node_id in self.nodes:
+                    for measure in [REACH, NORM_REACH, GRAVITY, BETWEENNESS,
+                                    CLOSENESS]:
+                        assert eq_tol(getattr(graph[node_id], measure),
+                                      getattr(stored_graph[node_id], measure))
+                assert len(getattr(stored_graph["B"], NEIGHBORS)) == 3
+                store.close()
+
+
+class TestTiling(unittest.TestCase):
+    """
+    Test class for computation one tile at a time
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = [(i, j) for i in range(6) for j in range(6)]
+        self.edges = ([((i, j), (i + 1, j), 1) for (i, j) in self.nodes if
+                       i < 5] +
+                      [((i, j), (i, j + 1), 1.5) for (i, j) in self.nodes if
+                       j < 5])
+        self.locations = dict((node_id, node_id) for node_id in self.nodes)
+
+    def test_Same_Results(self):
+        """
+        Test that the results match the computation on the whole graph
+        """
+        graph = construct_graph(self.nodes, self.edges)
+        for node_id in self.nodes:
+            setattr(graph[node_id], LOCATION, self.locations[node_id])
+        results = compute_centrality_by_tile(
+            lambda region: subgraph(graph, region), self.locations,
+            self.nodes, True, True, True, True, True, 2.5, True, 1,
+            [REACH], [], 2)
+        compute_centrality(graph, self.nodes, True, True, True, True, True,
+                           2.5, True, 1, [REACH], [])
+        for node_id in self.nodes:
+            for measure in [REACH, NORM_REACH, GRAVITY, BETWEENNESS, CLOSENESS,
+                            STRAIGHTNESS]:
+                assert eq_tol(getattr(graph[node_id], measure),
+                              getattr(results[node_id], measure))
+
+    def test_Tile_Rows(self):
+        """
+        Test that tiles loaded from rows split by tile, with locations in other
+            units than the impedance, match the whole graph
+        """
+        graph = construct_graph(self.nodes, self.edges)
+        locations = dict((node_id, (10 * node_id[0], 10 * node_id[1])) for
+                         node_id in self.nodes)
+
+        def load_region(region):
+            region_graph = construct_graph(region, [])
+            for u, v, d_uv, _ in tile_rows.region_rows(region):
+                region_graph[u].add_neighbor(v, d_uv)
+                region_graph[v].add_neighbor(u, d_uv)
+            return region_graph
+        with TemporaryDirectory() as directory:
+            tile_rows = Tile_Rows(directory, locations, 20)
+            tile_rows.write((u, v, d_uv, ()) for u, v, d_uv in self.edges)
+            results = compute_centrality_by_tile(
+                load_region, locations, self.nodes, True, True, True, True,
+                False, 2.5, True, 1, [REACH], [], 20, halo=25)
+        compute_centrality(graph, self.nodes, True, True, True, True, False,
+                           2.5, True, 1, [REACH], [])
+        for node_id in self.nodes:
+            for measure in [REACH, NORM_REACH, GRAVITY, BETWEENNESS,
+                            CLOSENESS]:
+                assert eq_tol(getattr(graph[node_id], measure),
+                              getattr(results[node_id], measure))
+
+
+class TestMapReduce(unittest.TestCase):
+    """
+    Test class for the map-reduce runner, with local processes standing in for
+        machines
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = list(range(10))
+        self.edges = ([(i, i + 1, 1 + i % 3) for i in range(9)] +
+                      [(0, 5, 4), (3, 8, 2)])
+        self.parameters = {"compute_r": True, "compute_g": True,
+                           "compute_b": True, "compute_c": True,
+                           "compute_s": False, "radius": INFINITE_RADIUS,
+                           "network_radius": True, "beta": 1,
+                           "measures_to_normalize": [REACH, BETWEENNESS],
+                           "accumulator_fields": []}
+
+    def test_Same_Results(self):
+        """
+        Test that the reduced results match a computation in one process
+        """
+        with TemporaryDirectory() as directory:
+            graph_path = join(directory, "Graph.pkl")
+            job_path = join(directory, "Job.json")
+            save_graph(graph_path, construct_graph(self.nodes, self.edges),
+                       self.nodes, self.parameters)
+            write_job_spec(job_path, graph_path, self.parameters, self.nodes,
+                           3, join(directory, "Results"))
+            with ProcessPoolExecutor(max_workers=3) as executor:
+                for future in [executor.submit(run_worker, job_path, shard)
+                               for shard in range(3)]:
+                    future.result()
+            results = reduce_results(job_path)
+        graph = construct_graph(self.nodes, self.edges)
+        compute_centrality(graph, self.nodes, True, True, True, True, False,
+                           INFINITE_RADIUS, True, 1, [REACH, BETWEENNESS], [])
+        for node_id in self.nodes:
+            for measure in [REACH, NORM_REACH, GRAVITY, BETWEENNESS, CLOSENESS,
+                            NORM_BETWEENNESS]:
+                assert eq_tol(getattr(graph[node_id], measure),
+                              getattr(results[node_id], measure))
+
+    def test_Stale_Partial_Results(self):
+        """
+        Test that partial results of another job in the same directory are
+            recomputed by the workers and rejected by the reduce step
+        """
+        with TemporaryDirectory() as directory:
+            graph_path = join(directory, "Graph.pkl")
+            job_path = join(directory, "Job.json")
+            results_dir = join(directory, "Results")
+            save_graph(graph_path, construct_graph(self.nodes, self.edges),
+                       self.nodes, self.parameters)
+            write_job_spec(job_path, graph_path, self.parameters, self.nodes,
+                           2, results_dir)
+            for shard in range(2):
+                run_worker(job_path, shard)
+            reduce_results(job_path)
+            # The same job reuses its partial results
+            partial_path = join(results_dir, "Partial_0.pkl")
+            # Partial results are written to a new file that replaces the
+            #     old one
+            partial_inode = stat(partial_path).st_ino
+            run_worker(job_path, 0)
+            assert stat(partial_path).st_ino == partial_inode
+            parameters = dict(self.parameters, beta=2)
+            write_job_spec(job_path, graph_path, parameters, self.nodes, 2,
+                           results_dir)
+            with self.assertRaises(Exception):
+                reduce_results(job_path)
+            run_worker(job_path, 0)
+            with self.assertRaises(Exception):
+                reduce_results(job_path)
+            run_worker(job_path, 1)
+            results = reduce_results(job_path)
+        graph = construct_graph(self.nodes, self.edges)
+        compute_centrality(graph, self.nodes, True, True, True, True, False,
+                           INFINITE_RADIUS, True, 2, [REACH, BETWEENNESS], [])
+        for node_id in self.nodes:
+            assert eq_tol(getattr(graph[node_id], GRAVITY),
+                          getattr(results[node_id], GRAVITY))
+
+
+class TestQueryService(unittest.TestCase):
+    """
+    Test class for the centrality query service
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = ["A", "B", "C", "D"]
+        self.edges = [("A", "B", 1), ("B", "C", 1), ("C", "D", 2)]
+        self.directory = TemporaryDirectory()
+        graph_path = join(self.directory.name, "Graph.pkl")
+        save_graph(graph_path, construct_graph(self.nodes, self.edges),
+                   self.nodes, {})
+        self.service = Centrality_Service({"city": graph_path})
+
+    def tearDown(self):
+        """
+        Tear down
+        """
+        self.directory.cleanup()
+
+    def test_Query(self):
+        """
+        Test that queries match a full computation and are cached
+        """
+        graph = construct_graph(self.nodes, self.edges)
+        compute_centrality(graph, self.nodes, True, True, False, True, False,
+                           2, True, 1, [REACH], [])
+        parameters = {"radius": 2, "measures_to_normalize": [REACH]}
+        answers = self.service.query("city", ["A", "C"], parameters)
+        answers.update(self.service.query("city", ["A", "D"], parameters))
+        assert self.service.cache.hits == 1
+        for node_id in ["A", "C", "D"]:
+            for measure in [REACH, NORM_REACH, GRAVITY, CLOSENESS]:
+                assert eq_tol(answers[node_id][measure],
+                              getattr(graph[node_id], measure))
+
+    def test_HTTP(self):
+        """
+        Test a query over HTTP
+        """
+        server = make_server(self.service, 0)
+        Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            connection = HTTPConnection("127.0.0.1", server.server_address[1])
+            connection.request("POST", "/query", dumps(
+                {"graph": "city", "origins": ["B"]}))
+            results = loads(connection.getresponse().read())["results"]
+            assert [result["origin"] for result in results] == ["B"]
+            assert results[0]["measures"][REACH] == 3
+            connection.request("GET", "/metrics")
+            assert loads(connection.getresponse().read())["count"] == 1
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestLibrary(unittest.TestCase):
+    """
+    Test class for computation from arrays
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.sources = [0, 1, 2, 1, 3]
+        self.targets = [1, 2, 3, 3, 4]
+        self.lengths = [1, 1, 2, 2, 1.5]
+        self.weights = [1, 2, 1, 3, 1]
+        self.coordinates = [(0, 0), (1, 0), (2, 0), (2, 1), (3, 2)]
+
+    def test_Same_Results(self):
+        """
+        Test that the results match those computed with |Node| objects
+        """
+        graph = construct_graph(range(5), zip(self.sources, self.targets,
+                                              self.lengths))
+        for node_id in range(5):
+            setattr(graph[node_id], WEIGHT, self.weights[node_id])
+            setattr(graph[node_id], LOCATION, self.coordinates[node_id])
+        compute_centrality(graph, [0, 1, 3], True, True, True, True, True,
+                           INFINITE_RADIUS, True, 1, [REACH], [])
+        results = compute_centrality_arrays(
+            self.sources, self.targets, self.lengths, self.weights,
+            self.coordinates, origins=[0, 1, 3], measures_to_normalize=[REACH])
+        for node_id in range(5):
+            assert eq_tol(results[BETWEENNESS][node_id],
+                          getattr(graph[node_id], BETWEENNESS))
+        for node_id in [0, 1, 3]:
+            for measure in [REACH, NORM_REACH, GRAVITY, CLOSENESS,
+                            STRAIGHTNESS]:
+                assert eq_tol(results[measure][node_id],
+                              getattr(graph[node_id], measure))
+        assert results[REACH][2] != results[REACH][2]
+        assert NORM_GRAVITY not in results
+
+    def test_Graph_Store(self):
+        """
+        Test that the results are the same when the graph is kept in a
+            |Graph_Store| on disk
+        """
+        results = compute_centrality_arrays(
+            self.sources, self.targets, self.lengths, self.weights,
+            self.coordinates, origins=[0, 1, 3], measures_to_normalize=[REACH])
+        with TemporaryDirectory() as directory:
+            stored_results = compute_centrality_arrays(
+                self.sources, self.targets, self.lengths, self.weights,
+                self.coordinates, origins=[0, 1, 3],
+                measures_to_normalize=[REACH], scratch_dir=directory,
+                memory_budget=0)
+        assert sorted(results) == sorted(stored_results)
+        for measure in results:
+            for node_id in range(5):
+                value = results[measure][node_id]
+                stored_value = stored_results[measure][node_id]
+                if value != value:
+                    assert stored_value != stored_value
+                else:
+                    assert eq_tol(value, stored_value)
+
+    def test_Without_Arcpy(self):
+        """
+        Test that the computation does not need arcpy
+        """
+        code = ("import sys; sys.modules['arcpy'] = None; "
+                "import src.Centrality.Library")
+        assert run([executable, "-c", code]).returncode == 0
+
+
+class TestCostEstimate(unittest.TestCase):
+    """
+    Test class for the estimate of the cost of a computation
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = [(i, j) for i in range(5) for j in range(5)]
+        self.edges = ([((i, j), (i + 1, j), 1) for (i, j) in self.nodes if
+                       i < 4] +
+                      [((i, j), (i, j + 1), 1) for (i, j) in self.nodes if
+                       j < 4])
+
+    def test_Estimate(self):
+        """
+        Test the figures of the estimate on a grid
+        """
+        graph = construct_graph(self.nodes, self.edges)
+        estimate = estimate_cost(graph, self.nodes, True, True, True, True,
+                                 False, INFINITE_RADIUS, True, 1, [], 5)
+        assert estimate["node_count"] == 25
+        assert estimate["edge_count"] == 40
+        assert estimate["sample_count"] == 5
+        assert estimate["mean_tree_size"] == 25
+        assert estimate["seconds"] > 0
+        assert estimate["euclidean_distance_evaluations"] == 0
+        assert 0 < estimate["graph_bytes"] < estimate["peak_bytes"]
+        # Searches within a radius of 1 reach a node and its grid neighbors
+        estimate = estimate_cost(graph, self.nodes, True, True, False, True,
+                                 False, 1, True, 1, [], 25)
+        assert 3 <= estimate["mean_tree_size"] < 5
+
+    def test_Estimated_Time(self):
+        """
+        Test the estimated time against a real run on a large grid with a small
+            radius, where the work done once per call on every node outweighs
+            that of the sampled searches
+        """
+        n = 200
+        nodes = [(i, j) for i in range(n) for j in range(n)]
+        edges = ([((i, j), (i + 1, j), 1) for (i, j) in nodes if i < n - 1] +
+                 [((i, j), (i, j + 1), 1) for (i, j) in nodes if j < n - 1])
+        origins = nodes[::100]
+        estimates = []
+        for _ in range(3):
+            estimate = estimate_cost(construct_graph(nodes, edges), origins,
+                                     True, True, True, True, False, 2, True, 1,
+                                     [], 20)
+            estimates.append(estimate["seconds"])
+        graph = construct_graph(nodes, edges)
+        start = perf_counter()
+        compute_centrality(graph, origins, True, True, True, True, False, 2,
+                           True, 1, [], [])
+        seconds = perf_counter() - start
+        assert seconds / 2.5 < sorted(estimates)[1] < 2.5 * seconds
+
+    def test_Dry_Run(self):
+        """
+        Test that a dry run from arrays returns an estimate
+        """
+        index = dict((node_id, i) for i, node_id in enumerate(self.nodes))
+        estimate = compute_centrality_arrays(
+            [index[u] for u, _, _ in self.edges],
+            [index[v] for _, v, _ in self.edges],
+            [length for _, _, length in self.edges], dry_run=True)
+        assert estimate["node_count"] == 25
+        assert estimate["edge_count"] == 40
+        assert estimate["graph_bytes"] > 0
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,156 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for merging co-located nodes into weighted super-nodes.
+Buildings that snap to the same network location have identical neighborhoods,
+    so a single shortest path tree serves all of them. Centrality is computed on
+    the super-node graph and the per-building results are expanded afterwards.
+"""
+
+from src.Centrality.Centrality_Computation import normalize_centrality
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import CLOSENESS
+from src.Centrality.Constants import GRAVITY
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import MEMBER_COUNT
+from src.Centrality.Constants import MEMBERS
+from src.Centrality.Constants import NEIGHBORS
+from src.Centrality.Constants import ORIGIN_MEMBER_COUNT
+from src.Centrality.Constants import REACH
+from src.Centrality.Constants import STRAIGHTNESS
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Node import Node
+
+
+def _location_key(node_id, node, tolerance):
+    """
+    Returns the key under which |node| is grouped with co-located nodes
+    Nodes without a location are never merged
+    """
+    if not hasattr(node, LOCATION):
+        return (None, node_id)
+    x, y = getattr(node, LOCATION)
+    if tolerance > 0:
+        return (round(x / tolerance), round(y / tolerance))
+    return (x, y)
+
+
+def collapse_co_located_nodes(nodes, origins, tolerance=0):
+    """
+    Merges nodes that share a location into super-nodes.
+    |nodes|: graph representation; dictionary mapping node id's to |Node| objects
+    |origins|: subset of nodes that will be used as sources of shortest path trees
+    |tolerance|: nodes whose locations agree after rounding to a multiple of
+        |tolerance| are merged, 0 merges only identical locations
+    Returns the super-node graph and its origins. A super-node is keyed by the
+        id of its first member, its weight is the sum of the member weights, and
+        it records its |MEMBERS|, |MEMBER_COUNT| and |ORIGIN_MEMBER_COUNT|.
+    """
+    origins = set(origins)
+    super_nodes = {}
+    # Mapping from node id's to the id of the super-node they are merged into
+    super_id = {}
+    key_to_super_id = {}
+    for node_id, node in nodes.items():
+        key = _location_key(node_id, node, tolerance)
+        if key not in key_to_super_id:
+            super_node = Node()
+            setattr(super_node, WEIGHT, 0.0)
+            setattr(super_node, MEMBERS, [])
+            setattr(super_node, MEMBER_COUNT, 0)
+            setattr(super_node, ORIGIN_MEMBER_COUNT, 0)
+            if hasattr(node, LOCATION):
+                setattr(super_node, LOCATION, getattr(node, LOCATION))
+            key_to_super_id[key] = node_id
+            super_nodes[node_id] = super_node
+        s_id = key_to_super_id[key]
+        super_id[node_id] = s_id
+        super_node = super_nodes[s_id]
+        setattr(super_node, WEIGHT,
+                getattr(super_node, WEIGHT) + getattr(node, WEIGHT))
+        getattr(super_node, MEMBERS).append(node_id)
+        setattr(super_node, MEMBER_COUNT, getattr(super_node, MEMBER_COUNT) + 1)
+        if node_id in origins:
+            setattr(super_node, ORIGIN_MEMBER_COUNT,
+                    getattr(super_node, ORIGIN_MEMBER_COUNT) + 1)
+
+    # Members share their neighborhoods, keep the shortest edge between any two
+    #     super-nodes and drop the edges inside a super-node
+    shortest_edges = {}
+    for node_id, node in nodes.items():
+        u = super_id[node_id]
+        for w, d_vw, accumulations_vw in getattr(node, NEIGHBORS):
+            v = super_id[w]
+            if u == v:
+                continue
+            if (u, v) not in shortest_edges or d_vw < shortest_edges[(u, v)][0]:
+                shortest_edges[(u, v)] = (d_vw, accumulations_vw)
+    for (u, v), (d_uv, accumulations_uv) in shortest_edges.items():
+        super_nodes[u].add_neighbor(v, d_uv, dict(accumulations_uv))
+
+    super_origins = [s_id for s_id, super_node in super_nodes.items() if
+                     getattr(super_node, ORIGIN_MEMBER_COUNT) > 0]
+    return super_nodes, super_origins
+
+
+def expand_co_located_results(super_nodes, nodes, origins, compute_r, compute_g,
+                              compute_b, compute_c, compute_s, beta,
+                              measures_to_normalize, accumulator_fields,
+                              node_count=None):
+    """
+    Copies the measures computed on the super-node graph back to the member
+        nodes, then normalizes them per member.
+    |super_nodes|: super-node graph returned by |collapse_co_located_nodes|,
+        after running |compute_centrality| on it without normalization
+    |nodes|: the original graph
+    |origins|: the original origins
+    |node_count|: as in |compute_centrality|
+    Members of a super-node share reach, gravity, closeness and straightness.
+        Weighted reach excludes the member's own weight rather than that of the
+        whole super-node. These match the results on the original graph when
+        members are joined by zero-length edges.
+    The betweenness credited to a super-node is split evenly among its members.
+        This is the betweenness on the original graph when members are joined
+        by edges shorter than any other, so that no shortest path goes through
+        one member to another. With zero-length edges between members instead,
+        the betweenness on the original graph depends on the order in which
+        the search settles them, and is not reproduced.
+    """
+    origins = set(origins)
+    sum_weights = 0.0
+    for super_node in super_nodes.values():
+        member_count = getattr(super_node, MEMBER_COUNT)
+        super_weight = getattr(super_node, WEIGHT)
+        computed = hasattr(super_node, "reach")
+        for member_id in getattr(super_node, MEMBERS):
+            member = nodes[member_id]
+            if compute_b:
+                setattr(member, BETWEENNESS,
+                        getattr(super_node, BETWEENNESS) / member_count)
+            if not (computed and member_id in origins):
+                continue
+            weight_m = getattr(member, WEIGHT)
+            sum_weights += weight_m
+            member.reach = super_node.reach
+            member.weighted_reach = (super_node.weighted_reach + super_weight -
+                                     weight_m)
+            if compute_r:
+                setattr(member, REACH, member.weighted_reach)
+            for measure in [GRAVITY, CLOSENESS, STRAIGHTNESS] + list(
+                    accumulator_fields):
+                if hasattr(super_node, measure):
+                    setattr(member, measure, getattr(super_node, measure))
+
+    # Straightness is skipped by |compute_centrality| without node locations
+    compute_s = compute_s and any(hasattr(super_node, STRAIGHTNESS) for
+                                  super_node in super_nodes.values())
+    normalize_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                         compute_c, compute_s, beta, measures_to_normalize,
+                         sum_weights, node_count)
@@ -0,0 +1,107 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for decomposing a graph into its connected components.
+No shortest path crosses between components, so each component with origins
+    can be computed on its own, and components without origins can be skipped.
+"""
+
+from src.Centrality.Centrality_Computation import normalize_centrality
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import NEIGHBORS
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Partitioned_Computation import compute_partitions
+from src.Common.Data_Structures.UnionFind import UnionFind
+
+
+def connected_components(nodes):
+    """
+    Returns a dictionary mapping each node id in |nodes| to a label of its
+        connected component
+    |nodes|: graph representation; dictionary mapping node id's to |Node| objects
+    """
+    union_find = UnionFind(nodes)
+    for node_id, node in nodes.items():
+        for w, _, _ in getattr(node, NEIGHBORS):
+            union_find.union(node_id, w)
+    return dict((node_id, union_find.find(node_id)) for node_id in nodes)
+
+
+def component_units(nodes, origins, component):
+    """
+    Returns the components that contain origins, as a list of (nodes, origins)
+        pairs sorted from largest to smallest, and the total number of
+        components.
+    |component|: mapping from node id's to component labels, as returned by
+        |connected_components|
+    """
+    units = {}
+    for node_id, label in component.items():
+        if label not in units:
+            units[label] = ({}, [])
+        units[label][0][node_id] = nodes[node_id]
+    for s in origins:
+        if s in component:
+            units[component[s]][1].append(s)
+    scheduled = [unit for unit in units.values() if unit[1]]
+    scheduled.sort(key=lambda unit: len(unit[0]), reverse=True)
+    return scheduled, len(units)
+
+
+def compute_centrality_by_component(nodes, origins, compute_r, compute_g,
+                                    compute_b, compute_c, compute_s, radius,
+                                    network_radius, beta, measures_to_normalize,
+                                    accumulator_fields, node_count=None,
+                                    processes=1, normalize_by_component=False):
+    """
+    Computes the measures of |compute_centrality| one connected component at a
+        time, skipping components without origins.
+    |processes|: the number of components computed in parallel
+    |normalize_by_component|: normalize reach by the sum of the origin weights
+        in the origin's component, rather than by the sum of all origin weights
+    All other parameters are as in |compute_centrality|. Returns the number of
+        components and the number of components that were computed.
+    """
+    component = connected_components(nodes)
+    units, component_count = component_units(nodes, origins, component)
+    centrality_arguments = (compute_r, compute_g, compute_b, compute_c,
+                            compute_s, radius, network_radius, beta, [],
+                            accumulator_fields)
+    if compute_b:
+        # Nodes in skipped components lie on no shortest path
+        for node in nodes.values():
+            setattr(node, BETWEENNESS, 0.0)
+    for _, results in compute_partitions(units, centrality_arguments,
+                                         processes, sum(len(unit_origins) for
+                                                        _, unit_origins in
+                                                        units)):
+        for node_id, attributes in results.items():
+            for attribute, value in attributes.items():
+                setattr(nodes[node_id], attribute, value)
+
+    # Global and per-component sums of the origin weights
+    sum_weights = 0.0
+    component_weights = {}
+    for s in origins:
+        if s in nodes:
+            weight_s = getattr(nodes[s], WEIGHT)
+            sum_weights += weight_s
+            component_weights[component[s]] = (component_weights.get(
+                component[s], 0.0) + weight_s)
+    component_sum_weights = (dict((s, component_weights[component[s]]) for s in
+                                  origins if s in nodes) if
+                             normalize_by_component else None)
+    # Straightness is skipped by |compute_centrality| without node locations
+    compute_s = compute_s and hasattr(next(iter(nodes.values())), LOCATION)
+    normalize_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                         compute_c, compute_s, beta, measures_to_normalize,
+                         sum_weights, node_count, component_sum_weights)
+    return component_count, len(units)
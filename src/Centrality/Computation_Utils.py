@@ -0,0 +1,68 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Utility methods used by the computations, which do not depend on arcpy.
+"""
+
+from src.Centrality.Constants import TOLERANCE
+from math import sqrt
+
+
+class Invalid_Parameters_Exception(Exception):
+    """
+    Exception thrown when parameters to a method are invalid
+    """
+    pass
+
+
+def eq_tol(a, b):
+    """
+    Returns True if |a| and |b| are within |TOLERANCE|, False otherwise
+    """
+    return abs(a - b) <= TOLERANCE
+
+
+def lt_tol(a, b):
+    """
+    Returns True if |a| is less than |b| by more than |TOLERANCE|, False otherwise
+    """
+    return b - a > TOLERANCE
+
+
+def dist(loc1, loc2):
+    """
+    Computes the euclidean distance between |loc1| and |loc2|
+    |loc1|: (x1, y1)
+    |loc2|: (x2, y2)
+    """
+    x1, y1 = loc1
+    x2, y2 = loc2
+    return sqrt((x1 - x2)**2 + (y1 - y2)**2)
+
+
+def merge_maps(map1, map2, f):
+    """
+    Returns comb_map, such that comb_map[key] = |f|(|map1|[key], |map2|[key])
+    |map1| and |map2| must have the same keys
+    """
+    if set(map1.keys()) != set(map2.keys()):
+        raise Exception("Invalid input, dictionaries must have the same keys")
+    comb_map = {}
+    for key in map1:
+        comb_map[key] = f(map1[key], map2[key])
+    return comb_map
+
+
+def trim(field_name):
+    """
+    Returns the first 10 characters of |field_name|
+    (DBF files truncate field names to 10 characters)
+    """
+    return field_name[:10]
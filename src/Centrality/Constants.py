@@ -80,6 +80,7 @@ INPUT_BUILDINGS_COPY_FINISHED = "[finished]"
 INPUT_BUILDINGS_COPY_FAILED = "[failed]"
 
 PROGRESS_NORMALIZATION = "Normalizing results"
+PROGRESS_GRAPH_PRUNING = "Finding nodes within the search radius of the origins"
 
 WARNING_LARGE_ADJ_FILE_NAME = ("Adjacency list DBF name is too large, "
                                "please rerun with shorter input file names")
@@ -109,15 +110,86 @@ def WARNING_POINTS_NOT_IN_GRAPH(in_graph, not_in_graph):
 WARNING_NO_NODES = "No nodes in graph"
 WARNING_APPLY_SYMBOLOGY_FAILED = "Failed to apply symbology to output layer"
 WARNING_FAIL_TO_DISPLAY = "Layer produced but not displayed"
+WARNING_DRY_RUN_UNSUPPORTED = ("Running time cannot be estimated with the "
+                               "street graph model or with tiles")
+
+
+def WARNING_TILES_NEED_LENGTH(impedance):
+    return (f"{impedance} is not a length in a projected coordinate system, so "
+            "the whole graph is loaded instead of tiles")
+
+
+def WARNING_PRUNING_NEEDS_LENGTH(impedance):
+    return (f"{impedance} is not a length in a projected coordinate system, so "
+            "the graph is not pruned to the selected origins")
+
+
+WARNING_CO_LOCATED_BETWEENNESS = ("Betweenness is split evenly among co-located "
+                                  "nodes, paths from one to another through a "
+                                  "third are not counted")
+
+
+def WARNING_OPTIONS_IGNORED(options, model):
+    return (f"{', '.join(options)} cannot be used {model}, so the measures are "
+            "computed without them")
+
+
+def INVALID_STEP_4_OPTIONS(options):
+    return (f"{', '.join(options)} cannot be combined, since the measures are "
+            "computed in one of these ways only")
+
+
+def INVALID_STREET_MODEL_IMPEDANCE(impedance):
+    return (f"{impedance} is not a length in a projected coordinate system, so "
+            "it cannot be used with the street graph model, which measures "
+            "street lengths")
+
+
+def INVALID_STREET_MODEL_ACCUMULATORS(accumulators):
+    return (f"{', '.join(accumulators)} cannot be accumulated with the street "
+            "graph model")
+
+
 WARNING_NO_BETWEENNESS_NORMALIZATION = ("Betweenness values were not normalized"
                                         " since not all nodes were used as origins")
 
+
+def WARNING_STAGES_NOT_CACHED(inputs):
+    return (f"Stages are not cached, since changes to {', '.join(inputs)} "
+            "cannot be detected")
+
+
 POINT_CONVERSION_STARTED = ("... [started] Converting polygons to network "
                             "locations")
 POINT_CONVERSION_FINISHED = "... [finished]"
 POINT_CONVERSION_DONE = "Conversion has already been done"
 
 ADJACENCY_LIST_COMPUTED = "Adjacency list already computed on previous run"
+DRY_RUN_FINISHED = ("Dry run: the adjacency list was computed and kept, no "
+                    "measures were computed")
+
+
+def STAGE_REUSED(stage):
+    return f"... {stage} reused from a previous run"
+
+
+def GRAPH_PRUNED(kept_count, node_count):
+    return (f"... {kept_count} out of {node_count} nodes are within the search "
+            "radius of the selected origins")
+
+
+def COMPONENTS_SCHEDULED(component_count, scheduled_count):
+    return (f"... {scheduled_count} out of {component_count} connected "
+            "components contain origins")
+
+
+def CO_LOCATED_NODES_COLLAPSED(node_count, super_node_count):
+    return f"... {node_count} nodes merged into {super_node_count} super-nodes"
+
+
+def SEARCH_COUNTERS_WRITTEN(search_count, file_name):
+    return f"... Counts of {search_count} searches written to {file_name}"
+
 
 BARRIER_COST_PRE_PROCESSING = "Barrier cost computation pre-processing"
 BARRIER_COST_COMPUTATION = "Barrier cost computation"
@@ -171,6 +243,13 @@ CLOSENESS = "Closeness"
 NORM_CLOSENESS = "Norm_Closeness"
 STRAIGHTNESS = "Straightness"
 NORM_STRAIGHTNESS = "Norm_Straightness"
+# Super-node attribute names (co-located nodes merged into one node)
+MEMBERS = "Members"
+MEMBER_COUNT = "Member_Count"
+ORIGIN_MEMBER_COUNT = "Origin_Member_Count"
+# Node attributes that describe the graph rather than computed measures
+GRAPH_ATTRIBUTES = (NEIGHBORS, LOCATION, WEIGHT, MEMBERS, MEMBER_COUNT,
+                    ORIGIN_MEMBER_COUNT)
 
 # Attributes that might be written to file
 METRICS = (REACH, GRAVITY, BETWEENNESS, CLOSENESS, STRAIGHTNESS)
@@ -178,6 +257,134 @@ NORM_METRICS = (NORM_REACH, NORM_GRAVITY, NORM_BETWEENNESS, NORM_CLOSENESS,
                 NORM_STRAIGHTNESS)
 FINAL_ATTRIBUTES = METRICS + NORM_METRICS
 
+
+def impedance_measure(index, measure):
+    """
+    Returns the attribute name of |measure| computed with the |index|-th
+        additional impedance
+    """
+    return f"I{index}_{measure}"
+
+
+# Graph model used for centrality computation: buildings connected through an
+#     adjacency list computed with OD cost matrices, or buildings attached to the
+#     edges of the street network (see Street_Graph.py)
+BUILDING_GRAPH_MODEL = "Building graph"
+STREET_GRAPH_MODEL = "Street graph"
+CENTRALITY_GRAPH_MODEL = BUILDING_GRAPH_MODEL
+
+# With a finite network radius, only load the nodes within the radius of the
+#     selected origins, when only some of the points are selected and the
+#     impedance is a length (see Graph_Pruning.py)
+PRUNE_GRAPH_TO_ORIGINS = True
+
+# Compute centrality separately for each connected component of the graph,
+#     skipping components without origins (see Components.py)
+DECOMPOSE_COMPONENTS = False
+# Number of processes used to compute independent parts of the graph
+CENTRALITY_PROCESSES = 1
+# Normalize reach by the origin weights in the same connected component instead
+#     of all origin weights
+NORMALIZE_BY_COMPONENT = False
+
+# Additional network impedance attributes to compute every measure with, mapped
+#     to the search radius to use with each. They are accumulated along the
+#     paths of the main impedance when the adjacency list is computed, and the
+#     results for the k-th one are output with an I<k>_ prefix (see
+#     Multi_Impedance.py)
+ADDITIONAL_IMPEDANCES = {}
+
+# Side length of the square tiles used to compute a finite network radius one
+#     tile at a time, None to load the whole graph (see Tiling.py). Tiles need
+#     an impedance measured in length; with any other impedance the whole
+#     graph is loaded.
+TILE_SIZE = None
+
+# Keep the graph in arrays that spill to memory-mapped files in a scratch
+#     directory once GRAPH_STORE_MEMORY_BUDGET bytes are used, instead of Node
+#     objects (see Graph_Store.py)
+# Every node and neighbor access then goes through a proxy that reads the
+#     arrays, which makes the centrality computation about 2.5 to 3 times
+#     slower than with Node objects. Use it only when the graph does not fit in
+#     memory.
+OUT_OF_CORE_GRAPH = False
+GRAPH_STORE_MEMORY_BUDGET = 2 * 1024 ** 3
+
+# Cache the graph, the graph with node attributes and the graph with measures
+#     of the building graph model in PIPELINE_CACHE_DIR_NAME, keyed by the
+#     inputs and parameters they were computed from. A run reuses the last of
+#     them whose inputs are unchanged, which also resumes a run that failed
+#     after computing it (see Pipeline.py). The converted points, their network
+#     locations and the adjacency list are reused only if they are the files
+#     written for the same inputs. Layers are keyed by their data source, and
+#     datasets in a geodatabase by the whole geodatabase; if an input cannot be
+#     fingerprinted, nothing is cached.
+CACHE_PIPELINE_STAGES = False
+POINTS_STAGE = "Points"
+NETWORK_LOCATIONS_STAGE = "Network_Locations"
+ADJACENCY_STAGE = "Adjacency_List"
+GRAPH_STAGE = "Graph"
+NODE_ATTRIBUTES_STAGE = "Node_Attributes"
+METRICS_STAGE = "Metrics"
+
+# Only estimate the running time and memory of the computation from a sample
+#     of DRY_RUN_SAMPLE_SIZE origins, without computing or writing the measures
+#     (see Cost_Estimate.py)
+# The estimate needs the graph, so the adjacency list is still computed in
+#     Step 1 and the graph built in Step 2. Only the centrality computation of
+#     Step 4 and the outputs are skipped. The adjacency list is kept, so the
+#     full run that follows does not compute it again.
+DRY_RUN = False
+DRY_RUN_SAMPLE_SIZE = 20
+
+# Derive the shortest path tree of each origin from that of a neighboring
+#     origin when possible (see Rerooted_Computation.py). The origins are
+#     handed back to the usual search once re-rooting is timed slower.
+REROOT_SHORTEST_PATH_TREES = False
+
+# Save the graph and its results next to the output, so that they can be
+#     updated after local edits to the network (see Incremental_Centrality.py)
+SAVE_CENTRALITY_BASELINE = False
+
+# Visit the origins in the order of their snap locations along a space filling
+#     curve, None keeps the order of the input (see Space_Filling_Curve.py)
+HILBERT_CURVE = "Hilbert curve"
+MORTON_CURVE = "Morton curve"
+NODE_ORDERING_CURVE = None
+# The curve is laid over a 2^CURVE_ORDER by 2^CURVE_ORDER grid
+CURVE_ORDER = 16
+
+# Merge buildings that snap to the same network location into one super-node
+#     before centrality computation (see Co_Location.py)
+# Reach, gravity, closeness and straightness are unchanged, betweenness is split
+#     evenly among the members of a super-node, as if members were not on the
+#     shortest paths to each other
+COLLAPSE_CO_LOCATED_NODES = False
+# Snap locations that agree after rounding to a multiple of this distance are
+#     considered the same location, 0 merges only identical locations
+CO_LOCATION_TOLERANCE = 0
+
+# Count the work of the shortest path search from each origin (heap pushes and
+#     pops, decrease-keys, edges relaxed, nodes settled, queue size and time),
+#     and write histograms of the counts with the SLOWEST_SEARCH_COUNT slowest
+#     origins to a JSON file next to the output (see Search_Counters.py). Only
+#     searches run in this process by compute_centrality are counted.
+SEARCH_COUNTERS = False
+SLOWEST_SEARCH_COUNT = 10
+
+# Trace the steps of the tool and their phases, and write the spans as Chrome
+#     trace events to a JSON file next to the output (see Tracing.py)
+TRACE_STEPS = False
+
+# Sample the memory used at the end of each step, with the estimated size of
+#     the graph, and write the samples to a JSON file next to the output (see
+#     Memory_Profile.py). Python allocations are also traced if
+#     TRACE_MEMORY_ALLOCATIONS, which slows the run down. A warning is given
+#     once the memory used exceeds SOFT_MEMORY_LIMIT bytes, unless it is None.
+PROFILE_MEMORY = False
+TRACE_MEMORY_ALLOCATIONS = False
+SOFT_MEMORY_LIMIT = None
+
 # Constants for adjacency list computation
 # Network feature type identifiers
 EDGE_FEATURE = "EdgeFeature"
@@ -194,6 +401,11 @@ BARRIER_COST_FIELD = "Barrier_Cost"
 BARRIER_COST = (sys.maxsize / 5) * 2
 # Maximum extent of search on the network
 SEARCH_TOLERANCE = "5000 Meters"
+# Meters in each length unit of network attributes
+METERS_PER_UNIT = {"Centimeters": 0.01, "Feet": 0.3048, "Inches": 0.0254,
+                   "Kilometers": 1000.0, "Meters": 1.0, "Miles": 1609.344,
+                   "Millimeters": 0.001, "NauticalMiles": 1852.0,
+                   "Yards": 0.9144}
 # Distance offset when buildings are snapped to the network
 SNAP_OFFSET = "5 Meters"
 # Origin and Destination ID names
@@ -210,6 +422,22 @@ def layer_name(base):
     return f"{base}_Layer"
 
 
+def baseline_file_name(base):
+    return f"{base}_Baseline.pkl"
+
+
+def search_counters_file_name(base):
+    return f"{base}_Search_Counters.json"
+
+
+def trace_file_name(base):
+    return f"{base}_Trace.json"
+
+
+def memory_profile_file_name(base):
+    return f"{base}_Memory_Profile.json"
+
+
 def get_symbology_layer_name(shape_type, first_metric):
     return f"{shape_type}_{first_metric}_Symbology_Layer.lyr"
 
@@ -218,6 +446,9 @@ SYMBOLOGY_DIR_NAME = "Symbology_Layers"
 SYMBOLOGY_DIR = join(SCRIPT_DIR, SYMBOLOGY_DIR_NAME)
 ADJACENCY_LIST_NAME = "Adj"
 AUXILIARY_DIR_NAME = "Auxiliary_Files"
+GRAPH_STORE_DIR_NAME = "Graph_Store"
+TILE_ROWS_DIR_NAME = "Tile_Rows"
+PIPELINE_CACHE_DIR_NAME = "Pipeline_Cache"
 OD_COST_MATRIX_LAYER_NAME = layer_name("OD_Cost_Matrix")
 OD_COST_MATRIX_LINES = "Lines"
 
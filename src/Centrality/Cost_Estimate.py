@@ -0,0 +1,188 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for estimating the running time and memory of a centrality computation
+    without carrying it out.
+A few origins are sampled and their searches are timed with
+    |compute_centrality|, then searched again with a bare Dijkstra that
+    records the size of their shortest path trees and of the search frontier.
+    The searches are timed one by one, apart from the work done once per call
+    on every node (initialization and normalization), and only their time is
+    extrapolated to all the origins. With a Euclidean radius,
+    every search also measures the distance to every node, which the sampled
+    timings include.
+Memory is estimated as the graph plus the data of one search and, with
+    betweenness, one value per node. Object sizes are measured on a sample of
+    the nodes when they are |Node| objects.
+"""
+
+from heapq import heappop
+from heapq import heappush
+from random import Random
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Constants import INFINITE_RADIUS
+from src.Centrality.Constants import NEIGHBORS
+from src.Centrality.Graph_Store import ITEM_SIZE
+from src.Common.Utils.Search_Counters import Search_Counters
+from sys import getsizeof
+from time import perf_counter
+
+# Approximate size in bytes of a dictionary entry, and of an entry holding a
+#     float or a list
+DICT_ENTRY_BYTES = 3 * 8 * 2
+FLOAT_ENTRY_BYTES = DICT_ENTRY_BYTES + getsizeof(0.0)
+LIST_ENTRY_BYTES = DICT_ENTRY_BYTES + getsizeof([]) + 2 * 8
+
+
+def _tree_size(nodes, s, radius):
+    """
+    Returns the number of nodes within |radius| of |s| and the largest size of
+        the search queue
+    """
+    d = {s: 0.0}
+    Q = [(0.0, s)]
+    settled = 0
+    frontier = 1
+    while Q:
+        d_sv, v = heappop(Q)
+        if d_sv > d[v]:
+            continue
+        settled += 1
+        for w, d_vw, _ in getattr(nodes[v], NEIGHBORS):
+            d_sw = d_sv + d_vw
+            if d_sw <= radius and (w not in d or d_sw < d[w]):
+                d[w] = d_sw
+                heappush(Q, (d_sw, w))
+        frontier = max(frontier, len(Q))
+    return settled, frontier
+
+
+def _graph_bytes(nodes, sample_ids, edge_count, accumulator_count):
+    """
+    Returns the estimated size of the graph in bytes
+    """
+    N = len(nodes)
+    try:
+        sizes = []
+        for node_id in sample_ids:
+            node = nodes[node_id]
+            neighbors = getattr(node, NEIGHBORS)
+            sizes.append(getsizeof(node) + getsizeof(vars(node)) +
+                         getsizeof(neighbors) +
+                         sum(getsizeof(edge) + getsizeof(edge[2]) for edge in
+                             neighbors))
+        return int(N * DICT_ENTRY_BYTES + N * sum(sizes) / max(1, len(sizes)))
+    except TypeError:
+        # Nodes stored in arrays: offsets and weights per node, and targets,
+        #     lengths and accumulations per directed edge
+        return ITEM_SIZE * (2 * N + 2 * edge_count * (2 + accumulator_count))
+
+
+def search_bytes(tree_size, frontier, compute_b, accumulator_count,
+                 network_radius, node_count):
+    """
+    Returns the estimated size in bytes of the data of a search from one origin
+        that reaches |tree_size| nodes with at most |frontier| nodes in the
+        queue: distances, the queue and, with betweenness, path counts,
+        predecessors and dependencies
+    """
+    entry_bytes = FLOAT_ENTRY_BYTES
+    if compute_b:
+        entry_bytes += 2 * FLOAT_ENTRY_BYTES + LIST_ENTRY_BYTES
+    if accumulator_count:
+        entry_bytes += (DICT_ENTRY_BYTES + getsizeof({}) +
+                        accumulator_count * FLOAT_ENTRY_BYTES)
+    size = int(tree_size * entry_bytes + frontier * getsizeof((0.0, 0)))
+    if not network_radius:
+        size += node_count * DICT_ENTRY_BYTES
+    return size
+
+
+def estimate_cost(nodes, origins, compute_r, compute_g, compute_b, compute_c,
+                  compute_s, radius, network_radius, beta, accumulator_fields,
+                  sample_size=20, seed=0):
+    """
+    Returns a dictionary with the estimated running time in seconds
+        ("seconds") and peak memory in bytes ("peak_bytes") of
+        |compute_centrality| with the given parameters, along with the figures
+        they are based on.
+    |sample_size|: the number of origins to time
+    |seed|: seed for sampling the origins
+    The sampled origins are computed, so their measures are left on |nodes|.
+    """
+    origins = [s for s in origins if s in nodes]
+    N = len(nodes)
+    O = len(origins)
+    edge_count = sum(len(getattr(nodes[node_id], NEIGHBORS)) for node_id in
+                     nodes) // 2
+    sample = Random(seed).sample(origins, min(sample_size, O))
+
+    counters = Search_Counters("estimate_cost")
+    start = perf_counter()
+    compute_centrality(nodes, sample, compute_r, compute_g, compute_b,
+                       compute_c, compute_s, radius, network_radius, beta, [],
+                       accumulator_fields, counters=counters)
+    # Work done once per call, whatever the number of origins
+    setup_seconds = max(0.0, perf_counter() - start - counters.seconds)
+
+    # With a Euclidean radius, searches are not bounded by the radius
+    search_radius = radius if network_radius else INFINITE_RADIUS
+    tree_sizes = []
+    frontiers = []
+    for s in sample:
+        tree_size, frontier = _tree_size(nodes, s, search_radius)
+        tree_sizes.append(tree_size)
+        frontiers.append(frontier)
+    mean_tree_size = sum(tree_sizes) / max(1, len(sample))
+    mean_frontier = sum(frontiers) / max(1, len(sample))
+
+    # Data of the largest search
+    largest_search_bytes = search_bytes(
+        max(tree_sizes, default=0), max(frontiers, default=0), compute_b,
+        len(accumulator_fields), network_radius, N)
+    betweenness_bytes = N * getsizeof(0.0) if compute_b else 0
+    graph_bytes = _graph_bytes(nodes, sample, edge_count,
+                               len(accumulator_fields))
+
+    seconds_per_origin = counters.seconds / max(1, len(sample))
+    return {"node_count": N, "edge_count": edge_count, "origin_count": O,
+            "sample_count": len(sample),
+            "seconds_per_origin": seconds_per_origin,
+            "setup_seconds": setup_seconds,
+            "seconds": setup_seconds + seconds_per_origin * O,
+            "mean_tree_size": mean_tree_size, "mean_frontier": mean_frontier,
+            "euclidean_distance_evaluations": 0 if network_radius else O * N,
+            "graph_bytes": graph_bytes, "search_bytes": largest_search_bytes,
+            "betweenness_bytes": betweenness_bytes,
+            "peak_bytes": (graph_bytes + largest_search_bytes +
+                           betweenness_bytes)}
+
+
+def describe_cost_estimate(estimate):
+    """
+    Returns a list of lines describing an estimate made by |estimate_cost|
+    """
+    lines = [f"Graph: {estimate['node_count']} nodes, "
+             f"{estimate['edge_count']} edges, "
+             f"{estimate['origin_count']} origins",
+             f"Sampled {estimate['sample_count']} origins: "
+             f"{estimate['seconds_per_origin'] * 1000:.2f} ms per origin, "
+             f"{estimate['mean_tree_size']:.0f} nodes per search, "
+             f"{estimate['mean_frontier']:.0f} nodes in the search frontier"]
+    if estimate["euclidean_distance_evaluations"]:
+        lines.append(f"Euclidean radius: "
+                     f"{estimate['euclidean_distance_evaluations']} distance "
+                     "evaluations")
+    lines += [f"Estimated time: {estimate['seconds']:.1f} s",
+              f"Estimated peak memory: {estimate['peak_bytes'] / 1024 ** 2:.1f}"
+              f" MB (graph {estimate['graph_bytes'] / 1024 ** 2:.1f} MB, "
+              f"search {estimate['search_bytes'] / 1024 ** 2:.1f} MB, "
+              f"betweenness {estimate['betweenness_bytes'] / 1024 ** 2:.1f} MB)"]
+    return lines
@@ -0,0 +1,39 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for saving and loading a graph together with its centrality results.
+"""
+
+from pickle import dump
+from pickle import HIGHEST_PROTOCOL
+from pickle import load
+
+
+def save_graph(path, nodes, origins, parameters):
+    """
+    Saves a graph and the centrality results recorded on its nodes.
+    |path|: the file to write
+    |nodes|: graph representation; dictionary mapping node id's to |Node| objects
+    |origins|: the origins the results were computed for
+    |parameters|: dictionary of the arguments the results were computed with,
+        keyed by the parameter names of |compute_centrality|
+    """
+    with open(path, "wb") as artifact:
+        dump({"nodes": nodes, "origins": list(origins),
+              "parameters": parameters}, artifact, HIGHEST_PROTOCOL)
+
+
+def load_graph(path):
+    """
+    Returns the graph, origins and parameters saved by |save_graph| at |path|
+    """
+    with open(path, "rb") as artifact:
+        saved = load(artifact)
+    return saved["nodes"], saved["origins"], saved["parameters"]
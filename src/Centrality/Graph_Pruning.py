@@ -0,0 +1,102 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for restricting the graph to the part reachable from the origins.
+With a finite network radius, a shortest path tree rooted at an origin never
+    extends past the radius, so nodes farther than the radius from every origin
+    take no part in the computation and need not be loaded.
+When the impedance is a length, the network distance between two nodes is at
+    least the straight-line distance between their locations, so only the rows
+    of the adjacency list between nodes near some origin are read into memory.
+"""
+
+from heapq import heapify
+from heapq import heappop
+from heapq import heappush
+from math import floor
+
+
+def nodes_within_radius(neighbors, origins, radius):
+    """
+    Returns the set of nodes within network distance |radius| of some origin.
+    |neighbors|: dictionary mapping node id's to lists of (neighbor id, distance)
+    |origins|: the origin node id's, those not in |neighbors| are ignored
+    |radius|: the search radius
+    """
+    d = {}  # Shortest distance from the closest origin
+    Q = []
+    for s in origins:
+        if s in neighbors:
+            d[s] = 0.0
+            Q.append((0.0, s))
+    heapify(Q)
+    settled = set()
+    # Multi-source Dijkstra
+    while Q:
+        d_v, v = heappop(Q)
+        if v in settled:
+            continue
+        settled.add(v)
+        for w, d_vw in neighbors[v]:
+            d_w = d_v + d_vw
+            if d_w <= radius and (w not in d or d_w < d[w]):
+                d[w] = d_w
+                heappush(Q, (d_w, w))
+    return settled
+
+
+def nodes_near_origins(locations, origins, halo):
+    """
+    Returns the set of nodes within straight-line distance |halo| of some
+        origin.
+    |locations|: dictionary mapping node id's to (x, y) locations
+    |origins|: the origin node id's, those without a location are ignored
+    |halo|: the search radius, in the units of the locations
+    """
+    # Origins grouped by cells of side |halo|, so that a node need only be
+    #     compared with the origins in its cell and the eight around it
+    cell_size = halo if halo > 0 else 1.0
+    cells = {}
+    for s in origins:
+        if s in locations:
+            x, y = locations[s]
+            cells.setdefault((floor(x / cell_size), floor(y / cell_size)),
+                             []).append((x, y))
+    near = set()
+    for node_id, (x, y) in locations.items():
+        column, row = floor(x / cell_size), floor(y / cell_size)
+        if any((x - s_x) * (x - s_x) + (y - s_y) * (y - s_y) <= halo * halo
+               for other_column in range(column - 1, column + 2)
+               for other_row in range(row - 1, row + 2)
+               for s_x, s_y in cells.get((other_column, other_row), [])):
+            near.add(node_id)
+    return near
+
+
+def load_neighbors(rows, candidates):
+    """
+    Returns the |neighbors| dictionary of |nodes_within_radius| for the edges
+        between |candidates|.
+    |rows|: iterable of (origin id, destination id, distance) rows, as read
+        from an adjacency list
+    |candidates|: the nodes to keep, rows with another node are skipped
+    """
+    neighbors = {}
+    for origin_id, destination_id, distance in rows:
+        if origin_id not in candidates or destination_id not in candidates:
+            continue
+        distance = float(distance)
+        for row_id in [origin_id, destination_id]:
+            if row_id not in neighbors:
+                neighbors[row_id] = []
+        if origin_id != destination_id and distance >= 0:
+            neighbors[origin_id].append((destination_id, distance))
+            neighbors[destination_id].append((origin_id, distance))
+    return neighbors
@@ -0,0 +1,295 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for storing a graph in memory-mapped arrays.
+The adjacency of the graph is kept in compressed sparse row (CSR) form: the
+    neighbors of the node with index i are |targets|[|offsets|[i]:|offsets|[i +
+    1]], with edge lengths in |lengths| and accumulator values in one array per
+    field. Node weights, locations and computed measures are arrays indexed by
+    node. Arrays are allocated in memory while they fit in the memory budget,
+    and as files in the scratch directory after that, which are read through
+    the page cache.
+The store is exposed to |compute_centrality| as a mapping from node id's to
+    proxy nodes that read and write the arrays, so the graph is never held as
+    |Node| objects. Only the list of node id's stays in memory.
+"""
+
+from collections.abc import Mapping
+from itertools import repeat
+from math import isnan
+from mmap import mmap
+from os import makedirs
+from os.path import join
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import NEIGHBORS
+from src.Centrality.Constants import WEIGHT
+from struct import pack
+
+# Size in bytes of the array items: 64 bit integers and doubles
+ITEM_SIZE = 8
+INDEX_TYPE = "q"
+VALUE_TYPE = "d"
+# Value of measures that were not computed for a node
+MISSING = float("nan")
+
+
+class Graph_Store:
+    """
+    Graph stored in arrays, see |build_graph_store|
+    """
+
+    def __init__(self, directory, memory_budget=None):
+        """
+        |directory|: scratch directory for arrays that do not fit in memory
+        |memory_budget|: number of bytes of arrays to allocate in memory, None
+            for no limit
+        """
+        self._directory = directory
+        self._memory_budget = memory_budget
+        self._memory_used = 0
+        self._maps = []
+        self.ids = []
+        self.index = {}
+        self.accumulator_fields = ()
+        self.offsets = None
+        self.targets = None
+        self.lengths = None
+        self.accumulations = {}
+        # Node attribute arrays, keyed by attribute name
+        self.columns = {}
+
+    def allocate(self, name, count, typecode, fill=None):
+        """
+        Returns a new array of |count| items of type |typecode|, filled with
+            |fill| if given, and zeros otherwise. The array is a file named
+            |name| in the scratch directory if it does not fit in the memory
+            budget.
+        """
+        size = max(1, count) * ITEM_SIZE
+        if (self._memory_budget is None or
+                self._memory_used + size <= self._memory_budget):
+            self._memory_used += size
+            buffer = mmap(-1, size)
+        else:
+            makedirs(self._directory, exist_ok=True)
+            with open(join(self._directory, f"{name}.bin"), "w+b") as array_file:
+                array_file.truncate(size)
+                buffer = mmap(array_file.fileno(), size)
+        if fill is not None:
+            buffer[:] = pack(typecode, fill) * (size // ITEM_SIZE)
+        array = memoryview(buffer).cast(typecode)
+        view = array[:count]
+        self._maps.append((buffer, array, view))
+        return view
+
+    def column(self, attribute, create=False):
+        """
+        Returns the node array of |attribute|, allocating it if |create| is
+            True and it does not exist yet. Returns None otherwise.
+        """
+        if attribute not in self.columns and create:
+            self.columns[attribute] = self.allocate(
+                f"column_{len(self.columns)}", len(self.ids), VALUE_TYPE,
+                MISSING)
+        return self.columns.get(attribute)
+
+    def neighbors(self, i):
+        """
+        Returns the (neighbor id, distance, accumulations) triples of the node
+            with index |i|, as found in the |NEIGHBORS| of a |Node|
+        """
+        start, end = self.offsets[i], self.offsets[i + 1]
+        if self.accumulator_fields:
+            accumulations = zip(*(zip(repeat(field),
+                                      self.accumulations[field][start:end])
+                                  for field in self.accumulator_fields))
+        else:
+            accumulations = repeat(())
+        return list(zip(map(self.ids.__getitem__,
+                            self.targets[start:end].tolist()),
+                        self.lengths[start:end].tolist(), accumulations))
+
+    def nodes(self):
+        """
+        Returns a mapping from node id's to |Stored_Node| proxies
+        """
+        return Stored_Graph(self)
+
+    def flush(self):
+        """
+        Writes the arrays held in files back to disk
+        """
+        for buffer, _, _ in self._maps:
+            buffer.flush()
+
+    def close(self):
+        """
+        Releases the arrays
+        """
+        for buffer, array, view in self._maps:
+            view.release()
+            array.release()
+            buffer.close()
+        self._maps = []
+
+
+class Stored_Graph(Mapping):
+    """
+    Read-only mapping from node id's to |Stored_Node| proxies
+    Proxies are created on first access and reused after that, one pointer per
+        node, since the search looks up every node it reaches.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._nodes = [None] * len(store.ids)
+
+    def __getitem__(self, node_id):
+        index = self._store.index[node_id]
+        node = self._nodes[index]
+        if node is None:
+            node = self._nodes[index] = Stored_Node(self._store, index)
+        return node
+
+    def __contains__(self, node_id):
+        return node_id in self._store.index
+
+    def __iter__(self):
+        return iter(self._store.ids)
+
+    def __len__(self):
+        return len(self._store.ids)
+
+
+class Stored_Node:
+    """
+    Proxy for a node of a |Graph_Store|, with the attributes of a |Node|
+    Other attributes are measures, stored in node arrays of the store.
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store, index):
+        object.__setattr__(self, "_store", store)
+        object.__setattr__(self, "_index", index)
+
+    def __getattr__(self, attribute):
+        if attribute == NEIGHBORS:
+            return self._store.neighbors(self._index)
+        if attribute == LOCATION:
+            x, y = self._store.column("X"), self._store.column("Y")
+            if x is None or isnan(x[self._index]):
+                raise AttributeError(attribute)
+            return (x[self._index], y[self._index])
+        column = self._store.columns.get(attribute)
+        if column is None or isnan(column[self._index]):
+            raise AttributeError(attribute)
+        return column[self._index]
+
+    def __setattr__(self, attribute, value):
+        if attribute == NEIGHBORS:
+            raise AttributeError("The neighbors of a stored node are fixed")
+        if attribute == LOCATION:
+            self._store.column("X", True)[self._index] = value[0]
+            self._store.column("Y", True)[self._index] = value[1]
+        else:
+            self._store.column(attribute, True)[self._index] = value
+
+    def __dir__(self):
+        return [attribute for attribute in self._store.columns if
+                hasattr(self, attribute)]
+
+
+def build_graph_store(directory, edges, accumulator_fields=(),
+                      memory_budget=None, node_ids=()):
+    """
+    Returns a |Graph_Store| for the undirected graph with the given edges.
+    |directory|: scratch directory for arrays that do not fit in memory
+    |edges|: function returning an iterable of (u, v, distance, accumulations)
+        rows, as read from an adjacency list; it is called twice. Rows record
+        both nodes, and an edge if the nodes differ and the distance is not
+        negative. Repeated edges are stored once, as in |Node|.
+    |accumulator_fields|: keys of the accumulations dictionaries to store
+    |memory_budget|: as in |Graph_Store|
+    |node_ids|: node id's to store first, in this order, whether or not they
+        appear in |edges|
+    Node weights default to 1.
+    """
+    store = Graph_Store(directory, memory_budget)
+    store.accumulator_fields = tuple(accumulator_fields)
+
+    def is_edge(u, v, distance):
+        return u != v and distance >= 0
+
+    for node_id in node_ids:
+        if node_id not in store.index:
+            store.index[node_id] = len(store.ids)
+            store.ids.append(node_id)
+    # Count the edges of each node
+    degree = [0] * len(store.ids)
+    for u, v, distance, _ in edges():
+        for node_id in [u, v]:
+            if node_id not in store.index:
+                store.index[node_id] = len(store.ids)
+                store.ids.append(node_id)
+                degree.append(0)
+        if is_edge(u, v, distance):
+            degree[store.index[u]] += 1
+            degree[store.index[v]] += 1
+    N = len(store.ids)
+    edge_count = sum(degree)
+
+    store.offsets = store.allocate("offsets", N + 1, INDEX_TYPE)
+    for i in range(N):
+        store.offsets[i + 1] = store.offsets[i] + degree[i]
+    del degree
+    store.targets = store.allocate("targets", edge_count, INDEX_TYPE)
+    store.lengths = store.allocate("lengths", edge_count, VALUE_TYPE)
+    for field_index, field in enumerate(store.accumulator_fields):
+        store.accumulations[field] = store.allocate(
+            f"accumulations_{field_index}", edge_count, VALUE_TYPE)
+
+    # Fill the edges of each node
+    position = store.allocate("position", N, INDEX_TYPE)
+    position[:] = store.offsets[:N]
+    for u, v, distance, accumulations in edges():
+        if not is_edge(u, v, distance):
+            continue
+        for x, y in [(u, v), (v, u)]:
+            k = position[store.index[x]]
+            store.targets[k] = store.index[y]
+            store.lengths[k] = distance
+            for field in store.accumulator_fields:
+                store.accumulations[field][k] = accumulations[field]
+            position[store.index[x]] = k + 1
+    position.release()
+
+    # Drop repeated edges, moving the remaining edges down
+    start = end = 0
+    for i in range(N):
+        next_start = store.offsets[i + 1]
+        unique = set()
+        for k in range(start, next_start):
+            edge = ((store.targets[k], store.lengths[k]) +
+                    tuple(store.accumulations[field][k] for field in
+                          store.accumulator_fields))
+            if edge in unique:
+                continue
+            unique.add(edge)
+            store.targets[end] = store.targets[k]
+            store.lengths[end] = store.lengths[k]
+            for field in store.accumulator_fields:
+                store.accumulations[field][end] = store.accumulations[field][k]
+            end += 1
+        store.offsets[i + 1] = end
+        start = next_start
+
+    store.columns[WEIGHT] = store.allocate("weights", N, VALUE_TYPE, 1.0)
+    return store
@@ -0,0 +1,168 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for updating centrality results after local edits to the graph.
+With a network radius, the shortest path tree of an origin only depends on the
+    part of the graph within the radius of that origin. After an edit, only the
+    origins within the radius of an edited node or edge (before or after the
+    edit) need to be recomputed. Their betweenness contributions are computed on
+    the graph before and after the edit and swapped in the saved results.
+"""
+
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Centrality_Computation import normalize_centrality
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import NEIGHBORS
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Graph_Artifacts import load_graph
+from src.Centrality.Graph_Artifacts import save_graph
+from src.Centrality.Graph_Pruning import nodes_within_radius
+from src.Centrality.Node import Node
+from src.Centrality.Partitioned_Computation import result_attributes
+from src.Centrality.Partitioned_Computation import subgraph
+
+
+def _neighbor_lists(nodes):
+    """
+    Returns a dictionary mapping node id's to lists of (neighbor id, distance)
+    """
+    return dict((node_id, [(w, d_vw) for w, d_vw, _ in
+                           getattr(node, NEIGHBORS)]) for node_id, node in
+                nodes.items())
+
+
+def _edited_neighbor_lists(neighbors, edge_edits):
+    """
+    Returns a copy of |neighbors| with the edits of |apply_edits| applied
+    """
+    neighbors = dict((node_id, list(edges)) for node_id, edges in
+                     neighbors.items())
+    for u, v, distance, _ in edge_edits:
+        for x, y in [(u, v), (v, u)]:
+            neighbors[x] = [(w, d_xw) for w, d_xw in neighbors.get(x, []) if
+                            w != y]
+            if distance is not None:
+                neighbors[x].append((y, distance))
+    return neighbors
+
+
+def apply_edits(nodes, edge_edits, weight_edits):
+    """
+    Edits the graph in place.
+    |edge_edits|: list of (u, v, distance, accumulations) tuples, replacing the
+        edges between |u| and |v| by an edge of length |distance|, or removing
+        them if |distance| is None. Missing nodes are added. |accumulations| is
+        a dictionary of accumulator values, or None.
+    |weight_edits|: dictionary mapping node id's to their new weights
+    """
+    for u, v, distance, accumulations in edge_edits:
+        for x, y in [(u, v), (v, u)]:
+            if not x in nodes:
+                nodes[x] = Node()
+            neighbors_x = getattr(nodes[x], NEIGHBORS)
+            neighbors_x.difference_update([edge for edge in neighbors_x if
+                                           edge[0] == y])
+            if distance is not None:
+                nodes[x].add_neighbor(y, distance, accumulations)
+    for node_id, weight in weight_edits.items():
+        setattr(nodes[node_id], WEIGHT, weight)
+
+
+def _edited_nodes(edge_edits, weight_edits):
+    """
+    Returns the set of nodes touched by the edits
+    """
+    edited = set(weight_edits)
+    for u, v, _, _ in edge_edits:
+        edited.update([u, v])
+    return edited
+
+
+def update_centrality(nodes, origins, edge_edits, weight_edits, compute_r,
+                      compute_g, compute_b, compute_c, compute_s, radius,
+                      network_radius, beta, measures_to_normalize,
+                      accumulator_fields, node_count=None):
+    """
+    Applies edits to a graph that holds the results of |compute_centrality|,
+        recomputing only the origins that the edits may affect.
+    |nodes|, |origins|, and the measure parameters are as in
+        |compute_centrality|, and must be those the saved results were computed
+        with
+    |edge_edits|, |weight_edits|: as in |apply_edits|
+    Returns the number of origins that were recomputed. With a Euclidean radius
+        a search is not bounded by network distance, so every origin is.
+    """
+    origins = set(origins)
+    if network_radius:
+        edited = _edited_nodes(edge_edits, weight_edits)
+        old_neighbors = _neighbor_lists(nodes)
+        new_neighbors = _edited_neighbor_lists(old_neighbors, edge_edits)
+        affected = origins & (nodes_within_radius(old_neighbors, edited, radius)
+                              | nodes_within_radius(new_neighbors, edited,
+                                                    radius))
+        old_region = nodes_within_radius(old_neighbors, affected, radius)
+        new_region = nodes_within_radius(new_neighbors, affected, radius)
+        del old_neighbors, new_neighbors
+    else:
+        affected = set(origins)
+        old_region = set(nodes)
+        new_region = None
+    # The graph around the affected origins, before and after the edits
+    old_subgraph = subgraph(nodes, old_region)
+    apply_edits(nodes, edge_edits, weight_edits)
+    new_subgraph = subgraph(nodes, set(nodes) if new_region is None else
+                             new_region)
+
+    arguments = (compute_r, compute_g, compute_b, compute_c, compute_s, radius,
+                 network_radius, beta, [], accumulator_fields)
+    compute_centrality(old_subgraph, [s for s in affected if s in
+                                      old_subgraph], *arguments)
+    compute_centrality(new_subgraph, [s for s in affected if s in
+                                      new_subgraph], *arguments)
+
+    # Patch the results
+    if compute_b:
+        for node_id, node in nodes.items():
+            if not hasattr(node, BETWEENNESS):
+                setattr(node, BETWEENNESS, 0.0)
+        for node_id, node in old_subgraph.items():
+            setattr(nodes[node_id], BETWEENNESS, getattr(
+                nodes[node_id], BETWEENNESS) - getattr(node, BETWEENNESS, 0.0))
+        for node_id, node in new_subgraph.items():
+            setattr(nodes[node_id], BETWEENNESS, getattr(
+                nodes[node_id], BETWEENNESS) + getattr(node, BETWEENNESS, 0.0))
+    for s in affected:
+        if not s in new_subgraph:
+            continue
+        for attribute, value in result_attributes(new_subgraph[s]).items():
+            if attribute != BETWEENNESS:
+                setattr(nodes[s], attribute, value)
+
+    sum_weights = sum(getattr(nodes[s], WEIGHT) for s in origins if s in nodes)
+    compute_s = compute_s and hasattr(next(iter(nodes.values())), LOCATION)
+    normalize_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                         compute_c, compute_s, beta, list(measures_to_normalize),
+                         sum_weights, node_count)
+    return len(affected)
+
+
+def update_saved_centrality(path, edge_edits, weight_edits, output_path=None):
+    """
+    Loads a graph saved with |save_graph|, applies the edits, updates its
+        results with |update_centrality|, and saves it to |output_path|
+        (defaults to |path|). Returns the updated graph and the number of
+        origins that were recomputed.
+    """
+    nodes, origins, parameters = load_graph(path)
+    recomputed_count = update_centrality(nodes, origins, edge_edits,
+                                         weight_edits, **parameters)
+    save_graph(output_path or path, nodes, origins, parameters)
+    return nodes, recomputed_count
@@ -0,0 +1,185 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for computing centrality from arrays, outside of ArcGIS.
+Nodes are numbered 0 to n - 1. The graph is given as arrays of edge endpoints
+    and lengths, and the measures are returned as one array per measure,
+    indexed by node. The graph is held as |Node| objects, or in a |Graph_Store|
+    when a scratch directory or a memory budget is given. The arrays may be NumPy
+    arrays or any other sequences; results are NumPy arrays if NumPy is
+    installed, and arrays of doubles from the |array| module otherwise.
+Nothing here imports arcpy.
+"""
+
+from array import array
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Computation_Utils import Invalid_Parameters_Exception
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import CLOSENESS
+from src.Centrality.Constants import GRAVITY
+from src.Centrality.Constants import INFINITE_RADIUS
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import METRICS
+from src.Centrality.Constants import NORM_METRICS
+from src.Centrality.Constants import REACH
+from src.Centrality.Constants import STRAIGHTNESS
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Cost_Estimate import estimate_cost
+from src.Centrality.Graph_Store import build_graph_store
+from src.Centrality.Graph_Store import MISSING
+from src.Centrality.Graph_Store import VALUE_TYPE
+from src.Centrality.Node import Node
+
+try:
+    from numpy import array as numpy_array
+except ImportError:
+    numpy_array = None
+
+
+def _result_array(column):
+    """
+    Returns a copy of |column|, the values of an attribute indexed by node
+    """
+    if numpy_array is not None:
+        return numpy_array(column, dtype=float)
+    return array(VALUE_TYPE, column)
+
+
+def compute_centrality_arrays(sources, targets, lengths, node_weights=None,
+                              coordinates=None, accumulations=None,
+                              origins=None, measures=METRICS,
+                              measures_to_normalize=(), radius=INFINITE_RADIUS,
+                              network_radius=True, beta=1.0, node_count=None,
+                              scratch_dir=None, memory_budget=None,
+                              dry_run=False):
+    """
+    Computes centrality on the undirected graph with edges (|sources|[k],
+        |targets|[k]) of length |lengths|[k], and returns a dictionary mapping
+        measure names to arrays indexed by node. Measures that were not
+        computed for a node, such as those of nodes that are not origins, are
+        NaN.
+    |node_weights|: weight of each node, defaults to 1
+    |coordinates|: (x, y) location of each node, needed for straightness and a
+        Euclidean radius
+    |accumulations|: dictionary mapping cost attribute names to arrays holding
+        the value of the attribute on each edge; the totals over the shortest
+        paths from each origin are returned under the same names
+    |origins|: the nodes used as sources of shortest path trees, defaults to
+        all nodes
+    |measures|: the measures of |METRICS| to compute
+    |measures_to_normalize|: the measures to also return normalized
+    |node_count|: the number of nodes, defaults to the length of
+        |node_weights| or |coordinates|, or else to one more than the largest
+        node in the edges
+    |scratch_dir|, |memory_budget|: as in |Graph_Store|, for graphs that do
+        not fit in memory; if neither is given, the graph is held as |Node|
+        objects, which is faster
+    |dry_run|: if True, returns the estimate of |estimate_cost| for the
+        computation instead of its results
+    |radius|, |network_radius| and |beta| are as in |compute_centrality|.
+    """
+    unknown = set(measures) - set(METRICS)
+    if unknown:
+        raise Invalid_Parameters_Exception(
+            f"Unknown measures: {sorted(unknown)}")
+    if node_count is None:
+        if node_weights is not None:
+            node_count = len(node_weights)
+        elif coordinates is not None:
+            node_count = len(coordinates)
+        else:
+            node_count = max(max(sources, default=-1),
+                             max(targets, default=-1)) + 1
+    node_count = int(node_count)
+    accumulator_fields = list(accumulations or {})
+
+    def edges():
+        columns = [accumulations[field] for field in accumulator_fields]
+        for u, v, distance, *values in zip(sources, targets, lengths,
+                                           *columns):
+            yield (int(u), int(v), float(distance),
+                   dict(zip(accumulator_fields, map(float, values))))
+
+    if node_weights is not None and len(node_weights) != node_count:
+        raise Invalid_Parameters_Exception("There must be one weight per node")
+    if coordinates is not None and len(coordinates) != node_count:
+        raise Invalid_Parameters_Exception(
+            "There must be one location per node")
+    origins = (range(node_count) if origins is None else
+               [int(s) for s in origins])
+    attributes = METRICS + NORM_METRICS + tuple(accumulator_fields)
+
+    def compute(nodes):
+        if dry_run:
+            return estimate_cost(nodes, origins, REACH in measures,
+                                 GRAVITY in measures, BETWEENNESS in measures,
+                                 CLOSENESS in measures, STRAIGHTNESS in measures,
+                                 radius, network_radius, beta,
+                                 accumulator_fields)
+        compute_centrality(nodes, origins, REACH in measures,
+                           GRAVITY in measures, BETWEENNESS in measures,
+                           CLOSENESS in measures, STRAIGHTNESS in measures,
+                           radius, network_radius, beta,
+                           list(measures_to_normalize), accumulator_fields)
+
+    if scratch_dir is None and memory_budget is None:
+        nodes = {}
+        for i in range(node_count):
+            nodes[i] = Node()
+        for u, v, distance, edge_accumulations in edges():
+            if not (0 <= u < node_count and 0 <= v < node_count):
+                raise Invalid_Parameters_Exception(
+                    f"Edges refer to nodes outside 0 to {node_count - 1}")
+            if u != v and distance >= 0:
+                nodes[u].add_neighbor(v, distance, edge_accumulations)
+                nodes[v].add_neighbor(u, distance, edge_accumulations)
+        if node_weights is not None:
+            for i, weight in enumerate(node_weights):
+                setattr(nodes[i], WEIGHT, float(weight))
+        if coordinates is not None:
+            for i, (x_i, y_i) in enumerate(coordinates):
+                setattr(nodes[i], LOCATION, (float(x_i), float(y_i)))
+
+        if dry_run:
+            return compute(nodes)
+        compute(nodes)
+        results = {}
+        for attribute in attributes:
+            if any(hasattr(nodes[i], attribute) for i in nodes):
+                results[attribute] = _result_array(
+                    [getattr(nodes[i], attribute, MISSING) for i in
+                     range(node_count)])
+        return results
+
+    store = build_graph_store(scratch_dir, edges, accumulator_fields,
+                              memory_budget, range(node_count))
+    try:
+        if len(store.ids) != node_count:
+            raise Invalid_Parameters_Exception(
+                f"Edges refer to nodes outside 0 to {node_count - 1}")
+        if node_weights is not None:
+            store.columns[WEIGHT][:] = array(VALUE_TYPE,
+                                             map(float, node_weights))
+        if coordinates is not None:
+            x, y = store.column("X", True), store.column("Y", True)
+            for i, (x_i, y_i) in enumerate(coordinates):
+                x[i], y[i] = float(x_i), float(y_i)
+
+        if dry_run:
+            return compute(store.nodes())
+        compute(store.nodes())
+        results = {}
+        for attribute in attributes:
+            if store.column(attribute) is not None:
+                results[attribute] = _result_array(store.column(attribute))
+        return results
+    finally:
+        store.close()
+
@@ -9,48 +9,70 @@
 
 """
 Script for taking in the inputs to the toolbox and returning its outputs.
+Without arcpy, the inputs are shapefiles read by the shapefile backend: Steps 2
+    to 5 run on an adjacency list computed beforehand, and the output is the
+    feature class, without a layer or symbology.
 """
 
-from arcgisscripting import ExecuteAbort
-from arcpy import AddField_management
-from arcpy import AddMessage
-from arcpy import AddWarning
-from arcpy import ApplySymbologyFromLayer_management
-from arcpy import CheckOutExtension
-from arcpy import CopyFeatures_management
-from arcpy import CreateFeatureclass_management
-from arcpy import Describe
-from arcpy import env
-from arcpy import Exists
-from arcpy import GetCount_management
-from arcpy import GetMessages
-from arcpy import MakeFeatureLayer_management
-# from arcpy import mapping
-from arcpy import mp
-from arcpy import SaveToLayerFile_management
-from arcpy import SelectLayerByAttribute_management
-from arcpy import SetParameterAsText
-from arcpy import UpdateCursor
-from src.Centrality.Adjacency_List_Computation import compute_adjacency_list
 from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Co_Location import collapse_co_located_nodes
+from src.Centrality.Co_Location import expand_co_located_results
+from src.Centrality.Components import compute_centrality_by_component
+from src.Centrality.Cost_Estimate import describe_cost_estimate
+from src.Centrality.Cost_Estimate import estimate_cost
+from src.Centrality.Cost_Estimate import search_bytes
+from src.Common.Geodata.Backend import default_backend
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Messages import add_warning
+from src.Common.Utils.Messages import geoprocessing_errors
+from src.Common.Utils.Messages import headless
+from src.Common.Utils.Memory_Profile import Memory_Profile
 from src.Common.Utils.Progress_Bar import Progress_Bar
+from src.Common.Utils.Search_Counters import Search_Counters
+from src.Common.Utils.Streaming import prefetch_rows
+from src.Common.Utils.Tracing import NO_SPAN
+from src.Common.Utils.Tracing import span
+from src.Common.Utils.Tracing import start_tracing
+from src.Common.Utils.Tracing import stop_tracing
+from src.Common.Utils.Tracing import tracing
+from src.Common.Utils.Tracing import write_trace
 from src.Centrality.Constants import ACCUMULATOR_ATTRIBUTES
+from src.Centrality.Constants import ADDITIONAL_IMPEDANCES
 from src.Centrality.Constants import ADJACENCY_LIST_COMPUTED
 from src.Centrality.Constants import ADJACENCY_LIST_NAME
+from src.Centrality.Constants import ADJACENCY_STAGE
 from src.Centrality.Constants import AUXILIARY_DIR_NAME
+from src.Centrality.Constants import baseline_file_name
 from src.Centrality.Constants import BETA
+from src.Centrality.Constants import CACHE_PIPELINE_STAGES
+from src.Centrality.Constants import CENTRALITY_GRAPH_MODEL
+from src.Centrality.Constants import CENTRALITY_PROCESSES
+from src.Centrality.Constants import CO_LOCATED_NODES_COLLAPSED
+from src.Centrality.Constants import CO_LOCATION_TOLERANCE
+from src.Centrality.Constants import CURVE_ORDER
+from src.Centrality.Constants import COLLAPSE_CO_LOCATED_NODES
+from src.Centrality.Constants import COMPONENTS_SCHEDULED
 from src.Centrality.Constants import COMPUTE_BETWEENNESS
 from src.Centrality.Constants import COMPUTE_CLOSENESS
 from src.Centrality.Constants import COMPUTE_GRAVITY
 from src.Centrality.Constants import COMPUTE_REACH
 from src.Centrality.Constants import COMPUTE_STRAIGHTNESS
+from src.Centrality.Constants import DECOMPOSE_COMPONENTS
 from src.Centrality.Constants import DESTINATION_ID_FIELD_NAME
+from src.Centrality.Constants import DRY_RUN
+from src.Centrality.Constants import DRY_RUN_FINISHED
+from src.Centrality.Constants import DRY_RUN_SAMPLE_SIZE
 from src.Centrality.Constants import FAILURE
 from src.Centrality.Constants import feature_class_name
 from src.Centrality.Constants import FINAL_ATTRIBUTES
+from src.Centrality.Constants import GRAPH_PRUNED
+from src.Centrality.Constants import GRAPH_STAGE
+from src.Centrality.Constants import GRAPH_STORE_DIR_NAME
+from src.Centrality.Constants import GRAPH_STORE_MEMORY_BUDGET
 from src.Centrality.Constants import get_symbology_layer_name
 from src.Centrality.Constants import ID_ATTRIBUTE
 from src.Centrality.Constants import IMPEDANCE_ATTRIBUTE
+from src.Centrality.Constants import impedance_measure
 from src.Centrality.Constants import index
 from src.Centrality.Constants import INFINITE_RADIUS
 from src.Centrality.Constants import INPUT_BUILDINGS
@@ -65,7 +87,13 @@ from src.Centrality.Constants import layer_name
 from src.Centrality.Constants import LOCATION
 from src.Centrality.Constants import MAX_FILE_NAME_LENGTH
 from src.Centrality.Constants import METRICS
+from src.Centrality.Constants import memory_profile_file_name
+from src.Centrality.Constants import METRICS_STAGE
+from src.Centrality.Constants import NETWORK_LOCATIONS_STAGE
+from src.Centrality.Constants import NODE_ATTRIBUTES_STAGE
+from src.Centrality.Constants import NODE_ORDERING_CURVE
 from src.Centrality.Constants import NODE_WEIGHT_ATTRIBUTE
+from src.Centrality.Constants import NORMALIZE_BY_COMPONENT
 from src.Centrality.Constants import NORMALIZE_RESULTS
 from src.Centrality.Constants import OD_COST_MATRIX_LAYER_NAME
 from src.Centrality.Constants import OD_COST_MATRIX_LINES
@@ -74,16 +102,31 @@ from src.Centrality.Constants import ORIGIN_ID_FIELD_NAME
 from src.Centrality.Constants import ORIGINAL_FID
 from src.Centrality.Constants import OUTPUT_FEATURE_CLASS
 from src.Centrality.Constants import OUTPUT_FILE_NAME
+from src.Centrality.Constants import OUT_OF_CORE_GRAPH
 from src.Centrality.Constants import OUTPUT_LOCATION
 from src.Centrality.Constants import PARTIAL_ADJACENCY_LIST_NAME
+from src.Centrality.Constants import PIPELINE_CACHE_DIR_NAME
+from src.Centrality.Constants import PROFILE_MEMORY
+from src.Centrality.Constants import PROGRESS_GRAPH_PRUNING
+from src.Centrality.Constants import PRUNE_GRAPH_TO_ORIGINS
 from src.Centrality.Constants import POINT_CONVERSION_FINISHED
 from src.Centrality.Constants import POINT_CONVERSION_STARTED
 from src.Centrality.Constants import POINT_FEATURE_CLASS_NAME
 from src.Centrality.Constants import POINT_LOCATION
+from src.Centrality.Constants import POINTS_STAGE
 from src.Centrality.Constants import POLYGONS_LAYER_NAME
 from src.Centrality.Constants import POLYGONS_SHAPEFILE_NAME
 from src.Centrality.Constants import RASTER_NAME
+from src.Centrality.Constants import REROOT_SHORTEST_PATH_TREES
+from src.Centrality.Constants import SAVE_CENTRALITY_BASELINE
+from src.Centrality.Constants import SEARCH_COUNTERS
+from src.Centrality.Constants import search_counters_file_name
+from src.Centrality.Constants import SEARCH_COUNTERS_WRITTEN
 from src.Centrality.Constants import SEARCH_RADIUS
+from src.Centrality.Constants import SLOWEST_SEARCH_COUNT
+from src.Centrality.Constants import SOFT_MEMORY_LIMIT
+from src.Centrality.Constants import STAGE_REUSED
+from src.Centrality.Constants import STEP_1
 from src.Centrality.Constants import STEP_1_FAILED
 from src.Centrality.Constants import STEP_1_FINISHED
 from src.Centrality.Constants import STEP_1_STARTED
@@ -95,6 +138,7 @@ from src.Centrality.Constants import STEP_3
 from src.Centrality.Constants import STEP_3_FAILED
 from src.Centrality.Constants import STEP_3_FINISHED
 from src.Centrality.Constants import STEP_3_STARTED
+from src.Centrality.Constants import STEP_4
 from src.Centrality.Constants import STEP_4_FAILED
 from src.Centrality.Constants import STEP_4_FINISHED
 from src.Centrality.Constants import STEP_4_STARTED
@@ -102,38 +146,76 @@ from src.Centrality.Constants import STEP_5
 from src.Centrality.Constants import STEP_5_FAILED
 from src.Centrality.Constants import STEP_5_FINISHED
 from src.Centrality.Constants import STEP_5_STARTED
+from src.Centrality.Constants import STEP_6
 from src.Centrality.Constants import STEP_6_FAILED
 from src.Centrality.Constants import STEP_6_FINISHED
 from src.Centrality.Constants import STEP_6_STARTED
+from src.Centrality.Constants import STREET_GRAPH_MODEL
 from src.Centrality.Constants import SUCCESS
 from src.Centrality.Constants import SYMBOLOGY_DIR
+from src.Centrality.Constants import TILE_ROWS_DIR_NAME
+from src.Centrality.Constants import TILE_SIZE
+from src.Centrality.Constants import trace_file_name
+from src.Centrality.Constants import TRACE_MEMORY_ALLOCATIONS
+from src.Centrality.Constants import TRACE_STEPS
 from src.Centrality.Constants import USE_NETWORK_RADIUS
 from src.Centrality.Constants import WARNING_APPLY_SYMBOLOGY_FAILED
+from src.Centrality.Constants import WARNING_CO_LOCATED_BETWEENNESS
+from src.Centrality.Constants import WARNING_DRY_RUN_UNSUPPORTED
 from src.Centrality.Constants import WARNING_FAIL_TO_DISPLAY
 from src.Centrality.Constants import WARNING_LARGE_ADJ_FILE_NAME
 from src.Centrality.Constants import WARNING_NO_NODES
 from src.Centrality.Constants import WARNING_OUTPUT_ALREADY_EXISTS
 from src.Centrality.Constants import WARNING_POINTS_NOT_IN_GRAPH
+from src.Centrality.Constants import WARNING_PRUNING_NEEDS_LENGTH
+from src.Centrality.Constants import WARNING_STAGES_NOT_CACHED
+from src.Centrality.Constants import WARNING_TILES_NEED_LENGTH
 from src.Centrality.Constants import WEIGHT
+from src.Centrality.Graph_Artifacts import save_graph
+from src.Centrality.Graph_Pruning import load_neighbors
+from src.Centrality.Graph_Pruning import nodes_near_origins
+from src.Centrality.Graph_Pruning import nodes_within_radius
+from src.Centrality.Graph_Store import build_graph_store
+from src.Centrality.Multi_Impedance import compute_multi_impedance_centrality
 from src.Centrality.Node import Node
+from src.Centrality.Rerooted_Computation import compute_centrality_rerooted
+from src.Centrality.Space_Filling_Curve import curve_order
+from src.Centrality.Street_Graph import compute_street_graph_centrality
+from src.Centrality.Tiling import compute_centrality_by_tile
+from src.Centrality.Tiling import Tile_Rows
+from src.Common.Utils.Pipeline import Pipeline
+from src.Redundancy.Network import construct_network_and_load_buildings
+from os.path import isdir
 from os.path import join
+from shutil import rmtree
 from sys import argv
-from src.Centrality.Utils import all_values_in_column
 from src.Centrality.Utils import basename
-from src.Centrality.Utils import calculate_network_locations
+from src.Centrality.Utils import check_step_4_options
 from src.Centrality.Utils import delete
 from src.Centrality.Utils import Invalid_Input_Exception
 from src.Centrality.Utils import is_accumulator_field
+from src.Centrality.Utils import radius_in_location_units
+from src.Centrality.Utils import street_model_length_scale
 from src.Centrality.Utils import to_point_feature_class
 from src.Centrality.Utils import trim
 
+try:
+    from arcgisscripting import ExecuteAbort
+except ImportError:
+    # Without ArcGIS, a run is cancelled from the keyboard
+    ExecuteAbort = KeyboardInterrupt
+
 
 def main():
     """
     Runs the centrality tool.
     """
-    env.overwriteOutput = True  # Enable overwritting
-    CheckOutExtension("Network")
+    backend = default_backend()
+    if backend.geoprocessing:
+        from arcpy import CheckOutExtension
+        from arcpy import env
+        env.overwriteOutput = True  # Enable overwritting
+        CheckOutExtension("Network")
 
     # Success of the program through the six steps
     success = True
@@ -169,26 +251,64 @@ def main():
 
     # Record the origin nodes for centrality measurements
     # This is important if the user selects a subset of the features to be origins
-    selected_features = all_values_in_column(inputs[INPUT_BUILDINGS],
-                                             inputs[ID_ATTRIBUTE])
+    selected_features = set(backend.read_columns(
+        inputs[INPUT_BUILDINGS], [inputs[ID_ATTRIBUTE]])[inputs[ID_ATTRIBUTE]])
     # Clear selection if we got a layer file
     try:
+        from arcpy import SelectLayerByAttribute_management
         SelectLayerByAttribute_management(inputs[INPUT_BUILDINGS],
                                           "CLEAR_SELECTION")
     except:
         pass
 
+    # Search the street network instead of a building adjacency list?
+    street_model = CENTRALITY_GRAPH_MODEL == STREET_GRAPH_MODEL
+    if street_model:
+        # The street graph measures lengths, converted to the impedance units
+        length_scale = street_model_length_scale(
+            inputs[INPUT_NETWORK], inputs[IMPEDANCE_ATTRIBUTE],
+            [accumulator_attribute for accumulator_attribute in
+             inputs[ACCUMULATOR_ATTRIBUTES].split(";") if
+             accumulator_attribute != "#"])
+    # Load and compute the graph one tile at a time?
+    tiled = (not street_model and TILE_SIZE is not None and
+             inputs[USE_NETWORK_RADIUS] and inputs[SEARCH_RADIUS] < INFINITE_RADIUS)
+    if tiled:
+        # The halo of the tiles is the radius in the units of the locations,
+        #     which only bounds the trees if the impedance is a length
+        tile_halo = radius_in_location_units(inputs[INPUT_NETWORK],
+                                             inputs[IMPEDANCE_ATTRIBUTE],
+                                             inputs[SEARCH_RADIUS])
+        if tile_halo is None:
+            add_warning(WARNING_TILES_NEED_LENGTH(inputs[IMPEDANCE_ATTRIBUTE]))
+            tiled = False
+    # Step 4 computes the measures in one way only
+    check_step_4_options(ADDITIONAL_IMPEDANCES, COLLAPSE_CO_LOCATED_NODES,
+                         DECOMPOSE_COMPONENTS, street_model, tiled,
+                         OUT_OF_CORE_GRAPH)
+
+    # Additional impedances are recorded in the adjacency list as accumulated
+    #     attributes
+    accumulate_attributes = ";".join(
+        [accumulator_attribute for accumulator_attribute in
+         inputs[ACCUMULATOR_ATTRIBUTES].split(";") if accumulator_attribute != "#"] +
+        [impedance_attribute for impedance_attribute in ADDITIONAL_IMPEDANCES if
+         impedance_attribute not in inputs[ACCUMULATOR_ATTRIBUTES].split(";")]) or "#"
+
     # Adjacency List table name
     node_locations_needed = (inputs[COMPUTE_STRAIGHTNESS] or
                              not inputs[USE_NETWORK_RADIUS])
+    # Snap locations are also used to merge nodes and to order the origins
+    snap_locations_needed = (node_locations_needed or COLLAPSE_CO_LOCATED_NODES
+                             or NODE_ORDERING_CURVE is not None or tiled)
     adj_dbf_name = (f"{ADJACENCY_LIST_NAME}_"
                     f"{basename(inputs[INPUT_BUILDINGS])}_"
                     f"{basename(inputs[INPUT_NETWORK])}_"
                     f"{inputs[ID_ATTRIBUTE]}_"
                     f"{inputs[IMPEDANCE_ATTRIBUTE],}_"
-                    f"{inputs[ACCUMULATOR_ATTRIBUTES]}.dbf").replace("#", "None")
+                    f"{accumulate_attributes}.dbf").replace("#", "None")
     if len(adj_dbf_name) > MAX_FILE_NAME_LENGTH:
-        AddWarning(WARNING_LARGE_ADJ_FILE_NAME)
+        add_warning(WARNING_LARGE_ADJ_FILE_NAME)
     adj_dbf = join(inputs[OUTPUT_LOCATION], adj_dbf_name)
 
     # Output file names
@@ -196,30 +316,27 @@ def main():
     output_feature_class = f"{join(inputs[OUTPUT_LOCATION], output_feature_class_name)}.shp"
     # Create a feature class that is a copy of the input buildings
     try:
-        AddMessage(INPUT_BUILDINGS_COPY_STARTED)
-        CreateFeatureclass_management(out_path=inputs[OUTPUT_LOCATION],
-                                      out_name=output_feature_class_name)
-        CopyFeatures_management(in_features=inputs[INPUT_BUILDINGS],
-                                out_feature_class=output_feature_class)
-        AddMessage(INPUT_BUILDINGS_COPY_FINISHED)
+        add_message(INPUT_BUILDINGS_COPY_STARTED)
+        backend.copy_features(inputs[INPUT_BUILDINGS], output_feature_class)
+        add_message(INPUT_BUILDINGS_COPY_FINISHED)
     except:
-        AddWarning(GetMessages(2))
-        AddMessage(INPUT_BUILDINGS_COPY_FAILED)
+        add_warning(geoprocessing_errors())
+        add_message(INPUT_BUILDINGS_COPY_FAILED)
         success = False
     output_layer_name = layer_name(inputs[OUTPUT_FILE_NAME])
     output_layer = f"{join(inputs[OUTPUT_LOCATION], output_layer_name)}.lyr"
 
     # If output has already been created, don't carry on
-    if Exists(output_layer):
-        AddWarning(WARNING_OUTPUT_ALREADY_EXISTS)
+    if backend.exists(output_layer):
+        add_warning(WARNING_OUTPUT_ALREADY_EXISTS)
         success = False
 
     # We will convert polygon input buildings to point feature class
-    buildings_description = Describe(output_feature_class)
-    if buildings_description.shapeType == "Point":
+    buildings_shape_type = backend.shape_type(output_feature_class)
+    if buildings_shape_type == "Point":
         # Input buildings are already a point shape file
         inputs[INPUT_POINTS] = output_feature_class
-    elif buildings_description.shapeType == "Polygon":
+    elif buildings_shape_type == "Polygon":
         # Input buildings need to be converted to point feature class
         point_feature_class_name = POINT_FEATURE_CLASS_NAME(
             basename(output_feature_class), inputs[POINT_LOCATION])
@@ -238,13 +355,87 @@ def main():
             first_metric = METRICS[metric_index]
             break
     symbology_layer_name = get_symbology_layer_name(
-        buildings_description.shapeType, first_metric)
+        buildings_shape_type, first_metric)
     symbology_layer = join(SYMBOLOGY_DIR, symbology_layer_name)
 
+    # Graph, built in step 2
+    nodes = {}
+    # Array storage of the graph when it is kept out of core
+    graph_store = None
+    # Nodes left out of the graph, snap locations of the points when the graph
+    #     is loaded by tile, and counts of the searches, set in steps 2 and 4
+    pruned_ids = set()
+    point_locations = {}
+    search_counters = None
+    accumulator_fields = set()
+
+    # Stages of the building graph cached between runs. The points, their
+    #     network locations and the adjacency list are files written by Step
+    #     1, whose stages record their fingerprints.
+    cache_stages = CACHE_PIPELINE_STAGES and not (street_model or tiled or
+                                                  OUT_OF_CORE_GRAPH)
+    pipeline = Pipeline(join(inputs[OUTPUT_LOCATION], PIPELINE_CACHE_DIR_NAME),
+                        backend.data_source)
+    pipeline.add_stage(POINTS_STAGE, [inputs[POINT_LOCATION]],
+                       inputs=[inputs[INPUT_BUILDINGS]])
+    pipeline.add_stage(NETWORK_LOCATIONS_STAGE, [], [POINTS_STAGE],
+                       inputs=[inputs[INPUT_NETWORK]])
+    pipeline.add_stage(ADJACENCY_STAGE, [inputs[ID_ATTRIBUTE],
+                                         inputs[IMPEDANCE_ATTRIBUTE],
+                                         accumulate_attributes, inputs[SEARCH_RADIUS]],
+                       [NETWORK_LOCATIONS_STAGE])
+    pipeline.add_stage(GRAPH_STAGE, [inputs[USE_NETWORK_RADIUS], PRUNE_GRAPH_TO_ORIGINS,
+                                     sorted(map(repr, selected_features))],
+                       [ADJACENCY_STAGE])
+    pipeline.add_stage(NODE_ATTRIBUTES_STAGE, [inputs[NODE_WEIGHT_ATTRIBUTE],
+                                               node_locations_needed,
+                                               COLLAPSE_CO_LOCATED_NODES],
+                       [GRAPH_STAGE])
+    pipeline.add_stage(METRICS_STAGE, [inputs[COMPUTE_REACH], inputs[COMPUTE_GRAVITY],
+                                       inputs[COMPUTE_BETWEENNESS],
+                                       inputs[COMPUTE_CLOSENESS],
+                                       inputs[COMPUTE_STRAIGHTNESS], inputs[BETA],
+                                       inputs[NORMALIZE_RESULTS], NORMALIZE_BY_COMPONENT,
+                                       COLLAPSE_CO_LOCATED_NODES, CO_LOCATION_TOLERANCE,
+                                       ADDITIONAL_IMPEDANCES],
+                       [NODE_ATTRIBUTES_STAGE])
+    if cache_stages:
+        # Edits to data that cannot be fingerprinted would go unnoticed
+        unfingerprinted_inputs = pipeline.unfingerprinted_inputs()
+        if unfingerprinted_inputs:
+            add_warning(WARNING_STAGES_NOT_CACHED(unfingerprinted_inputs))
+            cache_stages = False
+    # The last stage to resume from, if any
+    resume_stage = (pipeline.last_completed([GRAPH_STAGE, NODE_ATTRIBUTES_STAGE,
+                                             METRICS_STAGE]) if cache_stages
+                    else None)
+
+    def locate_points():
+        """
+        Computes the network locations of the points, unless those computed by
+            a previous run for the same inputs are cached
+        """
+        if cache_stages and pipeline.artifact_current(NETWORK_LOCATIONS_STAGE,
+                                                      inputs[INPUT_POINTS]):
+            add_message(STAGE_REUSED(NETWORK_LOCATIONS_STAGE))
+            return
+        backend.calculate_network_locations(inputs[INPUT_POINTS],
+                                            inputs[INPUT_NETWORK])
+        if cache_stages:
+            pipeline.save_artifact(NETWORK_LOCATIONS_STAGE, inputs[INPUT_POINTS])
+
     def clean_up():
         """
         Removes all auxiliary files
         """
+        if memory_profile is not None:
+            memory_profile.close()
+        if graph_store is not None:
+            graph_store.close()
+        for scratch_dir_name in [GRAPH_STORE_DIR_NAME, TILE_ROWS_DIR_NAME]:
+            scratch_dir = join(inputs[OUTPUT_LOCATION], scratch_dir_name)
+            if isdir(scratch_dir):
+                rmtree(scratch_dir)
         auxiliary_dir = join(inputs[OUTPUT_LOCATION], AUXILIARY_DIR_NAME)
         od_cost_matrix_layer = join(auxiliary_dir, OD_COST_MATRIX_LAYER_NAME)
         od_cost_matrix_lines = join(auxiliary_dir, OD_COST_MATRIX_LINES)
@@ -260,67 +451,347 @@ def main():
                             od_cost_matrix_layer, auxiliary_dir]:
             delete(delete_path)
 
+    # Trace the steps, unless the caller traces the run
+    trace_run = TRACE_STEPS and not tracing()
+    if trace_run:
+        start_tracing()
+    # Span of the current step
+    step_span = NO_SPAN
+    memory_profile = (Memory_Profile(SOFT_MEMORY_LIMIT, TRACE_MEMORY_ALLOCATIONS)
+                      if PROFILE_MEMORY or SOFT_MEMORY_LIMIT is not None else None)
+
+    def end_step(step):
+        """
+        Ends the span of |step|, and samples the memory used after it
+        """
+        step_span.end(success=success)
+        if memory_profile is not None:
+            estimated_bytes = {}
+            if search_counters is not None and search_counters.searches:
+                # Data of the largest search, from the counts of the searches
+                estimated_bytes["search"] = search_bytes(
+                    search_counters.maxima["pushes"] + 1,
+                    search_counters.maxima["max_queue"],
+                    inputs[COMPUTE_BETWEENNESS], len(accumulator_fields),
+                    inputs[USE_NETWORK_RADIUS], len(nodes))
+            memory_profile.sample(step, estimated_bytes, graph=nodes,
+                                  origins=selected_features,
+                                  pruned_ids=pruned_ids,
+                                  point_locations=point_locations,
+                                  search_counters=search_counters)
+
     try:
         """
         Here we carry out the six steps of the tool
         """
         # Step 1
         if success:
-            AddMessage(STEP_1_STARTED)
+            add_message(STEP_1_STARTED)
+            step_span = span(STEP_1)
             # If necessary, convert input buildings to point feature class
-            if buildings_description.shapeType == "Polygon":
-                AddMessage(POINT_CONVERSION_STARTED)
-                to_point_feature_class(output_feature_class, inputs[INPUT_POINTS],
-                                       inputs[POINT_LOCATION])
-                AddMessage(POINT_CONVERSION_FINISHED)
-            if Exists(adj_dbf):
-                AddMessage(ADJACENCY_LIST_COMPUTED)
-                if node_locations_needed:
-                    calculate_network_locations(inputs[INPUT_POINTS],
-                                                inputs[INPUT_NETWORK])
-                AddMessage(STEP_1_FINISHED)
+            if buildings_shape_type == "Polygon":
+                if cache_stages and (
+                        pipeline.artifact_current(NETWORK_LOCATIONS_STAGE,
+                                                  inputs[INPUT_POINTS]) or
+                        pipeline.artifact_current(POINTS_STAGE,
+                                                  inputs[INPUT_POINTS])):
+                    add_message(STAGE_REUSED(POINTS_STAGE))
+                else:
+                    if cache_stages:
+                        # Points left by a run with other inputs are stale
+                        delete(inputs[INPUT_POINTS])
+                    add_message(POINT_CONVERSION_STARTED)
+                    to_point_feature_class(output_feature_class, inputs[INPUT_POINTS],
+                                           inputs[POINT_LOCATION])
+                    add_message(POINT_CONVERSION_FINISHED)
+                    if cache_stages:
+                        pipeline.save_artifact(POINTS_STAGE, inputs[INPUT_POINTS])
+            if street_model:
+                # Only the network locations of the points are needed
+                if not backend.network_locations_calculated(
+                        inputs[INPUT_POINTS]):
+                    backend.calculate_network_locations(inputs[INPUT_POINTS],
+                                                        inputs[INPUT_NETWORK])
+                add_message(STEP_1_FINISHED)
+            elif resume_stage in [NODE_ATTRIBUTES_STAGE, METRICS_STAGE]:
+                # Neither the adjacency list nor the network locations are
+                #     read again
+                add_message(STEP_1_FINISHED)
+            elif (pipeline.artifact_current(ADJACENCY_STAGE, adj_dbf) if
+                  cache_stages else backend.exists(adj_dbf)):
+                add_message(ADJACENCY_LIST_COMPUTED)
+                if snap_locations_needed:
+                    locate_points()
+                add_message(STEP_1_FINISHED)
             else:
                 try:
+                    from src.Centrality.Adjacency_List_Computation import \
+                        compute_adjacency_list
+                    if cache_stages:
+                        # Only the adjacency list of the current inputs is
+                        #     reused, and it is read with current locations
+                        delete(adj_dbf)
+                        locate_points()
                     compute_adjacency_list(inputs[INPUT_POINTS], inputs[INPUT_NETWORK],
                                            inputs[ID_ATTRIBUTE], inputs[IMPEDANCE_ATTRIBUTE],
-                                           inputs[ACCUMULATOR_ATTRIBUTES], inputs[SEARCH_RADIUS],
+                                           accumulate_attributes, inputs[SEARCH_RADIUS],
                                            inputs[OUTPUT_LOCATION], adj_dbf_name)
-                    AddMessage(STEP_1_FINISHED)
+                    if cache_stages:
+                        pipeline.save_artifact(ADJACENCY_STAGE, adj_dbf)
+                        # The barrier costs added to the points leave their
+                        #     locations current
+                        pipeline.save_artifact(NETWORK_LOCATIONS_STAGE,
+                                               inputs[INPUT_POINTS])
+                    add_message(STEP_1_FINISHED)
                 except:
-                    AddWarning(GetMessages(2))
-                    AddMessage(STEP_1_FAILED)
+                    add_warning(geoprocessing_errors())
+                    add_message(STEP_1_FAILED)
                     success = False
+        end_step(STEP_1)
 
         # Step 2
-        if success:
-            AddMessage(STEP_2_STARTED)
+        if success and street_model:
+            add_message(STEP_2_STARTED)
+            step_span = span(STEP_2)
+            try:
+                # Street network representation and buildings on its edges
+                network, points, _ = construct_network_and_load_buildings(
+                    inputs[INPUT_POINTS], inputs[INPUT_NETWORK],
+                    (trim(inputs[NODE_WEIGHT_ATTRIBUTE]) if
+                     inputs[NODE_WEIGHT_ATTRIBUTE] != "#" else None),
+                    inputs[ID_ATTRIBUTE])
+                accumulator_fields = set()
+                N = len(points)  # The number of buildings in the graph
+                graph_node_count = N
+                if N == 0:
+                    add_warning(WARNING_NO_NODES)
+                    success = False
+                add_message(STEP_2_FINISHED)
+            except:
+                add_warning(geoprocessing_errors())
+                add_message(STEP_2_FAILED)
+                success = False
+        elif success and tiled:
+            add_message(STEP_2_STARTED)
+            step_span = span(STEP_2)
+            try:
+                distance_field = trim(f"Total_{inputs[IMPEDANCE_ATTRIBUTE]}")
+                accumulator_fields = set([trim(f"Total_{accumulator_attribute}")
+                                          for accumulator_attribute in inputs[ACCUMULATOR_ATTRIBUTES].split(
+                    ";") if accumulator_attribute != "#"])
+                impedances = []
+                pruned_ids = set()
+                # Snap locations and weights of the points, tiles of the graph
+                #     are loaded from the rows of |adj_dbf| as they are
+                #     computed
+                get_weights = inputs[NODE_WEIGHT_ATTRIBUTE] != "#"
+                point_locations = {}
+                point_weights = {}
+                point_columns = [inputs[ID_ATTRIBUTE], trim("SnapX"),
+                                 trim("SnapY")]
+                if get_weights:
+                    point_columns.append(trim(inputs[NODE_WEIGHT_ATTRIBUTE]))
+                rows = prefetch_rows(backend, inputs[INPUT_POINTS],
+                                     point_columns)
+                for row in rows:
+                    row_id = row[0]
+                    point_locations[row_id] = (row[1], row[2])
+                    if get_weights:
+                        point_weights[row_id] = row[3]
+
+                # Split the rows of |adj_dbf| by tile in one pass, so that each
+                #     tile reads only the rows around it
+                fields = list(accumulator_fields)
+                tile_rows = Tile_Rows(join(inputs[OUTPUT_LOCATION],
+                                           TILE_ROWS_DIR_NAME), point_locations,
+                                      TILE_SIZE)
+                rows = prefetch_rows(backend, adj_dbf, [
+                    trim(ORIGIN_ID_FIELD_NAME),
+                    trim(DESTINATION_ID_FIELD_NAME), distance_field] + fields)
+                tile_rows.write((origin_id, destination_id, float(distance),
+                                 tuple(map(float, values))) for
+                                origin_id, destination_id, distance, *values in
+                                rows)
+
+                def load_tile(region):
+                    """
+                    Returns the graph induced by the nodes in |region|
+                    """
+                    tile_nodes = {}
+                    for origin_id, destination_id, distance, values in \
+                            tile_rows.region_rows(region):
+                        for row_id in [origin_id, destination_id]:
+                            if not row_id in tile_nodes:
+                                tile_nodes[row_id] = Node()
+                                if row_id in point_weights:
+                                    setattr(tile_nodes[row_id], WEIGHT,
+                                            point_weights[row_id])
+                                if node_locations_needed:
+                                    setattr(tile_nodes[row_id], LOCATION,
+                                            point_locations[row_id])
+                        if origin_id != destination_id and distance >= 0:
+                            accumulations = dict(zip(fields, values))
+                            tile_nodes[origin_id].add_neighbor(destination_id, distance,
+                                                               accumulations)
+                            tile_nodes[destination_id].add_neighbor(origin_id, distance,
+                                                                    accumulations)
+                    return tile_nodes
+                # Filled with the results in Step 4
+                nodes = {}
+                N = len(point_locations)
+                if N == 0:
+                    add_warning(WARNING_NO_NODES)
+                    success = False
+                graph_node_count = N
+                add_message(STEP_2_FINISHED)
+            except:
+                add_warning(geoprocessing_errors())
+                add_message(STEP_2_FAILED)
+                success = False
+        elif success and resume_stage is not None:
+            add_message(STEP_2_STARTED)
+            step_span = span(STEP_2)
+            try:
+                accumulator_fields = set([trim(f"Total_{accumulator_attribute}")
+                                          for accumulator_attribute in inputs[ACCUMULATOR_ATTRIBUTES].split(
+                    ";") if accumulator_attribute != "#"])
+                impedances = [(trim(f"Total_{impedance_attribute}"), impedance_radius) for
+                              impedance_attribute, impedance_radius in
+                              ADDITIONAL_IMPEDANCES.items()]
+                # Graph as saved after the last stage that was completed
+                nodes, pruned_ids = pipeline.load(resume_stage)
+                add_message(STAGE_REUSED(resume_stage))
+                N = len(nodes)  # The number of nodes in the graph
+                graph_node_count = N + len(pruned_ids)
+                add_message(STEP_2_FINISHED)
+            except:
+                add_warning(geoprocessing_errors())
+                add_message(STEP_2_FAILED)
+                success = False
+        elif success and OUT_OF_CORE_GRAPH:
+            add_message(STEP_2_STARTED)
+            step_span = span(STEP_2)
+            try:
+                distance_field = trim(f"Total_{inputs[IMPEDANCE_ATTRIBUTE]}")
+                accumulator_fields = set([trim(f"Total_{accumulator_attribute}")
+                                          for accumulator_attribute in inputs[ACCUMULATOR_ATTRIBUTES].split(
+                    ";") if accumulator_attribute != "#"])
+                impedances = []
+                pruned_ids = set()
+
+                def adjacency_rows():
+                    """
+                    Yields the (origin, destination, distance, accumulations)
+                        rows of |adj_dbf|
+                    """
+                    graph_progress = Progress_Bar(directed_edge_count, 1, STEP_2)
+                    fields = list(accumulator_fields)
+                    rows = prefetch_rows(backend, adj_dbf, [
+                        trim(ORIGIN_ID_FIELD_NAME),
+                        trim(DESTINATION_ID_FIELD_NAME), distance_field] + fields)
+                    for origin_id, destination_id, distance, *values in rows:
+                        yield (origin_id, destination_id, float(distance),
+                               dict(zip(fields, map(float, values))))
+                        graph_progress.step()
+                # The number of rows in |adj_dbf|
+                directed_edge_count = backend.count(adj_dbf)
+                graph_store = build_graph_store(
+                    join(inputs[OUTPUT_LOCATION], GRAPH_STORE_DIR_NAME),
+                    adjacency_rows, accumulator_fields, GRAPH_STORE_MEMORY_BUDGET)
+                # Graph representation: mapping from node id's to proxy nodes
+                nodes = graph_store.nodes()
+                N = len(nodes)  # The number of nodes in the graph
+                if N == 0:
+                    add_warning(WARNING_NO_NODES)
+                    success = False
+                graph_node_count = N
+                add_message(STEP_2_FINISHED)
+            except:
+                add_warning(geoprocessing_errors())
+                add_message(STEP_2_FAILED)
+                success = False
+        elif success:
+            add_message(STEP_2_STARTED)
+            step_span = span(STEP_2)
             try:
                 distance_field = trim(f"Total_{inputs[IMPEDANCE_ATTRIBUTE]}")
                 accumulator_fields = set([trim(f"Total_{accumulator_attribute}")
                                           for accumulator_attribute in inputs[ACCUMULATOR_ATTRIBUTES].split(
                     ";") if accumulator_attribute != "#"])
+                impedances = [(trim(f"Total_{impedance_attribute}"), impedance_radius) for
+                              impedance_attribute, impedance_radius in
+                              ADDITIONAL_IMPEDANCES.items()]
+                # Columns read into the accumulations of each edge
+                edge_fields = list(accumulator_fields | set(
+                    impedance_field for impedance_field, _ in impedances))
+                adjacency_columns = [trim(ORIGIN_ID_FIELD_NAME),
+                                     trim(DESTINATION_ID_FIELD_NAME),
+                                     distance_field] + edge_fields
                 # Graph representation: dictionary mapping node id's to Node objects
                 nodes = {}
                 # The number of rows in |adj_dbf|
-                directed_edge_count = int(
-                    GetCount_management(adj_dbf).getOutput(0))
+                directed_edge_count = backend.count(adj_dbf)
+                # With a finite network radius, only load the part of the graph
+                #     within the radius of the selected origins. When every
+                #     point is an origin, as by default, nothing can be pruned
+                #     and the extra pass over |adj_dbf| is skipped.
+                prune_graph = (PRUNE_GRAPH_TO_ORIGINS and inputs[USE_NETWORK_RADIUS]
+                               and inputs[SEARCH_RADIUS] < INFINITE_RADIUS and
+                               len(selected_features) <
+                               backend.count(inputs[INPUT_POINTS]))
+                # Nodes of the full graph that are left out of |nodes|
+                pruned_ids = set()
+                if prune_graph:
+                    # The radius in the units of the snap locations
+                    prune_halo = radius_in_location_units(
+                        inputs[INPUT_NETWORK], inputs[IMPEDANCE_ATTRIBUTE],
+                        inputs[SEARCH_RADIUS])
+                    if prune_halo is None:
+                        add_warning(WARNING_PRUNING_NEEDS_LENGTH(
+                            inputs[IMPEDANCE_ATTRIBUTE]))
+                        prune_graph = False
+                if prune_graph:
+                    snap_locations = {}
+                    rows = prefetch_rows(backend, inputs[INPUT_POINTS], [
+                        inputs[ID_ATTRIBUTE], trim("SnapX"), trim("SnapY")])
+                    for row_id, snap_x, snap_y in rows:
+                        snap_locations[row_id] = (snap_x, snap_y)
+                    # Only the rows between nodes near the origins are loaded
+                    candidate_ids = nodes_near_origins(
+                        snap_locations, selected_features, prune_halo)
+                    pruning_progress = Progress_Bar(directed_edge_count, 1,
+                                                    PROGRESS_GRAPH_PRUNING)
+
+                    def pruning_rows():
+                        rows = prefetch_rows(backend, adj_dbf,
+                                             adjacency_columns[:3])
+                        for row in rows:
+                            yield row
+                            pruning_progress.step()
+
+                    neighbors = load_neighbors(pruning_rows(), candidate_ids)
+                    kept_ids = nodes_within_radius(neighbors, selected_features,
+                                                   inputs[SEARCH_RADIUS])
+                    pruned_ids = set(snap_locations) - kept_ids
+                    del neighbors, candidate_ids, snap_locations
+                    add_message(GRAPH_PRUNED(len(kept_ids),
+                                             len(kept_ids) + len(pruned_ids)))
                 graph_progress = Progress_Bar(directed_edge_count, 1, STEP_2)
-                rows = UpdateCursor(adj_dbf)
-                for row in rows:
-                    # Get neighboring nodes, and the distance between them
-                    origin_id = row.getValue(trim(ORIGIN_ID_FIELD_NAME))
-                    destination_id = row.getValue(
-                        trim(DESTINATION_ID_FIELD_NAME))
-                    distance = float(row.getValue(distance_field))
+                # Rows may be read in a reader process while the graph is
+                #     built
+                rows = prefetch_rows(backend, adj_dbf, adjacency_columns)
+                # Get neighboring nodes, and the distance between them
+                for origin_id, destination_id, distance, *values in rows:
+                    distance = float(distance)
                     # Make sure the nodes are recorded in the graph
                     for row_id in [origin_id, destination_id]:
-                        if not row_id in nodes:
+                        if not row_id in nodes and not row_id in pruned_ids:
                             nodes[row_id] = Node()
                     # Make sure that the nodes are neighbors in the graph
-                    if origin_id != destination_id and distance >= 0:
-                        accumulations = {}
-                        for field in accumulator_fields:
-                            accumulations[field] = float(row.getValue(field))
+                    if (origin_id != destination_id and distance >= 0 and
+                            origin_id in nodes and destination_id in nodes):
+                        accumulations = dict(zip(edge_fields,
+                                                 map(float, values)))
                         nodes[origin_id].add_neighbor(destination_id, distance,
                                                       accumulations)
                         nodes[destination_id].add_neighbor(origin_id, distance,
@@ -328,146 +799,332 @@ def main():
                     graph_progress.step()
                 N = len(nodes)  # The number of nodes in the graph
                 if N == 0:
-                    AddWarning(WARNING_NO_NODES)
+                    add_warning(WARNING_NO_NODES)
                     success = False
-                AddMessage(STEP_2_FINISHED)
+                # The number of nodes in the full graph, used in normalization
+                graph_node_count = N + len(pruned_ids)
+                if cache_stages and success:
+                    pipeline.save(GRAPH_STAGE, (nodes, pruned_ids))
+                add_message(STEP_2_FINISHED)
             except:
-                AddWarning(GetMessages(2))
-                AddMessage(STEP_2_FAILED)
+                add_warning(geoprocessing_errors())
+                add_message(STEP_2_FAILED)
                 success = False
+        end_step(STEP_2)
 
         # Step 3
-        if success:
-            AddMessage(STEP_3_STARTED)
+        if success and (street_model or tiled or
+                        resume_stage in [NODE_ATTRIBUTES_STAGE, METRICS_STAGE]):
+            # Node weights and locations were read with the network locations,
+            #     are set as the tiles are loaded, or were saved with the graph
+            add_message(STEP_3_STARTED)
+            step_span = span(STEP_3)
+            add_message(STEP_3_FINISHED)
+        elif success:
+            add_message(STEP_3_STARTED)
+            step_span = span(STEP_3)
             try:
                 get_weights = inputs[NODE_WEIGHT_ATTRIBUTE] != "#"
-                get_locations = node_locations_needed
+                get_locations = (node_locations_needed or
+                                 COLLAPSE_CO_LOCATED_NODES)
                 # Keep track of number nodes in input points not present in the graph
                 point_not_in_graph_count = 0
-                input_point_count = int(
-                    GetCount_management(inputs[INPUT_POINTS]).getOutput(0))
+                input_point_count = backend.count(inputs[INPUT_POINTS])
                 node_attribute_progress = Progress_Bar(
                     input_point_count, 1, STEP_3)
-                rows = UpdateCursor(inputs[INPUT_POINTS])
+                weight_field = trim(inputs[NODE_WEIGHT_ATTRIBUTE])
+                point_columns = [inputs[ID_ATTRIBUTE]]
+                if get_weights:
+                    point_columns.append(weight_field)
+                if get_locations:
+                    point_columns += [trim("SnapX"), trim("SnapY")]
+                rows = prefetch_rows(backend, inputs[INPUT_POINTS],
+                                     point_columns)
                 for row in rows:
-                    row_id = row.getValue(inputs[ID_ATTRIBUTE])
+                    row = dict(zip(point_columns, row))
+                    row_id = row[inputs[ID_ATTRIBUTE]]
                     if not row_id in nodes:
-                        point_not_in_graph_count += 1
+                        if not row_id in pruned_ids:
+                            point_not_in_graph_count += 1
                         continue
                     if get_weights:
-                        setattr(nodes[row_id], WEIGHT,
-                                row.getValue(trim(inputs[NODE_WEIGHT_ATTRIBUTE])))
+                        setattr(nodes[row_id], WEIGHT, row[weight_field])
                     if get_locations:
-                        snap_x = row.getValue(trim("SnapX"))
-                        snap_y = row.getValue(trim("SnapY"))
-                        setattr(nodes[row_id], LOCATION, (snap_x, snap_y))
+                        setattr(nodes[row_id], LOCATION, (row[trim("SnapX")],
+                                                          row[trim("SnapY")]))
                     node_attribute_progress.step()
                 if point_not_in_graph_count:
-                    AddWarning(WARNING_POINTS_NOT_IN_GRAPH(N,
-                                                           point_not_in_graph_count))
-                AddMessage(STEP_3_FINISHED)
+                    add_warning(WARNING_POINTS_NOT_IN_GRAPH(graph_node_count,
+                                                            point_not_in_graph_count))
+                if cache_stages:
+                    pipeline.save(NODE_ATTRIBUTES_STAGE, (nodes, pruned_ids))
+                add_message(STEP_3_FINISHED)
             except:
-                AddWarning(GetMessages(2))
-                AddMessage(STEP_3_FAILED)
+                add_warning(geoprocessing_errors())
+                add_message(STEP_3_FAILED)
                 success = False
+        end_step(STEP_3)
 
         # Step 4
         if success:
-            AddMessage(STEP_4_STARTED)
+            add_message(STEP_4_STARTED)
+            step_span = span(STEP_4)
             try:
-                # Compute measures
-                compute_centrality(nodes, selected_features, inputs[COMPUTE_REACH],
-                                   inputs[COMPUTE_GRAVITY], inputs[COMPUTE_BETWEENNESS],
-                                   inputs[COMPUTE_CLOSENESS], inputs[COMPUTE_STRAIGHTNESS],
-                                   inputs[SEARCH_RADIUS], inputs[USE_NETWORK_RADIUS], inputs[BETA],
-                                   inputs[NORMALIZE_RESULTS], accumulator_fields)
-                AddMessage(STEP_4_FINISHED)
+                if NODE_ORDERING_CURVE is not None and not (street_model or tiled):
+                    # Visit the origins in the order of their snap locations
+                    #     along the curve
+                    origin_locations = {}
+                    for row_id, snap_x, snap_y in backend.iter_rows(
+                            inputs[INPUT_POINTS], [inputs[ID_ATTRIBUTE],
+                                                   trim("SnapX"), trim("SnapY")]):
+                        if row_id in selected_features:
+                            origin_locations[row_id] = (snap_x, snap_y)
+                    origins = curve_order(origin_locations, NODE_ORDERING_CURVE,
+                                          CURVE_ORDER)
+                    del origin_locations
+                else:
+                    origins = selected_features
+                search_counters = (Search_Counters("compute_centrality",
+                                                   SLOWEST_SEARCH_COUNT) if
+                                   SEARCH_COUNTERS else None)
+                if DRY_RUN:
+                    # Only estimate the cost of the computation
+                    if street_model or tiled:
+                        add_warning(WARNING_DRY_RUN_UNSUPPORTED)
+                    else:
+                        estimate = estimate_cost(
+                            nodes, origins, inputs[COMPUTE_REACH],
+                            inputs[COMPUTE_GRAVITY], inputs[COMPUTE_BETWEENNESS],
+                            inputs[COMPUTE_CLOSENESS], inputs[COMPUTE_STRAIGHTNESS],
+                            inputs[SEARCH_RADIUS], inputs[USE_NETWORK_RADIUS],
+                            inputs[BETA], accumulator_fields, DRY_RUN_SAMPLE_SIZE)
+                        for line in describe_cost_estimate(estimate):
+                            add_message(line)
+                    # The adjacency list is kept for the full run
+                    delete(output_feature_class)
+                    add_message(DRY_RUN_FINISHED)
+                elif resume_stage == METRICS_STAGE:
+                    # The measures were saved with the graph
+                    pass
+                elif street_model:
+                    nodes, unplaced_count = compute_street_graph_centrality(
+                        network, points, origins, inputs[COMPUTE_REACH],
+                        inputs[COMPUTE_GRAVITY], inputs[COMPUTE_BETWEENNESS],
+                        inputs[COMPUTE_CLOSENESS], inputs[COMPUTE_STRAIGHTNESS],
+                        inputs[SEARCH_RADIUS], inputs[USE_NETWORK_RADIUS], inputs[BETA],
+                        inputs[NORMALIZE_RESULTS], length_scale)
+                    if unplaced_count:
+                        add_warning(WARNING_POINTS_NOT_IN_GRAPH(len(nodes),
+                                                                unplaced_count))
+                elif tiled:
+                    # Compute measures one tile at a time
+                    nodes = compute_centrality_by_tile(
+                        load_tile, point_locations, origins, inputs[COMPUTE_REACH],
+                        inputs[COMPUTE_GRAVITY], inputs[COMPUTE_BETWEENNESS],
+                        inputs[COMPUTE_CLOSENESS], inputs[COMPUTE_STRAIGHTNESS],
+                        inputs[SEARCH_RADIUS], inputs[USE_NETWORK_RADIUS], inputs[BETA],
+                        inputs[NORMALIZE_RESULTS], accumulator_fields, TILE_SIZE,
+                        graph_node_count, CENTRALITY_PROCESSES, tile_halo)
+                elif impedances:
+                    # Compute measures for each impedance on the same graph
+                    compute_multi_impedance_centrality(
+                        nodes, origins, impedances, inputs[COMPUTE_REACH],
+                        inputs[COMPUTE_GRAVITY], inputs[COMPUTE_BETWEENNESS],
+                        inputs[COMPUTE_CLOSENESS], inputs[COMPUTE_STRAIGHTNESS],
+                        inputs[SEARCH_RADIUS], inputs[USE_NETWORK_RADIUS], inputs[BETA],
+                        inputs[NORMALIZE_RESULTS], accumulator_fields,
+                        graph_node_count)
+                elif COLLAPSE_CO_LOCATED_NODES:
+                    # Compute measures once per group of co-located nodes
+                    super_nodes, super_origins = collapse_co_located_nodes(
+                        nodes, origins, CO_LOCATION_TOLERANCE)
+                    add_message(CO_LOCATED_NODES_COLLAPSED(N, len(super_nodes)))
+                    if inputs[COMPUTE_BETWEENNESS]:
+                        add_warning(WARNING_CO_LOCATED_BETWEENNESS)
+                    compute_centrality(super_nodes, super_origins, inputs[COMPUTE_REACH],
+                                       inputs[COMPUTE_GRAVITY], inputs[COMPUTE_BETWEENNESS],
+                                       inputs[COMPUTE_CLOSENESS], inputs[COMPUTE_STRAIGHTNESS],
+                                       inputs[SEARCH_RADIUS], inputs[USE_NETWORK_RADIUS], inputs[BETA],
+                                       [], accumulator_fields, counters=search_counters)
+                    expand_co_located_results(super_nodes, nodes, origins,
+                                              inputs[COMPUTE_REACH], inputs[COMPUTE_GRAVITY],
+                                              inputs[COMPUTE_BETWEENNESS], inputs[COMPUTE_CLOSENESS],
+                                              inputs[COMPUTE_STRAIGHTNESS], inputs[BETA],
+                                              inputs[NORMALIZE_RESULTS], accumulator_fields,
+                                              graph_node_count)
+                elif DECOMPOSE_COMPONENTS:
+                    # Compute measures one connected component at a time
+                    component_count, scheduled_count = compute_centrality_by_component(
+                        nodes, origins, inputs[COMPUTE_REACH],
+                        inputs[COMPUTE_GRAVITY], inputs[COMPUTE_BETWEENNESS],
+                        inputs[COMPUTE_CLOSENESS], inputs[COMPUTE_STRAIGHTNESS],
+                        inputs[SEARCH_RADIUS], inputs[USE_NETWORK_RADIUS], inputs[BETA],
+                        inputs[NORMALIZE_RESULTS], accumulator_fields,
+                        graph_node_count, CENTRALITY_PROCESSES,
+                        NORMALIZE_BY_COMPONENT)
+                    add_message(COMPONENTS_SCHEDULED(component_count, scheduled_count))
+                elif REROOT_SHORTEST_PATH_TREES:
+                    # Compute measures, re-rooting the trees of neighboring origins
+                    compute_centrality_rerooted(nodes, origins, inputs[COMPUTE_REACH],
+                                                inputs[COMPUTE_GRAVITY], inputs[COMPUTE_BETWEENNESS],
+                                                inputs[COMPUTE_CLOSENESS], inputs[COMPUTE_STRAIGHTNESS],
+                                                inputs[SEARCH_RADIUS], inputs[USE_NETWORK_RADIUS],
+                                                inputs[BETA], inputs[NORMALIZE_RESULTS],
+                                                accumulator_fields, graph_node_count)
+                else:
+                    # Compute measures
+                    compute_centrality(nodes, origins, inputs[COMPUTE_REACH],
+                                       inputs[COMPUTE_GRAVITY], inputs[COMPUTE_BETWEENNESS],
+                                       inputs[COMPUTE_CLOSENESS], inputs[COMPUTE_STRAIGHTNESS],
+                                       inputs[SEARCH_RADIUS], inputs[USE_NETWORK_RADIUS], inputs[BETA],
+                                       inputs[NORMALIZE_RESULTS], accumulator_fields,
+                                       graph_node_count, counters=search_counters)
+                if search_counters is not None and search_counters.searches:
+                    # Write the counts of the searches next to the output
+                    counters_file_name = join(inputs[OUTPUT_LOCATION],
+                                              search_counters_file_name(
+                                                  output_feature_class_name))
+                    search_counters.dump(counters_file_name)
+                    add_message(SEARCH_COUNTERS_WRITTEN(search_counters.searches,
+                                                        counters_file_name))
+                if cache_stages and not DRY_RUN and resume_stage != METRICS_STAGE:
+                    pipeline.save(METRICS_STAGE, (nodes, pruned_ids))
+                if (SAVE_CENTRALITY_BASELINE and not (street_model or tiled) and
+                        not (COLLAPSE_CO_LOCATED_NODES or OUT_OF_CORE_GRAPH or
+                             DRY_RUN)):
+                    # Save the graph and its results for incremental updates
+                    save_graph(join(inputs[OUTPUT_LOCATION],
+                                    baseline_file_name(output_feature_class_name)),
+                               nodes, origins, {
+                                   "compute_r": inputs[COMPUTE_REACH],
+                                   "compute_g": inputs[COMPUTE_GRAVITY],
+                                   "compute_b": inputs[COMPUTE_BETWEENNESS],
+                                   "compute_c": inputs[COMPUTE_CLOSENESS],
+                                   "compute_s": inputs[COMPUTE_STRAIGHTNESS],
+                                   "radius": inputs[SEARCH_RADIUS],
+                                   "network_radius": inputs[USE_NETWORK_RADIUS],
+                                   "beta": inputs[BETA],
+                                   "measures_to_normalize": inputs[NORMALIZE_RESULTS],
+                                   "accumulator_fields": accumulator_fields,
+                                   "node_count": graph_node_count})
+                add_message(STEP_4_FINISHED)
             except:
-                AddWarning(GetMessages(2))
-                AddMessage(STEP_4_FAILED)
+                add_warning(geoprocessing_errors())
+                add_message(STEP_4_FAILED)
                 success = False
+        end_step(STEP_4)
 
         # Step 5
-        if success:
-            AddMessage(STEP_5_STARTED)
+        if success and not DRY_RUN:
+            add_message(STEP_5_STARTED)
+            step_span = span(STEP_5)
             try:
-                # Make output layer
-                MakeFeatureLayer_management(in_features=output_feature_class,
-                                            out_layer=output_layer_name)
-                # Save output layer
-                SaveToLayerFile_management(output_layer_name, output_layer,
-                                           "ABSOLUTE")
+                if backend.geoprocessing:
+                    from arcpy import MakeFeatureLayer_management
+                    from arcpy import SaveToLayerFile_management
+                    # Make output layer
+                    MakeFeatureLayer_management(
+                        in_features=output_feature_class,
+                        out_layer=output_layer_name)
+                    # Save output layer
+                    SaveToLayerFile_management(output_layer_name, output_layer,
+                                               "ABSOLUTE")
+                    output = output_layer
+                else:
+                    # Without ArcGIS, the feature class is the output
+                    output = output_feature_class
                 # Use a test node to figure out which metrics were computed
                 test_node_id = selected_features.pop()
                 # Make sure the test node is in the graph
                 while test_node_id not in nodes:
                     test_node_id = selected_features.pop()
                 test_node = nodes[test_node_id]
+                final_attributes = FINAL_ATTRIBUTES + tuple(
+                    impedance_measure(index, measure) for index in
+                    range(1, len(ADDITIONAL_IMPEDANCES) + 1) for measure in FINAL_ATTRIBUTES)
                 measures = set([measure for measure in dir(test_node) if (measure in
-                                                                          FINAL_ATTRIBUTES or is_accumulator_field(measure))])
-                # Add a field in the output layer for each computed metric
-                for measure in measures:
-                    AddField_management(in_table=output_layer, field_name=trim(measure),
-                                        field_type="DOUBLE", field_is_nullable="NON_NULLABLE")
+                                                                          final_attributes or is_accumulator_field(measure))])
                 # Figure out the id field to use based on the type of input buildings
-                if (buildings_description.shapeType == "Polygon" and
+                if (buildings_shape_type == "Polygon" and
                         inputs[ID_ATTRIBUTE] == ORIGINAL_FID):
                     id_field = "FID"
                 else:
                     id_field = inputs[ID_ATTRIBUTE]
-                # Fill the layer with the metric values
-                write_progress = Progress_Bar(N, 1, STEP_5)
-                layer_rows = UpdateCursor(output_layer)
-                for row in layer_rows:
-                    row_id = row.getValue(id_field)
-                    for measure in measures:
-                        # If no value was computed for this node id, set value to 0
-                        value = 0
-                        if row_id in nodes and hasattr(nodes[row_id], measure):
-                            value = getattr(nodes[row_id], measure)
-                        row.setValue(trim(measure), value)
-                    layer_rows.updateRow(row)
+                # Fill the layer with the metric values, adding a field for
+                #     each computed metric
+                write_progress = Progress_Bar(len(measures), 1, STEP_5)
+                node_ids = list(nodes)
+                node_list = [nodes[node_id] for node_id in node_ids]
+                columns = {}
+                for measure in measures:
+                    # If no value was computed for a node, its value is 0
+                    columns[trim(measure)] = [getattr(node, measure, 0) for
+                                              node in node_list]
                     write_progress.step()
+                backend.write_columns(output, id_field, node_ids, columns,
+                                      default=0)
                 # Save to toolbox output
-                SetParameterAsText(OUTPUT_FEATURE_CLASS, output_feature_class)
-                AddMessage(STEP_5_FINISHED)
+                if backend.geoprocessing and not headless():
+                    from arcpy import SetParameterAsText
+                    SetParameterAsText(OUTPUT_FEATURE_CLASS, output_feature_class)
+                add_message(STEP_5_FINISHED)
             except:
-                AddWarning(GetMessages(2))
-                AddMessage(STEP_5_FAILED)
+                add_warning(geoprocessing_errors())
+                add_message(STEP_5_FAILED)
+                # Let the next run write the output again, resuming from the
+                #     saved measures
+                delete(output_layer)
                 success = False
+        end_step(STEP_5)
 
-        # Step 6
-        if success:
-            AddMessage(STEP_6_STARTED)
+        # Step 6, which needs ArcGIS to symbolize and display the layer
+        if success and not DRY_RUN and backend.geoprocessing:
+            from arcpy import ApplySymbologyFromLayer_management
+            # from arcpy import mapping
+            from arcpy import mp
+            add_message(STEP_6_STARTED)
+            step_span = span(STEP_6)
             # Apply symbology
             try:
                 ApplySymbologyFromLayer_management(in_layer=output_layer,
                                                    in_symbology_layer=symbology_layer)
             except:
-                AddWarning(WARNING_APPLY_SYMBOLOGY_FAILED)
-                AddWarning(GetMessages(2))
-                AddMessage(STEP_6_FAILED)
-            # Display
-            try:
-                # current_map_document = mapping.MapDocument("CURRENT")
-                # data_frame = mapping.ListDataFrames(current_map_document,
-                #                                     "Layers")[0]
-                # add_layer = mapping.Layer(output_layer)
-                # mapping.AddLayer(data_frame, add_layer, "AUTO_ARRANGE")
-
-                aprx = mp.ArcGISProject("CURRENT")
-                active_map = aprx.activeMap
-                active_map.addLayer(output_layer, "AUTO_ARRANGE")
-                AddMessage(STEP_6_FINISHED)
-            except:
-                AddWarning(WARNING_FAIL_TO_DISPLAY)
-                AddWarning(GetMessages(2))
-                AddMessage(STEP_6_FAILED)
+                add_warning(WARNING_APPLY_SYMBOLOGY_FAILED)
+                add_warning(geoprocessing_errors())
+                add_message(STEP_6_FAILED)
+            # Display, unless there is no map to display in
+            if headless():
+                add_message(STEP_6_FINISHED)
+            else:
+                try:
+                    # current_map_document = mapping.MapDocument("CURRENT")
+                    # data_frame = mapping.ListDataFrames(current_map_document,
+                    #                                     "Layers")[0]
+                    # add_layer = mapping.Layer(output_layer)
+                    # mapping.AddLayer(data_frame, add_layer, "AUTO_ARRANGE")
+
+                    aprx = mp.ArcGISProject("CURRENT")
+                    active_map = aprx.activeMap
+                    active_map.addLayer(output_layer, "AUTO_ARRANGE")
+                    add_message(STEP_6_FINISHED)
+                except:
+                    add_warning(WARNING_FAIL_TO_DISPLAY)
+                    add_warning(geoprocessing_errors())
+                    add_message(STEP_6_FAILED)
+        end_step(STEP_6)
 
         # Clean up
         clean_up()
 
-        AddMessage(SUCCESS if success else FAILURE)
+        add_message(SUCCESS if success else FAILURE)
+        if trace_run:
+            stop_tracing()
+            write_trace(join(inputs[OUTPUT_LOCATION],
+                             trace_file_name(output_feature_class_name)))
+        if PROFILE_MEMORY:
+            memory_profile.dump(join(inputs[OUTPUT_LOCATION],
+                                     memory_profile_file_name(
+                                         output_feature_class_name)))
 
     except ExecuteAbort:
         clean_up()
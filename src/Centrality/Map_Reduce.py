@@ -0,0 +1,202 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for spreading a centrality computation over several machines that share
+    a file system.
+A job spec (JSON) names a graph saved with |save_graph|, the parameters of
+    |compute_centrality|, and the origins split into shards. A worker computes
+    one shard and writes a partial result file, and the reduce step sums the
+    betweenness of the partial results, gathers the measures of the origins
+    and normalizes them.
+Partial results record the key of the job they were computed for, which covers
+    the graph file, the parameters and the shards. A worker skips a shard whose
+    partial result has the key of the job, and the reduce step rejects partial
+    results with another key, left by an earlier job in the same directory.
+Usage:
+    python -m src.Centrality.Map_Reduce worker <job spec> <shard index>
+    python -m src.Centrality.Map_Reduce reduce <job spec>
+"""
+
+from json import dump as dump_json
+from json import load as load_json
+from os import makedirs
+from os import replace
+from os.path import exists
+from os.path import join
+from pickle import dump
+from pickle import HIGHEST_PROTOCOL
+from pickle import load
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Centrality_Computation import normalize_centrality
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Graph_Artifacts import load_graph
+from src.Centrality.Node import Node
+from src.Centrality.Partitioned_Computation import result_attributes
+from src.Common.Utils.Pipeline import content_key
+from src.Common.Utils.Pipeline import fingerprint
+from sys import argv
+
+
+def write_job_spec(job_path, graph_path, parameters, origins, shard_count,
+                   results_dir):
+    """
+    Writes a job spec.
+    |job_path|: the file to write
+    |graph_path|: a graph saved with |save_graph|
+    |parameters|: the arguments of |compute_centrality| after |origins|, keyed
+        by parameter name
+    |origins|: the origins, which must be JSON values (numbers or strings)
+    |shard_count|: the number of shards to split the origins into
+    |results_dir|: the directory for the partial and final results
+    """
+    origins = list(origins)
+    shards = [origins[index::shard_count] for index in range(shard_count)]
+    with open(job_path, "w") as job_file:
+        dump_json({"graph": graph_path, "parameters": parameters,
+                   "shards": shards, "results_dir": results_dir}, job_file,
+                  indent=2)
+
+
+def read_job_spec(job_path):
+    """
+    Returns the job spec written by |write_job_spec|
+    """
+    with open(job_path) as job_file:
+        return load_json(job_file)
+
+
+def partial_result_path(job, shard_index):
+    """
+    Returns the path of the partial result of shard |shard_index| of |job|
+    """
+    return join(job["results_dir"], f"Partial_{shard_index}.pkl")
+
+
+def job_key(job):
+    """
+    Returns the key of |job|, which changes when its graph file, parameters or
+        shards change
+    """
+    return content_key("Map_Reduce", {"graph": fingerprint(job["graph"]),
+                                      "parameters": job["parameters"],
+                                      "shards": job["shards"]})
+
+
+def partial_result_key(path):
+    """
+    Returns the job key recorded in the partial result file |path|, None if
+        there is no such file
+    """
+    if not exists(path):
+        return None
+    with open(path, "rb") as partial_file:
+        return load(partial_file)
+
+
+def run_worker(job_path, shard_index):
+    """
+    Computes the measures for the origins of one shard of a job and writes them
+        to the partial result file of the shard, without normalization.
+    The partial result holds the key of the job, then the betweenness
+        contributions of the shard, keyed by node, and the measures of each
+        origin of the shard. Does nothing if the partial result of the shard
+        was already computed for this job.
+    """
+    job = read_job_spec(job_path)
+    key = job_key(job)
+    path = partial_result_path(job, shard_index)
+    if partial_result_key(path) == key:
+        return
+    nodes, _, _ = load_graph(job["graph"])
+    origins = [s for s in job["shards"][shard_index] if s in nodes]
+    parameters = dict(job["parameters"])
+    parameters["measures_to_normalize"] = []
+    compute_centrality(nodes, origins, **parameters)
+    betweenness = dict((node_id, getattr(node, BETWEENNESS)) for
+                       node_id, node in nodes.items() if
+                       getattr(node, BETWEENNESS, 0.0))
+    origin_results = dict((s, result_attributes(nodes[s])) for s in origins)
+    for s in origin_results:
+        origin_results[s].pop(BETWEENNESS, None)
+
+    # Write to a temporary file first, so that a partial result file is only
+    #     ever seen complete
+    makedirs(job["results_dir"], exist_ok=True)
+    with open(f"{path}.tmp", "wb") as partial_file:
+        dump(key, partial_file, HIGHEST_PROTOCOL)
+        dump({"betweenness": betweenness, "origins": origin_results},
+             partial_file, HIGHEST_PROTOCOL)
+    replace(f"{path}.tmp", path)
+
+
+def reduce_results(job_path):
+    """
+    Combines the partial results of all the shards of a job and normalizes
+        them. Returns a dictionary mapping node id's to |Node| objects holding
+        the results, without their neighbors.
+    """
+    job = read_job_spec(job_path)
+    nodes, _, _ = load_graph(job["graph"])
+    parameters = job["parameters"]
+    compute_b = parameters["compute_b"]
+    key = job_key(job)
+    keys = [partial_result_key(partial_result_path(job, shard_index)) for
+            shard_index in range(len(job["shards"]))]
+    missing = [shard_index for shard_index, partial_key in enumerate(keys) if
+               partial_key is None]
+    if missing:
+        raise Exception(f"Missing partial results for shards {missing}")
+    stale = [shard_index for shard_index, partial_key in enumerate(keys) if
+             partial_key != key]
+    if stale:
+        raise Exception(f"Partial results for shards {stale} were computed "
+                        "for another job")
+
+    results = {}
+    for node_id, node in nodes.items():
+        results[node_id] = Node()
+        setattr(results[node_id], WEIGHT, getattr(node, WEIGHT))
+        if compute_b:
+            setattr(results[node_id], BETWEENNESS, 0.0)
+    origins = []
+    for shard_index in range(len(job["shards"])):
+        with open(partial_result_path(job, shard_index), "rb") as partial_file:
+            load(partial_file)  # The job key, checked above
+            partial = load(partial_file)
+        for node_id, betweenness in partial["betweenness"].items():
+            setattr(results[node_id], BETWEENNESS,
+                    getattr(results[node_id], BETWEENNESS) + betweenness)
+        for s, attributes in partial["origins"].items():
+            origins.append(s)
+            for attribute, value in attributes.items():
+                setattr(results[s], attribute, value)
+
+    sum_weights = sum(getattr(results[s], WEIGHT) for s in origins)
+    compute_s = (parameters["compute_s"] and
+                 hasattr(next(iter(nodes.values())), LOCATION))
+    normalize_centrality(results, origins, parameters["compute_r"],
+                         parameters["compute_g"], compute_b,
+                         parameters["compute_c"], compute_s, parameters["beta"],
+                         list(parameters["measures_to_normalize"]), sum_weights,
+                         parameters.get("node_count"))
+    return results
+
+
+if __name__ == "__main__":
+    if len(argv) == 4 and argv[1] == "worker":
+        run_worker(argv[2], int(argv[3]))
+    elif len(argv) == 3 and argv[1] == "reduce":
+        results_dir = read_job_spec(argv[2])["results_dir"]
+        with open(join(results_dir, "Results.pkl"), "wb") as results_file:
+            dump(reduce_results(argv[2]), results_file, HIGHEST_PROTOCOL)
+    else:
+        print(__doc__)
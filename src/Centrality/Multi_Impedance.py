@@ -0,0 +1,74 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for centrality computation with several impedances in one run.
+Additional impedances are read from accumulator columns of the adjacency list.
+    The graph is loaded once, and each impedance is searched by swapping the
+    edge lengths of the same nodes.
+"""
+
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Constants import FINAL_ATTRIBUTES
+from src.Centrality.Constants import impedance_measure
+from src.Centrality.Constants import NEIGHBORS
+
+
+def _impedance_neighbors(neighbors, impedance_field, accumulator_fields):
+    """
+    Returns a copy of the set of |neighbors| of a node with edge lengths taken
+        from the accumulator column |impedance_field|, or kept if it is None,
+        and accumulations restricted to |accumulator_fields|
+    """
+    return set((w, d_vw if impedance_field is None else
+                dict(accumulations_vw)[impedance_field],
+                tuple((field, value) for field, value in accumulations_vw if
+                      field in accumulator_fields)) for w, d_vw,
+               accumulations_vw in neighbors)
+
+
+def compute_multi_impedance_centrality(nodes, origins, impedances, compute_r,
+                                       compute_g, compute_b, compute_c,
+                                       compute_s, radius, network_radius, beta,
+                                       measures_to_normalize,
+                                       accumulator_fields, node_count=None):
+    """
+    Computes the measures of |compute_centrality| for the edge lengths of the
+        graph and for each additional impedance.
+    |impedances|: list of (accumulator field, search radius) pairs, the field
+        holding the impedance of each edge; the edges of |nodes| carry these
+        fields in their accumulations
+    All other parameters are as in |compute_centrality|. The results for the
+        k-th additional impedance are recorded under |impedance_measure|(k,
+        measure), those for the edge lengths under the usual names.
+        Accumulations are only computed for the edge lengths.
+    """
+    neighbors = dict((node_id, getattr(node, NEIGHBORS)) for node_id, node in
+                     nodes.items())
+    for index, (impedance_field, impedance_radius) in enumerate(impedances, 1):
+        for node_id, node in nodes.items():
+            setattr(node, NEIGHBORS, _impedance_neighbors(
+                neighbors[node_id], impedance_field, ()))
+        compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                           compute_c, compute_s, impedance_radius,
+                           network_radius, beta, list(measures_to_normalize),
+                           [], node_count)
+        for node in nodes.values():
+            for measure in FINAL_ATTRIBUTES:
+                if hasattr(node, measure):
+                    setattr(node, impedance_measure(index, measure),
+                            getattr(node, measure))
+                    delattr(node, measure)
+
+    for node_id, node in nodes.items():
+        setattr(node, NEIGHBORS, _impedance_neighbors(
+            neighbors[node_id], None, accumulator_fields))
+    compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                       compute_c, compute_s, radius, network_radius, beta,
+                       measures_to_normalize, accumulator_fields, node_count)
@@ -0,0 +1,125 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for running the centrality computation on independent parts of a graph.
+"""
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Constants import GRAPH_ATTRIBUTES
+from src.Centrality.Constants import NEIGHBORS
+from src.Centrality.Constants import STEP_4
+from src.Centrality.Node import Node
+from src.Common.Utils.Progress_Bar import forward_progress
+from src.Common.Utils.Progress_Bar import Progress_Bar
+from src.Common.Utils.Progress_Bar import report_progress_to
+
+# Seconds between polls of the progress of the worker processes
+PROGRESS_POLL_SECONDS = 0.5
+
+
+def result_attributes(node):
+    """
+    Returns a dictionary of the measures recorded on |node| by
+        |compute_centrality|
+    """
+    return dict((attribute, value) for attribute, value in vars(node).items() if
+                attribute not in GRAPH_ATTRIBUTES)
+
+
+def subgraph(nodes, node_ids):
+    """
+    Returns a copy of the graph structure of |nodes| restricted to |node_ids|,
+        without any computed measures
+    """
+    restricted = {}
+    for node_id in node_ids:
+        node = Node()
+        for attribute in GRAPH_ATTRIBUTES:
+            if attribute != NEIGHBORS and hasattr(nodes[node_id], attribute):
+                setattr(node, attribute, getattr(nodes[node_id], attribute))
+        setattr(node, NEIGHBORS, set(edge for edge in getattr(nodes[node_id],
+                                                              NEIGHBORS) if
+                                     edge[0] in node_ids))
+        restricted[node_id] = node
+    return restricted
+
+
+def _compute_partition(nodes, origins, centrality_arguments):
+    """
+    Runs |compute_centrality| on one part of the graph and returns a dictionary
+        mapping its node id's to their |result_attributes|
+    """
+    compute_centrality(nodes, origins, *centrality_arguments)
+    return dict((node_id, result_attributes(node)) for node_id, node in
+                nodes.items())
+
+
+def compute_partitions(partitions, centrality_arguments, processes=1,
+                       origin_count=None):
+    """
+    Runs |compute_centrality| on each part of a graph. Yields (index, results)
+        pairs as parts finish, where results map node id's to the measures
+        recorded on them.
+    |partitions|: an iterable of (nodes, origins) pairs, nodes being a
+        dictionary mapping node id's to |Node| objects. Parts are taken from it
+        as they are needed, at most |processes| at a time.
+    |centrality_arguments|: the arguments of |compute_centrality| following
+        |origins|; measures should not be normalized per part
+    |processes|: the number of processes to use, parts are computed in place in
+        this process if it is 1
+    |origin_count|: the number of origins of all the parts, if known, so that
+        progress is reported over all of them rather than for each part
+    """
+    progress = (Progress_Bar(origin_count, 1, STEP_4) if origin_count is not
+                None else None)
+    if processes <= 1:
+        for index, (nodes, origins) in enumerate(partitions):
+            if progress is None:
+                yield index, _compute_partition(nodes, origins,
+                                                centrality_arguments)
+                continue
+            with forward_progress(progress):
+                results = _compute_partition(nodes, origins,
+                                             centrality_arguments)
+            yield index, results
+        if progress is not None:
+            progress.finish()
+        return
+    # Workers add the steps of their progress bars to a counter shared with
+    #     |progress|, which is polled while waiting for them
+    pool_arguments = ({} if progress is None else
+                      {"initializer": report_progress_to,
+                       "initargs": (progress.shared_counter(),)})
+    poll_seconds = None if progress is None else PROGRESS_POLL_SECONDS
+    with ProcessPoolExecutor(max_workers=processes,
+                             **pool_arguments) as executor:
+        futures = {}
+        for index, (nodes, origins) in enumerate(partitions):
+            futures[executor.submit(_compute_partition, nodes, origins,
+                                    centrality_arguments)] = index
+            while len(futures) >= processes:
+                done, _ = wait(futures, timeout=poll_seconds,
+                               return_when=FIRST_COMPLETED)
+                if progress is not None:
+                    progress.poll()
+                for future in done:
+                    yield futures.pop(future), future.result()
+        while futures:
+            done, _ = wait(futures, timeout=poll_seconds,
+                           return_when=FIRST_COMPLETED)
+            if progress is not None:
+                progress.poll()
+            for future in done:
+                yield futures.pop(future), future.result()
+    if progress is not None:
+        progress.finish()
@@ -0,0 +1,282 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for a long-lived service answering centrality queries.
+Graphs saved with |save_graph| are loaded once. A query asks for the measures of
+    a few origins of a graph under some parameters, and only the searches
+    rooted at those origins are run. Answers are cached per origin and
+    parameters, and request latencies are recorded.
+Queries are answered over HTTP, on a TCP port or a Unix socket:
+    POST /query {"graph": name, "origins": [...], "parameters": {...}}
+    GET /graphs
+    GET /metrics
+Usage:
+    python -m src.Centrality.Query_Service [--port PORT | --socket PATH]
+        NAME=GRAPH_PATH ...
+Betweenness depends on the searches from all origins, so it is not answered.
+    Reach is normalized by the weights of all the nodes of the graph.
+"""
+
+from argparse import ArgumentParser
+from collections import deque
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from json import dumps
+from json import loads
+from os import remove
+from os.path import exists
+from socket import AF_UNIX
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Centrality_Computation import normalize_centrality
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import INFINITE_RADIUS
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Graph_Artifacts import load_graph
+from src.Centrality.Partitioned_Computation import result_attributes
+from src.Common.Data_Structures.LRUCache import LRUCache
+from threading import Lock
+from time import perf_counter
+
+# Parameters of a query, with their default values
+DEFAULT_QUERY_PARAMETERS = {"compute_r": True, "compute_g": True,
+                            "compute_c": True, "compute_s": True,
+                            "radius": INFINITE_RADIUS, "network_radius": True,
+                            "beta": 1.0, "measures_to_normalize": [],
+                            "accumulator_fields": []}
+# Number of per-origin answers kept in the cache
+CACHE_CAPACITY = 10000
+# Number of recent requests kept for latency percentiles
+LATENCY_WINDOW = 1000
+
+
+class Latency_Metrics:
+    """
+    Records request latencies
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = Lock()
+
+    def record(self, seconds):
+        """
+        Records a request that took |seconds|
+        """
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.maximum = max(self.maximum, seconds)
+            self._recent.append(seconds)
+
+    def summary(self):
+        """
+        Returns a dictionary of latency statistics in milliseconds, with
+            percentiles over the recent requests
+        """
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total, maximum = self.count, self.total, self.maximum
+
+        def percentile(fraction):
+            if not recent:
+                return 0.0
+            return 1000 * recent[min(len(recent) - 1, int(fraction *
+                                                           len(recent)))]
+        return {"count": count,
+                "mean_ms": 1000 * total / count if count else 0.0,
+                "max_ms": 1000 * maximum, "p50_ms": percentile(0.5),
+                "p90_ms": percentile(0.9), "p99_ms": percentile(0.99)}
+
+
+class Centrality_Service:
+    """
+    Answers centrality queries on graphs held in memory
+    """
+
+    def __init__(self, graph_paths, cache_capacity=CACHE_CAPACITY):
+        """
+        |graph_paths|: dictionary mapping graph names to graphs saved with
+            |save_graph|
+        """
+        self.graphs = {}
+        self._sum_weights = {}
+        self._locks = {}
+        for name, path in graph_paths.items():
+            nodes, _, _ = load_graph(path)
+            # Drop the results saved with the graph
+            for node in nodes.values():
+                for attribute in result_attributes(node):
+                    delattr(node, attribute)
+            self.graphs[name] = nodes
+            self._sum_weights[name] = sum(getattr(node, WEIGHT) for node in
+                                          nodes.values())
+            self._locks[name] = Lock()
+        self.cache = LRUCache(cache_capacity)
+        self._cache_lock = Lock()
+        self.latency = Latency_Metrics()
+
+    def query(self, graph_name, origins, parameters=None):
+        """
+        Returns a dictionary mapping each of |origins| in the graph to a
+            dictionary of its measures.
+        |parameters|: overrides of |DEFAULT_QUERY_PARAMETERS|
+        """
+        start = perf_counter()
+        nodes = self.graphs[graph_name]
+        query_parameters = dict(DEFAULT_QUERY_PARAMETERS)
+        query_parameters.update(parameters or {})
+        unknown = set(query_parameters) - set(DEFAULT_QUERY_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown parameters: {sorted(unknown)}")
+        parameters_key = dumps(query_parameters, sort_keys=True)
+
+        answers = {}
+        missing = []
+        with self._cache_lock:
+            for s in origins:
+                if s not in nodes:
+                    continue
+                cached = self.cache.get((graph_name, s, parameters_key))
+                if cached is None:
+                    missing.append(s)
+                else:
+                    answers[s] = cached
+        if missing:
+            for s, measures in self._compute(graph_name, missing,
+                                             query_parameters).items():
+                answers[s] = measures
+                with self._cache_lock:
+                    self.cache.put((graph_name, s, parameters_key), measures)
+        self.latency.record(perf_counter() - start)
+        return answers
+
+    def _compute(self, graph_name, origins, parameters):
+        """
+        Runs the searches rooted at |origins| and returns their measures
+        """
+        nodes = self.graphs[graph_name]
+        measures_to_normalize = [measure for measure in
+                                 parameters["measures_to_normalize"] if
+                                 measure != BETWEENNESS]
+        # Searches write their results on the shared nodes
+        with self._locks[graph_name]:
+            compute_centrality(nodes, origins, parameters["compute_r"],
+                               parameters["compute_g"], False,
+                               parameters["compute_c"], parameters["compute_s"],
+                               parameters["radius"],
+                               parameters["network_radius"],
+                               parameters["beta"], [],
+                               parameters["accumulator_fields"])
+            compute_s = (parameters["compute_s"] and
+                         hasattr(next(iter(nodes.values())), LOCATION))
+            normalize_centrality(nodes, origins, parameters["compute_r"],
+                                 parameters["compute_g"], False,
+                                 parameters["compute_c"], compute_s,
+                                 parameters["beta"], measures_to_normalize,
+                                 self._sum_weights[graph_name])
+            measures = {}
+            for s in origins:
+                measures[s] = result_attributes(nodes[s])
+                # Leave no measures behind for the next query
+                for attribute in measures[s]:
+                    delattr(nodes[s], attribute)
+        return measures
+
+
+def make_handler(service):
+    """
+    Returns an HTTP request handler class answering queries with |service|
+    """
+
+    class Query_Handler(BaseHTTPRequestHandler):
+        """
+        Answers the requests of one connection
+        """
+
+        def _reply(self, status, body):
+            content = dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            if self.path == "/graphs":
+                self._reply(200, dict((name, len(nodes)) for name, nodes in
+                                      service.graphs.items()))
+            elif self.path == "/metrics":
+                metrics = service.latency.summary()
+                metrics["cache"] = {"size": len(service.cache),
+                                    "hits": service.cache.hits,
+                                    "misses": service.cache.misses}
+                self._reply(200, metrics)
+            else:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/query":
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                request = loads(self.rfile.read(int(
+                    self.headers["Content-Length"])))
+                answers = service.query(request["graph"], request["origins"],
+                                        request.get("parameters"))
+            except Exception as error:
+                self._reply(400, {"error": str(error)})
+                return
+            self._reply(200, {"results": [{"origin": s, "measures": measures}
+                                          for s, measures in answers.items()]})
+
+        def address_string(self):
+            # Unix socket clients have no address
+            return str(self.client_address[0]) if self.client_address else ""
+
+    return Query_Handler
+
+
+class Unix_HTTP_Server(ThreadingHTTPServer):
+    """
+    HTTP server on a Unix socket
+    """
+    address_family = AF_UNIX
+
+    def server_bind(self):
+        if exists(self.server_address):
+            remove(self.server_address)
+        ThreadingHTTPServer.server_bind(self)
+        self.server_name, self.server_port = self.server_address, 0
+
+
+def make_server(service, port=None, socket_path=None):
+    """
+    Returns an HTTP server for |service| on the local |port|, or on the Unix
+        socket at |socket_path|
+    """
+    if socket_path is not None:
+        return Unix_HTTP_Server(socket_path, make_handler(service))
+    return ThreadingHTTPServer(("127.0.0.1", port), make_handler(service))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Centrality query service")
+    parser.add_argument("graphs", nargs="+", metavar="NAME=GRAPH_PATH")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--socket", dest="socket_path")
+    arguments = parser.parse_args()
+    server = make_server(Centrality_Service(dict(graph.split("=", 1) for graph
+                                                 in arguments.graphs)),
+                         arguments.port, arguments.socket_path)
+    server.serve_forever()
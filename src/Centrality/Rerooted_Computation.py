@@ -0,0 +1,274 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for centrality computation with re-rooted shortest path trees.
+Origins are visited in chains where each origin is a graph neighbor of the
+    previous one. If |t| follows |s| across an edge of length l, then
+    d(t, v) <= d(s, v) + l for every node |v|, so the distances from |s|, shifted
+    by l, are upper bounds on the distances from |t|. Only the nodes whose
+    distance decreases are searched again, starting from |t|.
+The distances from |t| within the radius come out exact. A node whose shortest
+    path from |t| runs through a node that does not get closer is exactly l
+    farther from |t| than from |s|: it either keeps its shifted distance, or
+    was beyond the radius of |s| and is beyond that of |t|. A chain therefore
+    only ends when no unvisited origin neighbors it.
+Re-rooting pays when few distances decrease, but its bookkeeping runs in
+    Python while |compute_centrality| handles each origin in a single loop. An
+    update that lowers too many distances is dropped for a full search, and the
+    origins left are handed to |compute_centrality| once re-rooted chains take
+    longer per origin than the origins it computed first.
+"""
+
+from src.Common.Utils.Progress_Bar import Progress_Bar
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Centrality_Computation import normalize_centrality
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import CLOSENESS
+from src.Centrality.Constants import GRAVITY
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import MEMBER_COUNT
+from src.Centrality.Constants import NEIGHBORS
+from src.Centrality.Constants import ORIGIN_MEMBER_COUNT
+from src.Centrality.Constants import REACH
+from src.Centrality.Constants import STEP_4
+from src.Centrality.Constants import STRAIGHTNESS
+from src.Centrality.Constants import TOLERANCE
+from src.Centrality.Constants import WEIGHT
+from heapq import heappop
+from heapq import heappush
+from math import exp
+from src.Centrality.Computation_Utils import dist
+from src.Centrality.Computation_Utils import eq_tol
+from src.Centrality.Computation_Utils import lt_tol
+from time import perf_counter
+
+
+def origin_chains(nodes, origins):
+    """
+    Yields (origin, previous origin, edge length) triples visiting each origin
+        once. The previous origin is a graph neighbor of the origin, joined by an
+        edge of the given length, or None at the start of a chain.
+    """
+    origins = [s for s in origins if s in nodes]
+    is_origin = set(origins)
+    visited = set()
+    for start in origins:
+        if start in visited:
+            continue
+        visited.add(start)
+        yield start, None, None
+        s = start
+        while True:
+            # Follow the shortest edge to an origin that was not visited yet
+            next_origin = None
+            for w, d_sw, _ in getattr(nodes[s], NEIGHBORS):
+                if (w in is_origin and w not in visited and
+                        (next_origin is None or d_sw < next_origin[1])):
+                    next_origin = (w, d_sw)
+            if next_origin is None:
+                break
+            t, d_st = next_origin
+            visited.add(t)
+            yield t, s, d_st
+            s = t
+
+
+def _search(nodes, s, radius):
+    """
+    Returns the distances from |s| to the nodes within |radius| of it
+    """
+    d = {s: 0.0}
+    Q = [(0.0, s)]
+    settled = set()
+    while Q:
+        d_sv, v = heappop(Q)
+        if v in settled:
+            continue
+        settled.add(v)
+        for w, d_vw, _ in getattr(nodes[v], NEIGHBORS):
+            d_sw = d_sv + d_vw
+            if d_sw <= radius and (w not in d or lt_tol(d_sw, d[w])):
+                d[w] = d_sw
+                heappush(Q, (d_sw, w))
+    return d
+
+
+def _reroot(nodes, d, t, d_st, radius, max_updates):
+    """
+    Returns the distances from |t| to the nodes within |radius| of it, given the
+        distances |d| from its neighbor to the nodes within |radius| of that
+        neighbor. |d_st| is the length of the edge between the two. Returns
+        None if more than |max_updates| distances had to be lowered.
+    """
+    d_t = dict((v, d_sv + d_st) for v, d_sv in d.items())
+    d_t[t] = 0.0
+    Q = [(0.0, t)]
+    updates = 0
+    # Dijkstra restricted to the nodes that get closer
+    while Q:
+        d_tv, v = heappop(Q)
+        if lt_tol(d_t[v], d_tv):
+            continue
+        for w, d_vw, _ in getattr(nodes[v], NEIGHBORS):
+            d_tw = d_tv + d_vw
+            if d_tw <= radius and (w not in d_t or lt_tol(d_tw, d_t[w])):
+                d_t[w] = d_tw
+                heappush(Q, (d_tw, w))
+                updates += 1
+                if updates > max_updates:
+                    return None
+    return dict((v, d_tv) for v, d_tv in d_t.items() if d_tv <= radius)
+
+
+def _compute_searched(nodes, origins, compute_b, centrality_arguments):
+    """
+    Computes the measures of |origins| with |compute_centrality|, adding to the
+        betweenness computed so far, and leaves them to be normalized
+    """
+    if compute_b:
+        betweenness = dict((v, getattr(node, BETWEENNESS)) for v, node in
+                           nodes.items())
+    compute_centrality(nodes, origins, *centrality_arguments)
+    if compute_b:
+        for v, betweenness_v in betweenness.items():
+            setattr(nodes[v], BETWEENNESS, getattr(nodes[v], BETWEENNESS) +
+                    betweenness_v)
+
+
+def compute_centrality_rerooted(nodes, origins, compute_r, compute_g, compute_b,
+                                compute_c, compute_s, radius, network_radius,
+                                beta, measures_to_normalize, accumulator_fields,
+                                node_count=None, max_update_fraction=0.5,
+                                pilot_origins=20):
+    """
+    Computes the measures of |compute_centrality|, deriving the shortest path
+        tree of each origin from that of the previous origin when possible.
+    |max_update_fraction|: a tree is searched from scratch instead when more
+        than this fraction of its distances have to be lowered
+    |pilot_origins|: the number of origins computed with |compute_centrality|
+        before any is re-rooted, to time its searches. Once as many origins
+        have been re-rooted, the rest are computed with |compute_centrality| if
+        they took longer on average. With 0, all the chains are re-rooted.
+    All other parameters are as in |compute_centrality|. Accumulations, a
+        Euclidean radius, and edges too short to order shortest paths by
+        distance are not supported; |compute_centrality| is used for those,
+        and when too few origins neighbor each other for the pilot to pay off.
+        Distances are summed in another order than in |compute_centrality|,
+        so a node at the radius up to rounding may be counted by one and not
+        the other.
+    """
+    supported = (network_radius and not accumulator_fields and
+                 not any(d_vw <= TOLERANCE for node in nodes.values() for _, d_vw,
+                         _ in getattr(node, NEIGHBORS)))
+    chains = list(origin_chains(nodes, origins)) if supported else []
+    rerooted_count = sum(previous is not None for _, previous, _ in chains)
+    if rerooted_count == 0 or rerooted_count < 2 * pilot_origins:
+        compute_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                           compute_c, compute_s, radius, network_radius, beta,
+                           measures_to_normalize, accumulator_fields,
+                           node_count)
+        return
+
+    have_locations = hasattr(next(iter(nodes.values())), LOCATION)
+    compute_s = compute_s and have_locations
+    if compute_b:
+        for node in nodes.values():
+            setattr(node, BETWEENNESS, 0.0)
+    sum_weights = sum(getattr(nodes[s], WEIGHT) for s, _, _ in chains)
+    centrality_arguments = (compute_r, compute_g, compute_b, compute_c,
+                            compute_s, radius, network_radius, beta, [],
+                            accumulator_fields)
+
+    # Seconds per origin of the searches of |compute_centrality|, timed on the
+    #     last origins
+    if pilot_origins:
+        pilot = [s for s, _, _ in chains[-pilot_origins:]]
+        chains = chains[:-pilot_origins]
+        start = perf_counter()
+        _compute_searched(nodes, pilot, compute_b, centrality_arguments)
+        searched_seconds = (perf_counter() - start) / len(pilot)
+    # Seconds spent on the chains so far
+    chain_seconds = 0.0
+
+    progress = Progress_Bar(len(chains), 1, STEP_4)
+    for k, (s, previous, d_previous_s) in enumerate(chains):
+        if (pilot_origins and k >= pilot_origins and
+                chain_seconds > k * searched_seconds):
+            # Re-rooting does not pay on this graph
+            _compute_searched(nodes, [t for t, _, _ in chains[k:]], compute_b,
+                              centrality_arguments)
+            break
+        start = perf_counter()
+        # Distances from |s| to the nodes within the radius
+        d_s = None
+        if previous is not None:
+            d_s = _reroot(nodes, d, s, d_previous_s, radius,
+                          max_update_fraction * len(d))
+        d = d_s if d_s is not None else _search(nodes, s, radius)
+
+        weight_s = getattr(nodes[s], WEIGHT)
+        if have_locations:
+            location_s = getattr(nodes[s], LOCATION)
+        # Nodes of the tree in order of distance from |s|
+        S = sorted(d, key=d.get)
+
+        reach_s = -1
+        weighted_reach_s = -weight_s
+        gravity_s = 0.0
+        d_sum_s = 0.0
+        straightness_s = 0.0
+        for v in S:
+            d_sv = d[v]
+            weight_v = getattr(nodes[v], WEIGHT)
+            reach_s += getattr(nodes[v], MEMBER_COUNT, 1)
+            weighted_reach_s += weight_v
+            if d_sv > 0:
+                gravity_s += weight_v * exp(-d_sv * beta)
+                d_sum_s += weight_v * d_sv
+                if compute_s:
+                    straightness_s += (weight_v * dist(
+                        location_s, getattr(nodes[v], LOCATION)) / d_sv)
+
+        if compute_b:
+            origin_count_s = getattr(nodes[s], ORIGIN_MEMBER_COUNT, 1)
+            sigma = {s: 1.0}
+            P = {s: []}
+            for w in S[1:]:
+                sigma[w] = 0.0
+                P[w] = []
+                for v, d_vw, _ in getattr(nodes[w], NEIGHBORS):
+                    if v in d and eq_tol(d[v] + d_vw, d[w]):
+                        sigma[w] += sigma[v]
+                        P[w].append(v)
+            delta = dict((v, 0.0) for v in S)
+            for w in reversed(S):
+                weight_w = getattr(nodes[w], WEIGHT)
+                for v in P[w]:
+                    delta[v] += sigma[v] / sigma[w] * (weight_w + delta[w])
+                if w != s:
+                    setattr(nodes[w], BETWEENNESS, getattr(nodes[w], BETWEENNESS)
+                            + origin_count_s * delta[w])
+
+        if compute_r:
+            setattr(nodes[s], REACH, weighted_reach_s)
+        if compute_g:
+            setattr(nodes[s], GRAVITY, gravity_s)
+        if compute_c:
+            setattr(nodes[s], CLOSENESS, 1.0 / d_sum_s if d_sum_s > 0 else 0.0)
+        if compute_s:
+            setattr(nodes[s], STRAIGHTNESS, straightness_s)
+        nodes[s].reach = reach_s
+        nodes[s].weighted_reach = weighted_reach_s
+        chain_seconds += perf_counter() - start
+        progress.step()
+
+    normalize_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                         compute_c, compute_s, beta, measures_to_normalize,
+                         sum_weights, node_count)
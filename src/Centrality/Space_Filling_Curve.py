@@ -0,0 +1,81 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for ordering nodes along a space filling curve.
+Nodes that are close in space are close along the curve, so visiting the
+    origins in curve order has consecutive shortest path searches touch mostly
+    the same nodes, which are then still in the processor caches.
+"""
+
+from src.Centrality.Constants import HILBERT_CURVE
+from src.Centrality.Constants import MORTON_CURVE
+
+
+def hilbert_index(x, y, order):
+    """
+    Returns the position of cell (|x|, |y|) along the Hilbert curve filling a
+        2^|order| by 2^|order| grid
+    """
+    n = 1 << order
+    d = 0
+    s = n >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so that the curve stays continuous
+        if ry == 0:
+            if rx == 1:
+                x = n - 1 - x
+                y = n - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def morton_index(x, y, order):
+    """
+    Returns the position of cell (|x|, |y|) along the Morton (Z-order) curve
+        filling a 2^|order| by 2^|order| grid
+    """
+    d = 0
+    for bit in range(order):
+        d |= ((x >> bit) & 1) << (2 * bit)
+        d |= ((y >> bit) & 1) << (2 * bit + 1)
+    return d
+
+
+def curve_order(locations, curve=HILBERT_CURVE, order=16):
+    """
+    Returns the keys of |locations| sorted by position along a curve.
+    |locations|: dictionary mapping node id's to (x, y) locations
+    |curve|: |HILBERT_CURVE| or |MORTON_CURVE|
+    |order|: the curve fills a 2^|order| by 2^|order| grid laid over the
+        bounding box of the locations
+    """
+    if curve == HILBERT_CURVE:
+        index = hilbert_index
+    elif curve == MORTON_CURVE:
+        index = morton_index
+    else:
+        raise ValueError(f"Unknown curve: {curve}")
+    if not locations:
+        return []
+    min_x = min(x for x, _ in locations.values())
+    min_y = min(y for _, y in locations.values())
+    extent = max(max(x for x, _ in locations.values()) - min_x,
+                 max(y for _, y in locations.values()) - min_y)
+    cells = (1 << order) - 1
+    scale = cells / extent if extent > 0 else 0
+
+    def key(node_id):
+        x, y = locations[node_id]
+        return index(int((x - min_x) * scale), int((y - min_y) * scale), order)
+    return sorted(locations, key=key)
@@ -0,0 +1,127 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for centrality computation on the street network.
+Instead of a building-to-building adjacency list computed with OD cost
+    matrices, buildings are attached to the street edges they snap to, as in the
+    Redundancy tools. Each street edge is split at the buildings on it, so the
+    graph has one node per junction and per building, and one edge per street
+    segment between them.
+"""
+
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Centrality_Computation import normalize_centrality
+from src.Centrality.Constants import LOCATION
+from src.Centrality.Constants import MEMBER_COUNT
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Node import Node
+from collections import defaultdict
+
+
+def junction_id(network_node_id):
+    """
+    Returns the graph node id for the junction |network_node_id|
+    """
+    return ("Junction", network_node_id)
+
+
+def building_id(point_id):
+    """
+    Returns the graph node id for the building |point_id|
+    Junction and building ids are tagged tuples so that they stay distinct and
+        comparable when the Dijkstra queue breaks ties
+    """
+    return ("Building", point_id)
+
+
+def build_street_graph(network, points, length_scale=1.0):
+    """
+    Builds a graph of the street junctions and buildings.
+    |network|: a csNetwork
+    |points|: a mapping from building ids to csPoint objects, as returned by
+        |loadBuildingsOnNetwork|
+    |length_scale|: units of the impedance per unit of the coordinates of
+        |network|; edge lengths and locations are scaled by it, so that the
+        distances are in the units of the search radius
+    Junctions have weight 0 and |MEMBER_COUNT| 0, so they route shortest paths
+        without counting towards any measure. Returns the graph and the number
+        of buildings that could not be placed on a network edge.
+    """
+    graph = {}
+    for network_node_id, network_node in network.Nodes.items():
+        node = Node()
+        setattr(node, WEIGHT, 0.0)
+        setattr(node, MEMBER_COUNT, 0)
+        setattr(node, LOCATION, tuple(length_scale * coordinate for coordinate
+                                      in network_node.Point[:2]))
+        graph[junction_id(network_node_id)] = node
+
+    # Group the buildings by the edge they are on
+    edge_to_point_ids = defaultdict(list)
+    unplaced_count = 0
+    for point_id, point in points.items():
+        if point.Segment not in network.Edges:
+            unplaced_count += 1
+            continue
+        node = Node()
+        if point.Weight is not None:
+            setattr(node, WEIGHT, point.Weight)
+        setattr(node, LOCATION, tuple(length_scale * coordinate for coordinate
+                                      in point.Point[:2]))
+        graph[building_id(point_id)] = node
+        edge_to_point_ids[point.Segment].append(point_id)
+
+    def connect(u, v, length):
+        graph[u].add_neighbor(v, length_scale * length)
+        graph[v].add_neighbor(u, length_scale * length)
+
+    # Split each edge at the buildings on it, in order of position along it
+    for edge_id, edge in network.Edges.items():
+        previous_id = junction_id(edge.Start)
+        previous_position = 0.0
+        for point_id in sorted(edge_to_point_ids[edge_id],
+                               key=lambda point_id: points[point_id].tValue):
+            position = points[point_id].tValue * edge.Length
+            connect(previous_id, building_id(point_id),
+                    position - previous_position)
+            previous_id, previous_position = building_id(point_id), position
+        connect(previous_id, junction_id(edge.End),
+                edge.Length - previous_position)
+    return graph, unplaced_count
+
+
+def compute_street_graph_centrality(network, points, origins, compute_r,
+                                    compute_g, compute_b, compute_c, compute_s,
+                                    radius, network_radius, beta,
+                                    measures_to_normalize, length_scale=1.0):
+    """
+    Computes reach, gravity, betweenness, closeness, and straightness for the
+        buildings in |points| by searching the street graph of |network|.
+    |network|: a csNetwork
+    |points|: a mapping from building ids to csPoint objects
+    |length_scale|: as in |build_street_graph|
+    All other parameters are as in |compute_centrality|. Distances are street
+        lengths; accumulator attributes are not available in this model.
+    Returns a dictionary mapping building ids to |Node| objects holding the
+        results, and the number of buildings that could not be placed.
+    """
+    graph, unplaced_count = build_street_graph(network, points, length_scale)
+    compute_centrality(graph, [building_id(s) for s in origins if
+                               building_id(s) in graph], compute_r, compute_g,
+                       compute_b, compute_c, compute_s, radius, network_radius,
+                       beta, [], [])
+    # Normalize among buildings only
+    nodes = dict((point_id, graph[building_id(point_id)]) for point_id in
+                 points if building_id(point_id) in graph)
+    sum_weights = sum(getattr(nodes[s], WEIGHT) for s in origins if s in nodes)
+    normalize_centrality(nodes, origins, compute_r, compute_g, compute_b,
+                         compute_c, compute_s, beta, measures_to_normalize,
+                         sum_weights)
+    return nodes, unplaced_count
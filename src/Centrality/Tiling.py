@@ -0,0 +1,226 @@
+# ------------------------------------------------------------------------------
+# Urban Network Analysis Toolbox for ArcGIS10
+# Credits: Michael Mekonnen, Andres Sevtsuk
+# MIT City Form Research Group
+# Usage: Creative Commons Attribution - NonCommercial - ShareAlike 3.0 Unported
+#   License
+# License: http://creativecommons.org/licenses/by-nc-sa/3.0/
+# ------------------------------------------------------------------------------
+
+"""
+Script for centrality computation one spatial tile at a time.
+With a network radius, the shortest path tree of an origin stays within the
+    radius of it. The study area is split into square tiles, and each tile is
+    loaded with a halo one radius wide around it, which holds every tree rooted
+    at an origin of the tile. Measures of the origins are taken from their own
+    tile, and betweenness contributions, which also land on halo nodes, are
+    summed over the tiles. Only one tile (per process) is held in memory.
+The halo is measured with Euclidean distance, which is a lower bound on
+    network distance only when the impedance is a length. Its width must be
+    the radius converted to the units of the node locations.
+The rows of the adjacency list are split by tile in one pass (see |Tile_Rows|),
+    so that each tile reads only the rows of the tiles its region covers.
+"""
+
+from src.Centrality.Centrality_Computation import normalize_centrality
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import STRAIGHTNESS
+from src.Centrality.Constants import WEIGHT
+from src.Centrality.Node import Node
+from src.Centrality.Partitioned_Computation import compute_partitions
+from glob import glob
+from math import floor
+from os import makedirs
+from os import remove
+from os.path import exists
+from os.path import join
+from pickle import dump
+from pickle import HIGHEST_PROTOCOL
+from pickle import load
+from src.Centrality.Computation_Utils import Invalid_Parameters_Exception
+
+# Number of rows of a tile buffered before they are written to its file
+ROW_BATCH_SIZE = 10000
+
+
+def tile_of(location, tile_size):
+    """
+    Returns the (column, row) of the tile containing |location|
+    """
+    x, y = location
+    return (floor(x / tile_size), floor(y / tile_size))
+
+
+def tile_regions(locations, origins, tile_size, halo):
+    """
+    Returns a list of (tile origins, region) pairs, one for each tile containing
+        origins, where the region is the set of nodes within |halo| of the tile.
+    |locations|: dictionary mapping node id's to (x, y) locations
+    |origins|: the origins, those without a location are ignored
+    |tile_size|: the side length of the tiles
+    |halo|: the width of the halo
+    """
+    # Nodes grouped by tile
+    tiles = {}
+    for node_id, location in locations.items():
+        tiles.setdefault(tile_of(location, tile_size), []).append(node_id)
+    tile_origins = {}
+    for s in origins:
+        if s in locations:
+            tile_origins.setdefault(tile_of(locations[s], tile_size),
+                                    []).append(s)
+
+    # Number of tiles the halo may extend into, on each side
+    reach = int(floor(halo / tile_size)) + 1
+    regions = []
+    for (column, row), origins_in_tile in sorted(tile_origins.items()):
+        min_x, min_y = column * tile_size, row * tile_size
+        max_x, max_y = min_x + tile_size, min_y + tile_size
+        region = set()
+        for other_column in range(column - reach, column + reach + 1):
+            for other_row in range(row - reach, row + reach + 1):
+                for node_id in tiles.get((other_column, other_row), []):
+                    x, y = locations[node_id]
+                    # Distance from the node to the tile
+                    dx = max(min_x - x, 0, x - max_x)
+                    dy = max(min_y - y, 0, y - max_y)
+                    if dx * dx + dy * dy <= halo * halo:
+                        region.add(node_id)
+        regions.append((origins_in_tile, region))
+    return regions
+
+
+class Tile_Rows:
+    """
+    Rows of an adjacency list split by tile, in one file per tile in
+        |directory|. A row goes to the tile of its first node, whose location
+        is given by |locations|; rows of nodes without a location are dropped.
+    """
+
+    def __init__(self, directory, locations, tile_size):
+        self._directory = directory
+        self._locations = locations
+        self._tile_size = tile_size
+
+    def _path(self, tile):
+        column, row = tile
+        return join(self._directory, f"{column}_{row}.pkl")
+
+    def _append(self, tile, rows):
+        with open(self._path(tile), "ab") as tile_file:
+            dump(rows, tile_file, HIGHEST_PROTOCOL)
+
+    def write(self, rows, batch_size=ROW_BATCH_SIZE):
+        """
+        Splits |rows|, tuples starting with the ids of their two nodes, by
+            tile, replacing the rows written before
+        """
+        makedirs(self._directory, exist_ok=True)
+        for path in glob(join(self._directory, "*.pkl")):
+            remove(path)
+        batches = {}
+        for row in rows:
+            if row[0] not in self._locations:
+                continue
+            tile = tile_of(self._locations[row[0]], self._tile_size)
+            batch = batches.setdefault(tile, [])
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self._append(tile, batch)
+                batches[tile] = []
+        for tile, batch in batches.items():
+            if batch:
+                self._append(tile, batch)
+
+    def region_rows(self, region):
+        """
+        Yields the rows whose two nodes are in |region|, a set of node id's,
+            reading only the files of the tiles of its nodes
+        """
+        tiles = set(tile_of(self._locations[node_id], self._tile_size) for
+                    node_id in region if node_id in self._locations)
+        for tile in sorted(tiles):
+            if not exists(self._path(tile)):
+                continue
+            with open(self._path(tile), "rb") as tile_file:
+                while True:
+                    try:
+                        rows = load(tile_file)
+                    except EOFError:
+                        break
+                    for row in rows:
+                        if row[0] in region and row[1] in region:
+                            yield row
+
+
+def compute_centrality_by_tile(load_region, locations, origins, compute_r,
+                               compute_g, compute_b, compute_c, compute_s,
+                               radius, network_radius, beta,
+                               measures_to_normalize, accumulator_fields,
+                               tile_size, node_count=None, processes=1,
+                               halo=None):
+    """
+    Computes the measures of |compute_centrality| one tile at a time.
+    |load_region|: function that returns the graph induced by a set of node
+        id's, as a dictionary mapping node id's to |Node| objects
+    |locations|: dictionary mapping node id's to (x, y) locations
+    |tile_size|: the side length of the tiles
+    |node_count|: the number of nodes in the whole graph, defaults to the number
+        of nodes with a location
+    |processes|: the number of tiles computed in parallel
+    |halo|: the width of the halo, |radius| in the units of the locations,
+        defaults to |radius|
+    All other parameters are as in |compute_centrality|; |radius| must be a
+        finite network radius. Returns a dictionary mapping node id's to |Node|
+        objects holding the results, without their neighbors.
+    """
+    if not network_radius:
+        raise Invalid_Parameters_Exception("tiling requires a network radius")
+    regions = tile_regions(locations, origins, tile_size,
+                           radius if halo is None else halo)
+    results = {}
+    centrality_arguments = (compute_r, compute_g, compute_b, compute_c,
+                            compute_s, radius, network_radius, beta, [],
+                            accumulator_fields)
+
+    # Weights of the origins, which the results leave out
+    origin_weights = {}
+
+    def tiles():
+        for origins_in_tile, region in regions:
+            tile_nodes = load_region(region)
+            for s in origins_in_tile:
+                if s in tile_nodes:
+                    origin_weights[s] = getattr(tile_nodes[s], WEIGHT)
+            yield tile_nodes, origins_in_tile
+
+    for index, tile_results in compute_partitions(tiles(), centrality_arguments,
+                                                  processes, sum(
+                                                      len(origins_in_tile) for
+                                                      origins_in_tile, _ in
+                                                      regions)):
+        own_origins = set(regions[index][0])
+        for node_id, attributes in tile_results.items():
+            if node_id not in results:
+                results[node_id] = Node()
+                if compute_b:
+                    setattr(results[node_id], BETWEENNESS, 0.0)
+            node = results[node_id]
+            if compute_b:
+                setattr(node, BETWEENNESS, getattr(node, BETWEENNESS) +
+                        attributes.get(BETWEENNESS, 0.0))
+            if node_id in own_origins:
+                setattr(node, WEIGHT, origin_weights[node_id])
+                for attribute, value in attributes.items():
+                    if attribute != BETWEENNESS:
+                        setattr(node, attribute, value)
+
+    sum_weights = sum(getattr(results[s], WEIGHT) for s in origins if s in
+                      results)
+    compute_s = compute_s and any(hasattr(node, STRAIGHTNESS) for node in
+                                  results.values())
+    normalize_centrality(results, origins, compute_r, compute_g, compute_b,
+                         compute_c, compute_s, beta, measures_to_normalize,
+                         sum_weights, len(locations) if node_count is None else
+                         node_count)
+    return results
@@ -9,26 +9,31 @@
 
 """
 Utility methods.
+arcpy is imported by the methods that need it, so that the others can be used
+    without ArcGIS.
 """
 
-from arcpy import AddMessage
-from arcpy import AddWarning
-from arcpy import CalculateLocations_na
-from arcpy import Delete_management
-from arcpy import Describe
-from arcpy import Exists
-from arcpy import FeatureToPoint_management
-from arcpy import UpdateCursor
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Messages import add_warning
 from src.Centrality.Constants import CALCULATE_LOCATIONS_FINISHED
 from src.Centrality.Constants import CALCULATE_LOCATIONS_STARTED
 from src.Centrality.Constants import EDGE_FEATURE
+from src.Centrality.Constants import INVALID_STEP_4_OPTIONS
+from src.Centrality.Constants import INVALID_STREET_MODEL_ACCUMULATORS
+from src.Centrality.Constants import INVALID_STREET_MODEL_IMPEDANCE
 from src.Centrality.Constants import JUNCTION_FEATURE
+from src.Centrality.Constants import METERS_PER_UNIT
 from src.Centrality.Constants import POINT_CONVERSION_DONE
 from src.Centrality.Constants import SEARCH_TOLERANCE
-from src.Centrality.Constants import TOLERANCE
 from src.Centrality.Constants import WARNING_NO_EDGE_FEATURE
 from src.Centrality.Constants import WARNING_NO_JUNCTION_FEATURE
-from math import sqrt
+from src.Centrality.Constants import WARNING_OPTIONS_IGNORED
+from src.Centrality.Computation_Utils import dist
+from src.Centrality.Computation_Utils import eq_tol
+from src.Centrality.Computation_Utils import Invalid_Parameters_Exception
+from src.Centrality.Computation_Utils import lt_tol
+from src.Centrality.Computation_Utils import merge_maps
+from src.Centrality.Computation_Utils import trim
 from os import remove
 from os import rmdir
 from os.path import basename as os_basename
@@ -49,20 +54,15 @@ class Invalid_Input_Exception(Exception):
         Exception.__init__(self, "Invalid Input: %s" % input_name)
 
 
-class Invalid_Parameters_Exception(Exception):
-    """
-    Exception thrown when parameters to a method are invalid
-    """
-    pass
-
-
 def to_point_feature_class(feature_class, point_feature_class, point_location):
     """
     Converts a feature class to a point feature class
     |point_location|: parameter for conversion, should be "CENTROID" or "INSIDE"
     """
+    from arcpy import Exists
+    from arcpy import FeatureToPoint_management
     if Exists(point_feature_class):
-        AddMessage(POINT_CONVERSION_DONE)
+        add_message(POINT_CONVERSION_DONE)
     else:
         FeatureToPoint_management(in_features=feature_class,
                                   out_feature_class=point_feature_class,
@@ -75,6 +75,7 @@ def all_values_in_column(table, column):
     |table|: a dbf
     |column|: the name of a column in the table, the column must be in the table
     """
+    from arcpy import UpdateCursor
     values = set()
     rows = UpdateCursor(table)
     for row in rows:
@@ -87,6 +88,7 @@ def network_features(network):
     Returns the junction and edge feature names of |network|
     |network|: a network dataset
     """
+    from arcpy import Describe
     edge_feature = None
     junction_feature = None
     for source in Describe(network).sources:
@@ -95,42 +97,99 @@ def network_features(network):
         elif source.sourceType in JUNCTION_FEATURE:
             junction_feature = source.name
     if edge_feature is None:
-        AddWarning(WARNING_NO_EDGE_FEATURE(network))
+        add_warning(WARNING_NO_EDGE_FEATURE(network))
         raise Invalid_Input_Exception("Input Network")
     if junction_feature is None:
-        AddWarning(WARNING_NO_JUNCTION_FEATURE(network))
+        add_warning(WARNING_NO_JUNCTION_FEATURE(network))
         raise Invalid_Input_Exception("Input Network")
     return junction_feature, edge_feature
 
 
+def radius_in_location_units(network, impedance, radius):
+    """
+    Returns |radius|, in the units of the cost attribute |impedance| of
+        |network|, converted to the units of the coordinates of |network|.
+        Returns None if |impedance| is not a length, if the coordinates are
+        not projected, or if |network| cannot be described without arcpy.
+    """
+    try:
+        from arcpy import Describe
+    except ImportError:
+        return None
+    description = Describe(network)
+    units = [attribute.units for attribute in description.attributes if
+             attribute.name == impedance]
+    spatial_reference = description.spatialReference
+    if (not units or units[0] not in METERS_PER_UNIT or
+            spatial_reference.type != "Projected"):
+        return None
+    return radius * METERS_PER_UNIT[units[0]] / spatial_reference.metersPerUnit
+
+
+def check_step_4_options(impedances, collapse, decompose, street_model, tiled,
+                         out_of_core):
+    """
+    Checks the options that choose how the measures are computed in Step 4.
+    |impedances|: the additional impedances to compute measures for
+    |collapse|: merge co-located nodes?
+    |decompose|: compute one connected component at a time?
+    |street_model|: search the street graph?
+    |tiled|: compute one tile at a time?
+    |out_of_core|: keep the graph in a |Graph_Store|?
+    Raises |Invalid_Parameters_Exception| if more than one of |impedances|,
+        |collapse| and |decompose| is requested, and warns about the requested
+        options that the street graph, tiles or graph store leave out.
+    """
+    options = [option for option, requested in [
+        ("ADDITIONAL_IMPEDANCES", bool(impedances)),
+        ("COLLAPSE_CO_LOCATED_NODES", collapse),
+        ("DECOMPOSE_COMPONENTS", decompose)] if requested]
+    if len(options) > 1:
+        raise Invalid_Parameters_Exception(INVALID_STEP_4_OPTIONS(options))
+    if options and street_model:
+        add_warning(WARNING_OPTIONS_IGNORED(options, "with the street graph "
+                                                     "model"))
+    elif options and tiled:
+        add_warning(WARNING_OPTIONS_IGNORED(options, "with tiles"))
+    elif impedances and out_of_core:
+        add_warning(WARNING_OPTIONS_IGNORED(options, "with OUT_OF_CORE_GRAPH"))
+
+
+def street_model_length_scale(network, impedance, accumulators):
+    """
+    Checks the inputs of the street graph model, which measures street lengths
+        in the units of the coordinates of |network|.
+    |impedance|: the cost attribute of |network| that the search radius is in
+    |accumulators|: the attributes requested to be accumulated
+    Returns the number of units of |impedance| per unit of the coordinates.
+        Raises |Invalid_Parameters_Exception| if |impedance| is not a length or
+        if there are |accumulators|, which the street graph does not record.
+    """
+    if accumulators:
+        raise Invalid_Parameters_Exception(
+            INVALID_STREET_MODEL_ACCUMULATORS(accumulators))
+    location_units = radius_in_location_units(network, impedance, 1.0)
+    if location_units is None:
+        raise Invalid_Parameters_Exception(
+            INVALID_STREET_MODEL_IMPEDANCE(impedance))
+    return 1.0 / location_units
+
+
 def calculate_network_locations(points, network):
     """
     Computes the locations of |points| in |network|
     |points|: a feature class (points or polygons)
     |network|: a network dataset
     """
-    AddMessage(CALCULATE_LOCATIONS_STARTED)
+    from arcpy import CalculateLocations_na
+    add_message(CALCULATE_LOCATIONS_STARTED)
     CalculateLocations_na(in_point_features=points,
                           in_network_dataset=network,
                           search_tolerance=SEARCH_TOLERANCE,
                           search_criteria=("%s SHAPE; %s SHAPE;" %
                                            network_features(network)),
                           exclude_restricted_elements="INCLUDE")
-    AddMessage(CALCULATE_LOCATIONS_FINISHED)
-
-
-def eq_tol(a, b):
-    """
-    Returns True if |a| and |b| are within |TOLERANCE|, False otherwise
-    """
-    return abs(a - b) <= TOLERANCE
-
-
-def lt_tol(a, b):
-    """
-    Returns True if |a| is less than |b| by more than |TOLERANCE|, False otherwise
-    """
-    return b - a > TOLERANCE
+    add_message(CALCULATE_LOCATIONS_FINISHED)
 
 
 def basename(path):
@@ -146,6 +205,8 @@ def delete(path):
     """
     try:
         # Attempt to delete using arcpy methods
+        from arcpy import Delete_management
+        from arcpy import Exists
         if Exists(path):
             Delete_management(path)
     except:
@@ -159,38 +220,6 @@ def delete(path):
             pass
 
 
-def trim(field_name):
-    """
-    Returns the first 10 characters of |field_name|
-    (DBF files truncate field names to 10 characters)
-    """
-    return field_name[:10]
-
-
-def dist(loc1, loc2):
-    """
-    Computes the euclidean distance between |loc1| and |loc2|
-    |loc1|: (x1, y1)
-    |loc2|: (x2, y2)
-    """
-    x1, y1 = loc1
-    x2, y2 = loc2
-    return sqrt((x1 - x2)**2 + (y1 - y2)**2)
-
-
-def merge_maps(map1, map2, f):
-    """
-    Returns comb_map, such that comb_map[key] = |f|(|map1|[key], |map2|[key])
-    |map1| and |map2| must have the same keys
-    """
-    if set(map1.keys()) != set(map2.keys()):
-        raise Exception("Invalid input, dictionaries must have the same keys")
-    comb_map = {}
-    for key in map1:
-        comb_map[key] = f(map1[key], map2[key])
-    return comb_map
-
-
 def row_has_field(row, field):
     """
     Returns True if |row| has the field |field|, False otherwise
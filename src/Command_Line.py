@@ -0,0 +1,330 @@
+"""
+Command line runner for the Centrality, Redundancy Index and Redundant Paths
+    tools, for running them on local files outside of ArcGIS Pro, e.g.
+    python -m src.Command_Line centrality --buildings buildings.shp
+        --network streets_ND --id-field FID --impedance Length
+        --measures Reach Betweenness --radius 600 --output-dir out
+        --output-name results
+Options may also be given in a JSON file with --config, whose keys are the
+    option names with underscores, e.g. {"radius": 600}. Options on the
+    command line override the file.
+The tools run headless: messages and progress go to standard error, results are
+    not displayed in a map, and a JSON report of the run with the time taken by
+    each stage is written to standard output, or to the --timings file. With
+    --trace, the spans of the run are written to a Chrome trace file. With
+    --progress-log, progress is also logged to a JSON lines file.
+The tools use arcpy for their geoprocessing when it can be imported: network
+    locations, the OD cost matrix of the adjacency list, the network dataset
+    and the output layers, as with the Python of ArcGIS Pro or ArcGIS Server,
+    including ArcGIS Server on Linux. On a plain Python, the Centrality and
+    Redundancy Index tools read and write shapefiles instead: the network is
+    the shapefile of its edges, the points must have network locations, and
+    Centrality needs the adjacency list of a previous run. The Redundant Paths
+    tool needs arcpy, and the runner reports that it is missing without
+    running the tool. Centrality can also be computed on graphs given as
+    arrays with src.Centrality.Library.
+"""
+
+from argparse import ArgumentParser
+from importlib import import_module
+from json import dump
+from json import load
+from os.path import abspath
+from os.path import dirname
+from re import match
+from src.Common.Utils.Messages import message_log
+from src.Common.Utils.Messages import set_headless
+from src.Common.Utils.Progress_Bar import JSON_Lines_Sink
+from src.Common.Utils.Progress_Bar import progress_sinks
+from src.Common.Utils.Progress_Bar import set_progress_sinks
+from src.Common.Utils.Tracing import start_tracing
+from src.Common.Utils.Tracing import stop_tracing
+from src.Common.Utils.Tracing import write_trace
+from sys import argv
+from sys import exit
+from sys import path
+from sys import stdout
+from time import perf_counter
+
+# Directory of the tool scripts, where the tools find their symbology layers
+SRC_DIR = dirname(abspath(__file__))
+
+# Toolbox values of boolean and missing parameters
+TRUE = "true"
+FALSE = "false"
+MISSING = "#"
+
+# Toolbox options for the radius of the Centrality tool
+EUCLIDEAN_OPTION = "Euclidean"
+
+# Modules of ArcGIS that the tools import
+ARCGIS_MODULES = ("arcpy", "arcgisscripting")
+
+# Messages that start and end a stage of a tool, e.g. "[2 started] Building
+#     graph" and "[2 finished]" for the Centrality tool, and "Computing
+#     redundancy indices ..." and "Done." for the Redundancy tools
+STAGE_STARTED = r"(?:\.\.\. )?\[(?:\d+ )?started\] (.*)|(.*) \.\.\.$"
+STAGE_ENDED = r"(?:\.\.\. )?\[(?:\d+ )?(finished|failed)\]|(Done)\.$"
+
+
+def ARCGIS_REQUIRED(tool, module):
+    return (f"The {tool} tool needs ArcGIS: {module} cannot be imported. Run it "
+            "with the Python of ArcGIS Pro or ArcGIS Server.")
+
+
+def _flag(value):
+    return TRUE if value else FALSE
+
+
+def _optional(value):
+    return MISSING if value is None else str(value)
+
+
+def _list(values):
+    return ";".join(values) if values else MISSING
+
+
+def _add_option(parser, config, name, **kwargs):
+    """
+    Adds option --|name| to |parser|, required unless it has a default or is
+        given in |config|
+    """
+    dest = name.replace("-", "_")
+    if dest in config:
+        kwargs["default"] = config[dest]
+    elif "default" not in kwargs and kwargs.get("action") != "store_true":
+        kwargs["required"] = True
+    parser.add_argument(f"--{name}", dest=dest, **kwargs)
+
+
+def _add_centrality_options(parser, config):
+    from src.Centrality.Constants import METRICS
+    _add_option(parser, config, "buildings",
+                help="input buildings (points or polygons)")
+    _add_option(parser, config, "inside", action="store_true",
+                help="place polygon buildings inside, rather than at their "
+                "centroid")
+    _add_option(parser, config, "network", help="input network dataset")
+    _add_option(parser, config, "measures", nargs="+", choices=METRICS,
+                default=list(METRICS), help="measures to compute")
+    _add_option(parser, config, "id-field", help="building id field")
+    _add_option(parser, config, "weight-field", default=None,
+                help="building weight field")
+    _add_option(parser, config, "impedance", help="impedance attribute")
+    _add_option(parser, config, "radius", type=float, default=None,
+                help="search radius, none by default")
+    _add_option(parser, config, "euclidean-radius", action="store_true",
+                help="measure the radius as the crow flies")
+    _add_option(parser, config, "beta", type=float, default=1.0,
+                help="gravity exponent")
+    _add_option(parser, config, "normalize", nargs="+", choices=METRICS,
+                default=[], help="measures to normalize")
+    _add_option(parser, config, "output-dir", help="output directory")
+    _add_option(parser, config, "output-name", help="output file name")
+    _add_option(parser, config, "accumulate", nargs="+", default=[],
+                help="cost attributes to accumulate")
+
+
+def _centrality_argv(options):
+    from src.Centrality.Constants import METRICS
+    from src.Centrality.Constants import ON_THE_NETWORK_OPTION
+    return ([options.buildings, _flag(options.inside), options.network] +
+            [_flag(measure in options.measures) for measure in METRICS] +
+            [options.id_field, _optional(options.weight_field),
+             options.impedance, _optional(options.radius),
+             EUCLIDEAN_OPTION if options.euclidean_radius else
+             ON_THE_NETWORK_OPTION, str(options.beta),
+             _list(options.normalize), options.output_dir,
+             options.output_name, _list(options.accumulate),
+             # Output feature class, set by the tool
+             MISSING])
+
+
+def _add_redundancy_options(parser, config):
+    _add_option(parser, config, "network", help="input network dataset")
+    _add_option(parser, config, "points", help="input points")
+    _add_option(parser, config, "origins-field",
+                help="field flagging the origins")
+    _add_option(parser, config, "destinations-field",
+                help="field flagging the destinations")
+    _add_option(parser, config, "coefficient", type=float, default=1.2,
+                help="redundancy coefficient, at least 1")
+    _add_option(parser, config, "radius", type=float, default=None,
+                help="search radius, none by default")
+    _add_option(parser, config, "output-dir", help="output directory")
+    _add_option(parser, config, "output-name", help="output file name")
+
+
+def _add_redundancy_index_options(parser, config):
+    _add_redundancy_options(parser, config)
+    _add_option(parser, config, "weight-field", default=None,
+                help="building weight field")
+
+
+def _redundancy_index_argv(options):
+    return [options.network, options.points, options.origins_field,
+            options.destinations_field, _optional(options.weight_field),
+            str(options.coefficient), _optional(options.radius),
+            options.output_dir, options.output_name]
+
+
+def _add_redundant_paths_options(parser, config):
+    _add_redundancy_options(parser, config)
+    _add_option(parser, config, "wayfinding", action="store_true",
+                help="compute wayfinding")
+    _add_option(parser, config, "visualization", default="None",
+                choices=["Unique Segments", "Path Polylines", "None"],
+                help="how to visualize the paths")
+
+
+def _redundant_paths_argv(options):
+    return [options.network, options.points, options.origins_field,
+            options.destinations_field, str(options.coefficient),
+            _optional(options.radius), options.output_dir,
+            options.output_name, _flag(options.wayfinding),
+            options.visualization]
+
+
+# For each tool: its module, the function adding its options to a parser, and
+#     the function turning its options into the arguments the toolbox passes
+TOOLS = {"centrality": ("src.Centrality.Main", _add_centrality_options,
+                        _centrality_argv),
+         "redundancy-index": ("src.Redundancy.RedundancyIndexMain",
+                              _add_redundancy_index_options,
+                              _redundancy_index_argv),
+         "redundant-paths": ("src.Redundancy.RedundantPathsMain",
+                             _add_redundant_paths_options,
+                             _redundant_paths_argv)}
+
+
+def parse_options(arguments):
+    """
+    Returns the options given by the command line |arguments|, and by the
+        config file they name
+    """
+    config_parser = ArgumentParser(add_help=False)
+    config_parser.add_argument("--config")
+    config_file_name = config_parser.parse_known_args(arguments)[0].config
+    config = {}
+    if config_file_name is not None:
+        with open(config_file_name) as config_file:
+            config = load(config_file)
+
+    parser = ArgumentParser(description=__doc__.split("\n")[0])
+    tool_parsers = parser.add_subparsers(dest="tool", required=True)
+    for tool, (_, add_options, _) in TOOLS.items():
+        tool_parser = tool_parsers.add_parser(tool)
+        tool_parser.add_argument("--config",
+                                 help="JSON file of option values")
+        tool_parser.add_argument("--timings",
+                                 help="file for the JSON report, standard "
+                                 "output by default")
+        tool_parser.add_argument("--trace",
+                                 help="file for a Chrome trace of the run")
+        tool_parser.add_argument("--progress-log",
+                                 help="JSON lines file to log progress to")
+        add_options(tool_parser, config)
+    options = parser.parse_args(arguments)
+    unknown = set(config) - set(vars(options))
+    if unknown:
+        parser.error(f"Unknown options in {config_file_name}: "
+                     f"{', '.join(sorted(unknown))}")
+    return options
+
+
+def tool_argv(options):
+    """
+    Returns the arguments the toolbox would pass to the tool of |options|
+    """
+    return TOOLS[options.tool][2](options)
+
+
+def stage_timings(log):
+    """
+    Returns the (stage, seconds, status) triples of the stages in the message
+        |log| of a run, see |message_log|
+    """
+    stages = []
+    started = []
+    for seconds, _, message in log:
+        start = match(STAGE_STARTED, message.strip())
+        end = match(STAGE_ENDED, message.strip())
+        if start:
+            started.append((start.group(1) or start.group(2), seconds))
+        elif end and started:
+            stage, start_seconds = started.pop()
+            status = "failed" if end.group(1) == "failed" else "finished"
+            stages.append((stage, seconds - start_seconds, status))
+    return stages
+
+
+def run(options):
+    """
+    Runs the tool of |options| headless, and returns the report of the run
+    """
+    from src.Centrality.Constants import FAILURE
+    tool_arguments = tool_argv(options)
+    try:
+        tool_main = import_module(TOOLS[options.tool][0]).main
+    except ModuleNotFoundError as exception:
+        if exception.name not in ARCGIS_MODULES:
+            raise
+        # Nothing can run without ArcGIS
+        return {"tool": options.tool, "arguments": tool_arguments,
+                "success": False,
+                "error": ARCGIS_REQUIRED(options.tool, exception.name),
+                "seconds": 0.0, "stages": [], "messages": []}
+    # The tools read their inputs from the arguments, as from the toolbox
+    argv[1:] = tool_arguments
+    set_headless(True)
+    if options.trace:
+        start_tracing()
+    sinks = progress_sinks()
+    if options.progress_log:
+        progress_log = JSON_Lines_Sink(options.progress_log)
+        set_progress_sinks(sinks + [progress_log])
+    start = perf_counter()
+    error = None
+    try:
+        tool_main()
+    except Exception as exception:
+        error = repr(exception)
+    seconds = perf_counter() - start
+    if options.trace:
+        stop_tracing()
+        write_trace(options.trace)
+    if options.progress_log:
+        set_progress_sinks(sinks)
+        progress_log.close()
+    log = message_log()
+    set_headless(False)
+    success = error is None and not any(
+        message_type == "error" or message == FAILURE for _, message_type,
+        message in log)
+    return {"tool": options.tool, "arguments": tool_arguments,
+            "success": success, "error": error, "seconds": seconds,
+            "stages": [{"stage": stage, "seconds": stage_seconds,
+                        "status": status} for stage, stage_seconds, status in
+                       stage_timings(log)],
+            "messages": [{"seconds": message_seconds, "type": message_type,
+                          "message": message} for message_seconds,
+                         message_type, message in log]}
+
+
+def main():
+    # The tools find their symbology layers in the first directory of the
+    #     path, as when run from the toolbox
+    path.insert(0, SRC_DIR)
+    options = parse_options(argv[1:])
+    report = run(options)
+    if options.timings:
+        with open(options.timings, "w") as timings_file:
+            dump(report, timings_file, indent=2)
+    else:
+        dump(report, stdout, indent=2)
+        stdout.write("\n")
+    exit(0 if report["success"] else 1)
+
+
+if __name__ == "__main__":
+    main()
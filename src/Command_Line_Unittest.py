@@ -0,0 +1,106 @@
+"""
+Unittest for the command line runner.
+"""
+
+from src.Command_Line import parse_options
+from src.Command_Line import stage_timings
+from src.Command_Line import tool_argv
+from json import dumps
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Messages import add_warning
+from src.Common.Utils.Messages import message_log
+from src.Common.Utils.Messages import set_headless
+from os.path import join
+from subprocess import run
+from sys import executable
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestCommandLine(unittest.TestCase):
+    """
+    Test class for the command line runner
+    """
+
+    def test_Centrality_Argv(self):
+        """
+        Test the arguments of the centrality tool, from a configuration file
+            and options
+        """
+        with TemporaryDirectory() as directory:
+            config = join(directory, "config.json")
+            with open(config, "w") as config_file:
+                config_file.write(dumps({"network": "Streets_ND",
+                                         "id_field": "FID",
+                                         "impedance": "Length",
+                                         "radius": 600}))
+            options = parse_options([
+                "centrality", "--config", config, "--buildings",
+                "Buildings.shp", "--measures", "Reach", "Betweenness",
+                "--radius", "800", "--output-dir", "Output", "--output-name",
+                "Results"])
+        assert tool_argv(options) == [
+            "Buildings.shp", "false", "Streets_ND", "true", "false", "true",
+            "false", "false", "FID", "#", "Length", "800.0", "On the network",
+            "1.0", "#", "Output", "Results", "#", "#"]
+
+    def test_Redundancy_Argv(self):
+        """
+        Test the arguments of the redundant paths tool
+        """
+        options = parse_options([
+            "redundant-paths", "--network", "Streets_ND", "--points",
+            "Points.shp", "--origins-field", "Origin", "--destinations-field",
+            "Destination", "--output-dir", "Output", "--output-name", "Paths",
+            "--wayfinding"])
+        assert tool_argv(options) == [
+            "Streets_ND", "Points.shp", "Origin", "Destination", "1.2", "#",
+            "Output", "Paths", "true", "None"]
+
+    def test_Stage_Timings(self):
+        """
+        Test the stages and their status found in the message log
+        """
+        set_headless(True)
+        try:
+            add_message("[1 started] Computing adjacency list")
+            add_message("... [started] Calculating locations")
+            add_message("... [finished]")
+            add_warning("Slow")
+            add_message("[1 failed] ")
+            add_message("Computing redundancy indices ...")
+            add_message("\tDone.")
+            log = message_log()
+        finally:
+            set_headless(False)
+        assert [message_type for _, message_type, _ in log].count(
+            "warning") == 1
+        assert [(stage, status) for stage, _, status in stage_timings(log)] == [
+            ("Calculating locations", "finished"),
+            ("Computing adjacency list", "failed"),
+            ("Computing redundancy indices", "finished")]
+
+    def test_Without_ArcGIS(self):
+        """
+        Test that a run of a tool that needs ArcGIS reports that it does, and
+            that the tools reading shapefiles run up to the network dataset
+            they cannot read
+        """
+        code = ("import sys; sys.modules['arcpy'] = None; "
+                "sys.modules['arcgisscripting'] = None; "
+                "from src.Command_Line import parse_options, run; "
+                "options = ['--network', "
+                "'Streets_ND', '--points', 'Points.shp', '--origins-field', "
+                "'O', '--destinations-field', 'D', '--output-dir', 'Output', "
+                "'--output-name', 'Index']; "
+                "report = run(parse_options(['redundant-paths'] + options)); "
+                "assert not report['success']; "
+                "assert 'needs ArcGIS' in report['error']; "
+                "report = run(parse_options(['redundancy-index'] + options)); "
+                "assert not report['success']; "
+                "assert 'can only be read with arcpy' in report['error']")
+        assert run([executable, "-c", code]).returncode == 0
+
+
+if __name__ == "__main__":
+    unittest.main()
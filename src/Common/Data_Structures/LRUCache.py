@@ -0,0 +1,49 @@
+"""
+Least recently used cache.
+"""
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A mapping that holds at most a fixed number of items, evicting the least
+        recently used item when full.
+    """
+
+    def __init__(self, capacity):
+        """
+        |capacity|: the largest number of items held
+        """
+        self._capacity = capacity
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """
+        Returns the item for |key|, marking it as the most recently used, or
+            |default| if there is none
+        """
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """
+        Stores |value| for |key|, evicting the least recently used item if the
+            cache is full
+        """
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self._capacity:
+            self._items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,60 @@
+"""
+Union-Find (disjoint sets).
+"""
+
+
+class UnionFind:
+    """
+    A Union-Find data structure over hashable items that supports find and
+        union, with path compression and union by size.
+    """
+
+    def __init__(self, items=None):
+        """
+        |items| is an optional iterable of the starting items, each in a set of
+            its own. Items that are not yet known are added on first use.
+        """
+        self._parent = {}
+        self._size = {}
+        if items is not None:
+            for item in items:
+                self.add(item)
+
+    def add(self, item):
+        """
+        Adds |item| in a set of its own, if it is not already known.
+        """
+        if item not in self._parent:
+            self._parent[item] = item
+            self._size[item] = 1
+
+    def find(self, item):
+        """
+        Returns the representative of the set containing |item|.
+        """
+        self.add(item)
+        root = item
+        while self._parent[root] != root:
+            root = self._parent[root]
+        # Path compression
+        while self._parent[item] != root:
+            self._parent[item], item = root, self._parent[item]
+        return root
+
+    def union(self, item1, item2):
+        """
+        Merges the sets containing |item1| and |item2|. Returns the
+            representative of the merged set.
+        """
+        root1 = self.find(item1)
+        root2 = self.find(item2)
+        if root1 == root2:
+            return root1
+        if self._size[root1] < self._size[root2]:
+            root1, root2 = root2, root1
+        self._parent[root2] = root1
+        self._size[root1] += self._size[root2]
+        return root1
+
+    def __len__(self):
+        return len(self._parent)
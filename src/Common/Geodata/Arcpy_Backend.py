@@ -0,0 +1,97 @@
+"""
+Geodata backend using arcpy, for any dataset ArcGIS can read: shapefiles,
+    geodatabase feature classes, DBF tables and layers (whose selection is
+    respected).
+"""
+
+from arcpy import AddFields_management
+from arcpy import CopyFeatures_management
+from arcpy import Describe
+from arcpy import Exists
+from arcpy import GetCount_management
+from arcpy import ListFields
+from arcpy.da import SearchCursor
+from arcpy.da import UpdateCursor
+from src.Common.Geodata.Backend import DOUBLE
+from src.Common.Geodata.Backend import Geodata_Backend
+from src.Common.Geodata.Backend import row_values_lookup
+from src.Redundancy.Utils import arcGISPointAsTuple
+from src.Redundancy.Utils import calculate_network_locations
+from src.Redundancy.Utils import getEdgePathFromNetwork
+
+
+class Arcpy_Backend(Geodata_Backend):
+    """
+    Reads and writes geodata with arcpy cursors
+    """
+
+    # Cursors are read in the main thread, and layers with a selection only
+    #     exist in this process
+    reads_in_process = False
+    geoprocessing = True
+
+    def exists(self, dataset):
+        return bool(Exists(dataset))
+
+    def count(self, dataset):
+        return int(GetCount_management(dataset).getOutput(0))
+
+    def fields(self, dataset):
+        return [field.name for field in ListFields(dataset)]
+
+    def shape_type(self, dataset):
+        return Describe(dataset).shapeType
+
+    def iter_rows(self, dataset, columns):
+        with SearchCursor(dataset, list(columns)) as rows:
+            for row in rows:
+                yield row
+
+    def read_polylines(self, dataset):
+        with SearchCursor(dataset, ["OID@", "SHAPE@"]) as rows:
+            for oid, shape in rows:
+                # Parts are arrays of points, with None between rings
+                parts = [[arcGISPointAsTuple(point) for point in part if point
+                          is not None] for part in shape]
+                yield oid, parts, shape.length3D
+
+    def write_columns(self, dataset, key_field, keys, columns, default=0,
+                      field_types=None, delete_missing=False):
+        existing_fields = set(self.fields(dataset))
+        new_fields = [[field, (field_types or {}).get(field, DOUBLE)] for
+                      field in columns if field not in existing_fields]
+        if new_fields:
+            AddFields_management(dataset, new_fields)
+        row_values = row_values_lookup(keys, columns, default, field_types)
+        missing_values = [default] * len(columns)
+        with UpdateCursor(dataset, [key_field] + list(columns)) as rows:
+            for row in rows:
+                values = row_values(row[0])
+                if values is None:
+                    if delete_missing:
+                        rows.deleteRow()
+                        continue
+                    values = missing_values
+                rows.updateRow([row[0]] + values)
+
+    def copy_features(self, source, destination):
+        CopyFeatures_management(in_features=source,
+                                out_feature_class=destination)
+
+    def edge_source(self, network):
+        return getEdgePathFromNetwork(network)
+
+    def cost_attributes(self, network):
+        return set(attribute.name for attribute in Describe(network).attributes
+                   if attribute.usageType == "Cost")
+
+    def calculate_network_locations(self, points, network):
+        calculate_network_locations(points, network)
+
+    def data_source(self, dataset):
+        # Layers and datasets in geodatabases resolve to their catalog path
+        try:
+            return Describe(dataset).catalogPath
+        except (OSError, RuntimeError):
+            return dataset
+
@@ -0,0 +1,177 @@
+"""
+Interface for reading and writing geodata, and selection of the implementation.
+Datasets are named by path. Rows are identified by the "OID@" column, as with
+    arcpy cursors.
+"""
+
+# Column holding the object id of each row
+OID = "OID@"
+# Types of the fields added by |write_columns|
+DOUBLE = "DOUBLE"
+INTEGER = "INTEGER"
+# Fields recorded on points whose network locations were computed
+NETWORK_LOCATION_FIELDS = ("SourceID", "SourceOID", "PosAlong", "SideOfEdge",
+                           "SnapX", "SnapY", "Distance")
+
+
+class Geodata_Backend:
+    """
+    Reads and writes the rows of feature classes and tables.
+    Implementations provide |exists|, |count|, |fields|, |shape_type|,
+        |iter_rows|, |read_polylines|, |write_columns|, |copy_features|,
+        |edge_source|, |cost_attributes| and |calculate_network_locations|.
+    """
+
+    # Can |iter_rows| run in another process, given the backend and dataset?
+    reads_in_process = False
+    # Can the backend run ArcGIS geoprocessing tools, and make layers?
+    geoprocessing = False
+
+    def exists(self, dataset):
+        """
+        Returns True if |dataset| exists
+        """
+        raise NotImplementedError
+
+    def count(self, dataset):
+        """
+        Returns the number of rows in |dataset|
+        """
+        raise NotImplementedError
+
+    def fields(self, dataset):
+        """
+        Returns the list of field names of |dataset|
+        """
+        raise NotImplementedError
+
+    def shape_type(self, dataset):
+        """
+        Returns the type of the shapes of |dataset|, as named by ArcGIS:
+            "Point", "Polyline" or "Polygon"
+        """
+        raise NotImplementedError
+
+    def iter_rows(self, dataset, columns):
+        """
+        Yields a tuple of the values of |columns| for each row of |dataset|
+        """
+        raise NotImplementedError
+
+    def read_columns(self, dataset, columns):
+        """
+        Returns a dictionary mapping each of |columns| to the list of its values
+            in |dataset|
+        """
+        values = [[] for _ in columns]
+        for row in self.iter_rows(dataset, columns):
+            for column_values, value in zip(values, row):
+                column_values.append(value)
+        return dict(zip(columns, values))
+
+    def read_polylines(self, dataset):
+        """
+        Yields an (object id, parts, length) triple for each polyline of
+            |dataset|, where parts are the lists of (x, y, z) points of its
+            parts and length is its 3D length
+        """
+        raise NotImplementedError
+
+    def write_columns(self, dataset, key_field, keys, columns, default=0,
+                      field_types=None, delete_missing=False):
+        """
+        Writes result columns to |dataset| in one pass over its rows, adding
+            the fields that are missing in one schema change.
+        |key_field|: the field identifying the rows
+        |keys|: the keys of the rows that have results
+        |columns|: dictionary mapping field names to sequences of values, such
+            as NumPy arrays, aligned with |keys|
+        |default|: the value of rows whose key is not in |keys|, and of NaN
+            values
+        |field_types|: dictionary mapping the fields to add to |DOUBLE|, the
+            default, or |INTEGER|
+        |delete_missing|: if True, rows whose key is not in |keys| are deleted
+        """
+        raise NotImplementedError
+
+    def copy_features(self, source, destination):
+        """
+        Copies the feature class |source| to the shapefile |destination|,
+            replacing it if it exists
+        """
+        raise NotImplementedError
+
+    def edge_source(self, network):
+        """
+        Returns the path of the edge feature class of |network|
+        """
+        raise NotImplementedError
+
+    def cost_attributes(self, network):
+        """
+        Returns the set of the names of the cost attributes of |network|
+        """
+        raise NotImplementedError
+
+    def calculate_network_locations(self, points, network):
+        """
+        Computes the locations of |points| on |network|
+        """
+        raise NotImplementedError
+
+    def data_source(self, dataset):
+        """
+        Returns the path of the data behind |dataset|, such as the data source
+            of a layer
+        """
+        return dataset
+
+    def network_locations_calculated(self, points):
+        """
+        Returns True if the network locations of |points| have been computed
+        """
+        points_fields = self.fields(points)
+        return all(field in points_fields for field in
+                   NETWORK_LOCATION_FIELDS)
+
+
+def row_values_lookup(keys, columns, default, field_types):
+    """
+    Returns a function mapping a key to the list of the values of its row in
+        |columns|, in the order of |columns|, or to None if the key is not in
+        |keys|. Arguments are as in |Geodata_Backend.write_columns|.
+    """
+    index = dict((key, i) for i, key in enumerate(keys))
+    value_columns = list(columns.values())
+    casts = [int if (field_types or {}).get(field) == INTEGER else float for
+             field in columns]
+
+    def row_values(key):
+        i = index.get(key)
+        if i is None:
+            return None
+        values = []
+        for cast, column in zip(casts, value_columns):
+            value = column[i]
+            # NaN marks a value that was not computed
+            values.append(default if value != value else cast(value))
+        return values
+    return row_values
+
+
+_default_backend = []
+
+
+def default_backend():
+    """
+    Returns the arcpy backend if arcpy can be imported, and the shapefile
+        backend otherwise
+    """
+    if not _default_backend:
+        try:
+            from src.Common.Geodata.Arcpy_Backend import Arcpy_Backend
+            _default_backend.append(Arcpy_Backend())
+        except ImportError:
+            from src.Common.Geodata.Shapefile_Backend import Shapefile_Backend
+            _default_backend.append(Shapefile_Backend())
+    return _default_backend[0]
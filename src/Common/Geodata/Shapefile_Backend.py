@@ -0,0 +1,392 @@
+"""
+Geodata backend reading and writing shapefiles (.shp, .shx and .dbf files) and
+    DBF tables directly, without arcpy.
+Object ids are the 0-based record numbers, as in the FID field ArcGIS shows for
+    shapefiles. Network datasets cannot be read, so a network is given as the
+    shapefile of its edges, whose only cost is the length of the edges, and
+    network locations must have been computed beforehand.
+"""
+
+from glob import escape
+from glob import glob
+from math import sqrt
+from os import remove
+from os import replace
+from os.path import exists
+from os.path import splitext
+from shutil import copyfile
+from src.Common.Geodata.Backend import Geodata_Backend
+from src.Common.Geodata.Backend import INTEGER
+from src.Common.Geodata.Backend import OID
+from src.Common.Geodata.Backend import row_values_lookup
+from struct import calcsize
+from struct import pack
+from struct import unpack
+from struct import unpack_from
+
+# Column holding the (x, y) location of each point
+SHAPE_XY = "SHAPE@XY"
+
+# Shape types
+NULL_SHAPE = 0
+POINT_TYPES = (1, 11, 21)
+POLYLINE_TYPES = (3, 13, 23)
+POLYGON_TYPES = (5, 15, 25)
+Z_TYPES = (11, 13, 15)
+# Names ArcGIS gives the shape types
+SHAPE_TYPE_NAMES = dict([(shape_type, "Point") for shape_type in POINT_TYPES] +
+                        [(shape_type, "Polyline") for shape_type in
+                         POLYLINE_TYPES] +
+                        [(shape_type, "Polygon") for shape_type in
+                         POLYGON_TYPES])
+
+# Size and number of decimals of the DBF fields written for doubles and
+#     integers, as written by ArcGIS
+DOUBLE_FIELD_LENGTH = 19
+DOUBLE_FIELD_DECIMALS = 11
+INTEGER_FIELD_LENGTH = 10
+DBF_HEADER = "<BBBBIHH20x"
+DBF_FIELD = "<11sc4xBB14x"
+
+
+def _encoding(path):
+    """
+    Returns the text encoding of the DBF of |path|, from its .cpg file
+    """
+    cpg_path = f"{splitext(path)[0]}.cpg"
+    if exists(cpg_path):
+        with open(cpg_path) as cpg_file:
+            return cpg_file.read().strip() or "latin-1"
+    return "latin-1"
+
+
+def read_dbf_header(dbf_file):
+    """
+    Returns the record count, header length, record length and fields of an
+        open DBF file, where fields are (name, type, length, decimals) tuples
+    """
+    header = dbf_file.read(calcsize(DBF_HEADER))
+    _, _, _, _, record_count, header_length, record_length = unpack(DBF_HEADER,
+                                                                     header)
+    fields = []
+    while True:
+        descriptor = dbf_file.read(calcsize(DBF_FIELD))
+        if not descriptor or descriptor[0] == 0x0D:
+            break
+        name, field_type, length, decimals = unpack(DBF_FIELD, descriptor)
+        fields.append((name.split(b"\0")[0].decode("ascii"),
+                       field_type.decode("ascii"), length, decimals))
+    return record_count, header_length, record_length, fields
+
+
+def _parse_value(raw, field_type, decimals, encoding):
+    """
+    Returns the value of a DBF field from its bytes
+    """
+    text = raw.decode(encoding, "replace").strip()
+    if field_type in "NF":
+        if not text or text.startswith("*"):
+            return None
+        if decimals == 0 and "." not in text and "e" not in text.lower():
+            return int(text)
+        return float(text)
+    if field_type == "L":
+        return None if text in ("", "?") else text in "YyTt"
+    return text
+
+
+def iter_dbf(path, columns):
+    """
+    Yields a tuple of the values of |columns| for each record of the DBF of
+        |path|, including "OID@", the record number. Deleted records are
+        skipped.
+    """
+    encoding = _encoding(path)
+    with open(f"{splitext(path)[0]}.dbf", "rb") as dbf_file:
+        record_count, header_length, record_length, fields = read_dbf_header(
+            dbf_file)
+        # Position of each field in a record, after the deletion flag
+        layout = {}
+        offset = 1
+        for name, field_type, length, decimals in fields:
+            layout[name] = (offset, length, field_type, decimals)
+            offset += length
+        for column in columns:
+            if column != OID and column not in layout:
+                raise KeyError(f"{path} has no field {column}")
+        dbf_file.seek(header_length)
+        for oid in range(record_count):
+            record = dbf_file.read(record_length)
+            if record[:1] == b"*":
+                continue
+            row = []
+            for column in columns:
+                if column == OID:
+                    row.append(oid)
+                else:
+                    offset, length, field_type, decimals = layout[column]
+                    row.append(_parse_value(record[offset:offset + length],
+                                            field_type, decimals, encoding))
+            yield tuple(row)
+
+
+def iter_shapes(path):
+    """
+    Yields a (shape type, points, part starts) triple for each record of the
+        .shp file of |path|, where points are (x, y, z) tuples (z is 0 without
+        Z values)
+    """
+    with open(f"{splitext(path)[0]}.shp", "rb") as shp_file:
+        shp_file.seek(100)
+        while True:
+            record_header = shp_file.read(8)
+            if len(record_header) < 8:
+                break
+            _, content_length = unpack(">ii", record_header)
+            content = shp_file.read(2 * content_length)
+            shape_type, = unpack_from("<i", content)
+            if shape_type == NULL_SHAPE:
+                yield shape_type, [], []
+            elif shape_type in POINT_TYPES:
+                x, y = unpack_from("<2d", content, 4)
+                z = (unpack_from("<d", content, 20)[0] if shape_type in
+                     Z_TYPES else 0.0)
+                yield shape_type, [(x, y, z)], [0]
+            elif shape_type in POLYLINE_TYPES + POLYGON_TYPES:
+                part_count, point_count = unpack_from("<2i", content, 36)
+                parts = list(unpack_from(f"<{part_count}i", content, 44))
+                xy_offset = 44 + 4 * part_count
+                xy = unpack_from(f"<{2 * point_count}d", content, xy_offset)
+                if shape_type in Z_TYPES:
+                    z = unpack_from(f"<{point_count}d", content,
+                                    xy_offset + 16 * point_count + 16)
+                else:
+                    z = [0.0] * point_count
+                yield (shape_type, [(xy[2 * i], xy[2 * i + 1], z[i]) for i in
+                                    range(point_count)], parts)
+            else:
+                raise ValueError(
+                    f"Unsupported shape type {shape_type} in {path}")
+
+
+def _format_number(value, length, decimals):
+    """
+    Returns the bytes of |value| in a numeric DBF field
+    """
+    if value is None:
+        return b" " * length
+    text = f"{value:.{decimals}f}" if decimals else str(int(round(value)))
+    while len(text) > length and decimals > 0:
+        decimals -= 1
+        text = f"{value:.{decimals}f}"
+    if len(text) > length:
+        text = f"{value:.{max(0, length - 7)}e}"
+    return text.rjust(length)[:length].encode("ascii")
+
+
+def _replace_file(path, content):
+    """
+    Replaces the file at |path| with |content|, writing to a temporary file
+        first so that the file is only ever seen complete
+    """
+    with open(f"{path}.tmp", "wb") as new_file:
+        new_file.write(content)
+    replace(f"{path}.tmp", path)
+
+
+def _keep_shapes(path, kept):
+    """
+    Rewrites the .shp and .shx files of |path| with only the records numbered
+        |kept| (from 0), in order. The bounding box in the header is left as
+        is, and still bounds the remaining shapes.
+    """
+    base = splitext(path)[0]
+    with open(f"{base}.shp", "rb") as shp_file:
+        data = shp_file.read()
+    contents = []
+    offset = 100
+    while offset + 8 <= len(data):
+        _, content_length = unpack_from(">ii", data, offset)
+        contents.append(data[offset + 8:offset + 8 + 2 * content_length])
+        offset += 8 + 2 * content_length
+    shp = bytearray()
+    shx = bytearray()
+    for number, record_number in enumerate(kept):
+        content = contents[record_number]
+        shx += pack(">ii", (100 + len(shp)) // 2, len(content) // 2)
+        shp += pack(">ii", number + 1, len(content) // 2) + content
+    for extension, records in [("shp", shp), ("shx", shx)]:
+        _replace_file(f"{base}.{extension}",
+                      data[:24] + pack(">i", (100 + len(records)) // 2) +
+                      data[28:100] + records)
+    # The spatial index no longer matches, ArcGIS rebuilds it when needed
+    for extension in ["sbn", "sbx"]:
+        if exists(f"{base}.{extension}"):
+            remove(f"{base}.{extension}")
+
+
+class Shapefile_Backend(Geodata_Backend):
+    """
+    Reads and writes shapefiles and DBF tables
+    """
+
+    # Files are opened by path, so a reader process can open them again
+    reads_in_process = True
+
+    def exists(self, dataset):
+        return exists(dataset)
+
+    def count(self, dataset):
+        base = splitext(dataset)[0]
+        if exists(f"{base}.dbf"):
+            with open(f"{base}.dbf", "rb") as dbf_file:
+                return read_dbf_header(dbf_file)[0]
+        with open(f"{base}.shx", "rb") as shx_file:
+            file_length, = unpack_from(">i", shx_file.read(100), 24)
+        return (2 * file_length - 100) // 8
+
+    def fields(self, dataset):
+        with open(f"{splitext(dataset)[0]}.dbf", "rb") as dbf_file:
+            return [name for name, _, _, _ in read_dbf_header(dbf_file)[3]]
+
+    def shape_type(self, dataset):
+        with open(f"{splitext(dataset)[0]}.shp", "rb") as shp_file:
+            shape_type, = unpack_from("<i", shp_file.read(100), 32)
+        if shape_type not in SHAPE_TYPE_NAMES:
+            raise ValueError(f"Unsupported shape type {shape_type} in "
+                             f"{dataset}")
+        return SHAPE_TYPE_NAMES[shape_type]
+
+    def iter_rows(self, dataset, columns):
+        if SHAPE_XY not in columns:
+            yield from iter_dbf(dataset, columns)
+            return
+        attribute_columns = [column for column in columns if column !=
+                             SHAPE_XY]
+        if exists(f"{splitext(dataset)[0]}.dbf"):
+            attribute_rows = iter_dbf(dataset, [OID] + attribute_columns)
+        else:
+            attribute_rows = ((oid,) for oid in range(self.count(dataset)))
+        shapes = iter_shapes(dataset)
+        next_oid = 0
+        for attribute_row in attribute_rows:
+            # Skip the shapes of deleted records
+            while next_oid <= attribute_row[0]:
+                shape_type, points, _ = next(shapes)
+                next_oid += 1
+            if shape_type not in POINT_TYPES:
+                raise ValueError(f"{dataset} does not hold points")
+            values = dict(zip(attribute_columns, attribute_row[1:]))
+            values[OID] = attribute_row[0]
+            values[SHAPE_XY] = points[0][:2]
+            yield tuple(values[column] for column in columns)
+
+    def read_polylines(self, dataset):
+        for oid, (shape_type, points, parts) in enumerate(iter_shapes(dataset)):
+            if shape_type == NULL_SHAPE:
+                continue
+            if shape_type not in POLYLINE_TYPES:
+                raise ValueError(f"{dataset} does not hold polylines")
+            part_points = [points[start:end] for start, end in
+                           zip(parts, parts[1:] + [len(points)])]
+            length = 0.0
+            for part in part_points:
+                for (x1, y1, z1), (x2, y2, z2) in zip(part, part[1:]):
+                    length += sqrt((x2 - x1)**2 + (y2 - y1)**2 + (z2 - z1)**2)
+            yield oid, part_points, length
+
+    def write_columns(self, dataset, key_field, keys, columns, default=0,
+                      field_types=None, delete_missing=False):
+        dbf_path = f"{splitext(dataset)[0]}.dbf"
+        encoding = _encoding(dataset)
+        record_keys = [row[0] for row in iter_dbf(dataset, [key_field])]
+        with open(dbf_path, "rb") as dbf_file:
+            record_count, header_length, record_length, fields = (
+                read_dbf_header(dbf_file))
+            dbf_file.seek(0)
+            header = dbf_file.read(calcsize(DBF_HEADER))
+            dbf_file.seek(header_length)
+            records = [bytearray(dbf_file.read(record_length)) for _ in
+                       range(record_count)]
+
+        new_fields = []
+        for field in columns:
+            if field in [name for name, _, _, _ in fields]:
+                continue
+            if (field_types or {}).get(field) == INTEGER:
+                new_fields.append((field, "N", INTEGER_FIELD_LENGTH, 0))
+            else:
+                new_fields.append((field, "N", DOUBLE_FIELD_LENGTH,
+                                   DOUBLE_FIELD_DECIMALS))
+        added_length = sum(length for _, _, length, _ in new_fields)
+        for record in records:
+            record.extend(b" " * added_length)
+        fields = fields + new_fields
+        layout = {}
+        offset = 1
+        for name, _, length, decimals in fields:
+            layout[name] = (offset, length, decimals)
+            offset += length
+        column_layouts = [layout[field] for field in columns]
+        row_values = row_values_lookup(keys, columns, default, field_types)
+        missing_values = [default] * len(columns)
+        # Numbers of the records that were not deleted, in order
+        live_records = [record_number for record_number, record in
+                        enumerate(records) if record[:1] != b"*"]
+        kept = []
+        for record_number, key in zip(live_records, record_keys):
+            values = row_values(key)
+            if values is None:
+                if delete_missing:
+                    continue
+                values = missing_values
+            kept.append(record_number)
+            record = records[record_number]
+            for (offset, length, decimals), value in zip(column_layouts,
+                                                         values):
+                record[offset:offset + length] = _format_number(
+                    value, length, decimals)
+        if delete_missing:
+            # Drop the deleted records, along with their shapes
+            if exists(f"{splitext(dataset)[0]}.shp"):
+                _keep_shapes(dataset, kept)
+            records = [records[record_number] for record_number in kept]
+            record_count = len(records)
+
+        header_length = 32 + 32 * len(fields) + 1
+        record_length = 1 + sum(length for _, _, length, _ in fields)
+        content = bytearray(header[:4] + pack("<IHH", record_count,
+                                              header_length, record_length) +
+                            header[12:])
+        for name, field_type, length, decimals in fields:
+            content += pack(DBF_FIELD, name.encode(encoding)[:10],
+                            field_type.encode("ascii"), length, decimals)
+        content += b"\r"
+        for record in records:
+            content += record
+        content += b"\x1a"
+        _replace_file(dbf_path, content)
+
+    def copy_features(self, source, destination):
+        source_base = splitext(source)[0]
+        destination_base = splitext(destination)[0]
+        # The .shp, .shx and .dbf files, and the files that come with them
+        for path in glob(f"{escape(source_base)}.*"):
+            copyfile(path, destination_base + path[len(source_base):])
+
+    def edge_source(self, network):
+        if splitext(network)[1].lower() != ".shp":
+            raise ValueError(f"{network} is not a shapefile; network datasets "
+                             "can only be read with arcpy")
+        return network
+
+    def cost_attributes(self, network):
+        self.edge_source(network)
+        return {"Length"}
+
+    def calculate_network_locations(self, points, network):
+        # Locations computed with ArcGIS beforehand are kept
+        if self.network_locations_calculated(points):
+            return
+        raise ValueError(f"Network locations of {points} can only be "
+                         "computed with arcpy")
@@ -0,0 +1,105 @@
+"""
+Unittest for the geodata backend reading and writing shapefiles.
+"""
+
+from src.Common.Geodata.Backend import INTEGER
+from src.Common.Geodata.Backend import OID
+from src.Centrality.Computation_Utils import eq_tol
+from os.path import dirname
+from os.path import join
+from src.Common.Geodata.Shapefile_Backend import SHAPE_XY
+from src.Common.Geodata.Shapefile_Backend import Shapefile_Backend
+from shutil import copy
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestShapefileBackend(unittest.TestCase):
+    """
+    Test class for the shapefile backend, on the test files
+    """
+
+    TEST_FILES = join(dirname(__file__), "..", "..", "..", "Test_Files",
+                      "Cambridge-Sommerville")
+
+    def test_Read_Points(self):
+        """
+        Test reading the points and snap locations of a shapefile
+        """
+        backend = Shapefile_Backend()
+        junctions = join(self.TEST_FILES, "cam_som_junctions2.shp")
+        assert backend.count(junctions) == 7607
+        assert backend.network_locations_calculated(junctions)
+        rows = list(backend.iter_rows(junctions, [OID, SHAPE_XY, "SnapX",
+                                                  "SnapY"]))
+        assert len(rows) == 7607
+        assert [row[0] for row in rows] == list(range(7607))
+        # Junctions lie on the network, so they are their own snap locations
+        assert all(eq_tol(x, snap_x) and eq_tol(y, snap_y) for _, (x, y),
+                   snap_x, snap_y in rows)
+        # Points without a DBF
+        buildings = join(self.TEST_FILES, "Buildings26513_weights.shp")
+        assert backend.count(buildings) == 26513
+
+    def test_Copy_Features(self):
+        """
+        Test copying a shapefile, and describing it
+        """
+        backend = Shapefile_Backend()
+        junctions = join(self.TEST_FILES, "cam_som_junctions2.shp")
+        assert backend.shape_type(junctions) == "Point"
+        assert backend.cost_attributes(junctions) == {"Length"}
+        with self.assertRaises(ValueError):
+            backend.cost_attributes(join(self.TEST_FILES, "cam-som.gdb"))
+        with TemporaryDirectory() as directory:
+            copied = join(directory, "copied.shp")
+            assert not backend.exists(copied)
+            backend.copy_features(junctions, copied)
+            assert backend.exists(copied)
+            assert backend.fields(copied) == backend.fields(junctions)
+            assert (list(backend.iter_rows(copied, [OID, SHAPE_XY])) ==
+                    list(backend.iter_rows(junctions, [OID, SHAPE_XY])))
+            # The network locations of the copy are already computed
+            backend.calculate_network_locations(copied, junctions)
+
+    def test_Write_Columns(self):
+        """
+        Test adding, overwriting and deleting the rows of a shapefile
+        """
+        backend = Shapefile_Backend()
+        with TemporaryDirectory() as directory:
+            junctions = join(directory, "junctions.shp")
+            for extension in ["shp", "shx", "dbf"]:
+                copy(join(self.TEST_FILES, f"cam_som_junctions2.{extension}"),
+                     join(directory, f"junctions.{extension}"))
+            snap_x = backend.read_columns(junctions, ["SnapX"])["SnapX"]
+            backend.write_columns(junctions, OID, [1, 0],
+                                  {"Reach": [0.5, 3], "Count": [2, 7]},
+                                  field_types={"Count": INTEGER})
+            assert backend.count(junctions) == 7607
+            assert backend.fields(junctions)[-2:] == ["Reach", "Count"]
+            columns = backend.read_columns(junctions, ["Reach", "Count",
+                                                       "SnapX"])
+            assert columns["Reach"][:3] == [3, 0.5, 0]
+            assert columns["Count"][:3] == [7, 2, 0]
+            assert all(eq_tol(a, b) for a, b in zip(columns["SnapX"], snap_x))
+            # Existing fields are overwritten, with the default for missing
+            #     keys and NaN values
+            backend.write_columns(junctions, OID, [1, 2],
+                                  {"SnapX": [1.25, float("nan")]}, default=-1)
+            assert backend.read_columns(junctions, ["SnapX"])["SnapX"][:3] == [
+                -1, 1.25, -1]
+            # Rows without results are deleted along with their shapes
+            points = list(backend.iter_rows(junctions, [SHAPE_XY]))
+            backend.write_columns(junctions, OID, [5, 9], {"Reach": [1, 2]},
+                                  delete_missing=True)
+            assert backend.count(junctions) == 2
+            assert list(backend.iter_rows(junctions, [OID, SHAPE_XY,
+                                                      "Reach"])) == [
+                (0, points[5][0], 1), (1, points[9][0], 2)]
+            with open(join(directory, "junctions.shx"), "rb") as shx_file:
+                assert len(shx_file.read()) == 100 + 2 * 8
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,4 @@
+"""
+Python package for reading and writing geodata, through arcpy or directly from
+    shapefiles.
+"""
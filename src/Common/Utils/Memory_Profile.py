@@ -0,0 +1,230 @@
+"""
+Memory profile of a run: at the boundaries of its steps, the resident set size
+    of the process and, when tracemalloc is tracing, the memory allocated by
+    Python are sampled, along with the estimated sizes of the main structures
+    of the run (the graph, caches, results). The samples are written as JSON
+    next to the outputs.
+With tracemalloc, each sample also gives the transient memory of its step: the
+    peak allocated during the step less what remained allocated at its end,
+    which is mostly the data of the searches.
+A soft memory limit warns once when the resident set size goes over it, so
+    that a run that is about to run out of memory can be told apart from one
+    that is slow. The resident set size is also polled in the background
+    while a step runs. Tool messages are only sent from the main thread, so a
+    breach found by the poll is recorded and warned about at the next sample
+    or check, at the latest when the step ends.
+"""
+
+from ctypes import byref
+from ctypes import c_size_t
+from ctypes import c_ulong
+from ctypes import sizeof
+from ctypes import Structure
+from itertools import islice
+from json import dump
+from src.Common.Utils.Messages import add_warning
+from sys import getsizeof
+from sys import platform
+from threading import Event
+from threading import Lock
+from threading import Thread
+from time import perf_counter
+import tracemalloc
+
+# Number of items of a container whose sizes are measured to estimate its size
+SAMPLE_SIZE = 100
+# Seconds between polls of the resident set size
+POLL_SECONDS = 1.0
+
+
+class _Process_Memory_Counters(Structure):
+    """
+    PROCESS_MEMORY_COUNTERS of the Windows API
+    """
+    _fields_ = [("cb", c_ulong), ("PageFaultCount", c_ulong),
+                ("PeakWorkingSetSize", c_size_t),
+                ("WorkingSetSize", c_size_t),
+                ("QuotaPeakPagedPoolUsage", c_size_t),
+                ("QuotaPagedPoolUsage", c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", c_size_t),
+                ("QuotaNonPagedPoolUsage", c_size_t),
+                ("PagefileUsage", c_size_t), ("PeakPagefileUsage", c_size_t)]
+
+
+def rss_bytes():
+    """
+    Returns the resident set size of this process in bytes, or None if it
+        cannot be read on this platform
+    """
+    try:
+        if platform == "win32":
+            from ctypes import windll
+            counters = _Process_Memory_Counters()
+            counters.cb = sizeof(counters)
+            windll.psapi.GetProcessMemoryInfo(
+                windll.kernel32.GetCurrentProcess(), byref(counters),
+                counters.cb)
+            return counters.WorkingSetSize
+        from os import sysconf
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * sysconf("SC_PAGE_SIZE")
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def estimate_size(structure, sample_size=SAMPLE_SIZE, _seen=None):
+    """
+    Returns the estimated size in bytes of |structure| and of what it holds.
+        The items of containers and the attributes of objects are measured
+        recursively; only |sample_size| items of each container are measured,
+        and their mean size is scaled to all its items. Objects shared by the
+        sampled items are counted once.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(structure) in _seen:
+        return 0
+    _seen.add(id(structure))
+    size = getsizeof(structure)
+    if isinstance(structure, dict):
+        count = len(structure)
+        items = [item for key_value in islice(structure.items(), sample_size)
+                 for item in key_value]
+    elif isinstance(structure, (list, tuple, set, frozenset)):
+        count = len(structure)
+        items = list(islice(structure, sample_size))
+    else:
+        count = 1
+        items = [vars(structure)] if hasattr(structure, "__dict__") else []
+    if items:
+        sampled_count = min(count, sample_size)
+        size += (sum(estimate_size(item, sample_size, _seen) for item in
+                     items) * count / sampled_count)
+    return int(size)
+
+
+class Memory_Profile:
+    """
+    Samples of the memory used by a run. Python allocations are traced with
+        tracemalloc if |trace_allocations|, which slows the run down. A warning
+        is given the first time the resident set size is found to exceed
+        |soft_limit_bytes|, if given.
+    """
+
+    def __init__(self, soft_limit_bytes=None, trace_allocations=False,
+                 poll_seconds=POLL_SECONDS):
+        self.soft_limit_bytes = soft_limit_bytes
+        self.samples = []
+        self.peak_rss_bytes = None
+        self._limit_exceeded = False
+        # Warning about the soft limit found by the poll, not yet sent
+        self._limit_warning = None
+        self._lock = Lock()
+        self._started_tracing = (trace_allocations and
+                                 not tracemalloc.is_tracing())
+        if self._started_tracing:
+            tracemalloc.start()
+        self._start = perf_counter()
+        self._stop = Event()
+        self._poller = Thread(target=self._poll, args=(poll_seconds,),
+                              daemon=True)
+        self._poller.start()
+
+    def _poll(self, poll_seconds):
+        while not self._stop.wait(poll_seconds):
+            self._read("while running")
+
+    def _read(self, label):
+        """
+        Reads the resident set size and records a warning if it exceeds the
+            soft limit for the first time, at the point of the run given by
+            |label|. Returns the resident set size in bytes, None if it cannot
+            be read.
+        """
+        rss = rss_bytes()
+        if rss is None:
+            return None
+        with self._lock:
+            if self.peak_rss_bytes is None or rss > self.peak_rss_bytes:
+                self.peak_rss_bytes = rss
+            if (self.soft_limit_bytes is not None and
+                    rss > self.soft_limit_bytes and not self._limit_exceeded):
+                self._limit_exceeded = True
+                self._limit_warning = (
+                    f"Memory use of {rss / 1024 ** 2:.0f} MB exceeds the "
+                    f"limit of {self.soft_limit_bytes / 1024 ** 2:.0f} MB "
+                    f"({label})")
+        return rss
+
+    def _send_warning(self):
+        """
+        Sends the warning about the soft limit if one is waiting
+        """
+        with self._lock:
+            warning, self._limit_warning = self._limit_warning, None
+        if warning is not None:
+            add_warning(warning)
+
+    def check(self, label):
+        """
+        Reads the resident set size at the point of the run given by |label|,
+            and warns if it or the background poll found it over the soft
+            limit for the first time. Returns the resident set size in bytes,
+            None if it cannot be read. To be called from the main thread.
+        """
+        rss = self._read(label)
+        self._send_warning()
+        return rss
+
+    def sample(self, label, estimated_bytes=None, **structures):
+        """
+        Records a sample of the memory used at the point of the run given by
+            |label|, with the estimated sizes of the |structures|, and returns
+            it. To be called from the main thread.
+        |estimated_bytes|: dictionary of sizes in bytes of data that cannot be
+            measured, such as the data of searches that have ended, estimated
+            from counts
+        """
+        sample = {"label": label, "seconds": perf_counter() - self._start,
+                  "rss_bytes": self.check(label)}
+        if tracemalloc.is_tracing():
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            sample.update(traced_bytes=traced, traced_peak_bytes=traced_peak,
+                          transient_bytes=traced_peak - traced)
+        sample["structure_bytes"] = dict(
+            (name, estimate_size(structure)) for name, structure in
+            structures.items())
+        sample["estimated_bytes"] = dict(estimated_bytes or {})
+        self.samples.append(sample)
+        return sample
+
+    def summary(self):
+        """
+        Returns the samples and the peak resident set size as a dictionary that
+            can be written as JSON
+        """
+        return {"soft_limit_bytes": self.soft_limit_bytes,
+                "limit_exceeded": self._limit_exceeded,
+                "peak_rss_bytes": self.peak_rss_bytes,
+                "samples": list(self.samples)}
+
+    def dump(self, file_name):
+        """
+        Writes |summary| to the JSON file |file_name|
+        """
+        with open(file_name, "w") as profile_file:
+            dump(self.summary(), profile_file, indent=2)
+
+    def close(self):
+        """
+        Stops polling the resident set size, and tracing allocations if this
+            profile started it. Sends the warning of a breach found by the last
+            polls.
+        """
+        self._stop.set()
+        self._poller.join()
+        self._send_warning()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
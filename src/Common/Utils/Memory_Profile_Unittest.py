@@ -0,0 +1,99 @@
+"""
+Unittest for the memory profile of a run.
+"""
+
+from src.Centrality.Centrality_Computation_Unittest import construct_graph
+from json import loads
+from src.Common.Utils.Memory_Profile import estimate_size
+from src.Common.Utils.Memory_Profile import Memory_Profile
+from src.Common.Utils.Memory_Profile import rss_bytes
+from src.Common.Utils.Messages import message_log
+from src.Common.Utils.Messages import set_headless
+from os.path import join
+from sys import getsizeof
+from tempfile import TemporaryDirectory
+from time import sleep
+import unittest
+
+
+class TestMemoryProfile(unittest.TestCase):
+    """
+    Test class for the memory profile of a run
+    """
+
+    def test_Estimate_Size(self):
+        """
+        Test the estimated sizes of containers and graphs
+        """
+        values = [1.5, 2.5]
+        assert estimate_size(values) == getsizeof(values) + 2 * getsizeof(1.5)
+        # Sampled items are scaled to the whole container
+        rows = [(float(i), [float(i)]) for i in range(1000)]
+        row_bytes = (getsizeof(rows[0]) + getsizeof(0.0) +
+                     getsizeof(rows[0][1]) + getsizeof(0.0))
+        assert estimate_size(rows, 10) == getsizeof(rows) + 1000 * row_bytes
+        graph = construct_graph(["A", "B"], [("A", "B", 1)])
+        assert estimate_size(graph) > getsizeof(graph) + 2 * getsizeof(
+            graph["A"])
+
+    def test_Profile(self):
+        """
+        Test the samples of a profile, its summary, and the warning about the
+            soft limit
+        """
+        assert rss_bytes() > 0
+        set_headless(True)
+        try:
+            profile = Memory_Profile(1, trace_allocations=True,
+                                     poll_seconds=60)
+            graph = construct_graph(["A", "B"], [("A", "B", 1)])
+            sample = profile.sample("Graph built", graph=graph)
+            profile.sample("Done")
+            profile.close()
+            warnings = [message for _, message_type, message in
+                        message_log() if message_type == "warning"]
+        finally:
+            set_headless(False)
+        # The limit is only reported once
+        assert len(warnings) == 1 and "Graph built" in warnings[0]
+        assert sample["rss_bytes"] > 1
+        assert sample["traced_bytes"] > 0
+        assert sample["transient_bytes"] >= 0
+        assert sample["structure_bytes"]["graph"] == estimate_size(graph)
+        with TemporaryDirectory() as directory:
+            file_name = join(directory, "profile.json")
+            profile.dump(file_name)
+            with open(file_name) as profile_file:
+                summary = loads(profile_file.read())
+        assert summary["limit_exceeded"]
+        assert [sample["label"] for sample in summary["samples"]] == [
+            "Graph built", "Done"]
+
+    def test_Poll_Warning(self):
+        """
+        Test that a breach found by the background poll is warned about by the
+            next check
+        """
+        set_headless(True)
+        try:
+            profile = Memory_Profile(1, poll_seconds=0.01)
+            while not profile.summary()["limit_exceeded"]:
+                sleep(0.01)
+            # The poll does not send messages itself
+            warnings_before_check = len(message_log())
+            profile.check("Step")
+            profile.close()
+            warnings = [message for _, message_type, message in
+                        message_log() if message_type == "warning"]
+        finally:
+            set_headless(False)
+        assert warnings_before_check == 0
+        assert len(warnings) == 1 and "while running" in warnings[0]
+        profile = Memory_Profile()
+        sample = profile.sample("Done", {"search": 10})
+        profile.close()
+        assert sample["estimated_bytes"] == {"search": 10}
+
+
+if __name__ == "__main__":
+    unittest.main()
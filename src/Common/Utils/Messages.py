@@ -0,0 +1,147 @@
+"""
+Tool messages and progressor, sent to arcpy when it is loaded and to standard
+    error otherwise, so that the computations can run outside of ArcGIS.
+In headless mode, set by the command line runner, everything goes to standard
+    error even when arcpy is loaded, and the messages are recorded with the
+    time they were sent.
+"""
+
+from sys import modules
+from sys import stderr
+from time import perf_counter
+from traceback import format_exc
+
+# Progress is reported every |PROGRESS_PERCENT_STEP| percent in headless mode
+PROGRESS_PERCENT_STEP = 10
+
+# State of headless mode: whether it is on, when it started, the messages sent
+#     since as (seconds, type, message) triples, and the current progressor
+_headless = {"on": False, "start": 0.0, "log": [], "progressor": None}
+
+
+def set_headless(headless):
+    """
+    Turns headless mode on or off. Turning it on clears the message log.
+    """
+    _headless["on"] = headless
+    _headless["start"] = perf_counter()
+    _headless["log"] = []
+    _headless["progressor"] = None
+
+
+def headless():
+    """
+    Returns True in headless mode
+    """
+    return _headless["on"]
+
+
+def message_log():
+    """
+    Returns the (seconds, type, message) triples of the messages sent since
+        headless mode was turned on, where seconds are counted from then and
+        type is "message", "warning" or "error"
+    """
+    return list(_headless["log"])
+
+
+def _arcpy():
+    """
+    Returns the arcpy module if it has been imported outside of headless mode,
+        None otherwise
+    """
+    return None if _headless["on"] else modules.get("arcpy")
+
+
+def _report(message_type, message, prefix=""):
+    """
+    Prints |message| to standard error, and records it in headless mode
+    """
+    if _headless["on"]:
+        _headless["log"].append((perf_counter() - _headless["start"],
+                                 message_type, str(message)))
+    print(f"{prefix}{message}", file=stderr)
+
+
+def add_message(message):
+    """
+    Reports |message|
+    """
+    arcpy = _arcpy()
+    if arcpy is not None:
+        arcpy.AddMessage(message)
+    else:
+        _report("message", message)
+
+
+def add_warning(message):
+    """
+    Reports |message| as a warning
+    """
+    arcpy = _arcpy()
+    if arcpy is not None:
+        arcpy.AddWarning(message)
+    else:
+        _report("warning", message, "Warning: ")
+
+
+def add_error(message):
+    """
+    Reports |message| as an error
+    """
+    arcpy = _arcpy()
+    if arcpy is not None:
+        arcpy.AddError(message)
+    else:
+        _report("error", message, "Error: ")
+
+
+def geoprocessing_errors():
+    """
+    Returns the error messages of the last geoprocessing tool if arcpy is
+        loaded, and the traceback of the exception being handled otherwise
+    """
+    arcpy = modules.get("arcpy")
+    if arcpy is not None:
+        return arcpy.GetMessages(2)
+    return format_exc()
+
+
+def set_progressor(n, p, caption):
+    """
+    Sets up a step progressor counting to |n| by |p|, labeled |caption|
+    """
+    arcpy = _arcpy()
+    if arcpy is not None:
+        arcpy.SetProgressor("step", "", 0, n, p)
+        arcpy.SetProgressorLabel(caption)
+    elif _headless["on"]:
+        # [caption, number of steps, last percentage reported]
+        _headless["progressor"] = [caption, n, -PROGRESS_PERCENT_STEP]
+
+
+def set_progressor_position(position):
+    """
+    Moves the progressor to |position|
+    """
+    arcpy = _arcpy()
+    if arcpy is not None:
+        arcpy.SetProgressorPosition(position)
+    elif _headless["progressor"] is not None:
+        caption, n, reported = _headless["progressor"]
+        percent = 100 * position // n if n else 100
+        if percent >= reported + PROGRESS_PERCENT_STEP:
+            _headless["progressor"][2] = percent
+            print(f"{caption} {percent}%", file=stderr)
+
+
+def reset_progressor():
+    """
+    Clears the progressor
+    """
+    arcpy = _arcpy()
+    if arcpy is not None:
+        arcpy.SetProgressorLabel("")
+        arcpy.ResetProgressor()
+    else:
+        _headless["progressor"] = None
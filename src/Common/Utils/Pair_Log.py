@@ -0,0 +1,100 @@
+"""
+Structured log of the origin-destination pairs computed by a tool. Each pair
+    is recorded as a line of JSON, buffered and written in batches in the
+    background, instead of being reported with messages, which stalls the tool
+    when there are many pairs. Only a summary of the counts of pairs by status
+    is reported, every |SUMMARY_SECONDS| and when the log is closed.
+"""
+
+from json import dumps
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Streaming import Background_Writer
+from time import perf_counter
+
+# Status of a pair
+COMPUTED = "computed"
+NO_PATH = "no_path"
+BEYOND_RADIUS = "beyond_radius"
+
+# Number of records written together
+BATCH_SIZE = 1000
+# Seconds between two summaries
+SUMMARY_SECONDS = 10.0
+
+
+class Pair_Log:
+    """
+    Log of pairs written to the JSON lines file |file_name|, or only counted if
+        it is None. Summaries are reported labeled |caption|.
+    """
+
+    def __init__(self, file_name, caption, batch_size=BATCH_SIZE,
+                 summary_seconds=SUMMARY_SECONDS):
+        self.caption = caption
+        self.counts = {COMPUTED: 0, NO_PATH: 0, BEYOND_RADIUS: 0}
+        self._batch_size = batch_size
+        self._summary_seconds = summary_seconds
+        self._summarized = perf_counter()
+        self._batch = []
+        self._file = None
+        self._writer = None
+        if file_name is not None:
+            self._file = open(file_name, "w")
+            self._writer = Background_Writer()
+
+    def record(self, origin_id, destination_id, status, **values):
+        """
+        Records the pair from |origin_id| to |destination_id| with |status|,
+            and |values| computed for it
+        """
+        self.counts[status] = self.counts.get(status, 0) + 1
+        if self._file is not None:
+            record = {"origin": origin_id, "destination": destination_id,
+                      "status": status}
+            record.update(values)
+            self._batch.append(dumps(record, default=str))
+            if len(self._batch) >= self._batch_size:
+                self._write_batch()
+        now = perf_counter()
+        if now - self._summarized >= self._summary_seconds:
+            self._summarized = now
+            add_message(self.summary())
+
+    def _write_batch(self):
+        if self._batch:
+            self._writer.submit(self._file.write,
+                                "\n".join(self._batch) + "\n")
+            self._batch = []
+
+    def summary(self):
+        """
+        Returns a message summarizing the counts of pairs by status
+        """
+        return (f"{self.caption}: {sum(self.counts.values())} pairs, "
+                f"{self.counts[COMPUTED]} computed, "
+                f"{self.counts[BEYOND_RADIUS]} beyond the search radius, "
+                f"{self.counts[NO_PATH]} without a path")
+
+    def close(self):
+        """
+        Writes the remaining records and reports the final summary
+        """
+        if self._file is not None:
+            try:
+                self._write_batch()
+                self._writer.close()
+            finally:
+                self._file.close()
+                self._file = None
+        add_message(self.summary())
+
+
+def log_pair(pair_log, origin_id, destination_id, status, message, **values):
+    """
+    Records the pair from |origin_id| to |destination_id| in |pair_log|, or
+        reports |message| if |pair_log| is None
+    """
+    if pair_log is None:
+        add_message(message)
+    else:
+        pair_log.record(origin_id, destination_id, status, **values)
@@ -0,0 +1,79 @@
+"""
+Unittest for the log of the origin-destination pairs computed by a tool.
+"""
+
+from json import loads
+from src.Common.Utils.Messages import message_log
+from src.Common.Utils.Messages import set_headless
+from src.Common.Utils.Pair_Log import BEYOND_RADIUS
+from src.Common.Utils.Pair_Log import COMPUTED
+from src.Common.Utils.Pair_Log import log_pair
+from src.Common.Utils.Pair_Log import NO_PATH
+from src.Common.Utils.Pair_Log import Pair_Log
+from os.path import join
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestPairLog(unittest.TestCase):
+    """
+    Test class for the log of origin-destination pairs
+    """
+
+    def test_Pair_Log(self):
+        """
+        Test that pairs are written as JSON lines and summarized when the log
+            is closed
+        """
+        set_headless(True)
+        try:
+            with TemporaryDirectory() as directory:
+                file_name = join(directory, "pairs.jsonl")
+                pair_log = Pair_Log(file_name, "Pairs", batch_size=2,
+                                    summary_seconds=60)
+                log_pair(pair_log, 1, 2, COMPUTED, "Redundancy=1.00000",
+                         redundancy=1.0)
+                log_pair(pair_log, 1, 3, NO_PATH, "No path found")
+                log_pair(pair_log, 2, 3, BEYOND_RADIUS, "Too far",
+                         distance=5.0)
+                # Nothing is reported per pair
+                assert message_log() == []
+                pair_log.close()
+                with open(file_name) as log_file:
+                    records = [loads(line) for line in log_file]
+            messages = [message for _, _, message in message_log()]
+        finally:
+            set_headless(False)
+        assert records == [
+            {"origin": 1, "destination": 2, "status": COMPUTED,
+             "redundancy": 1.0},
+            {"origin": 1, "destination": 3, "status": NO_PATH},
+            {"origin": 2, "destination": 3, "status": BEYOND_RADIUS,
+             "distance": 5.0}]
+        assert messages == ["Pairs: 3 pairs, 1 computed, 1 beyond the search "
+                            "radius, 1 without a path"]
+
+    def test_Summaries(self):
+        """
+        Test that summaries are given as time passes, and that pairs are
+            reported one by one without a log
+        """
+        set_headless(True)
+        try:
+            pair_log = Pair_Log(None, "Pairs", summary_seconds=0)
+            pair_log.record(1, 2, COMPUTED)
+            pair_log.record(1, 3, COMPUTED)
+            log_pair(None, 2, 3, NO_PATH, "No path found")
+            messages = [message for _, _, message in message_log()]
+        finally:
+            set_headless(False)
+        assert messages == [
+            "Pairs: 1 pairs, 1 computed, 0 beyond the search radius, 0 "
+            "without a path",
+            "Pairs: 2 pairs, 2 computed, 0 beyond the search radius, 0 "
+            "without a path",
+            "No path found"]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+"""
+Stages of a tool whose results are cached by the content of their inputs, so
+    that a run can skip the stages whose inputs have not changed, and resume a
+    failed run after its last successful stage.
+The result of a stage is either a value, saved in the cache, or a file that the
+    stage writes elsewhere, such as a feature class, recorded by its
+    fingerprint so that a file changed or replaced since is not reused.
+"""
+
+from glob import glob
+from hashlib import sha256
+from json import dumps
+from os import makedirs
+from os import remove
+from os import replace
+from os import stat
+from os import walk
+from os.path import exists
+from os.path import dirname
+from os.path import isdir
+from os.path import join
+from os.path import splitext
+from pickle import dump
+from pickle import HIGHEST_PROTOCOL
+from pickle import load
+
+# Extensions of geodatabases, whose datasets are not files of their own
+GEODATABASE_EXTENSIONS = (".gdb", ".mdb")
+
+
+def _geodatabase(path):
+    """
+    Returns the path of the geodatabase holding the dataset at |path|, such as
+        a feature class or a network dataset in a feature dataset, None if it
+        is not in a geodatabase
+    """
+    parent = dirname(path)
+    while parent and parent != path:
+        if splitext(parent)[1].lower() in GEODATABASE_EXTENSIONS:
+            return parent if exists(parent) else None
+        path, parent = parent, dirname(parent)
+    return None
+
+
+def fingerprint(path):
+    """
+    Returns a summary of the size and modification time of the data at |path|,
+        which changes when the data changes. A shapefile includes its sidecar
+        files, and a directory all of its files. A dataset inside a geodatabase
+        is covered by the whole geodatabase. Returns None if there is no such
+        data.
+    """
+    if not exists(path):
+        path = _geodatabase(path)
+        if path is None:
+            return None
+    if isdir(path):
+        paths = [join(directory, file_name) for directory, _, file_names in
+                 walk(path) for file_name in file_names]
+    elif exists(path):
+        paths = glob(f"{splitext(path)[0]}.*") or [path]
+    else:
+        return None
+    summary = []
+    for file_path in sorted(paths):
+        info = stat(file_path)
+        summary.append((file_path, info.st_size, info.st_mtime_ns))
+    return summary
+
+
+def content_key(name, parameters, dependency_keys=()):
+    """
+    Returns the key of the result of stage |name| computed with |parameters|
+        (a JSON-serializable value) from the results with |dependency_keys|
+    """
+    content = dumps({"stage": name, "parameters": parameters,
+                     "dependencies": list(dependency_keys)}, sort_keys=True,
+                    default=repr)
+    return sha256(content.encode("utf-8")).hexdigest()
+
+
+class Pipeline:
+    """
+    Graph of stages, each with its parameters, input files and the stages it
+        depends on. The result of a stage is saved in the cache directory under
+        its content key, which covers its parameters, the fingerprints of its
+        input files and the keys of the stages it depends on.
+    """
+
+    def __init__(self, directory, data_source=None):
+        """
+        |directory|: the cache directory
+        |data_source|: function returning the path of the data behind an input,
+            such as the data source of a layer, None if inputs are paths
+        """
+        self._directory = directory
+        self._data_source = data_source
+        self._stages = {}
+        self._keys = {}
+        self._fingerprints = {}
+
+    def add_stage(self, name, parameters, dependencies=(), inputs=()):
+        """
+        Adds stage |name|, whose result depends on |parameters|, on the results
+            of the stages |dependencies| and on the files |inputs|
+        """
+        self._stages[name] = (parameters, tuple(dependencies), tuple(inputs))
+
+    def _fingerprint(self, path):
+        if path not in self._fingerprints:
+            source = (self._data_source(path) if self._data_source is not None
+                      else path)
+            self._fingerprints[path] = fingerprint(source)
+        return self._fingerprints[path]
+
+    def unfingerprinted_inputs(self):
+        """
+        Returns the inputs of the stages whose data cannot be fingerprinted.
+            Changes to them would go unnoticed, so the stages that depend on
+            them must not be cached.
+        """
+        return sorted(set(path for _, _, inputs in self._stages.values() for
+                          path in inputs if self._fingerprint(path) is None))
+
+    def key(self, name):
+        """
+        Returns the content key of stage |name|. Input files are fingerprinted
+            the first time the key of a stage is needed.
+        """
+        if name not in self._keys:
+            parameters, dependencies, inputs = self._stages[name]
+            self._keys[name] = content_key(
+                name, {"parameters": parameters,
+                       "inputs": [(path, self._fingerprint(path)) for path
+                                  in inputs]},
+                [self.key(dependency) for dependency in dependencies])
+        return self._keys[name]
+
+    def _path(self, name):
+        return join(self._directory, f"{name}.{self.key(name)}.pkl")
+
+    def completed(self, name):
+        """
+        Returns True if the result of stage |name| is in the cache
+        """
+        return exists(self._path(name))
+
+    def last_completed(self, names):
+        """
+        Returns the last of the stages |names| whose result is in the cache,
+            None if there is none
+        """
+        for name in reversed(names):
+            if self.completed(name):
+                return name
+        return None
+
+    def load(self, name):
+        """
+        Returns the cached result of stage |name|
+        """
+        with open(self._path(name), "rb") as result_file:
+            return load(result_file)
+
+    def save(self, name, result):
+        """
+        Caches |result| as the result of stage |name|, replacing the results of
+            the stage for other inputs
+        """
+        makedirs(self._directory, exist_ok=True)
+        path = self._path(name)
+        # Write to a temporary file first, so that a result is only ever seen
+        #     complete
+        with open(f"{path}.tmp", "wb") as result_file:
+            dump(result, result_file, HIGHEST_PROTOCOL)
+        replace(f"{path}.tmp", path)
+        for old_path in glob(join(self._directory, f"{name}.*.pkl")):
+            if old_path != path:
+                remove(old_path)
+
+    def save_artifact(self, name, path):
+        """
+        Records the file at |path|, written by stage |name|, as its result
+        """
+        self.save(name, fingerprint(path))
+
+    def artifact_current(self, name, path):
+        """
+        Returns True if the file at |path| is the result of stage |name| for
+            its current inputs, as recorded by |save_artifact|, and has not
+            changed since
+        """
+        if not self.completed(name):
+            return False
+        saved_fingerprint = self.load(name)
+        return (saved_fingerprint is not None and
+                saved_fingerprint == fingerprint(path))
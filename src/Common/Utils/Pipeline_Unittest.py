@@ -0,0 +1,105 @@
+"""
+Unittest for the stages cached by the content of their inputs.
+"""
+
+from os import makedirs
+from os.path import join
+from src.Common.Utils.Pipeline import fingerprint
+from src.Common.Utils.Pipeline import Pipeline
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestPipeline(unittest.TestCase):
+    """
+    Test class for stages cached by the content of their inputs
+    """
+
+    def _pipeline(self, directory, weight_field):
+        """
+        Returns a pipeline of three stages reading a file in |directory|
+        """
+        pipeline = Pipeline(join(directory, "Cache"))
+        pipeline.add_stage("Graph", ["Length"],
+                           inputs=[join(directory, "Edges.csv")])
+        pipeline.add_stage("Weights", [weight_field], ["Graph"])
+        pipeline.add_stage("Metrics", [True], ["Weights"])
+        return pipeline
+
+    def test_Resume(self):
+        """
+        Test that a run resumes from the last stage with unchanged inputs
+        """
+        with TemporaryDirectory() as directory:
+            with open(join(directory, "Edges.csv"), "w") as edges_file:
+                edges_file.write("A,B,1\n")
+            pipeline = self._pipeline(directory, "Weight")
+            assert pipeline.last_completed(["Graph", "Weights",
+                                            "Metrics"]) is None
+            pipeline.save("Graph", {"A": ["B"]})
+            pipeline.save("Weights", {"A": 1})
+            # Metrics failed
+            pipeline = self._pipeline(directory, "Weight")
+            assert pipeline.last_completed(["Graph", "Weights",
+                                            "Metrics"]) == "Weights"
+            assert pipeline.load("Weights") == {"A": 1}
+            # A changed parameter invalidates its stage and the later ones
+            pipeline = self._pipeline(directory, "Height")
+            assert pipeline.last_completed(["Graph", "Weights",
+                                            "Metrics"]) == "Graph"
+            pipeline.save("Weights", {"A": 2})
+            assert not self._pipeline(directory, "Weight").completed(
+                "Weights")
+            # A changed input file invalidates every stage
+            with open(join(directory, "Edges.csv"), "a") as edges_file:
+                edges_file.write("B,C,1\n")
+            pipeline = self._pipeline(directory, "Height")
+            assert pipeline.last_completed(["Graph", "Weights",
+                                            "Metrics"]) is None
+
+    def test_Data_Sources(self):
+        """
+        Test that datasets in geodatabases and layers are fingerprinted by
+            their data, and that other inputs are reported
+        """
+        with TemporaryDirectory() as directory:
+            geodatabase = join(directory, "Data.gdb")
+            makedirs(geodatabase)
+            with open(join(geodatabase, "a00000001.gdbtable"), "w") as table:
+                table.write("1")
+            network = join(geodatabase, "Transportation", "Streets_ND")
+            assert fingerprint(network) == fingerprint(geodatabase)
+            assert fingerprint(join(directory, "Streets_ND")) is None
+            sources = {"Streets": network}
+            pipeline = Pipeline(join(directory, "Cache"),
+                                lambda path: sources.get(path, path))
+            pipeline.add_stage("Graph", [], inputs=["Streets", "Buildings"])
+            assert pipeline.unfingerprinted_inputs() == ["Buildings"]
+            key = pipeline.key("Graph")
+            with open(join(geodatabase, "a00000001.gdbtable"), "a") as table:
+                table.write("2")
+            pipeline = Pipeline(join(directory, "Cache"),
+                                lambda path: sources.get(path, path))
+            pipeline.add_stage("Graph", [], inputs=["Streets", "Buildings"])
+            assert pipeline.key("Graph") != key
+
+    def test_Artifacts(self):
+        """
+        Test that a file written by a stage is reused only while unchanged
+        """
+        with TemporaryDirectory() as directory:
+            points = join(directory, "Points.shp")
+            with open(points, "w") as points_file:
+                points_file.write("1")
+            pipeline = Pipeline(join(directory, "Cache"))
+            pipeline.add_stage("Points", ["INSIDE"])
+            assert not pipeline.artifact_current("Points", points)
+            pipeline.save_artifact("Points", points)
+            assert pipeline.artifact_current("Points", points)
+            with open(join(directory, "Points.dbf"), "w") as dbf_file:
+                dbf_file.write("SnapX")
+            assert not pipeline.artifact_current("Points", points)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,56 +1,290 @@
 """
 Easy to use progress bar to provide feedback while a tool is running.
+Stepping a bar only counts; the time is looked at every so many steps, adapted
+    to the rate of the steps, and progress is reported at most every
+    |MIN_REPORT_SECONDS|, with the rate of the steps and the time left, to the
+    sinks set with |set_progress_sinks|: the progressor (see Messages.py) by
+    default, a terminal line or a JSON lines log.
+Bars created while steps are forwarded (see |forward_progress| and
+    |report_progress_to|) report nothing themselves and add their steps to
+    another bar, possibly through a |Progress_Counter| shared with worker
+    processes.
 """
 
 __author__ = 'mikemeko@mit.edu (Michael Mekonnen)'
 
-from arcpy import ResetProgressor
-from arcpy import SetProgressor
-from arcpy import SetProgressorLabel
-from arcpy import SetProgressorPosition
+from contextlib import contextmanager
+from json import dumps
+from multiprocessing import Value
+from src.Common.Utils.Messages import reset_progressor
+from src.Common.Utils.Messages import set_progressor
+from src.Common.Utils.Messages import set_progressor_position
+from sys import stderr
+from time import perf_counter
+from time import time
+
+# Least number of seconds between two reports of a bar
+MIN_REPORT_SECONDS = 0.5
+
+
+class Progress_Sink:
+    """
+    Destination of the progress of bars, told when a bar starts, moves and
+        finishes
+    """
+
+    def start(self, caption, n):
+        """
+        A bar labeled |caption| counting to |n| started
+        """
+        pass
+
+    def update(self, caption, count, n, rate, eta):
+        """
+        The bar labeled |caption| is at |count| out of |n|, taking |rate| steps
+            per second, with |eta| seconds left (None if unknown)
+        """
+        pass
+
+    def finish(self, caption, count, n, seconds):
+        """
+        The bar labeled |caption| finished at |count| out of |n|, after
+            |seconds|
+        """
+        pass
+
+
+class Progressor_Sink(Progress_Sink):
+    """
+    Reports progress to the step progressor of Messages.py: the arcpy
+        progressor in ArcGIS, standard error in headless mode
+    """
+
+    def start(self, caption, n):
+        set_progressor(n, 1, caption)
+        set_progressor_position(0)
+
+    def update(self, caption, count, n, rate, eta):
+        set_progressor_position(count)
+
+    def finish(self, caption, count, n, seconds):
+        set_progressor_position(count)
+        reset_progressor()
+
+
+class Terminal_Sink(Progress_Sink):
+    """
+    Reports progress on a single line of |stream|, with the rate and time left
+    """
+
+    def __init__(self, stream=stderr):
+        self._stream = stream
+
+    def update(self, caption, count, n, rate, eta):
+        percent = 100 * count // n if n else 100
+        eta_text = f", {eta:.0f} s left" if eta is not None else ""
+        self._stream.write(f"\r{caption} {percent}% ({count}/{n}, "
+                           f"{rate:.1f}/s{eta_text})")
+        self._stream.flush()
+
+    def finish(self, caption, count, n, seconds):
+        self._stream.write(f"\r{caption} {count}/{n} in {seconds:.1f} s\n")
+        self._stream.flush()
+
+
+class JSON_Lines_Sink(Progress_Sink):
+    """
+    Appends a JSON record of each report to the file |file_name|
+    """
+
+    def __init__(self, file_name):
+        self._file = open(file_name, "a")
+
+    def _write(self, record):
+        record["time"] = time()
+        self._file.write(f"{dumps(record)}\n")
+        self._file.flush()
+
+    def start(self, caption, n):
+        self._write({"event": "start", "caption": caption, "n": n})
+
+    def update(self, caption, count, n, rate, eta):
+        self._write({"event": "update", "caption": caption, "count": count,
+                     "n": n, "rate": rate, "eta": eta})
+
+    def finish(self, caption, count, n, seconds):
+        self._write({"event": "finish", "caption": caption, "count": count,
+                     "n": n, "seconds": seconds})
+
+    def close(self):
+        self._file.close()
+
+
+# Sinks that bars report to
+_sinks = [Progressor_Sink()]
+# Where the steps of new bars are forwarded, if anywhere: a bar or a
+#     |Progress_Counter|
+_forward_to = []
+
+
+def set_progress_sinks(sinks):
+    """
+    Makes bars created from now on report to |sinks|
+    """
+    _sinks[:] = sinks
+
+
+def progress_sinks():
+    """
+    Returns the sinks that bars report to
+    """
+    return list(_sinks)
+
+
+@contextmanager
+def forward_progress(target):
+    """
+    Within the with block, bars created add their steps to |target|, a
+        |Progress_Bar| or |Progress_Counter|, instead of reporting them
+    """
+    _forward_to.append(target)
+    try:
+        yield target
+    finally:
+        _forward_to.pop()
+
+
+def report_progress_to(counter):
+    """
+    Makes bars created from now on add their steps to the |Progress_Counter|
+        |counter|, e.g. in a worker process, as the initializer of its pool
+    """
+    _forward_to[:] = [counter]
+
+
+class Progress_Counter:
+    """
+    A count of steps shared with worker processes, which must receive it when
+        they start, e.g. through the initializer of their pool
+    """
+
+    def __init__(self):
+        self._value = Value("q", 0)
+
+    def step(self, count=1):
+        """
+        Adds |count| steps
+        """
+        with self._value.get_lock():
+            self._value.value += count
+
+    @property
+    def value(self):
+        return self._value.value
 
 
 class Progress_Bar:
     """
-    Wrapper for the arcpy progress bar.
+    Progress bar counting to |n|, labeled |caption|, displayed at most every |p|
+        steps
     """
 
     def __init__(self, n, p, caption):
         """
         |n|: number of steps to count to.
-        |p|: display is updated every |p| steps.
+        |p|: display is updated every |p| steps at most.
         |caption|: message to display with the progress bar.
         """
         self._n = n
-        self._p = p
+        self._p = max(1, p)
         self._caption = caption
-        # Create progress bar
-        self._bar = self._progress_bar()
-        # Start progress bar
-        self.step()
-
-    def step(self):
-        """
-        Move the progress bar by 1 step
-        """
-        next(self._bar)
-
-    def _progress_bar(self):
-        """
-        A generator representation of the arcpy progressor
-        """
-        # Setup progressor with min, max, interval, and label
-        SetProgressor("step", "", 0, self._n, self._p)
-        SetProgressorLabel(self._caption)
-        # Counter
-        count = 0
-        while True:
-            # Update display
-            if count % self._p == 0:
-                SetProgressorPosition(count)
-            # Finished?
-            if count == self._n:
-                SetProgressorLabel("")
-                ResetProgressor()
-            count += 1
-            yield
+        self._target = _forward_to[-1] if _forward_to else None
+        self._sinks = [] if self._target is not None else list(_sinks)
+        self._counter = None
+        # Steps taken, and the part of them reported to |_target|
+        self._count = 0
+        self._forwarded = 0
+        # The time is looked at once |_count| reaches |_next_check|, every
+        #     |_check_every| steps
+        self._check_every = self._p
+        self._next_check = self._p
+        self._start = self._checked = self._reported = perf_counter()
+        self._finished = False
+        for sink in self._sinks:
+            sink.start(caption, n)
+        if n <= 0:
+            self._check()
+
+    def step(self, count=1):
+        """
+        Move the progress bar by |count| steps
+        """
+        self._count += count
+        if self._count >= self._next_check:
+            self._check()
+
+    def finish(self):
+        """
+        Reports the bar as finished, whether or not it counted to |n|
+        """
+        self._report(perf_counter(), self.count(), True)
+
+    def shared_counter(self):
+        """
+        Returns a |Progress_Counter| whose steps, taken by worker processes, are
+            added to those of this bar when it is polled
+        """
+        if self._counter is None:
+            self._counter = Progress_Counter()
+        return self._counter
+
+    def poll(self):
+        """
+        Takes in the steps of the shared counter, see |shared_counter|
+        """
+        self._check()
+
+    def count(self):
+        """
+        Returns the number of steps taken, with those of the shared counter
+        """
+        return self._count + (self._counter.value if self._counter is not None
+                              else 0)
+
+    def _check(self):
+        now = perf_counter()
+        count = self.count()
+        done = count >= self._n
+        # Forwarded steps are not reported, so they are passed on at every check
+        if (done or self._target is not None or
+                now - self._reported >= MIN_REPORT_SECONDS):
+            self._report(now, count, done)
+        # Look at the time about four times per report
+        if now - self._checked < MIN_REPORT_SECONDS / 8:
+            self._check_every *= 2
+        elif (now - self._checked > MIN_REPORT_SECONDS / 2 and
+              self._check_every > self._p):
+            self._check_every //= 2
+        self._checked = now
+        self._next_check = self._count + self._check_every
+        if self._count < self._n:
+            self._next_check = min(self._next_check, self._n)
+
+    def _report(self, now, count, done):
+        self._reported = now
+        if self._target is not None:
+            self._target.step(count - self._forwarded)
+            self._forwarded = count
+            return
+        if self._finished:
+            return
+        seconds = now - self._start
+        if done:
+            self._finished = True
+            for sink in self._sinks:
+                sink.finish(self._caption, count, self._n, seconds)
+            return
+        rate = count / seconds if seconds > 0 else 0.0
+        eta = (self._n - count) / rate if rate > 0 else None
+        for sink in self._sinks:
+            sink.update(self._caption, count, self._n, rate, eta)
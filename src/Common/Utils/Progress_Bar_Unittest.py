@@ -0,0 +1,147 @@
+"""
+Unittest for the progress bar and its sinks.
+"""
+
+from src.Centrality.Centrality_Computation_Unittest import construct_graph
+from src.Centrality.Components import compute_centrality_by_component
+from src.Centrality.Constants import INFINITE_RADIUS
+from src.Centrality.Constants import STEP_4
+from concurrent.futures import ProcessPoolExecutor
+from json import loads
+from os.path import join
+from src.Common.Utils.Progress_Bar import forward_progress
+from src.Common.Utils.Progress_Bar import JSON_Lines_Sink
+from src.Common.Utils.Progress_Bar import Progress_Bar
+from src.Common.Utils.Progress_Bar import Progress_Sink
+from src.Common.Utils.Progress_Bar import progress_sinks
+from src.Common.Utils.Progress_Bar import report_progress_to
+from src.Common.Utils.Progress_Bar import set_progress_sinks
+from tempfile import TemporaryDirectory
+import unittest
+
+
+def step_progress_bar(n):
+    """
+    Steps a progress bar |n| times, in a worker process
+    """
+    progress = Progress_Bar(n, 1, "Worker")
+    for _ in range(n):
+        progress.step()
+
+
+class Recording_Sink(Progress_Sink):
+    """
+    Records the progress reported to it
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def start(self, caption, n):
+        self.events.append(("start", caption, n))
+
+    def update(self, caption, count, n, rate, eta):
+        self.events.append(("update", caption, count))
+
+    def finish(self, caption, count, n, seconds):
+        self.events.append(("finish", caption, count))
+
+
+class TestProgress(unittest.TestCase):
+    """
+    Test class for the progress bar and the sinks it reports to
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.default_sinks = progress_sinks()
+        self.sink = Recording_Sink()
+        set_progress_sinks([self.sink])
+
+    def tearDown(self):
+        """
+        Teardown
+        """
+        set_progress_sinks(self.default_sinks)
+
+    def test_Throttling(self):
+        """
+        Test that reports are throttled by time
+        """
+        progress = Progress_Bar(100000, 1, "Counting")
+        for _ in range(100000):
+            progress.step()
+        events = self.sink.events
+        assert events[0] == ("start", "Counting", 100000)
+        assert events[-1] == ("finish", "Counting", 100000)
+        # Reports are throttled by time, not made at every step
+        assert len(events) < 100
+        progress.step()
+        assert len(self.sink.events) == len(events)
+        Progress_Bar(0, 1, "Nothing")
+        assert self.sink.events[-1] == ("finish", "Nothing", 0)
+
+    def test_Forward_Progress(self):
+        """
+        Test that the steps of nested bars are counted by the outer bar
+        """
+        progress = Progress_Bar(10, 1, "Parts")
+        for _ in range(2):
+            with forward_progress(progress):
+                part_progress = Progress_Bar(5, 1, "Part")
+                for _ in range(5):
+                    part_progress.step()
+        assert [event[1] for event in self.sink.events] == ["Parts", "Parts"]
+        assert self.sink.events[-1] == ("finish", "Parts", 10)
+
+    def test_Shared_Counter(self):
+        """
+        Test that steps taken in worker processes are counted
+        """
+        progress = Progress_Bar(30, 1, "Workers")
+        with ProcessPoolExecutor(max_workers=2,
+                                 initializer=report_progress_to,
+                                 initargs=(progress.shared_counter(),)) as \
+                executor:
+            list(executor.map(step_progress_bar, [10, 20]))
+        progress.poll()
+        assert progress.count() == 30
+        assert self.sink.events[-1] == ("finish", "Workers", 30)
+
+    def test_Partitions(self):
+        """
+        Test that computing by component reports one bar for the origins
+        """
+        graph = construct_graph(["A", "B", "C", "D"], [("A", "B", 1),
+                                                       ("C", "D", 1)])
+        for processes in [1, 2]:
+            self.sink.events = []
+            compute_centrality_by_component(
+                graph, ["A", "B", "C"], True, False, False, False, False,
+                INFINITE_RADIUS, True, 1, [], [], processes=processes)
+            finished = [event for event in self.sink.events if event[0] ==
+                        "finish"]
+            assert finished == [("finish", STEP_4, 3)]
+
+    def test_JSON_Lines_Sink(self):
+        """
+        Test that progress is written as JSON lines
+        """
+        with TemporaryDirectory() as directory:
+            file_name = join(directory, "progress.jsonl")
+            sink = JSON_Lines_Sink(file_name)
+            set_progress_sinks([sink])
+            progress = Progress_Bar(2, 1, "Logged")
+            progress.step()
+            progress.step()
+            sink.close()
+            with open(file_name) as log_file:
+                records = [loads(line) for line in log_file]
+        assert [record["event"] for record in records] == ["start", "finish"]
+        assert records[-1]["count"] == 2
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Counters of the work done by shortest path searches, for finding the origins
+    that make a run slow and for comparing search engines. A search records
+    its counts once it is done, and the counts are aggregated into power of
+    two histograms, so that the memory used does not grow with the number of
+    searches, and the slowest searches are kept with their counts.
+"""
+
+from heapq import heappush
+from heapq import heappushpop
+from json import dump
+from math import ceil
+from time import perf_counter
+
+# Counts recorded for each search
+COUNTS = ("pushes", "pops", "decrease_keys", "relaxed", "settled",
+          "max_queue")
+# Wall time of the searches is histogrammed in microseconds
+MICROSECONDS = "microseconds"
+# Number of slowest searches kept by default
+SLOWEST_COUNT = 10
+
+
+def bucket(value):
+    """
+    Returns the smallest power of two at least |value|, or 0 if |value| is 0
+    """
+    return 0 if value <= 0 else 1 << (ceil(value) - 1).bit_length()
+
+
+class Search_Counters:
+    """
+    Aggregated counts of the shortest path searches of an |engine|, keeping the
+        |slowest_count| slowest searches
+    """
+
+    def __init__(self, engine, slowest_count=SLOWEST_COUNT):
+        self.engine = engine
+        self.slowest_count = slowest_count
+        self.searches = 0
+        self.seconds = 0.0
+        self.totals = dict((count, 0) for count in COUNTS)
+        self.maxima = dict((count, 0) for count in COUNTS)
+        self.histograms = dict((count, {}) for count in COUNTS +
+                               (MICROSECONDS,))
+        # Min-heap of (seconds, search number, origin, counts)
+        self._slowest = []
+        self._start = perf_counter()
+
+    def record(self, origin, seconds, pushes, pops, decrease_keys, relaxed,
+               settled, max_queue):
+        """
+        Records the counts of the search from |origin|, which took |seconds|
+        """
+        counts = dict(zip(COUNTS, (pushes, pops, decrease_keys, relaxed,
+                                   settled, max_queue)))
+        self.searches += 1
+        self.seconds += seconds
+        for count, value in counts.items():
+            self.totals[count] += value
+            if value > self.maxima[count]:
+                self.maxima[count] = value
+            self._add_to_histogram(count, value)
+        self._add_to_histogram(MICROSECONDS, seconds * 1e6)
+        search = (seconds, self.searches, origin, counts)
+        if len(self._slowest) < self.slowest_count:
+            heappush(self._slowest, search)
+        elif self.slowest_count > 0:
+            heappushpop(self._slowest, search)
+
+    def _add_to_histogram(self, count, value):
+        histogram = self.histograms[count]
+        upper_bound = bucket(value)
+        histogram[upper_bound] = histogram.get(upper_bound, 0) + 1
+
+    def slowest(self):
+        """
+        Returns the (origin, seconds, counts) triples of the slowest searches,
+            slowest first
+        """
+        return [(origin, seconds, counts) for seconds, _, origin, counts in
+                sorted(self._slowest, reverse=True)]
+
+    def summary(self):
+        """
+        Returns the aggregated counts as a dictionary that can be written as
+            JSON. Histograms are lists of [upper bound, number of searches]
+            pairs, where a search falls in the first bucket whose upper bound
+            is at least its count.
+        """
+        return {"engine": self.engine,
+                "searches": self.searches,
+                "seconds": self.seconds,
+                "wall_seconds": perf_counter() - self._start,
+                "totals": dict(self.totals),
+                "maxima": dict(self.maxima),
+                "histograms": dict((count, sorted(histogram.items())) for
+                                   count, histogram in
+                                   self.histograms.items()),
+                "slowest": [dict(origin=origin, seconds=seconds, **counts) for
+                            origin, seconds, counts in self.slowest()]}
+
+    def dump(self, file_name):
+        """
+        Writes |summary| to the JSON file |file_name|. Origins that JSON cannot
+            represent are written as strings.
+        """
+        with open(file_name, "w") as counters_file:
+            dump(self.summary(), counters_file, indent=2, default=str)
@@ -0,0 +1,127 @@
+"""
+Unittest for the counters of the work done by shortest path searches.
+"""
+
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Centrality_Computation_Unittest import construct_graph
+from src.Centrality.Computation_Utils import eq_tol
+from src.Centrality.Constants import BETWEENNESS
+from src.Centrality.Constants import GRAVITY
+from src.Centrality.Constants import INFINITE_RADIUS
+from src.Centrality.Constants import REACH
+from src.Centrality.Constants import WEIGHT
+from src.Redundancy.Dijkstra import find_shortest_path
+from json import loads
+from src.Redundancy.Network import csNetwork
+from os.path import join
+from src.Common.Utils.Search_Counters import bucket
+from src.Common.Utils.Search_Counters import Search_Counters
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestSearchCounters(unittest.TestCase):
+    """
+    Search counters
+    A--B
+    |  |
+    C--D
+    The path A-B-C is shorter than the edge A-C, found first
+    """
+
+    def setUp(self):
+        """
+        Setup
+        """
+        self.nodes = ["A", "B", "C", "D"]
+        self.edges = [("A", "B", 1), ("A", "C", 5), ("B", "C", 1),
+                      ("C", "D", 1)]
+
+    def test_Bucket(self):
+        """
+        Test the histogram buckets of counts
+        """
+        assert [bucket(value) for value in [0, 1, 2, 3, 4, 5, 0.5, 4.5]] == [
+            0, 1, 2, 4, 4, 8, 1, 8]
+
+    def test_Compute_Centrality(self):
+        """
+        Test that counting does not change the measures, and the counts of the
+            searches
+        """
+        graph = construct_graph(self.nodes, self.edges)
+        counted_graph = construct_graph(self.nodes, self.edges)
+        for node in list(graph.values()) + list(counted_graph.values()):
+            setattr(node, WEIGHT, 1.0)
+        arguments = ([True] * 3 + [False] * 2 + [INFINITE_RADIUS, True, 1.0,
+                                                  [], []])
+        compute_centrality(graph, self.nodes, *arguments)
+        counters = Search_Counters("test", 2)
+        compute_centrality(counted_graph, self.nodes, *arguments,
+                           counters=counters)
+        for node_id in self.nodes:
+            for measure in [REACH, GRAVITY, BETWEENNESS]:
+                assert eq_tol(getattr(graph[node_id], measure),
+                              getattr(counted_graph[node_id], measure))
+        assert counters.searches == 4
+        summary = counters.summary()
+        assert summary["totals"]["pops"] == 16
+        assert summary["totals"]["settled"] == 16
+        assert summary["totals"]["relaxed"] == 4 * 8
+        assert summary["histograms"]["pops"] == [(4, 4)]
+        assert len(summary["slowest"]) == 2
+        assert (summary["slowest"][0]["seconds"] >=
+                summary["slowest"][1]["seconds"])
+        # The search from A relaxes A-C, then finds the shorter path through B
+        counters = Search_Counters("test")
+        compute_centrality(counted_graph, ["A"], *arguments,
+                           counters=counters)
+        origin, _, counts = counters.slowest()[0]
+        assert origin == "A"
+        assert counts == {"pushes": 4, "pops": 4, "decrease_keys": 1,
+                          "relaxed": 8, "settled": 4, "max_queue": 2}
+
+    def test_Find_Shortest_Path(self):
+        """
+        Test the counts of a search of the redundancy tools
+        """
+        network = csNetwork()
+        for name, start, end in [(0, (0, 0, 0), (4, 0, 0)),
+                                 (1, (4, 0, 0), (8, 0, 0)),
+                                 (2, (4, 0, 0), (4, -4, 0))]:
+            network.addConnections(start, end, [start, end], 4.0, str(name))
+        network.remap()
+        counters = Search_Counters("test")
+        origin = next(iter(network.Nodes))
+        find_shortest_path(network, origin, counters=counters,
+                           search_id="search")
+        search_id, _, counts = counters.slowest()[0]
+        assert search_id == "search"
+        assert counts["pops"] == counts["settled"] == len(network.Nodes)
+        assert counts["pushes"] == len(network.Nodes) - 1
+        assert counts["decrease_keys"] == 0
+        # Each edge is relaxed once, away from the origin
+        assert counts["relaxed"] == len(network.Edges)
+        with TemporaryDirectory() as directory:
+            file_name = join(directory, "counters.json")
+            counters.dump(file_name)
+            with open(file_name) as counters_file:
+                summary = loads(counters_file.read())
+        assert summary["engine"] == "test"
+        assert summary["searches"] == 1
+        # Edges out of the destination, beyond |max_dist| or to avoided nodes
+        #     are not relaxed
+        middle = [node_id for node_id, node in network.Nodes.items() if
+                  node.Point == (4, 0, 0)][0]
+        for arguments in [{"destination": middle}, {"max_dist": 4.0},
+                          {"nodes_to_avoid": {middle}}]:
+            counters = Search_Counters("test")
+            find_shortest_path(network, origin, counters=counters,
+                               **arguments)
+            _, _, counts = counters.slowest()[0]
+            assert counts["relaxed"] == (0 if "nodes_to_avoid" in arguments
+                                         else 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
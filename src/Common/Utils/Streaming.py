@@ -0,0 +1,177 @@
+"""
+Overlapping of reading and writing with computation, using bounded queues so
+    that memory stays capped by the queue sizes.
+Rows are read ahead in a reader process rather than a thread: decoding them is
+    Python code that holds the interpreter lock, so a reader thread would only
+    take turns with the computation, and a reader process needs a processor of
+    its own. Backends whose reads cannot leave the main thread, such as arcpy
+    cursors, are read in place.
+"""
+
+from multiprocessing import Event as Process_Event
+from multiprocessing import Process
+from multiprocessing import Queue as Process_Queue
+from os import cpu_count
+from queue import Empty
+from queue import Full
+from queue import Queue
+from threading import Event
+from threading import Thread
+
+# Number of items read ahead together, and number of chunks of items or of
+#     writes that may wait in a queue
+CHUNK_SIZE = 4096
+QUEUE_SIZE = 4
+# Smallest number of rows worth starting a reader process for, and number of
+#     processors needed for the reader to run alongside the computation
+PREFETCH_MIN_ROWS = 50000
+PREFETCH_MIN_PROCESSORS = 2
+# Seconds between checks that the other side of a queue is still there
+POLL_SECONDS = 0.1
+
+# Markers ending a queue of chunks
+_DONE = "done"
+_ERROR = "error"
+_CHUNK = "chunk"
+
+
+def _put(queue, item, stop):
+    """
+    Puts |item| in |queue|, waiting for room unless |stop| is set. Returns
+        False if |stop| was set first.
+    """
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=POLL_SECONDS)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _read_rows(backend, dataset, columns, chunk_size, queue, stop):
+    """
+    Puts the rows of |columns| of |dataset| in |queue| in chunks of
+        |chunk_size| rows, then a marker of the end or of the error raised
+    """
+    try:
+        chunk = []
+        for row in backend.iter_rows(dataset, columns):
+            chunk.append(tuple(row))
+            if len(chunk) == chunk_size:
+                if not _put(queue, (_CHUNK, chunk), stop):
+                    return
+                chunk = []
+        if chunk and not _put(queue, (_CHUNK, chunk), stop):
+            return
+        _put(queue, (_DONE, None), stop)
+    except BaseException as exception:
+        _put(queue, (_ERROR, exception), stop)
+
+
+def prefetch_rows(backend, dataset, columns, chunk_size=CHUNK_SIZE,
+                  queue_size=QUEUE_SIZE, min_rows=PREFETCH_MIN_ROWS,
+                  min_processors=PREFETCH_MIN_PROCESSORS):
+    """
+    Yields the rows of |columns| of |dataset|, as |backend.iter_rows| does.
+        If |backend| reads in other processes, there are at least
+        |min_processors| processors and |dataset| has at least |min_rows| rows,
+        the rows are read ahead in a reader process in chunks
+        of |chunk_size| rows, with at most |queue_size| chunks waiting. An
+        exception raised while reading is raised here.
+    """
+    if (not backend.reads_in_process or (cpu_count() or 1) < min_processors or
+            backend.count(dataset) < min_rows):
+        yield from backend.iter_rows(dataset, columns)
+        return
+    queue = Process_Queue(queue_size)
+    stop = Process_Event()
+    reader = Process(target=_read_rows, args=(backend, dataset, list(columns),
+                                              chunk_size, queue, stop),
+                     daemon=True)
+    reader.start()
+    try:
+        while True:
+            try:
+                kind, chunk = queue.get(timeout=POLL_SECONDS)
+            except Empty:
+                if reader.is_alive():
+                    continue
+                # The reader may have ended right after its last put
+                try:
+                    kind, chunk = queue.get(timeout=POLL_SECONDS)
+                except Empty:
+                    raise RuntimeError(f"The reader of {dataset} ended "
+                                       f"with exit code {reader.exitcode}")
+            if kind == _DONE:
+                break
+            if kind == _ERROR:
+                raise chunk
+            yield from chunk
+    finally:
+        # Let the reader stop if the rows are not all consumed, taking what it
+        #     already put so that it can exit
+        stop.set()
+        while reader.is_alive():
+            try:
+                queue.get(timeout=POLL_SECONDS)
+            except Empty:
+                pass
+        reader.join()
+
+
+class Background_Writer:
+    """
+    Runs writes in a background thread, in the order they are submitted, while
+        the caller goes on computing. At most |queue_size| writes wait, so
+        submitting blocks when the writer falls behind. An exception raised by
+        a write is raised by the next call to |submit| or |close|.
+    """
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self._queue = Queue(queue_size)
+        self._stop = Event()
+        self._error = None
+        self._writer = Thread(target=self._write, daemon=True)
+        self._writer.start()
+
+    def _write(self):
+        while True:
+            try:
+                write = self._queue.get(timeout=POLL_SECONDS)
+            except Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if self._error is None:
+                try:
+                    function, args = write
+                    function(*args)
+                except BaseException as exception:
+                    self._error = exception
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def submit(self, function, *args):
+        """
+        Calls |function| with |args| in the background
+        """
+        self._raise_error()
+        _put(self._queue, (function, args), self._stop)
+
+    def close(self):
+        """
+        Waits for the submitted writes to finish
+        """
+        self._stop.set()
+        self._writer.join()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
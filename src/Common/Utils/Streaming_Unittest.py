@@ -0,0 +1,91 @@
+"""
+Unittest for the background reading and writing.
+"""
+
+from src.Common.Geodata.Backend import Geodata_Backend
+from multiprocessing import active_children
+from src.Common.Utils.Streaming import Background_Writer
+from src.Common.Utils.Streaming import prefetch_rows
+import unittest
+
+
+class List_Backend(Geodata_Backend):
+    """
+    Backend reading rows from lists, where None stands for a corrupt row
+    """
+
+    def __init__(self, tables, reads_in_process=True):
+        self.tables = tables
+        self.reads_in_process = reads_in_process
+
+    def count(self, dataset):
+        return len(self.tables[dataset])
+
+    def iter_rows(self, dataset, columns):
+        for row in self.tables[dataset]:
+            if row is None:
+                raise ValueError("Corrupt row")
+            yield tuple(row[column] for column in columns)
+
+
+class TestStreaming(unittest.TestCase):
+    """
+    Test class for background reading and writing
+    """
+
+    def test_Prefetch_Rows(self):
+        """
+        Test that rows read ahead come in order, with the errors of the reader,
+            and that the reader stops when the rows are not all consumed
+        """
+        backend = List_Backend({"rows": [(i, -i) for i in range(10)],
+                                "empty": [], "corrupt": [(1, 1), None],
+                                "long": [(i, i) for i in range(1000)]})
+        assert list(prefetch_rows(backend, "rows", [1, 0], 3, 2, 0, 1)) == [
+            (-i, i) for i in range(10)]
+        assert list(prefetch_rows(backend, "empty", [0], 3, 2, 0, 1)) == []
+        with self.assertRaises(ValueError):
+            list(prefetch_rows(backend, "corrupt", [0], 1, 1, 0, 1))
+        # The reader stops when the rows are not all consumed
+        rows = prefetch_rows(backend, "long", [0], 10, 1, 0, 1)
+        assert next(rows) == (0,)
+        rows.close()
+        assert active_children() == []
+
+    def test_Rows_Read_In_Place(self):
+        """
+        Test that no reader process is started for backends that read in the
+            main thread, for small datasets, or without a spare processor
+        """
+        rows = [(i,) for i in range(10)]
+        for backend, min_rows, min_processors in [
+                (List_Backend({"rows": rows}, False), 0, 1),
+                (List_Backend({"rows": rows}), 11, 1),
+                (List_Backend({"rows": rows}), 0, 10 ** 6)]:
+            read = prefetch_rows(backend, "rows", [0], 3, 2, min_rows,
+                                 min_processors)
+            assert next(read) == (0,)
+            assert active_children() == []
+            assert list(read) == rows[1:]
+
+    def test_Background_Writer(self):
+        """
+        Test that writes are made in order, and that their errors are raised
+            on close
+        """
+        written = []
+        with Background_Writer(2) as writer:
+            for i in range(20):
+                writer.submit(written.append, i)
+        assert written == list(range(20))
+
+        def fail(_):
+            raise IOError("Disk full")
+        writer = Background_Writer(2)
+        writer.submit(fail, 0)
+        with self.assertRaises(IOError):
+            writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
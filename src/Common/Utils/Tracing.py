@@ -0,0 +1,151 @@
+"""
+Tracing of where the wall time of a run goes: the steps of the tools, their
+    sub-phases and the units of work within them are recorded as spans, with
+    their start time, duration, process and thread, and attributes. The spans
+    are exported as Chrome trace events, which chrome://tracing and Perfetto
+    display as a timeline.
+When tracing is off, starting a span returns |NO_SPAN|, which records nothing.
+"""
+
+from json import dump
+from os import getpid
+from threading import current_thread
+from threading import get_ident
+from time import perf_counter
+
+# Categories of spans
+STEP = "step"
+PHASE = "phase"
+PARTITION = "partition"
+OD_PAIR = "od_pair"
+
+# State of tracing: whether it is on, when it started, the events recorded
+#     since, and the names of the (process id, thread id) pairs that recorded
+#     them
+_tracing = {"on": False, "start": 0.0, "events": [], "threads": {}}
+
+
+def start_tracing():
+    """
+    Starts recording spans, clearing the events recorded before
+    """
+    _tracing["on"] = True
+    _tracing["start"] = perf_counter()
+    _tracing["events"] = []
+    _tracing["threads"] = {}
+
+
+def stop_tracing():
+    """
+    Stops recording spans, keeping the events recorded
+    """
+    _tracing["on"] = False
+
+
+def tracing():
+    """
+    Returns True if spans are being recorded
+    """
+    return _tracing["on"]
+
+
+def trace_events():
+    """
+    Returns the Chrome trace events recorded since tracing was started
+    """
+    return list(_tracing["events"])
+
+
+def add_trace_events(events):
+    """
+    Adds |events| recorded elsewhere, e.g. by a worker process, to the trace
+    """
+    _tracing["events"].extend(events)
+
+
+class Span:
+    """
+    A span of time named |name|, in |category|, started when it is created and
+        recorded when |end| is called, or when its with block exits
+    """
+
+    def __init__(self, name, category, attributes):
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self._start = perf_counter()
+        self._ended = False
+
+    def set(self, **attributes):
+        """
+        Adds |attributes| to the span
+        """
+        self.attributes.update(attributes)
+
+    def end(self, **attributes):
+        """
+        Ends the span, with |attributes| added. Ending it again does nothing.
+        """
+        if self._ended:
+            return
+        self._ended = True
+        end = perf_counter()
+        self.attributes.update(attributes)
+        pid, tid = getpid(), get_ident()
+        _tracing["threads"][(pid, tid)] = current_thread().name
+        _tracing["events"].append({
+            "name": self.name, "cat": self.category, "ph": "X",
+            "ts": (self._start - _tracing["start"]) * 1e6,
+            "dur": (end - self._start) * 1e6, "pid": pid, "tid": tid,
+            "args": self.attributes})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        if exception is not None:
+            self.attributes["error"] = repr(exception)
+        self.end()
+
+
+class _No_Span:
+    """
+    A span that records nothing, used when tracing is off
+    """
+
+    def set(self, **attributes):
+        pass
+
+    def end(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        pass
+
+
+NO_SPAN = _No_Span()
+
+
+def span(name, category=STEP, **attributes):
+    """
+    Starts a span named |name| in |category|, with |attributes|, if tracing is
+        on. Returns the span, to be ended with |end| or used in a with block.
+    """
+    return Span(name, category, attributes) if _tracing["on"] else NO_SPAN
+
+
+def write_trace(file_name):
+    """
+    Writes the events recorded to |file_name| in the Chrome trace event format,
+        with the names of the threads that recorded them. Attributes that JSON
+        cannot represent are written as strings.
+    """
+    thread_names = [{"name": "thread_name", "ph": "M", "pid": pid,
+                     "tid": tid, "args": {"name": name}} for (pid, tid), name
+                    in _tracing["threads"].items()]
+    with open(file_name, "w") as trace_file:
+        dump({"traceEvents": thread_names + trace_events(),
+              "displayTimeUnit": "ms"}, trace_file, default=str)
@@ -0,0 +1,91 @@
+"""
+Unittest for the tracing of the wall time of a run.
+"""
+
+from src.Centrality.Centrality_Computation import compute_centrality
+from src.Centrality.Centrality_Computation_Unittest import construct_graph
+from src.Centrality.Constants import INFINITE_RADIUS
+from src.Centrality.Constants import REACH
+from src.Centrality.Constants import WEIGHT
+from json import loads
+from os.path import join
+from tempfile import TemporaryDirectory
+from src.Common.Utils.Tracing import NO_SPAN
+from src.Common.Utils.Tracing import span
+from src.Common.Utils.Tracing import start_tracing
+from src.Common.Utils.Tracing import stop_tracing
+from src.Common.Utils.Tracing import trace_events
+from src.Common.Utils.Tracing import write_trace
+import unittest
+
+
+class TestTracing(unittest.TestCase):
+    """
+    Test class for the spans of a run
+    """
+
+    def tearDown(self):
+        """
+        Teardown
+        """
+        stop_tracing()
+
+    def test_No_Tracing(self):
+        """
+        Test that nothing is recorded when tracing is off
+        """
+        start_tracing()
+        stop_tracing()
+        with span("Step") as step_span:
+            step_span.set(size=1)
+        assert step_span is NO_SPAN
+        assert trace_events() == []
+
+    def test_Spans(self):
+        """
+        Test the events recorded for spans, nested and failing
+        """
+        start_tracing()
+        step_span = span("Step", size=1)
+        with span("Phase", "phase"):
+            pass
+        with self.assertRaises(ValueError):
+            with span("Failing phase", "phase"):
+                raise ValueError("Bad input")
+        step_span.end(success=True)
+        step_span.end(success=False)
+        phase, failing_phase, step = trace_events()
+        assert [event["name"] for event in [phase, failing_phase, step]] == [
+            "Phase", "Failing phase", "Step"]
+        assert all(event["ph"] == "X" for event in [phase, step])
+        assert step["cat"] == "step" and phase["cat"] == "phase"
+        assert step["args"] == {"size": 1, "success": True}
+        assert "Bad input" in failing_phase["args"]["error"]
+        # The phase lies within the step
+        assert step["ts"] <= phase["ts"]
+        assert phase["ts"] + phase["dur"] <= step["ts"] + step["dur"]
+
+    def test_Write_Trace(self):
+        """
+        Test that the trace of a computation is written as JSON
+        """
+        start_tracing()
+        graph = construct_graph(["A", "B"], [("A", "B", 1)])
+        for node in graph.values():
+            setattr(node, WEIGHT, 1.0)
+        compute_centrality(graph, ["A", "B"], True, False, False, False,
+                           False, INFINITE_RADIUS, True, 1.0, [REACH], [])
+        stop_tracing()
+        with TemporaryDirectory() as directory:
+            file_name = join(directory, "trace.json")
+            write_trace(file_name)
+            with open(file_name) as trace_file:
+                trace = loads(trace_file.read())
+        metadata, normalization = trace["traceEvents"]
+        assert metadata["ph"] == "M" and metadata["name"] == "thread_name"
+        assert normalization["cat"] == "phase"
+        assert normalization["tid"] == metadata["tid"]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,7 @@ from collections import defaultdict
 from src.Common.Data_Structures.PriorityQueue import PriorityQueue
 from src.Redundancy.Network import csNetwork
 from src.Redundancy.Utils import memoized
+from time import perf_counter
 
 
 def _path(parent, node):
@@ -27,7 +28,7 @@ def _path(parent, node):
 
 
 def find_shortest_path(network, origin, destination=None, nodes_to_avoid=None,
-                       max_dist=float('inf')):
+                       max_dist=float('inf'), counters=None, search_id=None):
     """
     Returns the shortest path(s) from |origin| in |network|. If |destination| is
         given, returns a list of the edge ids for the path as well as the shortest
@@ -36,7 +37,9 @@ def find_shortest_path(network, origin, destination=None, nodes_to_avoid=None,
         paths from |origin| can be obtained. Uses Dijkstra's algorithm. If
         |nodes_to_avoid| is given, the path(s) is/are searched so as not to
         include any of the nodes in that set. No path whose distance exceeds
-        |max_dist| is found.
+        |max_dist| is found. If |counters| (a Search_Counters) is given, the
+        work of the search is recorded in it under |search_id|, |origin| by
+        default.
     TODO(mikemeko): what if there are multiple shortest paths?
     """
     assert isinstance(network, csNetwork)
@@ -59,10 +62,31 @@ def find_shortest_path(network, origin, destination=None, nodes_to_avoid=None,
     distance[origin] = 0
     agenda = PriorityQueue([(0, origin)])
     discovered = set()
+    counting = counters is not None
+    if counting:
+        start = perf_counter()
+        pops = decrease_keys = relaxed = max_queue = 0
+
+    def _record():
+        """
+        Records the counts of the search, every item of the agenda but the first
+            having been pushed.
+        """
+        counters.record(origin if search_id is None else search_id,
+                        perf_counter() - start,
+                        pops + decrease_keys + len(agenda) - 1, pops,
+                        decrease_keys, relaxed, pops,
+                        max(max_queue, len(agenda)))
     while len(agenda) > 0:
+        if counting:
+            max_queue = max(max_queue, len(agenda))
         u = agenda.pop()
         discovered.add(u)
+        if counting:
+            pops += 1
         if u == destination:
+            if counting:
+                _record()
             return _path(parent, destination), distance[u]
         else:
             for edge_id in network.Nodes[u].Edges:
@@ -71,10 +95,18 @@ def find_shortest_path(network, origin, destination=None, nodes_to_avoid=None,
                     v = edge.otherEnd(u)
                     if v not in discovered and v not in nodes_to_avoid:
                         dist_v_through_u = distance[u] + edge.Length
+                        # Edges are relaxed toward the nodes in reach that are
+                        #     not settled or avoided
+                        if counting and dist_v_through_u <= max_dist:
+                            relaxed += 1
                         if dist_v_through_u < distance[v] and dist_v_through_u <= max_dist:
                             distance[v] = dist_v_through_u
                             parent[v] = (u, edge_id)
                             if agenda.contains(v):
                                 agenda.remove(v)
+                                if counting:
+                                    decrease_keys += 1
                             agenda.push(v, distance[v] + _heuristic(v))
+    if counting:
+        _record()
     return (parent, distance) if destination is None else None
@@ -13,17 +13,12 @@ Classes in this script:
 __author__ = 'raul_kalvo, mikemeko'
 __date__ = 'May 24, 2013'
 
-from arcpy import AddMessage
-from arcpy.da import SearchCursor
 from collections import defaultdict
 from math import sqrt
-from time import time
-from src.Redundancy.Utils import arcGISPointAsTuple
-from src.Redundancy.Utils import calculate_network_locations
-from src.Redundancy.Utils import fields
-from src.Redundancy.Utils import getEdgePathFromNetwork
-from src.Redundancy.Utils import network_locations_calculated
-from src.Redundancy.Utils import polyline_points
+from src.Common.Geodata.Backend import default_backend
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Tracing import PHASE
+from src.Common.Utils.Tracing import span
 
 
 class csNetwork(object):
@@ -108,29 +103,29 @@ class csNetwork(object):
         self.E[edge_index] = e
 
     def printNodes(self):
-        AddMessage("")
-        AddMessage("printNodes:")
-        AddMessage("")
-        AddMessage("%6s %10s %10s %10s \t %s" % ("ID", "X", "Y", "Z", "Edges"))
+        add_message("")
+        add_message("printNodes:")
+        add_message("")
+        add_message("%6s %10s %10s %10s \t %s" % ("ID", "X", "Y", "Z", "Edges"))
         for n in self.N:
-            AddMessage("%6s %10.2f %10.2f %10.2f \t %s" % (n,
-                                                           self.N[n].Point[0],
-                                                           self.N[n].Point[1],
-                                                           self.N[n].Point[2],
-                                                           self.N[n].Edges))
-        AddMessage("")
+            add_message("%6s %10.2f %10.2f %10.2f \t %s" % (n,
+                                                            self.N[n].Point[0],
+                                                            self.N[n].Point[1],
+                                                            self.N[n].Point[2],
+                                                            self.N[n].Edges))
+        add_message("")
 
     def printEdges(self):
-        AddMessage("")
-        AddMessage("printEdges:")
-        AddMessage("")
-        AddMessage(f"{'ID':>6} {'Length':>10} {'tag':>10} \t{'Nodes'}")
-        AddMessage("")
+        add_message("")
+        add_message("printEdges:")
+        add_message("")
+        add_message(f"{'ID':>6} {'Length':>10} {'tag':>10} \t{'Nodes'}")
+        add_message("")
         for e in self.E:
             tag = ""
             if self.E[e].Hidden:
                 tag = "hidden"
-            AddMessage(
+            add_message(
                 f"{e:>6} {self.E[e].Length:10.2f} {tag:>10} \t{self.E[e].Nodes}")
 
     def edgeIDbyNodes(self, node1, node2):
@@ -151,8 +146,8 @@ class csNetwork(object):
             e = self.E[k]
             s1 = f"{e.Start} \t {e.End} \t {e.Length} \t {k}"
             s2 = f"{e.End} \t {e.Start} \t {e.Length} \t {k}"
-            AddMessage(s1)
-            AddMessage(s2)
+            add_message(s1)
+            add_message(s2)
             output_table.append(s1)
             output_table.append(s2)
         return output_table
@@ -218,8 +213,8 @@ class csNetwork(object):
                 n = self.N[nid]
                 if n.OriginalEdge == edge_id:
                     if n.TValue == t_value:
-                        AddMessage("@addPseudoNode: Two nodes are exactly same"
-                                   " place")
+                        add_message("@addPseudoNode: Two nodes are exactly same"
+                                    " place")
                     tN.append((n.TValue, nid))
             tN.sort()
             # Find adjacent node names:
@@ -562,61 +557,60 @@ class csPoint(object):
     Weight = property(getWeight, setWeight)
 
 
-def buildNetwork(network_file_path):
+def buildNetwork(network_file_path, backend=None):
     """
     DESCRIPTION:
         This function builds network from ND file.
         ND file has line
     PARAMETERS:
         network_file_path : String < path to ND file.
+        backend           : Geodata_Backend = None < defaults to
+                            default_backend()
     RETURN:
         csNetwork
     """
-    DEBUG = False
-    tStart = time()
+    if backend is None:
+        backend = default_backend()
     network = csNetwork()
-    feature_class_path = getEdgePathFromNetwork(network_file_path)
-    rows = SearchCursor(feature_class_path, ["SHAPE@", "OID@"])
-    if DEBUG:
-        AddMessage("Delta: " + str(time() - tStart))
-    for row in rows:
-        feat_shape = row[0]
-        pFirst = feat_shape.firstPoint
-        pLast = feat_shape.lastPoint
-        l = feat_shape.length3D
-        points = polyline_points(feat_shape)
-        network.addConnections(arcGISPointAsTuple(pFirst), arcGISPointAsTuple(
-            pLast), points, l, str(row[1]))
-    if DEBUG:
-        tEnd = time()
-        AddMessage("Delta: " + str(tEnd - tStart))
-    network.remap()
-    if DEBUG:
-        tEnd = time()
-        AddMessage("Delta: " + str(tEnd - tStart))
+    feature_class_path = backend.edge_source(network_file_path)
+    rows = backend.read_polylines(feature_class_path)
+    with span("Reading network edges", PHASE):
+        for oid, parts, l in rows:
+            pFirst = parts[0][0]
+            pLast = parts[-1][-1]
+            points = parts[0]
+            network.addConnections(pFirst, pLast, points, l, str(oid))
+    with span("Remapping network", PHASE):
+        network.remap()
     return network
 
 
-def loadBuildingsOnNetwork(point_file_path, weights_field):
+def loadBuildingsOnNetwork(point_file_path, weights_field, id_field="OID@",
+                           backend=None):
     """
     DESCRIPTION:
         This function reads point locations on network.
     PARAMETERS:
         point_file_path    : String
         weights_field      : String
+        id_field           : String < field used as Point ID
+        backend            : Geodata_Backend = None < defaults to
+                             default_backend()
         SourceOID : String
         PosAlong  : String
     RETURN:
         Points    : {Point ID, csPoint}
         Edge to points : {Edge ID, [Point ID]}
     """
-    cursor_fields = ["OID@", "SourceOID", "PosAlong", "SnapX", "SnapY"]
-    points_have_snap_z = "SnapZ" in fields(point_file_path)
+    if backend is None:
+        backend = default_backend()
+    cursor_fields = [id_field, "SourceOID", "PosAlong", "SnapX", "SnapY"]
+    points_have_snap_z = "SnapZ" in backend.fields(point_file_path)
     if points_have_snap_z:
         cursor_fields.append("SnapZ")
     if weights_field:
         cursor_fields.append(weights_field)
-    rows = SearchCursor(point_file_path, cursor_fields)
+    rows = backend.iter_rows(point_file_path, cursor_fields)
     points = {}
     edge_to_points = defaultdict(list)
     for row in rows:
@@ -632,28 +626,37 @@ def loadBuildingsOnNetwork(point_file_path, weights_field):
 
 
 def construct_network_and_load_buildings(points_file, network_file,
-                                         building_weights_field=None):
+                                         building_weights_field=None,
+                                         id_field="OID@", backend=None):
     """
     First constructs a network representation using the |network_file|, and then
         load the buildings in the |points_file| onto the network representation.
         |building_weights_field|, if available, is the field for building weights.
+        |id_field| is the field used to identify the buildings.
+        |backend| reads the files, and defaults to |default_backend()|.
         Returns the network representation, the points, and a mapping from edges
         to the points on the respective edges. Prints console messages.
     """
+    if backend is None:
+        backend = default_backend()
     # build network
-    AddMessage("Building network representation ...")
-    network = buildNetwork(network_file)
-    AddMessage("\tDone.")
+    add_message("Building network representation ...")
+    with span("Building network representation"):
+        network = buildNetwork(network_file, backend)
+    add_message("\tDone.")
     # calculate network locations if not already calculated
-    if not network_locations_calculated(points_file):
-        AddMessage("Calculating Network Locations ...")
-        calculate_network_locations(points_file, network_file)
-        AddMessage("\tDone.")
+    if not backend.network_locations_calculated(points_file):
+        add_message("Calculating Network Locations ...")
+        with span("Calculating network locations"):
+            backend.calculate_network_locations(points_file, network_file)
+        add_message("\tDone.")
     # load buildings on the network
-    AddMessage("Loading buildings on network representation ...")
-    points, edge_to_points = loadBuildingsOnNetwork(points_file,
-                                                    building_weights_field)
-    AddMessage("\tDone.")
+    add_message("Loading buildings on network representation ...")
+    with span("Loading buildings on network representation"):
+        points, edge_to_points = loadBuildingsOnNetwork(points_file,
+                                                        building_weights_field,
+                                                        id_field, backend)
+    add_message("\tDone.")
     return network, points, edge_to_points
 
 
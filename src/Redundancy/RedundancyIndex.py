@@ -5,13 +5,18 @@ Script to comput the redundancy index for a given pair of points in a network.
 __author__ = 'raul_kalvo, mikemeko'
 __date__ = 'May 4, 2013'
 
-from arcpy import AddMessage
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Pair_Log import BEYOND_RADIUS
+from src.Common.Utils.Pair_Log import COMPUTED
+from src.Common.Utils.Pair_Log import log_pair
+from src.Common.Utils.Pair_Log import NO_PATH
 from src.Redundancy.Dijkstra import find_shortest_path
 from src.Redundancy.Utils import edge_building_weight_sum
 
 
 def find_redundancy_index(network, points, edge_to_points, coeff, origin_id,
-                          destination_id, search_radius, weights_available):
+                          destination_id, search_radius, weights_available,
+                          counters=None, pair_log=None):
     """
     Returns the redundancy index and unique segments for the given pair of points
         |origin_id| and |destination_id|. |network| is the csNetwork in which the
@@ -22,29 +27,38 @@ def find_redundancy_index(network, points, edge_to_points, coeff, origin_id,
         have weights so that the redundancy index can be computed appropriately.
         Returns None if the shortest path between the two points is larger than
         |search_radius| or there is no network path between the two points.
+        If |counters| (a Search_Counters) is given, the work of the shortest
+        path searches is recorded in it, under the pair of points. If
+        |pair_log| (a Pair_Log) is given, the outcome for the pair is recorded
+        in it instead of being reported with messages.
     """
     # print current OD pair
-    AddMessage(f"O={origin_id} D={destination_id}")
+    if pair_log is None:
+        add_message(f"O={origin_id} D={destination_id}")
     # add origin and destination pseudo nodes to network
     o_point = points[origin_id]
     network.addPseudoNode(o_point.tValue, o_point.Segment, "O", o_point.Point)
     d_point = points[destination_id]
     network.addPseudoNode(d_point.tValue, d_point.Segment, "D", d_point.Point)
     # find the shortest path distance between origin and destination
-    search_result = find_shortest_path(network, "O", "D")
+    search_id = f"{origin_id}-{destination_id}"
+    search_result = find_shortest_path(network, "O", "D", counters=counters,
+                                       search_id=search_id)
     if search_result is None:
-        AddMessage("No path found")
+        log_pair(pair_log, origin_id, destination_id, NO_PATH, "No path found")
         network.clearPsudoNodes()
         return None
     shortest_path, shortest_path_dist = search_result
     if shortest_path_dist > search_radius:
-        AddMessage(
-            f"Shortest path distance <{shortest_path_dist}> larger than search radius <{search_radius}>")
+        log_pair(pair_log, origin_id, destination_id, BEYOND_RADIUS,
+                 f"Shortest path distance <{shortest_path_dist}> larger than search radius <{search_radius}>",
+                 distance=shortest_path_dist)
         network.clearPsudoNodes()
         return None
     # compute unique segments
     unique_segments = _redundant_unique_segments(network,
-                                                 shortest_path_dist * coeff)
+                                                 shortest_path_dist * coeff,
+                                                 counters, search_id)
     # compute redundancy
     # TODO(mikemeko, raul_kalvo): think of better ideas for what to do when
     #     redundancy index denominator is 0
@@ -63,15 +77,19 @@ def find_redundancy_index(network, points, edge_to_points, coeff, origin_id,
     # compute unique network segments
     unique_network_segments = set(map(network.originalEdge, unique_segments))
     # result
-    AddMessage(f"Redundancy={redundancy:.5f}")
+    log_pair(pair_log, origin_id, destination_id, COMPUTED,
+             f"Redundancy={redundancy:.5f}", distance=shortest_path_dist,
+             redundancy=redundancy)
     network.clearPsudoNodes()
     return redundancy, unique_network_segments
 
 
-def _redundant_unique_segments(network, dist_quota):
+def _redundant_unique_segments(network, dist_quota, counters=None,
+                               search_id=None):
     """
     Returns a set of the edge ids in the |network| involved in redundant paths
-        from "O" to "D" at the given |dist_quota|.
+        from "O" to "D" at the given |dist_quota|. The searches are recorded in
+        |counters|, if given, under |search_id| followed by their root.
     TODO(mikemeko): note well that this algorithm allows repeating edges in paths.
         This algorithm does NOT enforce the restriction of having simple paths. It
         would be great to have proofs of (1) our problem being NP-complete (if so)
@@ -80,10 +98,12 @@ def _redundant_unique_segments(network, dist_quota):
     """
     # find all shortest paths from "O" at a max distance of the quota
     o_parent, o_distance = find_shortest_path(
-        network, "O", max_dist=dist_quota)
+        network, "O", max_dist=dist_quota, counters=counters,
+        search_id=f"{search_id}:O")
     # find all shortest paths from "D" at a max distance of the quota
     d_parent, d_distance = find_shortest_path(
-        network, "D", max_dist=dist_quota)
+        network, "D", max_dist=dist_quota, counters=counters,
+        search_id=f"{search_id}:D")
     # find all nodes within reach
     nodes_in_reach = set(o_parent.keys()) | set(d_parent.keys())
     # track successful and unsuccessful segments
@@ -1,25 +1,25 @@
 """
 Main file for redundancy index tool.
+The indices are computed without arcpy when it cannot be imported, on
+    shapefiles read by the shapefile backend. The output layer and the
+    symbolized edges are then left out.
 """
 
 __author__ = 'raul_kalvo, mikemeko'
 __date__ = 'June 24, 2013'
 
-from arcpy import AddError
-from arcpy import AddField_management
-from arcpy import AddMessage
-from arcpy import AddWarning
-from arcpy import ApplySymbologyFromLayer_management
-from arcpy import CopyFeatures_management
-from arcpy import Describe
-from arcpy import env
-from arcpy import MakeFeatureLayer_management
-from arcpy import SaveToLayerFile_management
-from arcpy.da import UpdateCursor
-# from arcpy.mapping import Layer
-# from arcpy.mp import Layer
-from arcpy import mp
+from src.Common.Utils.Messages import add_error
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Messages import add_warning
+from src.Common.Utils.Memory_Profile import Memory_Profile
+from src.Common.Utils.Pair_Log import Pair_Log
+from src.Common.Geodata.Backend import default_backend
+from src.Common.Geodata.Backend import INTEGER
+from src.Common.Geodata.Backend import OID
 from src.Common.Utils.Progress_Bar import Progress_Bar
+from src.Common.Utils.Search_Counters import Search_Counters
+from src.Common.Utils.Tracing import OD_PAIR
+from src.Common.Utils.Tracing import span
 from math import sqrt
 from src.Redundancy.Network import construct_network_and_load_buildings
 from os.path import join
@@ -33,6 +33,22 @@ from src.Redundancy.Utils import is_number
 from src.Redundancy.Utils import network_cost_attributes
 from src.Redundancy.Utils import select_edges_from_network
 
+# Count the work of the shortest path searches of each OD pair, and write
+#     histograms of the counts with the slowest searches to a JSON file next to
+#     the output (see Search_Counters.py)
+SEARCH_COUNTERS = False
+# Sample the memory used after loading the network and after computing the
+#     indices, with the sizes of the network and of the memo of computed
+#     indices, and write the samples to a JSON file next to the output (see
+#     Memory_Profile.py). A warning is given once the memory used exceeds
+#     SOFT_MEMORY_LIMIT bytes, unless it is None.
+PROFILE_MEMORY = False
+SOFT_MEMORY_LIMIT = None
+# Record the outcome of each OD pair in a JSON lines file next to the output,
+#     reporting only periodic summaries, instead of several messages per pair
+#     (see Pair_Log.py)
+LOG_PAIRS = True
+
 
 def main():
     # tool inputs
@@ -47,14 +63,16 @@ def main():
     INPUT_OUTPUT_DIRECTORY = argv[8]
     INPUT_OUTPUT_FEATURE_CLASS_NAME = argv[9]
 
+    backend = default_backend()
+
     # check that network has "Length" attribute
     if "Length" not in network_cost_attributes(INPUT_NETWORK):
-        AddError(f"Network <{INPUT_NETWORK}> does not have Length attribute")
+        add_error(f"Network <{INPUT_NETWORK}> does not have Length attribute")
         return
 
     # check that coeff is at least 1
     if INPUT_COEFF < 1:
-        AddError(f"Redundancy coefficient <{INPUT_COEFF}> must be at least 1")
+        add_error(f"Redundancy coefficient <{INPUT_COEFF}> must be at least 1")
         return
 
     # if we are given a building weights field, check that it is valid
@@ -62,28 +80,35 @@ def main():
         INPUT_BUILDING_WEIGHTS_FIELD = ""
     if INPUT_BUILDING_WEIGHTS_FIELD and (INPUT_BUILDING_WEIGHTS_FIELD not in
                                          fields(INPUT_POINTS)):
-        AddError(f"Building weights field <{INPUT_BUILDING_WEIGHTS_FIELD}> is not a valid " +
-                 f"attribute in the input points <{INPUT_POINTS}>")
+        add_error(f"Building weights field <{INPUT_BUILDING_WEIGHTS_FIELD}> is not a valid " +
+                  f"attribute in the input points <{INPUT_POINTS}>")
         return
 
     # setup
-    env.overwriteOutput = True
+    if backend.geoprocessing:
+        from arcpy import env
+        env.overwriteOutput = True
 
     # copy the input points into an output feature class
-    AddMessage("Copying input points to output feature class ...")
+    add_message("Copying input points to output feature class ...")
     # input_points_layer = Layer(INPUT_POINTS)
     # output_feature_class = f"{join(INPUT_OUTPUT_DIRECTORY, INPUT_OUTPUT_FEATURE_CLASS_NAME)}.shp"
     # CopyFeatures_management(in_features=input_points_layer,
     #                         out_feature_class=output_feature_class)
 
     output_feature_class = f"{join(INPUT_OUTPUT_DIRECTORY, INPUT_OUTPUT_FEATURE_CLASS_NAME)}.shp"
-    CopyFeatures_management(in_features=INPUT_POINTS,
-                            out_feature_class=output_feature_class)
-    AddMessage("\tDone.")
+    backend.copy_features(INPUT_POINTS, output_feature_class)
+    add_message("\tDone.")
+
+    memory_profile = (Memory_Profile(SOFT_MEMORY_LIMIT) if PROFILE_MEMORY or
+                      SOFT_MEMORY_LIMIT is not None else None)
 
     # construct network and points
     network, points, edge_to_points = construct_network_and_load_buildings(
         INPUT_POINTS, INPUT_NETWORK, INPUT_BUILDING_WEIGHTS_FIELD)
+    if memory_profile is not None:
+        memory_profile.sample("Network loaded", network=network,
+                              points=points, edge_to_points=edge_to_points)
 
     # extract origin and destination ids
     origin_ids = flagged_points(INPUT_POINTS, INPUT_ORIGINS_FIELD)
@@ -91,13 +116,17 @@ def main():
     if (len(origin_ids) == 0 or
             len(destination_ids) == 0 or
             (len(origin_ids) == 1 and origin_ids == destination_ids)):
-        AddWarning("No OD pair found, no computation will be done.")
+        add_warning("No OD pair found, no computation will be done.")
 
     # compute redundancy index statistics for each origin point
-    AddMessage("Computing redundancy indices ...")
+    add_message("Computing redundancy indices ...")
     redundancy_indices = {}
     # memoize: computing index from O to D is same as computing it from D to O
     memo = {}
+    search_counters = (Search_Counters("find_shortest_path") if
+                       SEARCH_COUNTERS else None)
+    pair_log = (Pair_Log(f"{join(INPUT_OUTPUT_DIRECTORY, INPUT_OUTPUT_FEATURE_CLASS_NAME)}_Pairs.jsonl",
+                         "Redundancy indices") if LOG_PAIRS else None)
     for origin_id in origin_ids:
         progress_bar = Progress_Bar(len(destination_ids),
                                     1,
@@ -117,9 +146,12 @@ def main():
                             max(origin_id,
                                 destination_id))
                 if memo_key not in memo:
-                    memo[memo_key] = find_redundancy_index(network, points,
-                                                           edge_to_points, INPUT_COEFF, origin_id, destination_id,
-                                                           INPUT_SEARCH_RADIUS, bool(INPUT_BUILDING_WEIGHTS_FIELD))
+                    with span("Redundancy index", OD_PAIR, origin=origin_id,
+                              destination=destination_id):
+                        memo[memo_key] = find_redundancy_index(network, points,
+                                                               edge_to_points, INPUT_COEFF, origin_id, destination_id,
+                                                               INPUT_SEARCH_RADIUS, bool(INPUT_BUILDING_WEIGHTS_FIELD),
+                                                               search_counters, pair_log)
                 if memo[memo_key] is not None:
                     n += 1
                     redundancy_pair, unique_segments_pair = memo[memo_key]
@@ -145,34 +177,55 @@ def main():
             max_redundancy_index = 0
         redundancy_indices[origin_id] = (n, avg_redundancy_index, std,
                                          min_redundancy_index, max_redundancy_index, all_unique_segments)
-    AddMessage("\tDone.")
+    if pair_log is not None:
+        pair_log.close()
+    add_message("\tDone.")
+    if memory_profile is not None:
+        memory_profile.sample("Indices computed", memo=memo,
+                              redundancy_indices=redundancy_indices)
+        memory_profile.close()
+        if PROFILE_MEMORY:
+            memory_profile.dump(f"{join(INPUT_OUTPUT_DIRECTORY, INPUT_OUTPUT_FEATURE_CLASS_NAME)}_Memory_Profile.json")
+    if search_counters is not None:
+        counters_file_name = f"{join(INPUT_OUTPUT_DIRECTORY, INPUT_OUTPUT_FEATURE_CLASS_NAME)}_Search_Counters.json"
+        search_counters.dump(counters_file_name)
+        add_message(f"Search counts written to {counters_file_name}")
 
     # write out redundancy statistics to output feature class
     # delete all points that are not origins from the output feature class
-    AddMessage("Writing out results ...")
-    int_fields = ["InputID", "Reach"]
-    double_fields = ["AvgRedund", "StdRedund", "MinRedund", "MaxRedund"]
-    for field in int_fields:
-        AddField_management(in_table=output_feature_class, field_name=field,
-                            field_type="INTEGER")
-    for field in double_fields:
-        AddField_management(in_table=output_feature_class, field_name=field,
-                            field_type="DOUBLE")
-    rows = UpdateCursor(output_feature_class,
-                        ["OID@"] + int_fields + double_fields)
-    for row in rows:
-        oid = row[0]
-        if Describe(INPUT_POINTS).extension != "shp":
-            # original ids start from 1, but shapefile ids start from 0, so add
-            #     1 to shapefile id for correct matching
-            oid += 1
-        if oid in redundancy_indices:
-            n, avg, std, m, M, all_unique_segments = redundancy_indices[oid]
-            row[1:] = [oid, n, avg, std, m, M]
-            rows.updateRow(row)
-        else:
-            rows.deleteRow()
+    add_message("Writing out results ...")
+    # original ids start from 1, but shapefile ids start from 0, so add 1 to
+    #     shapefile id for correct matching. Without arcpy, the input points
+    #     are a shapefile.
+    if backend.geoprocessing:
+        from arcpy import Describe
+        id_offset = 0 if Describe(INPUT_POINTS).extension == "shp" else 1
+    else:
+        id_offset = 0
+    input_ids = list(redundancy_indices)
+    statistics = [redundancy_indices[input_id] for input_id in input_ids]
+    columns = {"InputID": input_ids,
+               "Reach": [n for n, _, _, _, _, _ in statistics],
+               "AvgRedund": [avg for _, avg, _, _, _, _ in statistics],
+               "StdRedund": [std for _, _, std, _, _, _ in statistics],
+               "MinRedund": [m for _, _, _, m, _, _ in statistics],
+               "MaxRedund": [M for _, _, _, _, M, _ in statistics]}
+    backend.write_columns(
+        output_feature_class, OID, [input_id - id_offset for input_id in
+                                    input_ids], columns,
+        field_types={"InputID": INTEGER, "Reach": INTEGER},
+        delete_missing=True)
+    add_message("\tDone.")
+    # layers and symbology need ArcGIS
+    if not backend.geoprocessing:
+        return
+    # from arcpy.mapping import Layer
+    # from arcpy.mp import Layer
+    from arcpy import ApplySymbologyFromLayer_management
+    from arcpy import MakeFeatureLayer_management
+    from arcpy import SaveToLayerFile_management
     # create a layer of the output feature class, for symbology purposes
+    add_message("Symbolizing results ...")
     output_layer = f"{join(INPUT_OUTPUT_DIRECTORY, INPUT_OUTPUT_FEATURE_CLASS_NAME)}.lyr"
     MakeFeatureLayer_management(in_features=output_feature_class,
                                 out_layer=INPUT_OUTPUT_FEATURE_CLASS_NAME)
@@ -190,7 +243,7 @@ def main():
         select_edges_from_network(INPUT_NETWORK, all_unique_segments,
                                   INPUT_OUTPUT_DIRECTORY,
                                   f"{INPUT_OUTPUT_FEATURE_CLASS_NAME}_edges")
-    AddMessage("\tDone.")
+    add_message("\tDone.")
 
 
 def _common_id(id_pairs):
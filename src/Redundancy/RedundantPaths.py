@@ -5,13 +5,17 @@ Script to find all redundant paths between a given pair of points in a network.
 __author__ = 'mikemeko'
 __date__ = 'August 12, 2013'
 
-from arcpy import AddMessage
 from collections import defaultdict
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Pair_Log import BEYOND_RADIUS
+from src.Common.Utils.Pair_Log import COMPUTED
+from src.Common.Utils.Pair_Log import log_pair
+from src.Common.Utils.Pair_Log import NO_PATH
 from src.Redundancy.Dijkstra import find_shortest_path
 
 
 def find_all_paths(network, points, coeff, origin_id, destination_id,
-                   search_radius, compute_wayfinding):
+                   search_radius, compute_wayfinding, pair_log=None):
     """
     Returns all paths from |origin_id| to |destination_id|. Paths are returned as
         lists of 3D point tuples. |network| is the network in which the paths are
@@ -22,10 +26,12 @@ def find_all_paths(network, points, coeff, origin_id, destination_id,
         redundancy index, and the wayfinding index (if requested as per
         |compute_wayfinding|). Returns None if the shortest path between the two
         points is greater than |search_radius| or there is no network path between
-        the two points.
+        the two points. If |pair_log| (a Pair_Log) is given, the outcome for
+        the pair is recorded in it instead of being reported with messages.
     """
     # print current OD pair
-    AddMessage(f"O={origin_id} D={destination_id}")
+    if pair_log is None:
+        add_message(f"O={origin_id} D={destination_id}")
     # add origin and destination pseudo nodes to network
     o_point = points[origin_id]
     network.addPseudoNode(o_point.tValue, o_point.Segment, "O", o_point.Point)
@@ -34,13 +40,14 @@ def find_all_paths(network, points, coeff, origin_id, destination_id,
     # find the shortest path distance between origin and destination
     search_result = find_shortest_path(network, "O", "D")
     if search_result is None:
-        AddMessage("No path found")
+        log_pair(pair_log, origin_id, destination_id, NO_PATH, "No path found")
         network.clearPsudoNodes()
         return None
     shortest_path, shortest_path_dist = search_result
     if shortest_path_dist > search_radius:
-        AddMessage(
-            f"Shortest path distance <{shortest_path_dist}> larger than search radius <{search_radius}>")
+        log_pair(pair_log, origin_id, destination_id, BEYOND_RADIUS,
+                 f"Shortest path distance <{shortest_path_dist}> larger than search radius <{search_radius}>",
+                 distance=shortest_path_dist)
         network.clearPsudoNodes()
         return None
     available_dist = shortest_path_dist * coeff
@@ -71,7 +78,12 @@ def find_all_paths(network, points, coeff, origin_id, destination_id,
     results = [f"Number of paths={len(paths)}", f"Redundancy={redundancy:.5f}"]
     if compute_wayfinding:
         results.append(f"Wayfinding={wayfinding:.5f}")
-    AddMessage(", ".join(results))
+    values = {"distance": shortest_path_dist, "paths": len(paths),
+              "redundancy": redundancy}
+    if compute_wayfinding:
+        values["wayfinding"] = wayfinding
+    log_pair(pair_log, origin_id, destination_id, COMPUTED, ", ".join(results),
+             **values)
     network.clearPsudoNodes()
     output = [path_points, unique_network_segment_counts,
               len(paths), redundancy]
@@ -5,10 +5,7 @@ Main file for redundant paths tool.
 __author__ = 'mikemeko'
 __date__ = 'August 12, 2013'
 
-from arcpy import AddError
 from arcpy import AddField_management
-from arcpy import AddMessage
-from arcpy import AddWarning
 from arcpy import ApplySymbologyFromLayer_management
 from arcpy import Array
 from arcpy import CopyFeatures_management
@@ -20,7 +17,14 @@ from arcpy import Polyline
 from arcpy import SaveToLayerFile_management
 from arcpy.da import UpdateCursor
 from collections import defaultdict
+from src.Common.Utils.Messages import add_error
+from src.Common.Utils.Messages import add_message
+from src.Common.Utils.Messages import add_warning
+from src.Common.Utils.Memory_Profile import Memory_Profile
+from src.Common.Utils.Pair_Log import Pair_Log
 from src.Common.Utils.Progress_Bar import Progress_Bar
+from src.Common.Utils.Tracing import OD_PAIR
+from src.Common.Utils.Tracing import span
 from src.Redundancy.Network import construct_network_and_load_buildings
 from os.path import join
 from src.Redundancy.RedundantPaths import find_all_paths
@@ -33,6 +37,18 @@ from src.Redundancy.Utils import network_cost_attributes
 from src.Redundancy.Utils import select_edges_from_network
 from src.Redundancy.Utils import write_rows_to_csv
 
+# Sample the memory used after loading the network and after finding the paths,
+#     with the sizes of the network and of the paths kept for the output, and
+#     write the samples to a JSON file next to the output (see
+#     Memory_Profile.py). A warning is given once the memory used exceeds
+#     SOFT_MEMORY_LIMIT bytes, unless it is None.
+PROFILE_MEMORY = False
+SOFT_MEMORY_LIMIT = None
+# Record the outcome of each OD pair in a JSON lines file next to the output,
+#     reporting only periodic summaries, instead of several messages per pair
+#     (see Pair_Log.py)
+LOG_PAIRS = True
+
 
 def main():
     # tool inputs
@@ -50,32 +66,32 @@ def main():
 
     # check that network has "Length" attribute
     if "Length" not in network_cost_attributes(INPUT_NETWORK):
-        AddError("Network <%s> does not have Length attribute" % INPUT_NETWORK)
+        add_error("Network <%s> does not have Length attribute" % INPUT_NETWORK)
         return
 
     # check that coeff is at least 1
     if INPUT_COEFF < 1:
-        AddError("Redundancy coefficient <%s> must be at least 1" %
-                 INPUT_COEFF)
+        add_error("Redundancy coefficient <%s> must be at least 1" %
+                  INPUT_COEFF)
         return
 
     # extract origin and destination ids
     origin_ids = flagged_points(INPUT_POINTS, INPUT_ORIGINS_FIELD)
     if len(origin_ids) != 1:
-        AddError("Number of origins <%s> must be 1" % len(origin_ids))
+        add_error("Number of origins <%s> must be 1" % len(origin_ids))
         return
     origin_id = origin_ids[0]
     destination_ids = flagged_points(INPUT_POINTS, INPUT_DESTINATIONS_FIELD)
     if len(destination_ids) == 0 or origin_ids == destination_ids:
-        AddWarning("No OD pair found, no computation will be done")
+        add_warning("No OD pair found, no computation will be done")
         return
 
     # check that the output file does not already exist
     output_feature_class = "%s.shp" % join(INPUT_OUTPUT_DIRECTORY,
                                            INPUT_OUTPUT_FEATURE_CLASS_NAME)
     if Exists(output_feature_class):
-        AddError("Output feature class <%s> already exists" %
-                 output_feature_class)
+        add_error("Output feature class <%s> already exists" %
+                  output_feature_class)
         return
 
     # obtain visualization method
@@ -85,19 +101,25 @@ def main():
     elif INPUT_VISUALIZATION == "Path Polylines":
         visualize_polylines = True
     elif INPUT_VISUALIZATION != "None":
-        AddError("Visualization method <%s> must be one of 'Unique Segments', "
-                 "'Path Polylines', or 'None'" % INPUT_VISUALIZATION)
+        add_error("Visualization method <%s> must be one of 'Unique Segments', "
+                  "'Path Polylines', or 'None'" % INPUT_VISUALIZATION)
         return
 
     # setup
     env.overwriteOutput = True
 
+    memory_profile = (Memory_Profile(SOFT_MEMORY_LIMIT) if PROFILE_MEMORY or
+                      SOFT_MEMORY_LIMIT is not None else None)
+
     # construct network and points
     network, points, edge_to_points = construct_network_and_load_buildings(
         INPUT_POINTS, INPUT_NETWORK)
+    if memory_profile is not None:
+        memory_profile.sample("Network loaded", network=network,
+                              points=points, edge_to_points=edge_to_points)
 
     # find redundant paths for each origin-destination
-    AddMessage("Computing redundant paths ...")
+    add_message("Computing redundant paths ...")
     progress_bar = Progress_Bar(len(destination_ids), 1, "Finding paths ...")
     # build output table one row at a time, starting from header row
     answers = [["OrigID", "DestID", "NumPaths", "Redundancy"]]
@@ -109,10 +131,16 @@ def main():
         polyline_data = []
     elif visualize_segments:
         all_unique_segment_counts = defaultdict(int)
+    pair_log = (Pair_Log("%s_Pairs.jsonl" % join(INPUT_OUTPUT_DIRECTORY,
+                                                 INPUT_OUTPUT_FEATURE_CLASS_NAME),
+                         "Redundant paths") if LOG_PAIRS else None)
     for destination_id in destination_ids:
         if origin_id != destination_id:
-            all_paths = find_all_paths(network, points, INPUT_COEFF, origin_id,
-                                       destination_id, INPUT_SEARCH_RADIUS, INPUT_COMPUTE_WAYFINDING)
+            with span("Redundant paths", OD_PAIR, origin=origin_id,
+                      destination=destination_id):
+                all_paths = find_all_paths(network, points, INPUT_COEFF, origin_id,
+                                           destination_id, INPUT_SEARCH_RADIUS, INPUT_COMPUTE_WAYFINDING,
+                                           pair_log)
             if all_paths is not None:
                 if INPUT_COMPUTE_WAYFINDING:
                     (all_path_points, unique_segment_counts, num_paths,
@@ -134,11 +162,22 @@ def main():
                         all_unique_segment_counts[edge_id] += unique_segment_counts[
                             edge_id]
         progress_bar.step()
-    AddMessage("\tDone.")
+    if pair_log is not None:
+        pair_log.close()
+    add_message("\tDone.")
+    if memory_profile is not None:
+        memory_profile.sample("Paths found", answers=answers,
+                              paths=(polylines if visualize_polylines else
+                                     all_unique_segment_counts if
+                                     visualize_segments else None))
+        memory_profile.close()
+        if PROFILE_MEMORY:
+            memory_profile.dump("%s_Memory_Profile.json" % join(
+                INPUT_OUTPUT_DIRECTORY, INPUT_OUTPUT_FEATURE_CLASS_NAME))
 
     # write out results
     if len(answers) > 1:
-        AddMessage("Writing out results ...")
+        add_message("Writing out results ...")
         # write out to a table
         write_rows_to_csv(answers, INPUT_OUTPUT_DIRECTORY,
                           INPUT_OUTPUT_FEATURE_CLASS_NAME)
@@ -176,6 +215,6 @@ def main():
             for row in rows:
                 row[1] = all_unique_segment_counts[id_mapping[row[0]]]
                 rows.updateRow(row)
-        AddMessage("\tDone.")
+        add_message("\tDone.")
     else:
-        AddMessage("No results to write out.")
+        add_message("No results to write out.")
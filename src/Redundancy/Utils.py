@@ -1,29 +1,17 @@
 """
 Utility methods.
+arcpy is imported by the methods that need it, so that the others can be used
+    without ArcGIS.
 """
 
 __author__ = 'Michael Mekonnen (mike22meko@gmail.com)'
 
-from arcpy import ApplySymbologyFromLayer_management
-from arcpy import CalculateLocations_na
-from arcpy import CheckInExtension
-from arcpy import CheckOutExtension
-from arcpy import Describe
-from arcpy import ListFields
-from arcpy import MakeFeatureLayer_management
-# from arcpy import RefreshCatalog
-from arcpy import RefreshLayer
-from arcpy import SaveToLayerFile_management
-from arcpy import Select_analysis
-from arcpy.da import SearchCursor
-# from arcpy.mapping import AddLayer
-# from arcpy.mapping import Layer
-# from arcpy.mapping import ListDataFrames
-# from arcpy.mapping import MapDocument
-from arcpy import mp
 from collections.abc import Hashable
 from csv import writer
 from os.path import join
+from src.Common.Geodata.Backend import default_backend
+from src.Common.Geodata.Backend import OID
+from src.Common.Utils.Messages import headless
 from sys import path
 
 
@@ -48,9 +36,16 @@ class memoized:
 def add_layer_to_display(layer):
     """
     Adds the given |layer| to the list of ArcMap layers so that it is visible.
-    Returns True on success and False on failure.
+    Returns True on success and False on failure, or when running headless.
     """
+    if headless():
+        return False
     try:
+        # from arcpy.mapping import AddLayer
+        # from arcpy.mapping import Layer
+        # from arcpy.mapping import ListDataFrames
+        # from arcpy.mapping import MapDocument
+        from arcpy import mp
         # data_frame = ListDataFrames(MapDocument("CURRENT"), "Layers")[0]
         # AddLayer(data_frame, Layer(layer), "AUTO_ARRANGE")
 
@@ -68,7 +63,7 @@ def fields(dataset):
     """
     Returns a set of the fields in the attribute table of the given |dataset|.
     """
-    return set([field.name for field in ListFields(dataset)])
+    return set(default_backend().fields(dataset))
 
 
 def network_features(network):
@@ -76,6 +71,7 @@ def network_features(network):
     Returns the junction and edge feature names of the given |network| dataset if
         they are both present. Raises an Exception otherwise.
     """
+    from arcpy import Describe
     edge_feature = None
     junction_feature = None
     for source in Describe(network).sources:
@@ -109,6 +105,9 @@ def calculate_network_locations(points, network):
     |points|: a feature class (points or polygons).
     |network|: a network dataset.
     """
+    from arcpy import CalculateLocations_na
+    from arcpy import CheckInExtension
+    from arcpy import CheckOutExtension
     CheckOutExtension("Network")
     CalculateLocations_na(in_point_features=points,
                           in_network_dataset=network,
@@ -123,8 +122,7 @@ def network_cost_attributes(network):
     """
     Returns a set of the cost attributes for the given |network|.
     """
-    return set([attribute.name for attribute in Describe(network).attributes if
-                attribute.usageType == "Cost"])
+    return default_backend().cost_attributes(network)
 
 
 def edge_building_weight_sum(network, edge_to_points, edge_id):
@@ -165,11 +163,12 @@ def flagged_points(input_points, field):
         respective values of the |field| attribute are numbers greater than 0.
         If |field| is invalid, ids of all points are returned.
     """
+    backend = default_backend()
     if field in fields(input_points):
-        return [int(oid) for oid, flag in SearchCursor(input_points,
-                                                       ["OID@", field]) if is_number(flag) and float(flag) > 0]
+        return [int(oid) for oid, flag in backend.iter_rows(input_points,
+                                                            [OID, field]) if is_number(flag) and float(flag) > 0]
     else:
-        return [int(oid) for oid, in SearchCursor(input_points, ["OID@"])]
+        return [int(oid) for oid, in backend.iter_rows(input_points, [OID])]
 
 
 def polyline_points(polyline):
@@ -191,6 +190,8 @@ def write_rows_to_csv(rows, output_dir, output_name):
     """
     Writes the given |rows| of data to a cvs file in the given location.
     """
+    # from arcpy import RefreshCatalog
+    from arcpy import RefreshLayer
     file_name = f"{join(output_dir, output_name)}.csv"
     c = writer(open(file_name, "wb"))
     c.writerows(rows)
@@ -199,6 +200,7 @@ def write_rows_to_csv(rows, output_dir, output_name):
 
 
 def getEdgePathFromNetwork(network_file_path):
+    from arcpy import Describe
     desc = Describe(network_file_path)
     assert desc.dataType in ("NetworkDataset", "NetworkDatasetLayer")
     assert len(desc.edgeSources) > 0
@@ -218,6 +220,11 @@ def select_edges_from_network(network, edges, directory, name):
         file, as recorded in the |edges| set. Also returns the path to the created
         shape file.
     """
+    from arcpy import ApplySymbologyFromLayer_management
+    from arcpy import Describe
+    from arcpy import MakeFeatureLayer_management
+    from arcpy import SaveToLayerFile_management
+    from arcpy import Select_analysis
     network_edges = getEdgePathFromNetwork(network)
     id_name = ("FID" if Describe(network_edges).extension == "shp" else
                "OBJECTID")